@@ -34,11 +34,41 @@ def create_app(config_name='development'):
     env_config = os.getenv('FLASK_ENV', config_name)
     app.config.from_object(config.get(env_config, config['default']))
 
+    # Client address/scheme from the trusted reverse proxies (nginx in docker-compose)
+    proxy_count = app.config.get('TRUSTED_PROXY_COUNT', 0)
+    if proxy_count:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxy_count, x_proto=proxy_count)
+
     # Initialize extensions
     db.init_app(app)
     migrate.init_app(app, db)
     jwt.init_app(app)
 
+    # Revoked JWTs (logout, refresh rotation, deactivated users)
+    from app.services.token_revocation_service import init_token_revocation
+    init_token_revocation(jwt)
+
+    # Structured logging (JSON, queue-backed, rate-limited)
+    from app.utils.structured_logging import init_logging
+    init_logging(app)
+
+    # Per-request SQL counting/timing, Server-Timing (debug) and /metrics
+    from app.middleware.request_metrics import init_request_metrics
+    init_request_metrics(app, db)
+
+    # Diagnosis stage spans (no-op unless TRACING_EXPORTER is set)
+    from app.utils.tracing import init_tracing
+    init_tracing(app)
+
+    # Background job queue (embedded worker thread unless JOB_QUEUE_MODE says otherwise)
+    from app.services.job_queue_service import init_job_queue
+    init_job_queue(app)
+
+    # `flask jobs ...` commands
+    from app.cli import register_commands
+    register_commands(app)
+
     # Configure CORS - allow multiple frontend URLs
     def _split_origins(value):
         if not value:
@@ -73,7 +103,7 @@ def create_app(config_name='development'):
 
     # Import models here to avoid circular imports
     with app.app_context():
-        from app.models import user, disease, symptom, rule, history, admin_log, system_settings
+        from app.models import user, disease, symptom, rule, history, admin_log, system_settings, solution_library, job, diagnosis_stats, revoked_token, diagnosis_session
 
     # Register middleware
     from app.middleware.maintenance import is_maintenance_mode, get_maintenance_message
@@ -86,6 +116,7 @@ def create_app(config_name='development'):
         # Skip maintenance check for admin routes, health check, and static files
         if (request.path.startswith('/admin') or
             request.path == '/health' or
+            request.path == '/metrics' or
             request.path.startswith('/static')):
             return None
 
@@ -156,6 +187,11 @@ def create_app(config_name='development'):
     # Health check
     @app.route('/health')
     def health():
-        return {'status': 'ok', 'message': 'Sistem Pakar Padi API is running'}
+        from app.utils.circuit_breaker import breaker_states
+        return {
+            'status': 'ok',
+            'message': 'Sistem Pakar Padi API is running',
+            'circuit_breakers': breaker_states()
+        }
 
     return app
@@ -1,6 +1,6 @@
 """
 Admin Panel Package
-11 Admin Menu Modules
+12 Admin Menu Modules
 """
 
 from flask import Blueprint, redirect, url_for
@@ -15,12 +15,14 @@ from app.admin import (
     kelola_penyakit,
     kelola_gejala,
     kelola_rule,
+    kelola_solusi,
     data_pengguna,
     riwayat_diagnosis,
     laporan,
     pengaturan_sistem,
     logs,
-    pengaturan_admin
+    pengaturan_admin,
+    antrian_tugas
 )
 
 # Register sub-blueprints
@@ -29,12 +31,14 @@ admin_bp.register_blueprint(dashboard.bp, url_prefix='/dashboard')
 admin_bp.register_blueprint(kelola_penyakit.bp, url_prefix='/penyakit')
 admin_bp.register_blueprint(kelola_gejala.bp, url_prefix='/gejala')
 admin_bp.register_blueprint(kelola_rule.bp, url_prefix='/rule')
+admin_bp.register_blueprint(kelola_solusi.bp, url_prefix='/solusi')
 admin_bp.register_blueprint(data_pengguna.bp, url_prefix='/pengguna')
 admin_bp.register_blueprint(riwayat_diagnosis.bp, url_prefix='/riwayat')
 admin_bp.register_blueprint(laporan.bp, url_prefix='/laporan')
 admin_bp.register_blueprint(pengaturan_sistem.bp, url_prefix='/pengaturan-sistem')
 admin_bp.register_blueprint(logs.bp, url_prefix='/logs')
 admin_bp.register_blueprint(pengaturan_admin.bp, url_prefix='/pengaturan')
+admin_bp.register_blueprint(antrian_tugas.bp, url_prefix='/antrian-tugas')
 
 # Root admin route - redirect to login
 @admin_bp.route('/')
@@ -0,0 +1,111 @@
+"""Admin - Antrian Tugas (Background Job Queue)"""
+from flask import Blueprint, jsonify, request, session
+from app import db
+from app.models.job import Job
+from app.models.admin_log import AdminLog
+from app.services.job_queue_service import JobQueueService
+
+bp = Blueprint('admin_jobs', __name__)
+
+@bp.route('/list', methods=['GET'])
+def get_jobs():
+    """List jobs with optional status/task filter - session based"""
+    if 'admin_id' not in session:
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+
+    page = int(request.args.get('page', 1))
+    per_page = int(request.args.get('per_page', 20))
+    status = request.args.get('status', '')
+    task = request.args.get('task', '')
+
+    query = Job.query
+    if status:
+        query = query.filter(Job.status == status)
+    if task:
+        query = query.filter(Job.task == task)
+
+    pagination = query.order_by(Job.id.desc()).paginate(
+        page=page, per_page=per_page, error_out=False
+    )
+
+    return jsonify({
+        'success': True,
+        'data': [job.to_dict() for job in pagination.items],
+        'pagination': {
+            'page': page,
+            'per_page': per_page,
+            'total': pagination.total,
+            'pages': pagination.pages
+        },
+        'stats': JobQueueService.stats()
+    })
+
+@bp.route('/stats', methods=['GET'])
+def get_job_stats():
+    """Job counts per status - session based"""
+    if 'admin_id' not in session:
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+
+    return jsonify({'success': True, 'data': JobQueueService.stats()})
+
+@bp.route('/<int:job_id>', methods=['GET'])
+def get_job(job_id):
+    """Get job status, progress and result - session based"""
+    if 'admin_id' not in session:
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+
+    job = db.session.get(Job, job_id)
+    if job is None:
+        return jsonify({'success': False, 'message': 'Tugas tidak ditemukan'}), 404
+    return jsonify({'success': True, 'data': job.to_dict()})
+
+@bp.route('/<int:job_id>/retry', methods=['POST'])
+def retry_job(job_id):
+    """Queue a failed or cancelled job again - session based"""
+    if 'admin_id' not in session:
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+
+    job = db.session.get(Job, job_id)
+    if job is None:
+        return jsonify({'success': False, 'message': 'Tugas tidak ditemukan'}), 404
+    if not JobQueueService.retry(job_id):
+        return jsonify({'success': False, 'message': f'Tugas berstatus {job.status}, tidak bisa diulang'}), 409
+
+    _log_action(job_id, f'Ulangi tugas #{job_id} ({job.task})')
+    return jsonify({'success': True, 'message': 'Tugas dijadwalkan ulang', 'data': JobQueueService.get(job_id).to_dict()})
+
+@bp.route('/<int:job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """Cancel a job that has not started yet - session based"""
+    if 'admin_id' not in session:
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+
+    job = db.session.get(Job, job_id)
+    if job is None:
+        return jsonify({'success': False, 'message': 'Tugas tidak ditemukan'}), 404
+    if not JobQueueService.cancel(job_id):
+        return jsonify({'success': False, 'message': f'Tugas berstatus {job.status}, tidak bisa dibatalkan'}), 409
+
+    _log_action(job_id, f'Batalkan tugas #{job_id} ({job.task})')
+    return jsonify({'success': True, 'message': 'Tugas dibatalkan', 'data': JobQueueService.get(job_id).to_dict()})
+
+@bp.route('/jadwal', methods=['GET'])
+def get_schedule():
+    """Maintenance schedule: interval, last run and next due time per task - session based"""
+    if 'admin_id' not in session:
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+
+    from app.services.scheduler_service import SchedulerService
+    return jsonify({'success': True, 'data': SchedulerService.status()})
+
+def _log_action(job_id, description):
+    log = AdminLog(
+        admin_id=session.get('admin_id'),
+        action='UPDATE',
+        description=description,
+        table_name='jobs',
+        record_id=job_id,
+        ip_address=request.remote_addr
+    )
+    db.session.add(log)
+    db.session.commit()
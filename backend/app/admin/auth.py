@@ -5,6 +5,8 @@ from app import db
 from app.models.user import User
 from app.models.admin_log import AdminLog
 from app.utils.decorators import admin_required
+from app.utils.login_throttle import LoginThrottle
+from app.services.password_service import PasswordHashingBusy
 from functools import wraps
 import re
 
@@ -55,14 +57,30 @@ def admin_login():
         flash('Login admin hanya dapat dilakukan dari halaman admin', 'danger')
         return redirect(url_for('admin.admin_auth.login_page'))
 
+    # Per-client and per-account brute-force limits, checked before any password hashing
+    ip = request.remote_addr
+    retry_after = LoginThrottle.retry_after(ip, email)
+    if retry_after:
+        flash(f'Terlalu banyak percobaan login. Coba lagi dalam {retry_after} detik.', 'danger')
+        return redirect(url_for('admin.admin_auth.login_page'))
+
     # Find user
     user = User.query.filter_by(email=email).first()
 
     # Validate credentials and role
-    if not user or not user.check_password(password):
+    try:
+        valid = user is not None and user.check_password(password)
+    except PasswordHashingBusy as e:
+        flash(str(e), 'danger')
+        return redirect(url_for('admin.admin_auth.login_page'))
+
+    if not valid:
+        LoginThrottle.record_failure(ip, email)
         flash('Email atau password salah', 'danger')
         return redirect(url_for('admin.admin_auth.login_page'))
 
+    LoginThrottle.record_success(email)
+
     if user.role != 'admin':
         flash('Akses ditolak. Hanya admin yang dapat login dari halaman ini', 'danger')
         return redirect(url_for('admin.admin_auth.login_page'))
@@ -81,7 +99,8 @@ def admin_login():
     session.permanent = False  # Session expires when browser closes
     session.modified = True  # Mark session as modified
 
-    # Update last login
+    # Update last login (and the hash, if the hashing parameters changed)
+    user.rehash_password_if_needed(password)
     user.last_login = datetime.utcnow()
 
     # Log admin login
@@ -1,11 +1,17 @@
 """Admin - Data Pengguna (User Management)"""
+import logging
 from flask import Blueprint, jsonify, request, render_template, session, redirect, url_for
 from datetime import datetime, timedelta
 from app import db
 from app.models.user import User
 from app.models.history import DiagnosisHistory
 from app.models.admin_log import AdminLog
-from sqlalchemy import func, or_
+from app.services.token_revocation_service import TokenRevocationService
+from app.services.user_search_service import UserSearchService
+from app.utils.principal_cache import PrincipalCache
+from sqlalchemy import func
+
+logger = logging.getLogger(__name__)
 
 bp = Blueprint('admin_users', __name__)
 
@@ -35,14 +41,11 @@ def get_all_users():
     # Build query
     query = User.query
 
-    # Apply search filter
+    # Apply search filter (indexed, best match first)
     if search:
-        query = query.filter(
-            or_(
-                User.email.ilike(f'%{search}%'),
-                User.full_name.ilike(f'%{search}%')
-            )
-        )
+        query = UserSearchService.search(query, search)
+    else:
+        query = query.order_by(User.created_at.desc())
 
     # Apply role filter
     if role:
@@ -54,9 +57,7 @@ def get_all_users():
         query = query.filter_by(is_active=is_active_bool)
 
     # Paginate
-    pagination = query.order_by(User.created_at.desc()).paginate(
-        page=page, per_page=per_page, error_out=False
-    )
+    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
 
     return jsonify({
         'success': True,
@@ -70,6 +71,38 @@ def get_all_users():
     })
 
 
+@bp.route('/search', methods=['GET'])
+def search_users():
+    """Quick user lookup by email or name, best match first - session based"""
+    # Check if admin is logged in
+    if 'admin_id' not in session:
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+
+    term = request.args.get('q', '').strip()
+    limit = min(int(request.args.get('limit', 10)), 50)
+    if not term:
+        return jsonify({'success': True, 'data': []})
+
+    users = UserSearchService.search(
+        db.session.query(User.id, User.email, User.full_name, User.role, User.is_active),
+        term
+    ).limit(limit).all()
+
+    return jsonify({
+        'success': True,
+        'data': [
+            {
+                'id': user.id,
+                'email': user.email,
+                'full_name': user.full_name,
+                'role': user.role,
+                'is_active': user.is_active
+            }
+            for user in users
+        ]
+    })
+
+
 @bp.route('/<int:user_id>', methods=['GET'])
 def get_user(user_id):
     """Get single user detail with diagnosis history count - session based"""
@@ -127,6 +160,7 @@ def create_user():
         }), 201
 
     except Exception as e:
+        logger.exception('create_user failed')
         db.session.rollback()
         return jsonify({
             'success': False,
@@ -159,14 +193,20 @@ def update_user(user_id):
         if 'role' in data:
             user.role = data['role']
 
+        was_active = user.is_active
         if 'is_active' in data:
             user.is_active = data['is_active']
 
-        if 'password' in data and data['password']:
+        password_changed = bool(data.get('password'))
+        if password_changed:
             user.set_password(data['password'])
 
         user.updated_at = datetime.utcnow()
         db.session.commit()
+        PrincipalCache.invalidate(user_id)
+        if password_changed or (was_active and not user.is_active):
+            # Existing sessions end now instead of when their tokens expire
+            TokenRevocationService.revoke_user(user_id)
 
         return jsonify({
             'success': True,
@@ -175,6 +215,7 @@ def update_user(user_id):
         })
 
     except Exception as e:
+        logger.exception('update_user failed')
         db.session.rollback()
         return jsonify({'success': False, 'message': f'Error: {str(e)}'}), 500
 
@@ -202,12 +243,16 @@ def toggle_user_status(user_id):
 
     try:
         db.session.commit()
+        PrincipalCache.invalidate(user_id)
+        if not user.is_active:
+            TokenRevocationService.revoke_user(user_id)
         return jsonify({
             'success': True,
             'message': f"User berhasil {'diaktifkan' if user.is_active else 'dinonaktifkan'}",
             'data': user.to_dict()
         })
     except Exception as e:
+        logger.exception('toggle_user_status failed')
         db.session.rollback()
         return jsonify({
             'success': False,
@@ -254,6 +299,8 @@ def delete_user(user_id):
         db.session.add(log)
 
         db.session.commit()
+        PrincipalCache.invalidate(user_id)
+        TokenRevocationService.revoke_user(user_id)
 
         return jsonify({
             'success': True,
@@ -261,6 +308,65 @@ def delete_user(user_id):
         })
 
     except Exception as e:
+        logger.exception('delete_user failed')
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': f'Error: {str(e)}'
+        }), 500
+
+
+@bp.route('/broadcast', methods=['POST'])
+def broadcast_email():
+    """Queue an email to all (or only active) users - session based"""
+    # Check if admin is logged in
+    if 'admin_id' not in session:
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+
+    from app.services.email_service import EmailService
+
+    data = request.get_json() or {}
+    subject = (data.get('subject') or '').strip()
+    body = data.get('body') or ''
+    if not subject or not body.strip():
+        return jsonify({'success': False, 'message': 'Subjek dan isi email harus diisi'}), 400
+    if not EmailService().enabled:
+        return jsonify({'success': False, 'message': 'Notifikasi email belum diaktifkan atau SMTP belum dikonfigurasi'}), 400
+
+    query = db.session.query(User.email).filter(User.role == 'user')
+    if data.get('only_active', True):
+        query = query.filter(User.is_active.is_(True))
+    messages = [
+        {'to_email': email, 'subject': subject, 'body': body, 'is_html': bool(data.get('is_html', False))}
+        for (email,) in query.all()
+    ]
+    if not messages:
+        return jsonify({'success': False, 'message': 'Tidak ada penerima'}), 400
+
+    admin_id = session.get('admin_id')
+    try:
+        jobs = EmailService.queue_many(messages, created_by=admin_id)
+
+        log = AdminLog(
+            admin_id=admin_id,
+            action='CREATE',
+            table_name='users',
+            description=f'Broadcast email "{subject}" ke {len(messages)} user',
+            ip_address=request.remote_addr
+        )
+        db.session.add(log)
+        db.session.commit()
+
+        return jsonify({
+            'success': True,
+            'message': f'Email untuk {len(messages)} user dijadwalkan',
+            'data': {
+                'recipients': len(messages),
+                'job_ids': [job.id for job in jobs]
+            }
+        }), 202
+    except Exception as e:
+        logger.exception('broadcast_email failed')
         db.session.rollback()
         return jsonify({
             'success': False,
@@ -1,8 +1,11 @@
 """Admin - Kelola Gejala (Manage Symptoms)"""
+from types import SimpleNamespace
 from flask import Blueprint, jsonify, request, render_template, session, redirect, url_for
 from app import db
 from app.models.symptom import Symptom
 from app.models.admin_log import AdminLog
+from app.services.knowledge_base_service import KnowledgeBaseService
+from app.services.symptom_search_service import SymptomSearchService
 
 bp = Blueprint('admin_symptoms', __name__)
 
@@ -25,29 +28,47 @@ def get_all_symptoms():
     category = request.args.get('category', '')
 
     query = Symptom.query
-
-    if search:
-        query = query.filter(
-            db.or_(
-                Symptom.code.ilike(f'%{search}%'),
-                Symptom.name.ilike(f'%{search}%')
-            )
+    # Ranked, typo-tolerant match from the in-memory index; None when the search
+    # has no indexable word ("a", "di"), which falls back to a plain substring filter
+    ranked_ids = SymptomSearchService.matching_ids(search, category or None) if search else None
+
+    if ranked_ids is not None:
+        # Page over the ranked ids
+        page_ids = ranked_ids[(page - 1) * per_page:page * per_page]
+        by_id = {symptom.id: symptom for symptom in query.filter(Symptom.id.in_(page_ids))} if page_ids else {}
+        pagination = SimpleNamespace(
+            items=[by_id[symptom_id] for symptom_id in page_ids if symptom_id in by_id],
+            total=len(ranked_ids),
+            pages=(len(ranked_ids) + per_page - 1) // per_page
         )
+    else:
+        if search:
+            query = query.filter(
+                db.or_(
+                    Symptom.code.ilike(f'%{search}%'),
+                    Symptom.name.ilike(f'%{search}%')
+                )
+            )
+        if category:
+            query = query.filter_by(category=category)
 
-    if category:
-        query = query.filter_by(category=category)
-
-    pagination = query.order_by(Symptom.code).paginate(
-        page=page, per_page=per_page, error_out=False
-    )
+        pagination = query.order_by(Symptom.code).paginate(
+            page=page, per_page=per_page, error_out=False
+        )
 
-    # Add usage count
+    # Add usage count (one grouped query for the whole page)
     from app.models.rule import Rule
+    page_ids = [symptom.id for symptom in pagination.items]
+    usage_counts = dict(
+        db.session.query(Rule.symptom_id, db.func.count(Rule.id))
+        .filter(Rule.symptom_id.in_(page_ids))
+        .group_by(Rule.symptom_id)
+        .all()
+    ) if page_ids else {}
     symptoms_data = []
     for symptom in pagination.items:
         symptom_dict = symptom.to_dict()
-        usage_count = Rule.query.filter_by(symptom_id=symptom.id).count()
-        symptom_dict['usage_count'] = usage_count
+        symptom_dict['usage_count'] = usage_counts.get(symptom.id, 0)
         symptoms_data.append(symptom_dict)
 
     return jsonify({
@@ -114,6 +135,7 @@ def create_symptom():
 
     log.record_id = symptom.id
     db.session.commit()
+    KnowledgeBaseService.invalidate()
 
     return jsonify({
         'success': True,
@@ -166,6 +188,7 @@ def update_symptom(symptom_id):
     )
     db.session.add(log)
     db.session.commit()
+    KnowledgeBaseService.invalidate()
 
     return jsonify({
         'success': True,
@@ -205,6 +228,7 @@ def delete_symptom(symptom_id):
     )
     db.session.add(log)
     db.session.commit()
+    KnowledgeBaseService.invalidate()
 
     return jsonify({
         'success': True,
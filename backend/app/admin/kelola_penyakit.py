@@ -4,6 +4,7 @@ from app import db
 from app.models.disease import Disease
 from app.models.rule import Rule
 from app.models.admin_log import AdminLog
+from app.services.knowledge_base_service import KnowledgeBaseService
 
 bp = Blueprint('admin_diseases', __name__)
 
@@ -37,11 +38,18 @@ def get_all_diseases():
         page=page, per_page=per_page, error_out=False
     )
 
-    # Add rule count to each disease
+    # Add rule count to each disease (one grouped query for the whole page)
+    page_ids = [disease.id for disease in pagination.items]
+    rule_counts = dict(
+        db.session.query(Rule.disease_id, db.func.count(Rule.id))
+        .filter(Rule.disease_id.in_(page_ids))
+        .group_by(Rule.disease_id)
+        .all()
+    ) if page_ids else {}
     diseases_data = []
     for disease in pagination.items:
         disease_dict = disease.to_dict()
-        disease_dict['rule_count'] = Rule.query.filter_by(disease_id=disease.id).count()
+        disease_dict['rule_count'] = rule_counts.get(disease.id, 0)
         diseases_data.append(disease_dict)
 
     return jsonify({
@@ -104,6 +112,7 @@ def create_disease():
     # Update log with record_id
     log.record_id = disease.id
     db.session.commit()
+    KnowledgeBaseService.invalidate()
 
     return jsonify({
         'success': True,
@@ -148,6 +157,7 @@ def update_disease(disease_id):
     db.session.add(log)
 
     db.session.commit()
+    KnowledgeBaseService.invalidate()
 
     return jsonify({
         'success': True,
@@ -186,6 +196,7 @@ def delete_disease(disease_id):
     db.session.add(log)
 
     db.session.commit()
+    KnowledgeBaseService.invalidate()
 
     return jsonify({
         'success': True,
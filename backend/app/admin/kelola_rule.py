@@ -1,33 +1,29 @@
 """Admin - Kelola Rule (Manage Disease/Symptom Rules)"""
 from flask import Blueprint, jsonify, request, render_template, session, redirect, url_for
+from sqlalchemy.orm import joinedload
 from app import db
 from app.models.rule import Rule
 from app.models.disease import Disease
 from app.models.symptom import Symptom
 from app.models.admin_log import AdminLog
+from app.services.knowledge_base_service import KnowledgeBaseService
+from app.services.rule_import_service import RuleImportService, format_rule_code
 
 bp = Blueprint('admin_rules', __name__)
 
 
-def _get_next_rule_number():
-    last_rule = Rule.query.order_by(Rule.id.desc()).first()
-    if last_rule and last_rule.rule_code and last_rule.rule_code[1:].isdigit():
-        return int(last_rule.rule_code[1:]) + 1
-    return 1
-
-
-def _build_rules_for_disease(disease_id, symptoms, cf_value, min_match, is_active, start_num):
+def _build_rules_for_disease(disease_id, symptoms, cf_value, min_match, is_active):
     rules = []
-    next_num = start_num
+    rule_numbers = RuleImportService.allocate_rule_numbers(len(symptoms))
 
-    for symptom in symptoms:
+    for symptom, rule_number in zip(symptoms, rule_numbers):
         base_mb = float(symptom.mb_value) if symptom.mb_value is not None else 0.5
         base_md = float(symptom.md_value) if symptom.md_value is not None else 0.5
         mb = max(0.0, min(1.0, base_mb * cf_value))
         md = max(0.0, min(1.0, base_md * cf_value))
 
         rule = Rule(
-            rule_code=f'R{str(next_num).zfill(3)}',
+            rule_code=format_rule_code(rule_number),
             disease_id=disease_id,
             symptom_id=symptom.id,
             symptom_ids=[symptom.id],
@@ -38,7 +34,6 @@ def _build_rules_for_disease(disease_id, symptoms, cf_value, min_match, is_activ
             is_active=is_active
         )
         rules.append(rule)
-        next_num += 1
 
     return rules
 
@@ -78,13 +73,14 @@ def get_all_rules():
     elif status == 'inactive':
         query = query.filter_by(is_active=False)
 
-    query = query.order_by(Rule.rule_code)
+    # Disease and symptom come in the same SELECT instead of two lookups per rule
+    query = query.options(joinedload(Rule.disease), joinedload(Rule.symptom)).order_by(Rule.rule_code)
     pagination = query.paginate(page=page, per_page=per_page, error_out=False)
 
     data = []
     for rule in pagination.items:
-        disease = Disease.query.get(rule.disease_id)
-        symptom = Symptom.query.get(rule.symptom_id)
+        disease = rule.disease
+        symptom = rule.symptom
 
         data.append({
             'id': rule.id,
@@ -116,6 +112,63 @@ def get_all_rules():
     })
 
 
+@bp.route('/import', methods=['POST'])
+def import_rules():
+    """
+    Bulk import/upsert rules from a CSV/JSON file upload, a JSON body
+    ({'rules': [...], 'mode', 'dry_run'}) or a text/csv body.
+    Columns: disease_code|disease_id, symptom_code|symptom_id, cf_value, mb, md,
+    min_symptom_match, is_active. Nothing is written unless every row is valid.
+    """
+    if not check_admin_session():
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+
+    options = request.args.to_dict()
+    try:
+        upload = request.files.get('file')
+        if upload:
+            options.update(request.form.to_dict())
+            rows = RuleImportService.parse_upload(upload.filename, upload.read())
+        elif request.mimetype == 'text/csv':
+            rows = RuleImportService.parse_csv(request.get_data())
+        else:
+            data = request.get_json(silent=True) or {}
+            if isinstance(data, list):
+                rows = data
+            elif isinstance(data, dict):
+                options.update({key: data[key] for key in ('mode', 'dry_run') if key in data})
+                rows = data.get('rules')
+            else:
+                rows = None
+    except (ValueError, UnicodeDecodeError) as e:
+        return jsonify({'success': False, 'message': f'File tidak dapat dibaca: {e}'}), 400
+
+    mode = options.get('mode', 'upsert')
+    dry_run = str(options.get('dry_run', '')).lower() in ('1', 'true', 'yes')
+    log = AdminLog(
+        admin_id=session.get('admin_id'),
+        action='import_rules',
+        description=f"Impor rule ({mode}): {len(rows) if isinstance(rows, list) else 0} baris",
+        ip_address=request.remote_addr
+    )
+    summary, errors = RuleImportService.import_rules(rows, mode=mode, dry_run=dry_run, log=log)
+    if errors:
+        return jsonify({
+            'success': False,
+            'message': f'{len(errors)} baris tidak valid, tidak ada rule yang disimpan',
+            'errors': errors
+        }), 400
+
+    return jsonify({
+        'success': True,
+        'message': (
+            f"{summary['inserted']} rule ditambahkan, {summary['updated']} diupdate, "
+            f"{summary['deleted']} dihapus" + (' (simulasi)' if dry_run else '')
+        ),
+        'data': summary
+    })
+
+
 @bp.route('/<int:rule_id>', methods=['GET'])
 def get_rule(rule_id):
     """Get single rule detail"""
@@ -198,14 +251,12 @@ def create_rule():
         if min_match < 1 or min_match > len(symptom_ids):
             return jsonify({'success': False, 'message': 'Min match tidak valid'}), 400
 
-        start_num = _get_next_rule_number()
         rules = _build_rules_for_disease(
             disease_id=disease_id,
             symptoms=symptoms,
             cf_value=cf_value,
             min_match=min_match,
-            is_active=data.get('is_active', True),
-            start_num=start_num
+            is_active=data.get('is_active', True)
         )
         for rule in rules:
             db.session.add(rule)
@@ -218,6 +269,7 @@ def create_rule():
         )
         db.session.add(log)
         db.session.commit()
+        KnowledgeBaseService.invalidate()
 
         return jsonify({
             'success': True,
@@ -266,8 +318,7 @@ def create_rule():
         return jsonify({'success': False, 'message': 'Min match minimal 1'}), 400
 
     # Generate rule_code automatically
-    next_num = _get_next_rule_number()
-    rule_code = f'R{str(next_num).zfill(3)}'
+    rule_code = format_rule_code(RuleImportService.allocate_rule_numbers(1)[0])
 
     rule = Rule(
         rule_code=rule_code,
@@ -293,6 +344,7 @@ def create_rule():
     )
     db.session.add(log)
     db.session.commit()
+    KnowledgeBaseService.invalidate()
 
     return jsonify({
         'success': True,
@@ -346,12 +398,15 @@ def update_rule(rule_id):
         if not (0 <= cf_value <= 1):
             return jsonify({'success': False, 'message': 'CF Value harus antara 0 dan 1'}), 400
 
-        try:
-            min_match = int(data.get('min_symptom_match', len(symptom_ids)))
-        except (ValueError, TypeError):
-            return jsonify({'success': False, 'message': 'Min match harus berupa angka'}), 400
-        if min_match < 1 or min_match > len(symptom_ids):
-            return jsonify({'success': False, 'message': 'Min match tidak valid'}), 400
+        # Without a value the disease keeps its min match (see RuleImportService.validate)
+        min_match = data.get('min_symptom_match')
+        if min_match not in (None, ''):
+            try:
+                min_match = int(min_match)
+            except (ValueError, TypeError):
+                return jsonify({'success': False, 'message': 'Min match harus berupa angka'}), 400
+            if min_match < 1 or min_match > len(symptom_ids):
+                return jsonify({'success': False, 'message': 'Min match tidak valid'}), 400
 
         old_disease = Disease.query.get(rule.disease_id)
         if disease_id != rule.disease_id:
@@ -361,21 +416,9 @@ def update_rule(rule_id):
             ).first()
             if existing:
                 return jsonify({'success': False, 'message': 'Rule untuk penyakit ini sudah ada'}), 400
+            Rule.query.filter_by(disease_id=rule.disease_id).delete(synchronize_session=False)
 
-        Rule.query.filter_by(disease_id=rule.disease_id).delete(synchronize_session=False)
-
-        start_num = _get_next_rule_number()
-        rules = _build_rules_for_disease(
-            disease_id=disease_id,
-            symptoms=symptoms,
-            cf_value=cf_value,
-            min_match=min_match,
-            is_active=data.get('is_active', True),
-            start_num=start_num
-        )
-        for new_rule in rules:
-            db.session.add(new_rule)
-
+        # Kept symptoms keep their rule (id and code), removed ones are deleted, new ones inserted
         log = AdminLog(
             admin_id=admin_id,
             action='update_rule',
@@ -385,8 +428,19 @@ def update_rule(rule_id):
             ),
             ip_address=request.remote_addr
         )
-        db.session.add(log)
-        db.session.commit()
+        _, errors = RuleImportService.import_rules([
+            {
+                'disease_id': disease_id,
+                'symptom_id': symptom.id,
+                'cf_value': cf_value,
+                'min_symptom_match': min_match,
+                'is_active': data.get('is_active', True)
+            }
+            for symptom in symptoms
+        ], mode='replace', log=log)
+        if errors:
+            db.session.rollback()
+            return jsonify({'success': False, 'message': errors[0]['message']}), 400
 
         return jsonify({
             'success': True,
@@ -454,6 +508,7 @@ def update_rule(rule_id):
     )
     db.session.add(log)
     db.session.commit()
+    KnowledgeBaseService.invalidate()
 
     return jsonify({
         'success': True,
@@ -487,6 +542,7 @@ def delete_rule(rule_id):
         )
         db.session.add(log)
         db.session.commit()
+        KnowledgeBaseService.invalidate()
 
         return jsonify({
             'success': True,
@@ -509,6 +565,7 @@ def delete_rule(rule_id):
     )
     db.session.add(log)
     db.session.commit()
+    KnowledgeBaseService.invalidate()
 
     return jsonify({
         'success': True,
@@ -550,6 +607,7 @@ def toggle_rule_status(rule_id):
         )
         db.session.add(log)
         db.session.commit()
+        KnowledgeBaseService.invalidate()
 
         return jsonify({
             'success': True,
@@ -571,6 +629,7 @@ def toggle_rule_status(rule_id):
     )
     db.session.add(log)
     db.session.commit()
+    KnowledgeBaseService.invalidate()
 
     return jsonify({
         'success': True,
@@ -0,0 +1,303 @@
+"""Admin - Kelola Pustaka Solusi (Manage Solution Library)"""
+import json
+from datetime import datetime
+from flask import Blueprint, jsonify, request, render_template, session, redirect, url_for, make_response
+from app import db
+from app.models.disease import Disease
+from app.models.solution_library import SolutionLibrary
+from app.models.admin_log import AdminLog
+from app.services.solution_library_service import SolutionLibraryService
+
+bp = Blueprint('admin_solutions', __name__)
+
+@bp.route('/', methods=['GET'])
+def solutions_page():
+    """Render solution library page - session based"""
+    if 'admin_id' not in session:
+        return redirect(url_for('admin.admin_auth.login_page'))
+    return render_template('admin/kelola_solusi.html', bands=list(SolutionLibraryService.BANDS))
+
+@bp.route('/list', methods=['GET'])
+def get_all_solutions():
+    """Get library entries with pagination and coverage - session based"""
+    if 'admin_id' not in session:
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+
+    page = int(request.args.get('page', 1))
+    per_page = int(request.args.get('per_page', 10))
+    search = request.args.get('search', '')
+    band = request.args.get('band', '')
+    status = request.args.get('status', '')
+
+    query = SolutionLibrary.query.join(Disease)
+    if search:
+        query = query.filter(
+            db.or_(
+                Disease.code.ilike(f'%{search}%'),
+                Disease.name.ilike(f'%{search}%')
+            )
+        )
+    if band:
+        query = query.filter(SolutionLibrary.confidence_band == band)
+    if status == 'active':
+        query = query.filter(SolutionLibrary.is_active.is_(True))
+    elif status == 'inactive':
+        query = query.filter(SolutionLibrary.is_active.is_(False))
+    elif status == 'pending':
+        # Generated by the AI and not activated yet
+        query = query.filter(SolutionLibrary.is_active.is_(False), SolutionLibrary.source == 'ai')
+
+    band_order = db.case(
+        {name: index for index, name in enumerate(SolutionLibraryService.BANDS)},
+        value=SolutionLibrary.confidence_band
+    )
+    pagination = query.order_by(Disease.code, band_order).paginate(
+        page=page, per_page=per_page, error_out=False
+    )
+
+    total_diseases = Disease.query.count()
+    active_entries = SolutionLibrary.query.filter(SolutionLibrary.is_active.is_(True)).count()
+    pending_entries = SolutionLibrary.query.filter(
+        SolutionLibrary.is_active.is_(False), SolutionLibrary.source == 'ai'
+    ).count()
+
+    return jsonify({
+        'success': True,
+        'data': [entry.to_dict() for entry in pagination.items],
+        'coverage': {
+            'diseases': total_diseases,
+            'expected_entries': total_diseases * len(SolutionLibraryService.BANDS),
+            'active_entries': active_entries,
+            'pending_entries': pending_entries
+        },
+        'pagination': {
+            'page': page,
+            'per_page': per_page,
+            'total': pagination.total,
+            'pages': pagination.pages
+        }
+    })
+
+@bp.route('/<int:solution_id>', methods=['GET'])
+def get_solution(solution_id):
+    """Get single library entry - session based"""
+    if 'admin_id' not in session:
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+
+    entry = SolutionLibrary.query.get_or_404(solution_id)
+    return jsonify({'success': True, 'data': entry.to_dict()})
+
+@bp.route('/<int:solution_id>', methods=['PUT'])
+def update_solution(solution_id):
+    """Update library entry; edited entries become 'manual' - session based"""
+    if 'admin_id' not in session:
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+
+    entry = SolutionLibrary.query.get_or_404(solution_id)
+    data = request.get_json() or {}
+    admin_id = session.get('admin_id')
+
+    if 'solution_json' in data:
+        error = SolutionLibraryService.validate_solution(data['solution_json'])
+        if error:
+            return jsonify({'success': False, 'message': error}), 400
+        entry.solution_json = data['solution_json']
+        entry.source = 'manual'
+    if 'raw_text' in data:
+        entry.raw_text = data['raw_text']
+        entry.source = 'manual'
+    if 'is_active' in data:
+        entry.is_active = bool(data['is_active'])
+
+    log = AdminLog(
+        admin_id=admin_id,
+        action='UPDATE',
+        description=f"Update pustaka solusi: {entry.disease.code} ({entry.confidence_band})",
+        table_name='solution_library',
+        record_id=entry.id,
+        ip_address=request.remote_addr
+    )
+    db.session.add(log)
+    db.session.commit()
+    SolutionLibraryService.invalidate()
+
+    return jsonify({
+        'success': True,
+        'message': 'Solusi berhasil diupdate',
+        'data': entry.to_dict()
+    })
+
+@bp.route('/<int:solution_id>', methods=['DELETE'])
+def delete_solution(solution_id):
+    """Delete library entry - session based"""
+    if 'admin_id' not in session:
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+
+    entry = SolutionLibrary.query.get_or_404(solution_id)
+    admin_id = session.get('admin_id')
+
+    log = AdminLog(
+        admin_id=admin_id,
+        action='DELETE',
+        description=f"Menghapus pustaka solusi: {entry.disease.code} ({entry.confidence_band})",
+        table_name='solution_library',
+        record_id=entry.id,
+        ip_address=request.remote_addr
+    )
+    db.session.add(log)
+    db.session.delete(entry)
+    db.session.commit()
+    SolutionLibraryService.invalidate()
+
+    return jsonify({'success': True, 'message': 'Solusi berhasil dihapus'})
+
+@bp.route('/bulk', methods=['POST'])
+def bulk_solutions():
+    """
+    Bulk edit - session based
+    {'action': 'activate' | 'deactivate' | 'delete', 'ids': [...]}
+    {'action': 'upsert', 'entries': [{'disease_code', 'confidence_band', 'solution_json', 'raw_text'?, 'is_active'?}]}
+    """
+    if 'admin_id' not in session:
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+
+    data = request.get_json() or {}
+    action = data.get('action')
+    admin_id = session.get('admin_id')
+
+    if action in ('activate', 'deactivate', 'delete'):
+        ids = [int(i) for i in data.get('ids') or []]
+        if not ids:
+            return jsonify({'success': False, 'message': 'Tidak ada solusi yang dipilih'}), 400
+        query = SolutionLibrary.query.filter(SolutionLibrary.id.in_(ids))
+        if action == 'delete':
+            affected = query.delete(synchronize_session=False)
+        else:
+            affected = query.update({'is_active': action == 'activate'}, synchronize_session=False)
+        description = f"Bulk {action} pustaka solusi: {affected} entri"
+
+    elif action == 'upsert':
+        entries = data.get('entries') or []
+        if not entries:
+            return jsonify({'success': False, 'message': 'Data solusi kosong'}), 400
+
+        diseases = {d.code: d.id for d in Disease.query.filter(
+            Disease.code.in_({e.get('disease_code') for e in entries})
+        ).all()}
+
+        # Validate everything before writing anything
+        errors = []
+        for index, item in enumerate(entries, start=1):
+            if item.get('disease_code') not in diseases:
+                errors.append(f"Baris {index}: kode penyakit '{item.get('disease_code')}' tidak ditemukan")
+            elif item.get('confidence_band') not in SolutionLibraryService.BANDS:
+                errors.append(f"Baris {index}: tingkat keyakinan '{item.get('confidence_band')}' tidak valid")
+            else:
+                error = SolutionLibraryService.validate_solution(item.get('solution_json'))
+                if error:
+                    errors.append(f"Baris {index}: {error}")
+        if errors:
+            return jsonify({'success': False, 'message': 'Data solusi tidak valid', 'errors': errors[:50]}), 400
+
+        existing = {
+            (e.disease_id, e.confidence_band): e
+            for e in SolutionLibrary.query.filter(SolutionLibrary.disease_id.in_(diseases.values())).all()
+        }
+        created = 0
+        for item in entries:
+            key = (diseases[item['disease_code']], item['confidence_band'])
+            entry = existing.get(key)
+            if entry is None:
+                entry = SolutionLibrary(disease_id=key[0], confidence_band=key[1])
+                db.session.add(entry)
+                existing[key] = entry
+                created += 1
+            entry.solution_json = item['solution_json']
+            entry.raw_text = item.get('raw_text', entry.raw_text)
+            entry.is_active = bool(item.get('is_active', True))
+            entry.source = 'manual'
+        affected = len(entries)
+        description = f"Import pustaka solusi: {affected} entri ({created} baru)"
+
+    else:
+        return jsonify({'success': False, 'message': 'Aksi tidak dikenal'}), 400
+
+    log = AdminLog(
+        admin_id=admin_id,
+        action='DELETE' if action == 'delete' else 'UPDATE',
+        description=description,
+        table_name='solution_library',
+        record_id=None,
+        ip_address=request.remote_addr
+    )
+    db.session.add(log)
+    db.session.commit()
+    SolutionLibraryService.invalidate()
+
+    return jsonify({
+        'success': True,
+        'message': f'{affected} solusi berhasil diproses',
+        'affected': affected
+    })
+
+@bp.route('/export', methods=['GET'])
+def export_solutions():
+    """Export library as JSON in the bulk upsert format - session based"""
+    if 'admin_id' not in session:
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+
+    entries = SolutionLibrary.query.join(Disease).order_by(Disease.code, SolutionLibrary.confidence_band).all()
+    payload = {
+        'action': 'upsert',
+        'entries': [{
+            'disease_code': entry.disease.code,
+            'confidence_band': entry.confidence_band,
+            'raw_text': entry.raw_text,
+            'solution_json': entry.solution_json,
+            'is_active': entry.is_active
+        } for entry in entries]
+    }
+
+    response = make_response(json.dumps(payload, ensure_ascii=False, indent=2))
+    response.headers['Content-Type'] = 'application/json; charset=utf-8'
+    response.headers['Content-Disposition'] = f'attachment; filename=pustaka_solusi_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
+    return response
+
+@bp.route('/generate', methods=['POST'])
+def generate_solutions():
+    """Queue generation of library entries as a background job - session based"""
+    if 'admin_id' not in session:
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+
+    data = request.get_json() or {}
+    admin_id = session.get('admin_id')
+
+    started, status = SolutionLibraryService.start_generation(
+        disease_ids=data.get('disease_ids'),
+        bands=data.get('bands'),
+        overwrite=bool(data.get('overwrite', False)),
+        created_by=admin_id
+    )
+    if not started:
+        return jsonify({'success': False, 'message': 'Proses generate masih antri atau berjalan', 'data': status}), 409
+
+    log = AdminLog(
+        admin_id=admin_id,
+        action='CREATE',
+        description='Generate pustaka solusi' + (' (timpa entri AI)' if data.get('overwrite') else ''),
+        table_name='solution_library',
+        record_id=None,
+        ip_address=request.remote_addr
+    )
+    db.session.add(log)
+    db.session.commit()
+
+    return jsonify({'success': True, 'message': 'Proses generate dimulai', 'data': status}), 202
+
+@bp.route('/generate/status', methods=['GET'])
+def generation_status():
+    """Progress of the background generation job - session based"""
+    if 'admin_id' not in session:
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+
+    return jsonify({'success': True, 'data': SolutionLibraryService.generation_status()})
@@ -2,16 +2,19 @@
 Admin - Laporan (Reports & Statistics)
 Session-based authentication
 """
+import logging
 from flask import Blueprint, jsonify, request, render_template, session, send_file
 from datetime import datetime, timedelta
 from sqlalchemy import func, extract
 from app import db
 from app.models.history import DiagnosisHistory
-from app.models.disease import Disease
 from app.models.user import User
+from app.services.stats_rollup_service import StatsRollupService
 import io
 import json
 
+logger = logging.getLogger(__name__)
+
 bp = Blueprint('admin_reports', __name__)
 
 
@@ -50,22 +53,12 @@ def get_statistics():
             end_date = datetime.strptime(end_date_str, '%Y-%m-%d')
             end_date = end_date.replace(hour=23, minute=59, second=59)
 
-        # Total diagnosis in period
-        total_diagnoses = DiagnosisHistory.query.filter(
-            DiagnosisHistory.diagnosis_date >= start_date,
-            DiagnosisHistory.diagnosis_date <= end_date
-        ).count()
+        # Total diagnosis and average confidence in period (daily rollup + recent history)
+        total_diagnoses, avg_confidence = StatsRollupService.summary(start_date, end_date)
 
         # Most common disease in period
-        most_common_disease = db.session.query(
-            Disease.name,
-            func.count(DiagnosisHistory.id).label('count')
-        ).join(DiagnosisHistory).filter(
-            DiagnosisHistory.diagnosis_date >= start_date,
-            DiagnosisHistory.diagnosis_date <= end_date
-        ).group_by(Disease.id, Disease.name).order_by(
-            func.count(DiagnosisHistory.id).desc()
-        ).first()
+        disease_counts = StatsRollupService.disease_counts(start_date, end_date, limit=1)
+        most_common_disease = disease_counts[0] if disease_counts else None
 
         # Most active user in period
         most_active_user = db.session.query(
@@ -79,15 +72,6 @@ def get_statistics():
             func.count(DiagnosisHistory.id).desc()
         ).first()
 
-        # Average confidence score
-        avg_confidence = db.session.query(
-            func.avg(DiagnosisHistory.final_cf_value)
-        ).filter(
-            DiagnosisHistory.diagnosis_date >= start_date,
-            DiagnosisHistory.diagnosis_date <= end_date,
-            DiagnosisHistory.final_cf_value.isnot(None)
-        ).scalar()
-
         return jsonify({
             'success': True,
             'data': {
@@ -104,6 +88,7 @@ def get_statistics():
             }
         })
     except Exception as e:
+        logger.exception('get_statistics failed')
         return jsonify({'success': False, 'message': str(e)}), 500
 
 
@@ -125,18 +110,11 @@ def get_daily_diagnosis_chart():
             end_date = datetime.strptime(end_date_str, '%Y-%m-%d')
             end_date = end_date.replace(hour=23, minute=59, second=59)
 
-        # Query diagnosis grouped by date
-        daily_data = db.session.query(
-            func.date(DiagnosisHistory.diagnosis_date).label('date'),
-            func.count(DiagnosisHistory.id).label('count')
-        ).filter(
-            DiagnosisHistory.diagnosis_date >= start_date,
-            DiagnosisHistory.diagnosis_date <= end_date
-        ).group_by(func.date(DiagnosisHistory.diagnosis_date)).order_by('date').all()
+        # Diagnosis count per date (daily rollup + recent history)
+        date_map = StatsRollupService.daily_counts(start_date, end_date)
 
         # Create complete date range (fill missing dates with 0)
         current_date = start_date
-        date_map = {str(d[0]): d[1] for d in daily_data}
         labels = []
         values = []
 
@@ -154,6 +132,7 @@ def get_daily_diagnosis_chart():
             }
         })
     except Exception as e:
+        logger.exception('get_daily_diagnosis_chart failed')
         return jsonify({'success': False, 'message': str(e)}), 500
 
 
@@ -176,15 +155,7 @@ def get_disease_distribution_chart():
             end_date = end_date.replace(hour=23, minute=59, second=59)
 
         # Get top 5 diseases
-        disease_data = db.session.query(
-            Disease.name,
-            func.count(DiagnosisHistory.id).label('count')
-        ).join(DiagnosisHistory).filter(
-            DiagnosisHistory.diagnosis_date >= start_date,
-            DiagnosisHistory.diagnosis_date <= end_date
-        ).group_by(Disease.id, Disease.name).order_by(
-            func.count(DiagnosisHistory.id).desc()
-        ).limit(5).all()
+        disease_data = StatsRollupService.disease_counts(start_date, end_date, limit=5)
 
         labels = [d[0] for d in disease_data]
         values = [d[1] for d in disease_data]
@@ -197,6 +168,7 @@ def get_disease_distribution_chart():
             }
         })
     except Exception as e:
+        logger.exception('get_disease_distribution_chart failed')
         return jsonify({'success': False, 'message': str(e)}), 500
 
 
@@ -246,6 +218,7 @@ def get_method_distribution_chart():
             }
         })
     except Exception as e:
+        logger.exception('get_method_distribution_chart failed')
         return jsonify({'success': False, 'message': str(e)}), 500
 
 
@@ -1,4 +1,5 @@
 """Admin - Activity Logs"""
+import logging
 from flask import Blueprint, jsonify, request, render_template, send_file
 from flask_jwt_extended import jwt_required
 from datetime import datetime, timedelta
@@ -14,6 +15,8 @@ from reportlab.lib.units import inch
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
 from reportlab.lib.styles import getSampleStyleSheet
 
+logger = logging.getLogger(__name__)
+
 bp = Blueprint('admin_logs', __name__)
 
 @bp.route('/', methods=['GET'])
@@ -54,6 +57,7 @@ def get_logs_api():
             'logs': logs_data
         })
     except Exception as e:
+        logger.exception('get_logs_api failed')
         return jsonify({
             'success': False,
             'message': str(e),
@@ -227,6 +231,7 @@ def export_logs():
             return jsonify({'success': False, 'message': 'Invalid format'}), 400
 
     except Exception as e:
+        logger.exception('export_logs failed')
         return jsonify({'success': False, 'message': str(e)}), 500
 
 def export_to_excel(logs):
@@ -6,6 +6,7 @@ from app import db
 from app.models.user import User
 from app.models.admin_log import AdminLog
 from app.utils.decorators import admin_required
+from app.utils.principal_cache import PrincipalCache
 import re
 
 bp = Blueprint('admin_management', __name__)
@@ -207,6 +208,7 @@ def promote_to_admin(user_id):
     db.session.add(log)
 
     db.session.commit()
+    PrincipalCache.invalidate(user.id)
 
     return jsonify({
         'success': True,
@@ -239,6 +241,7 @@ def demote_from_admin(admin_id):
     db.session.add(log)
 
     db.session.commit()
+    PrincipalCache.invalidate(admin.id)
 
     return jsonify({
         'success': True,
@@ -2,12 +2,15 @@
 Admin - Pengaturan Sistem (System Settings)
 Session-based authentication
 """
+import logging
 from flask import Blueprint, jsonify, request, render_template, session
 import importlib
 from app import db
 from app.models.system_settings import SystemSettings
 import json
 
+logger = logging.getLogger(__name__)
+
 bp = Blueprint('admin_settings', __name__)
 
 
@@ -50,6 +53,7 @@ def get_current_settings():
         # Define default settings
         default_settings = {
             'ai_provider': 'openai',
+            'ai_failover_enabled': 'false',
             'openai_api_key': '',
             'gemini_api_key': '',
             'history_retention_days': '30',
@@ -74,6 +78,7 @@ def get_current_settings():
             'data': settings_dict
         })
     except Exception as e:
+        logger.exception('get_current_settings failed')
         return jsonify({'success': False, 'message': str(e)}), 500
 
 
@@ -105,11 +110,16 @@ def save_settings():
 
         db.session.commit()
 
+        from app.services.email_service import EmailService
+        if any(key in EmailService.SETTING_KEYS for key in data):
+            EmailService.invalidate_settings()
+
         return jsonify({
             'success': True,
             'message': 'Pengaturan berhasil disimpan'
         })
     except Exception as e:
+        logger.exception('save_settings failed')
         db.session.rollback()
         return jsonify({'success': False, 'message': str(e)}), 500
 
@@ -125,10 +135,9 @@ def test_ai_connection():
         provider = data.get('provider')  # 'openai' or 'gemini'
         api_key = data.get('api_key')
 
-        print(f"[DEBUG] Testing AI connection - Provider: {provider}, API Key length: {len(api_key) if api_key else 0}")
+        logger.debug('Testing AI connection', extra={'provider': provider})
 
         if not provider or not api_key:
-            print(f"[DEBUG] Validation failed - Provider: {provider}, API key empty: {not api_key}")
             return jsonify({
                 'success': False,
                 'message': 'Provider dan API key harus diisi'
@@ -161,10 +170,8 @@ def test_ai_connection():
                         'message': 'Versi library OpenAI tidak mendukung OpenAI client. Jalankan: pip install --upgrade openai'
                     }), 500
 
-                print(f"[DEBUG] Creating OpenAI client...")
                 client = OpenAI(api_key=api_key)
 
-                print(f"[DEBUG] Making test API call...")
                 # Make a simple chat completion as a test
                 response = client.chat.completions.create(
                     model="gpt-3.5-turbo",
@@ -174,7 +181,6 @@ def test_ai_connection():
                     max_tokens=5
                 )
 
-                print(f"[DEBUG] API call successful!")
                 return jsonify({
                     'success': True,
                     'message': 'Koneksi OpenAI berhasil! API Key valid.'
@@ -182,7 +188,7 @@ def test_ai_connection():
 
             except Exception as api_error:
                 error_msg = str(api_error)
-                print(f"[DEBUG] OpenAI API Error: {error_msg}")
+                logger.warning('OpenAI connection test failed', extra={'provider': 'openai', 'error': error_msg})
 
                 # Handle specific error cases
                 if 'authentication' in error_msg.lower() or 'api key' in error_msg.lower():
@@ -243,6 +249,7 @@ def test_ai_connection():
             }), 400
 
     except Exception as e:
+        logger.exception('test_ai_connection failed')
         return jsonify({
             'success': False,
             'message': f'Error: {str(e)}'
@@ -260,23 +267,50 @@ def get_cleanup_stats():
         stats = CleanupService.get_cleanup_stats()
         return jsonify(stats)
     except Exception as e:
+        logger.exception('get_cleanup_stats failed')
         return jsonify({'success': False, 'message': str(e)}), 500
 
 
 @bp.route('/cleanup/run', methods=['POST'])
 def run_cleanup():
-    """Run cleanup of old history data"""
+    """Queue cleanup of old history data as a background job"""
     if not check_admin_session():
         return jsonify({'success': False, 'message': 'Unauthorized'}), 401
 
     try:
-        from app.services.cleanup_service import CleanupService
-        result = CleanupService.cleanup_old_history()
-        return jsonify(result)
+        from app.services.job_queue_service import JobQueueService
+        job = JobQueueService.enqueue('cleanup.history', created_by=session.get('admin_id'))
+        return jsonify({
+            'success': True,
+            'message': 'Cleanup dijadwalkan',
+            'data': job.to_dict()
+        }), 202
     except Exception as e:
+        logger.exception('run_cleanup failed')
         return jsonify({'success': False, 'message': str(e)}), 500
 
 
+@bp.route('/diagnosis-cache/stats', methods=['GET'])
+def get_diagnosis_cache_stats():
+    """Get diagnosis result cache hit/miss counters"""
+    if not check_admin_session():
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+
+    from app.services.diagnosis_cache_service import DiagnosisCacheService
+    return jsonify({'success': True, 'data': DiagnosisCacheService.stats()})
+
+
+@bp.route('/diagnosis-cache/clear', methods=['POST'])
+def clear_diagnosis_cache():
+    """Clear diagnosis result cache"""
+    if not check_admin_session():
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+
+    from app.services.diagnosis_cache_service import DiagnosisCacheService
+    DiagnosisCacheService.clear()
+    return jsonify({'success': True, 'message': 'Cache diagnosis berhasil dikosongkan'})
+
+
 @bp.route('/test-email-connection', methods=['POST'])
 def test_email_connection():
     """Test email SMTP connection"""
@@ -288,6 +322,7 @@ def test_email_connection():
         result = EmailService.test_smtp_connection()
         return jsonify(result)
     except Exception as e:
+        logger.exception('test_email_connection failed')
         return jsonify({'success': False, 'message': str(e)}), 500
 
 
@@ -312,4 +347,5 @@ def send_test_email():
         result = email_service.send_test_email(to_email)
         return jsonify(result)
     except Exception as e:
+        logger.exception('send_test_email failed')
         return jsonify({'success': False, 'message': str(e)}), 500
@@ -6,6 +6,7 @@ from app.models.history import DiagnosisHistory
 from app.models.user import User
 from app.models.disease import Disease
 from app.models.symptom import Symptom
+from app.services.user_search_service import UserSearchService
 from sqlalchemy import func, or_
 import csv
 import io
@@ -70,9 +71,8 @@ def get_all_history():
 
     # Apply user search filter
     if user_search:
-        # Join with User table to search by email
-        query = query.join(User, DiagnosisHistory.user_id == User.id, isouter=True)
-        query = query.filter(User.email.ilike(f'%{user_search}%'))
+        # Indexed search on email/name, see UserSearchService
+        query = query.filter(DiagnosisHistory.user_id.in_(UserSearchService.matching_ids(user_search)))
 
     # Paginate
     pagination = query.order_by(DiagnosisHistory.diagnosis_date.desc()).paginate(
@@ -145,8 +145,7 @@ def export_to_csv():
             pass
 
     if user_search:
-        query = query.join(User, DiagnosisHistory.user_id == User.id, isouter=True)
-        query = query.filter(User.email.ilike(f'%{user_search}%'))
+        query = query.filter(DiagnosisHistory.user_id.in_(UserSearchService.matching_ids(user_search)))
 
     # Get all results (no pagination for export)
     histories = query.order_by(DiagnosisHistory.diagnosis_date.desc()).limit(1000).all()
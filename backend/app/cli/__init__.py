@@ -0,0 +1,17 @@
+"""
+Flask CLI Commands
+Sistem Pakar Diagnosis Penyakit Tanaman Padi
+"""
+
+
+def register_commands(app):
+    """Attach the `flask ...` command groups to the app"""
+    from app.cli.jobs import jobs_cli
+    from app.cli.kb import kb_cli
+    from app.cli.mail import mail_cli
+    from app.cli.scheduler import scheduler_cli
+
+    app.cli.add_command(jobs_cli)
+    app.cli.add_command(kb_cli)
+    app.cli.add_command(mail_cli)
+    app.cli.add_command(scheduler_cli)
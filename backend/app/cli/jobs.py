@@ -0,0 +1,92 @@
+"""
+Job Queue Commands
+Sistem Pakar Diagnosis Penyakit Tanaman Padi
+
+  flask jobs worker            run queued jobs until SIGTERM/SIGINT
+  flask jobs worker --once     run what is due now, then exit
+  flask jobs enqueue cleanup.history
+  flask jobs list --status failed
+  flask jobs retry 42
+"""
+
+import json
+import signal
+import threading
+import click
+from flask.cli import AppGroup
+from app import db
+from app.models.job import Job
+from app.services.job_queue_service import JobQueueService, TASKS
+
+jobs_cli = AppGroup('jobs', help='Background job queue')
+
+
+@jobs_cli.command('worker')
+@click.option('--once', is_flag=True, help='Exit when no job is due instead of polling')
+@click.option('--worker-id', default=None, help='Name stored in jobs.locked_by (default host:pid)')
+def worker(once, worker_id):
+    """Claim and run jobs from the queue"""
+    stop_event = threading.Event()
+
+    def stop(signum, frame):
+        # Finish the job in hand, then exit
+        click.echo('Stopping after the current job...')
+        stop_event.set()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    click.echo('Job worker started' + (' (once)' if once else ''))
+    processed = JobQueueService.work(worker_id=worker_id, stop_event=stop_event, once=once)
+    click.echo(f'Job worker stopped, {processed} job(s) processed')
+
+
+@jobs_cli.command('enqueue')
+@click.argument('task')
+@click.option('--payload', default='{}', help='JSON object passed to the task')
+@click.option('--priority', type=int, default=None, help='Lower runs first')
+@click.option('--delay', type=int, default=0, help='Seconds before the job may run')
+def enqueue(task, payload, priority, delay):
+    """Queue a job for TASK"""
+    JobQueueService._load_tasks()
+    if task not in TASKS:
+        raise click.BadParameter(f"unknown task, choose from: {', '.join(sorted(TASKS))}", param_hint='TASK')
+    try:
+        payload = json.loads(payload)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='--payload')
+
+    job = JobQueueService.enqueue(task, payload, priority=priority, delay_seconds=delay)
+    click.echo(f'Queued job {job.id} ({task})')
+
+
+@jobs_cli.command('list')
+@click.option('--status', type=click.Choice(JobQueueService.STATUSES), default=None)
+@click.option('--task', default=None)
+@click.option('--limit', type=int, default=20)
+def list_jobs(status, task, limit):
+    """Show the most recent jobs"""
+    query = Job.query
+    if status:
+        query = query.filter(Job.status == status)
+    if task:
+        query = query.filter(Job.task == task)
+
+    for job in query.order_by(Job.id.desc()).limit(limit).all():
+        line = f'{job.id:>6}  {job.status:<10} {job.task:<28} attempt {job.attempts}/{job.max_attempts}'
+        if job.last_error:
+            line += f'  {job.last_error[:80]}'
+        click.echo(line)
+
+    counts = JobQueueService.stats()['counts']
+    click.echo(', '.join(f'{name}: {count}' for name, count in counts.items()))
+
+
+@jobs_cli.command('retry')
+@click.argument('job_id', type=int)
+def retry(job_id):
+    """Queue a failed or cancelled job again"""
+    if not JobQueueService.retry(job_id):
+        job = db.session.get(Job, job_id)
+        raise click.ClickException(f'Job {job_id} ' + (f'is {job.status}' if job else 'not found'))
+    click.echo(f'Job {job_id} queued again')
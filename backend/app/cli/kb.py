@@ -0,0 +1,74 @@
+"""
+Knowledge Base Commands
+Sistem Pakar Diagnosis Penyakit Tanaman Padi
+
+  flask kb export kb.jsonl[.gz]              write diseases, symptoms and rules to a snapshot file
+  flask kb diff kb.jsonl                     what importing the file would change
+  flask kb import kb.jsonl [--mode replace]  make the database match the file
+"""
+
+import click
+from flask.cli import AppGroup
+from app.services.kb_snapshot_service import KBSnapshotService, SnapshotError
+
+kb_cli = AppGroup('kb', help='Knowledge base snapshots')
+
+SHOWN_KEYS = 10
+
+
+def _key_label(key):
+    return '/'.join(key) if isinstance(key, tuple) else key
+
+
+def _show_diff(changes):
+    for table, change in changes.items():
+        click.echo(
+            f"{table:<10} +{len(change['added'])} ~{len(change['changed'])} "
+            f"-{len(change['removed'])} ={change['unchanged']}"
+        )
+        for sign, name in (('+', 'added'), ('~', 'changed'), ('-', 'removed')):
+            keys = change[name]
+            for key in keys[:SHOWN_KEYS]:
+                click.echo(f'  {sign} {_key_label(key)}')
+            if len(keys) > SHOWN_KEYS:
+                click.echo(f'  {sign} ... {len(keys) - SHOWN_KEYS} more')
+
+
+def _read(path):
+    try:
+        return KBSnapshotService.read(path)
+    except (OSError, SnapshotError) as e:
+        raise click.ClickException(str(e))
+
+
+@kb_cli.command('export')
+@click.argument('path')
+def export(path):
+    """Write the knowledge base to PATH (.gz to compress)"""
+    header = KBSnapshotService.export(path)
+    counts = ', '.join(f'{count} {table}' for table, count in header['counts'].items())
+    click.echo(f"Exported {counts} to {path} ({header['checksum']})")
+
+
+@kb_cli.command('diff')
+@click.argument('path')
+def diff(path):
+    """Compare PATH with the database (rows matched by code)"""
+    _show_diff(KBSnapshotService.diff(_read(path)))
+
+
+@kb_cli.command('import')
+@click.argument('path')
+@click.option('--mode', type=click.Choice(['merge', 'replace']), default='merge',
+              help='replace also deletes rules that are not in the file')
+@click.option('--dry-run', is_flag=True, help='Only show what would change')
+def import_(path, mode, dry_run):
+    """Load PATH into the database in one transaction"""
+    snapshot = _read(path)
+    changes = KBSnapshotService.import_snapshot(snapshot, mode=mode, dry_run=dry_run)
+    _show_diff(changes)
+    if mode == 'merge' and not dry_run:
+        click.echo('Rules missing from the file were kept (use --mode replace to delete them)')
+    if changes['diseases']['removed'] or changes['symptoms']['removed']:
+        click.echo('Diseases/symptoms missing from the file are never deleted (diagnosis history refers to them)')
+    click.echo('Dry run, nothing written' if dry_run else f'Imported {path}')
@@ -0,0 +1,29 @@
+"""
+Mail Commands
+Sistem Pakar Diagnosis Penyakit Tanaman Padi
+
+  flask mail sink --port 1025   local SMTP server that prints messages instead of delivering them
+"""
+
+import click
+from flask.cli import AppGroup
+from app.utils.smtp_sink import SMTPSink
+
+mail_cli = AppGroup('mail', help='Email utilities')
+
+
+@mail_cli.command('sink')
+@click.option('--host', default='127.0.0.1')
+@click.option('--port', type=int, default=1025)
+def sink(host, port):
+    """Accept and print email (use with EMAIL_SMTP_STARTTLS=false)"""
+    def show(message):
+        click.echo(f"--- from {message['from']} to {', '.join(message['to'])}")
+        click.echo(message['data'].decode('utf-8', 'replace'))
+
+    server = SMTPSink(host, port, on_message=show)
+    click.echo(f'SMTP sink listening on {host}:{server.port} (Ctrl+C to stop)')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
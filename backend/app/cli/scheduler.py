@@ -0,0 +1,48 @@
+"""
+Scheduler Commands
+Sistem Pakar Diagnosis Penyakit Tanaman Padi
+
+  flask scheduler run       enqueue maintenance tasks on schedule until SIGTERM/SIGINT
+  flask scheduler tick      enqueue whatever is due now, then exit
+  flask scheduler status    interval, last run and next due time per task
+"""
+
+import signal
+import threading
+import click
+from flask.cli import AppGroup
+from app.services.scheduler_service import SchedulerService
+
+scheduler_cli = AppGroup('scheduler', help='Maintenance task scheduler')
+
+
+@scheduler_cli.command('run')
+def run():
+    """Tick the scheduler every SCHEDULER_TICK_SECONDS"""
+    stop_event = threading.Event()
+
+    def stop(signum, frame):
+        stop_event.set()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    click.echo('Scheduler started')
+    SchedulerService.run(stop_event)
+    click.echo('Scheduler stopped')
+
+
+@scheduler_cli.command('tick')
+def tick():
+    """Enqueue the tasks that are due now"""
+    enqueued = SchedulerService.tick()
+    click.echo(f"Enqueued: {', '.join(enqueued)}" if enqueued else 'Nothing due (or another scheduler holds the lock)')
+
+
+@scheduler_cli.command('status')
+def status():
+    """Show the schedule"""
+    for task in SchedulerService.status():
+        interval = f"every {task['interval_seconds']}s" if task['interval_seconds'] else 'disabled'
+        last = f"last #{task['last_job_id']} {task['last_status']} at {task['last_run_at']}" if task['last_job_id'] else 'never run'
+        click.echo(f"{task['task']:<20} {interval:<16} {last}; next {task['next_due_at'] or '-'}")
@@ -33,10 +33,32 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_ECHO = False
 
-    # JWT - Token persists until user logout (365 days expiry for practical purposes)
+    # JWT - Short-lived access token, renewed with a rotating refresh token (POST /api/auth/refresh)
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'jwt-secret-key-change-in-production')
-    JWT_ACCESS_TOKEN_EXPIRES = timedelta(days=365)  # Persistent session until logout
-    JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=365)
+    JWT_ACCESS_TOKEN_EXPIRES = timedelta(minutes=int(os.getenv('JWT_ACCESS_TOKEN_MINUTES', 15)))
+    JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=int(os.getenv('JWT_REFRESH_TOKEN_DAYS', 30)))
+
+    # Token revocation - how often workers reload revoked_tokens, bloom filter size
+    TOKEN_REVOCATION_SYNC_SECONDS = int(os.getenv('TOKEN_REVOCATION_SYNC_SECONDS', 5))
+    TOKEN_REVOCATION_BLOOM_CAPACITY = int(os.getenv('TOKEN_REVOCATION_BLOOM_CAPACITY', 100000))
+
+    # Password hashing - Werkzeug method (changing it re-hashes on next login), thread pool bounds
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', 16))
+    PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS = float(os.getenv('PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS', 5))
+
+    # Login throttle - failed logins allowed per account / per client IP within the window (0 disables)
+    LOGIN_THROTTLE_MAX_FAILURES = int(os.getenv('LOGIN_THROTTLE_MAX_FAILURES', 10))
+    LOGIN_THROTTLE_MAX_FAILURES_PER_IP = int(os.getenv('LOGIN_THROTTLE_MAX_FAILURES_PER_IP', 50))
+    LOGIN_THROTTLE_WINDOW_SECONDS = int(os.getenv('LOGIN_THROTTLE_WINDOW_SECONDS', 300))
+
+    # Authorization - role/active lookups cached per worker (seconds, max users)
+    PRINCIPAL_CACHE_SECONDS = int(os.getenv('PRINCIPAL_CACHE_SECONDS', 30))
+    PRINCIPAL_CACHE_MAX_ENTRIES = int(os.getenv('PRINCIPAL_CACHE_MAX_ENTRIES', 10000))
+
+    # Reverse proxies in front of the app that set X-Forwarded-For/-Proto (0 = none, trust remote_addr)
+    TRUSTED_PROXY_COUNT = int(os.getenv('TRUSTED_PROXY_COUNT', 0))
 
     # CORS
     FRONTEND_URL = os.getenv('FRONTEND_URL', 'http://localhost:3000')
@@ -59,11 +81,110 @@ class Config:
     HISTORY_RETENTION_DAYS = int(os.getenv('HISTORY_RETENTION_DAYS', 30))
     MAX_DIAGNOSES_PER_DAY = int(os.getenv('MAX_DIAGNOSES_PER_DAY', 20))
 
+    # Knowledge Base - how often (seconds) workers re-check the rule base for changes
+    KNOWLEDGE_BASE_REFRESH_SECONDS = int(os.getenv('KNOWLEDGE_BASE_REFRESH_SECONDS', 5))
+    # `flask kb export` file to build the first snapshot from (used only while it matches the DB)
+    KNOWLEDGE_BASE_SNAPSHOT_PATH = os.getenv('KNOWLEDGE_BASE_SNAPSHOT_PATH', '')
+
+    # Interactive diagnosis sessions (diagnosis_sessions table, shared by all workers)
+    DIAGNOSIS_SESSION_TTL_SECONDS = int(os.getenv('DIAGNOSIS_SESSION_TTL_SECONDS', 1800))
+    DIAGNOSIS_SESSION_MAX_PER_USER = int(os.getenv('DIAGNOSIS_SESSION_MAX_PER_USER', 20))
+
+    # Diagnosis result cache (0 disables); DIAGNOSIS_CACHE_DIR shares entries across workers
+    DIAGNOSIS_CACHE_SIZE = int(os.getenv('DIAGNOSIS_CACHE_SIZE', 1024))
+    DIAGNOSIS_CACHE_DIR = os.getenv('DIAGNOSIS_CACHE_DIR', '')
+    DIAGNOSIS_CACHE_FILE_MAX = int(os.getenv('DIAGNOSIS_CACHE_FILE_MAX', 10000))
+    DIAGNOSIS_CACHE_PRUNE_EVERY = int(os.getenv('DIAGNOSIS_CACHE_PRUNE_EVERY', 100))  # file writes between prunes
+    DIAGNOSIS_CACHE_PRUNE_GRACE_SECONDS = int(os.getenv('DIAGNOSIS_CACHE_PRUNE_GRACE_SECONDS', 60))
+
+    # Request metrics - per-request SQL counting/timing and /metrics (Prometheus)
+    REQUEST_METRICS_ENABLED = os.getenv('REQUEST_METRICS_ENABLED', 'true').lower() == 'true'
+    SLOW_QUERY_THRESHOLD_MS = int(os.getenv('SLOW_QUERY_THRESHOLD_MS', 200))  # 0 disables slow-query logging
+    # Bearer token for /metrics; empty allows only loopback scrapers
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+    # AI provider calls - hard deadline per call and circuit breaker per provider
+    AI_CALL_DEADLINE_SECONDS = float(os.getenv('AI_CALL_DEADLINE_SECONDS', 20))
+    AI_CALL_WORKERS = int(os.getenv('AI_CALL_WORKERS', 8))
+    AI_BREAKER_FAILURE_RATE = float(os.getenv('AI_BREAKER_FAILURE_RATE', 0.5))
+    AI_BREAKER_MIN_CALLS = int(os.getenv('AI_BREAKER_MIN_CALLS', 4))
+    AI_BREAKER_WINDOW = int(os.getenv('AI_BREAKER_WINDOW', 20))
+    AI_BREAKER_COOLDOWN_SECONDS = int(os.getenv('AI_BREAKER_COOLDOWN_SECONDS', 30))
+
+    # AI provider chain - e.g. 'gemini,openai' overrides the ai_provider/ai_failover_enabled settings.
+    # The next provider is asked once the current one is slower than the given percentile of its
+    # recent latencies (AI_HEDGE_DELAY_SECONDS until AI_HEDGE_MIN_SAMPLES calls have been seen)
+    AI_PROVIDER_CHAIN = os.getenv('AI_PROVIDER_CHAIN', '')
+    AI_HEDGE_PERCENTILE = float(os.getenv('AI_HEDGE_PERCENTILE', 90))
+    AI_HEDGE_DELAY_SECONDS = float(os.getenv('AI_HEDGE_DELAY_SECONDS', 5))
+    AI_HEDGE_MIN_SAMPLES = int(os.getenv('AI_HEDGE_MIN_SAMPLES', 5))
+
+    # Async AI calls (AsyncAISolutionService) - provider calls in flight per event loop,
+    # worker tasks and backlog of AsyncSolutionQueue
+    AI_ASYNC_MAX_IN_FLIGHT = int(os.getenv('AI_ASYNC_MAX_IN_FLIGHT', 32))
+    AI_ASYNC_WORKERS = int(os.getenv('AI_ASYNC_WORKERS', 8))
+    AI_ASYNC_QUEUE_SIZE = int(os.getenv('AI_ASYNC_QUEUE_SIZE', 100))
+
+    # Solution library - stored per-disease solutions served instead of calling the AI provider.
+    # A diagnosis whose secondary diseases reach SOLUTION_LIBRARY_MAX_SECONDARY_CF still goes to the AI
+    SOLUTION_LIBRARY_ENABLED = os.getenv('SOLUTION_LIBRARY_ENABLED', 'true').lower() == 'true'
+    SOLUTION_LIBRARY_MAX_SECONDARY_CF = float(os.getenv('SOLUTION_LIBRARY_MAX_SECONDARY_CF', 0.6))
+    SOLUTION_LIBRARY_CONCURRENCY = int(os.getenv('SOLUTION_LIBRARY_CONCURRENCY', 4))
+
+    # Job queue - JOB_QUEUE_MODE 'thread' (worker thread in each web process), 'worker'
+    # (separate `flask jobs worker` processes) or 'inline' (run on enqueue). Failed jobs retry
+    # after JOB_RETRY_BACKOFF_SECONDS doubling up to the max; running jobs refresh their lock
+    # every JOB_HEARTBEAT_SECONDS, a lock older than JOB_LOCK_TIMEOUT_SECONDS is requeued
+    JOB_QUEUE_MODE = os.getenv('JOB_QUEUE_MODE', 'thread')
+    JOB_POLL_INTERVAL_SECONDS = float(os.getenv('JOB_POLL_INTERVAL_SECONDS', 2))
+    JOB_RETRY_BACKOFF_SECONDS = float(os.getenv('JOB_RETRY_BACKOFF_SECONDS', 10))
+    JOB_RETRY_BACKOFF_MAX_SECONDS = float(os.getenv('JOB_RETRY_BACKOFF_MAX_SECONDS', 600))
+    JOB_LOCK_TIMEOUT_SECONDS = int(os.getenv('JOB_LOCK_TIMEOUT_SECONDS', 900))
+    JOB_HEARTBEAT_SECONDS = float(os.getenv('JOB_HEARTBEAT_SECONDS', 60))
+    JOB_RETENTION_DAYS = int(os.getenv('JOB_RETENTION_DAYS', 14))
+
+    # Maintenance scheduler - job workers (or `flask scheduler run`) enqueue each task once its
+    # interval has passed; one process per database decides, under an advisory lock. 0 disables a task
+    SCHEDULER_ENABLED = os.getenv('SCHEDULER_ENABLED', 'true').lower() == 'true'
+    SCHEDULER_TICK_SECONDS = int(os.getenv('SCHEDULER_TICK_SECONDS', 60))
+    SCHEDULE_STATS_ROLLUP_SECONDS = int(os.getenv('SCHEDULE_STATS_ROLLUP_SECONDS', 3600))
+    SCHEDULE_CLEANUP_HISTORY_SECONDS = int(os.getenv('SCHEDULE_CLEANUP_HISTORY_SECONDS', 86400))
+    SCHEDULE_CLEANUP_ADMIN_LOGS_SECONDS = int(os.getenv('SCHEDULE_CLEANUP_ADMIN_LOGS_SECONDS', 86400))
+    SCHEDULE_CLEANUP_JOBS_SECONDS = int(os.getenv('SCHEDULE_CLEANUP_JOBS_SECONDS', 86400))
+    SCHEDULE_CLEANUP_REVOKED_TOKENS_SECONDS = int(os.getenv('SCHEDULE_CLEANUP_REVOKED_TOKENS_SECONDS', 86400))
+    SCHEDULE_DB_MAINTENANCE_SECONDS = int(os.getenv('SCHEDULE_DB_MAINTENANCE_SECONDS', 604800))
+    ADMIN_LOG_RETENTION_DAYS = int(os.getenv('ADMIN_LOG_RETENTION_DAYS', 90))
+    CLEANUP_BATCH_SIZE = int(os.getenv('CLEANUP_BATCH_SIZE', 1000))
+
+    # Email - SMTP settings come from Pengaturan Sistem, cached per process. Sessions are pooled
+    # (EMAIL_SMTP_POOL_SIZE per process) and reused for up to EMAIL_MESSAGES_PER_CONNECTION messages;
+    # queued bulk mail goes out EMAIL_BATCH_SIZE recipients per job. EMAIL_SMTP_STARTTLS=false for
+    # local sinks (`flask mail sink`)
+    EMAIL_SETTINGS_CACHE_SECONDS = int(os.getenv('EMAIL_SETTINGS_CACHE_SECONDS', 60))
+    EMAIL_SMTP_STARTTLS = os.getenv('EMAIL_SMTP_STARTTLS', 'true').lower() == 'true'
+    EMAIL_SMTP_POOL_SIZE = int(os.getenv('EMAIL_SMTP_POOL_SIZE', 4))
+    EMAIL_SMTP_TIMEOUT_SECONDS = int(os.getenv('EMAIL_SMTP_TIMEOUT_SECONDS', 10))
+    EMAIL_SMTP_IDLE_SECONDS = int(os.getenv('EMAIL_SMTP_IDLE_SECONDS', 60))
+    EMAIL_MESSAGES_PER_CONNECTION = int(os.getenv('EMAIL_MESSAGES_PER_CONNECTION', 100))
+    EMAIL_BATCH_SIZE = int(os.getenv('EMAIL_BATCH_SIZE', 500))
+    EMAIL_RETRY_ROUNDS = int(os.getenv('EMAIL_RETRY_ROUNDS', 3))
+
+    # Logging - LOG_FORMAT 'json' or 'text'; identical warnings/errors above the per-minute limit are dropped
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')
+    LOG_RATE_LIMIT_PER_MINUTE = int(os.getenv('LOG_RATE_LIMIT_PER_MINUTE', 30))
+    LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+
+    # Tracing - '' (off), 'console', 'file' (TRACING_FILE, JSON lines) or 'otel'
+    TRACING_EXPORTER = os.getenv('TRACING_EXPORTER', '')
+    TRACING_FILE = os.getenv('TRACING_FILE', 'logs/traces.jsonl')
+
 
 class DevelopmentConfig(Config):
     """Development configuration"""
     DEBUG = True
     SQLALCHEMY_ECHO = True
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')
 
 
 class ProductionConfig(Config):
@@ -77,6 +198,10 @@ class TestingConfig(Config):
     """Testing configuration"""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    DIAGNOSIS_CACHE_SIZE = 0
+    JOB_QUEUE_MODE = 'inline'
+    SCHEDULER_ENABLED = False
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'
 
 
 # Configuration dictionary
@@ -2,5 +2,6 @@
 Middleware Package
 """
 from .maintenance import maintenance_check
+from .request_metrics import init_request_metrics, metrics
 
-__all__ = ['maintenance_check']
+__all__ = ['maintenance_check', 'init_request_metrics', 'metrics']
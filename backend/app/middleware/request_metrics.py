@@ -0,0 +1,224 @@
+"""
+Request Metrics Middleware
+Counts SQL queries and DB time per request, times each endpoint and
+exposes the totals in Prometheus text format at /metrics
+"""
+import hmac
+import ipaddress
+import logging
+import os
+import socket
+import threading
+import time
+from flask import g, request, has_request_context, current_app, Response
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class MetricsRegistry:
+    """
+    In-process totals (one registry per gunicorn worker).
+
+    Every series carries a `worker` label (host:pid), so each worker's
+    counters stay monotonic even when scrapes are load-balanced across
+    workers; sum by the other labels to get totals. Extra collectors
+    registered with add_collector() are called on every /metrics scrape and
+    return ready-made Prometheus text lines.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests = {}
+        self._slow_queries = 0
+        self._collectors = []
+
+    def observe_request(self, endpoint, method, status, duration, queries, db_time):
+        key = (endpoint, method)
+        with self._lock:
+            entry = self._requests.get(key)
+            if entry is None:
+                entry = {
+                    'status': {},
+                    'buckets': [0] * len(LATENCY_BUCKETS),
+                    'duration_sum': 0.0,
+                    'count': 0,
+                    'queries': 0,
+                    'db_time': 0.0
+                }
+                self._requests[key] = entry
+
+            entry['status'][status] = entry['status'].get(status, 0) + 1
+            entry['count'] += 1
+            entry['duration_sum'] += duration
+            entry['queries'] += queries
+            entry['db_time'] += db_time
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if duration <= bound:
+                    entry['buckets'][i] += 1
+
+    def observe_slow_query(self):
+        with self._lock:
+            self._slow_queries += 1
+
+    def add_collector(self, collector):
+        self._collectors.append(collector)
+
+    def render(self):
+        lines = []
+        worker = f'{socket.gethostname()}:{os.getpid()}'
+        with self._lock:
+            items = sorted(self._requests.items())
+
+            lines.append('# HELP http_requests_total Total HTTP requests.')
+            lines.append('# TYPE http_requests_total counter')
+            for (endpoint, method), entry in items:
+                for status, count in sorted(entry['status'].items()):
+                    lines.append(
+                        f'http_requests_total{{worker="{worker}",endpoint="{endpoint}",method="{method}",status="{status}"}} {count}'
+                    )
+
+            lines.append('# HELP http_request_duration_seconds Request latency.')
+            lines.append('# TYPE http_request_duration_seconds histogram')
+            for (endpoint, method), entry in items:
+                labels = f'worker="{worker}",endpoint="{endpoint}",method="{method}"'
+                for bound, count in zip(LATENCY_BUCKETS, entry['buckets']):
+                    lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {entry["count"]}')
+                lines.append(f'http_request_duration_seconds_sum{{{labels}}} {entry["duration_sum"]:.6f}')
+                lines.append(f'http_request_duration_seconds_count{{{labels}}} {entry["count"]}')
+
+            lines.append('# HELP db_queries_total SQL statements executed while serving requests.')
+            lines.append('# TYPE db_queries_total counter')
+            for (endpoint, method), entry in items:
+                lines.append(f'db_queries_total{{worker="{worker}",endpoint="{endpoint}",method="{method}"}} {entry["queries"]}')
+
+            lines.append('# HELP db_query_duration_seconds_total Time spent in SQL while serving requests.')
+            lines.append('# TYPE db_query_duration_seconds_total counter')
+            for (endpoint, method), entry in items:
+                lines.append(
+                    f'db_query_duration_seconds_total{{worker="{worker}",endpoint="{endpoint}",method="{method}"}} {entry["db_time"]:.6f}'
+                )
+
+            lines.append('# HELP db_slow_queries_total Statements slower than SLOW_QUERY_THRESHOLD_MS.')
+            lines.append('# TYPE db_slow_queries_total counter')
+            lines.append(f'db_slow_queries_total{{worker="{worker}"}} {self._slow_queries}')
+
+        for collector in self._collectors:
+            try:
+                lines.extend(collector())
+            except Exception as e:
+                logger.warning(f'Metrics collector failed: {e}')
+
+        return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('query_start_time')
+    if not starts:
+        return
+    duration = time.perf_counter() - starts.pop()
+
+    if has_request_context():
+        stats = g.get('_request_metrics')
+        if stats is not None:
+            stats['queries'] += 1
+            stats['db_time'] += duration
+            if duration > stats['slowest_time']:
+                stats['slowest_time'] = duration
+                stats['slowest_statement'] = statement
+
+    threshold_ms = current_app.config.get('SLOW_QUERY_THRESHOLD_MS', 0) if current_app else 0
+    if threshold_ms and duration * 1000.0 >= threshold_ms:
+        metrics.observe_slow_query()
+        logger.warning('Slow query', extra={
+            'duration_ms': round(duration * 1000.0, 2),
+            'endpoint': request.endpoint if has_request_context() else None,
+            'statement': ' '.join(statement.split())[:500]
+        })
+
+
+def init_request_metrics(app, db):
+    """Attach SQL listeners to the app's engines and register request hooks"""
+    if not app.config.get('REQUEST_METRICS_ENABLED', True):
+        return
+
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+    @app.before_request
+    def start_request_metrics():
+        g._request_metrics = {
+            'start': time.perf_counter(),
+            'queries': 0,
+            'db_time': 0.0,
+            'slowest_time': 0.0,
+            'slowest_statement': None
+        }
+
+    @app.after_request
+    def finish_request_metrics(response):
+        stats = g.pop('_request_metrics', None)
+        if stats is None or request.path == '/metrics':
+            return response
+
+        duration = time.perf_counter() - stats['start']
+        endpoint = request.endpoint or 'unmatched'
+        metrics.observe_request(
+            endpoint, request.method, response.status_code, duration, stats['queries'], stats['db_time']
+        )
+
+        if app.config.get('SERVER_TIMING_HEADER', app.debug):
+            response.headers['Server-Timing'] = (
+                f'db;dur={stats["db_time"] * 1000.0:.2f};desc="{stats["queries"]} queries", '
+                f'app;dur={duration * 1000.0:.2f}'
+            )
+        else:
+            logger.info('Request completed', extra={
+                'endpoint': endpoint,
+                'status': response.status_code,
+                'duration_ms': round(duration * 1000.0, 2),
+                'db_queries': stats['queries'],
+                'db_time_ms': round(stats['db_time'] * 1000.0, 2),
+                'slowest_query_ms': round(stats['slowest_time'] * 1000.0, 2),
+                'slowest_query': ' '.join(stats['slowest_statement'].split())[:200] if stats['slowest_statement'] else None
+            })
+
+        return response
+
+    @app.route('/metrics')
+    def prometheus_metrics():
+        if not _metrics_access_allowed():
+            return Response('Forbidden\n', status=403, mimetype='text/plain')
+        return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+def _metrics_access_allowed():
+    """
+    With METRICS_TOKEN set, require 'Authorization: Bearer <token>'.
+    Without it, only loopback clients may read /metrics: traffic through a
+    published docker port arrives from the bridge gateway (a private
+    address), so private ranges are not trusted. The check uses the socket
+    peer, not X-Forwarded-For, which ProxyFix would otherwise let clients set.
+    """
+    token = current_app.config.get('METRICS_TOKEN')
+    if token:
+        supplied = request.headers.get('Authorization', '')
+        return hmac.compare_digest(supplied.encode(), f'Bearer {token}'.encode())
+    peer = request.environ.get('werkzeug.proxy_fix.orig', {}).get('REMOTE_ADDR', request.remote_addr)
+    try:
+        address = ipaddress.ip_address(peer or '')
+    except ValueError:
+        return False
+    return address.is_loopback
@@ -0,0 +1,25 @@
+"""
+Diagnosis Session Model
+Sistem Pakar Diagnosis Penyakit Tanaman Padi
+"""
+
+from datetime import datetime
+from sqlalchemy import PickleType
+from app import db
+
+
+class DiagnosisSessionState(db.Model):
+    """Diagnosis Session model - Sesi diagnosis interaktif (akumulator CF), dibagi antar worker"""
+
+    __tablename__ = 'diagnosis_sessions'
+
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    kb_checksum = db.Column(db.String(64))  # KnowledgeBaseSnapshot.checksum the accumulators were built from
+    state = db.Column(PickleType, nullable=False)  # {'symptoms': {id: certainty}, 'accumulators': {...}}
+    revision = db.Column(db.Integer, nullable=False, default=0)  # Bumped on every write (optimistic locking)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)  # Expiry is measured from here
+
+    def __repr__(self):
+        return f'<DiagnosisSessionState {self.id}>'
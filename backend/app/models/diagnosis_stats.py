@@ -0,0 +1,35 @@
+"""
+Diagnosis Daily Stats Model
+Sistem Pakar Diagnosis Penyakit Tanaman Padi
+"""
+
+from datetime import datetime
+from app import db
+
+
+class DiagnosisDailyStat(db.Model):
+    """Diagnosis Daily Stat model - Rekap harian diagnosis per penyakit (tetap ada setelah riwayat dihapus)"""
+
+    __tablename__ = 'diagnosis_daily_stats'
+
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False, index=True)  # UTC day of diagnosis_date
+    disease_id = db.Column(db.Integer, db.ForeignKey('diseases.id', ondelete='SET NULL'))
+    diagnosis_count = db.Column(db.Integer, nullable=False, default=0)
+    cf_sum = db.Column(db.Float, nullable=False, default=0.0)  # Sum of final_cf_value, for averages
+    cf_count = db.Column(db.Integer, nullable=False, default=0)  # Rows with a final_cf_value
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        """Convert to dictionary"""
+        return {
+            'id': self.id,
+            'day': self.day.isoformat() if self.day else None,
+            'disease_id': self.disease_id,
+            'diagnosis_count': self.diagnosis_count,
+            'cf_sum': self.cf_sum,
+            'cf_count': self.cf_count
+        }
+
+    def __repr__(self):
+        return f'<DiagnosisDailyStat {self.day} disease={self.disease_id}: {self.diagnosis_count}>'
@@ -24,6 +24,7 @@ class Disease(db.Model):
     # Relationships
     rules = db.relationship('Rule', back_populates='disease', lazy='dynamic', cascade='all, delete-orphan')
     diagnosis_history = db.relationship('DiagnosisHistory', back_populates='disease', lazy='dynamic')
+    solutions = db.relationship('SolutionLibrary', back_populates='disease', lazy='dynamic', cascade='all, delete-orphan')
 
     def to_dict(self):
         """Convert to dictionary"""
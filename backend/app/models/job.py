@@ -0,0 +1,59 @@
+"""
+Job Model
+Sistem Pakar Diagnosis Penyakit Tanaman Padi
+"""
+
+from datetime import datetime
+from sqlalchemy import PickleType
+from app import db
+
+
+class Job(db.Model):
+    """Job model - Antrian tugas latar belakang (AI, email, cleanup)"""
+
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        db.Index('ix_jobs_claim', 'status', 'priority', 'run_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    task = db.Column(db.String(100), nullable=False, index=True)  # 'cleanup.history', 'email.send', etc
+    payload = db.Column(PickleType)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # 'queued', 'running', 'succeeded', 'failed', 'cancelled'
+    priority = db.Column(db.Integer, nullable=False, default=100)  # Lower runs first
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # Not claimed before this time
+    locked_by = db.Column(db.String(100))  # Worker id while running
+    locked_at = db.Column(db.DateTime)  # Claim time, refreshed on progress
+    progress = db.Column(PickleType)
+    result = db.Column(PickleType)
+    last_error = db.Column(db.Text)
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='SET NULL'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        """Convert to dictionary"""
+        return {
+            'id': self.id,
+            'task': self.task,
+            'payload': self.payload,
+            'status': self.status,
+            'priority': self.priority,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'run_at': self.run_at.isoformat() if self.run_at else None,
+            'locked_by': self.locked_by,
+            'progress': self.progress,
+            'result': self.result,
+            'last_error': self.last_error,
+            'created_by': self.created_by,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+    def __repr__(self):
+        return f'<Job {self.id} {self.task} {self.status}>'
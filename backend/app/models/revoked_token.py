@@ -0,0 +1,34 @@
+"""
+Revoked Token Model
+Sistem Pakar Diagnosis Penyakit Tanaman Padi
+"""
+
+from datetime import datetime
+from app import db
+
+
+class RevokedToken(db.Model):
+    """Revoked Token model - JWT yang dicabut (logout, refresh rotation, user dinonaktifkan)"""
+
+    __tablename__ = 'revoked_tokens'
+
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(64), unique=True, index=True)  # NULL: every token of user_id issued before revoked_at
+    user_id = db.Column(db.Integer, index=True)
+    token_type = db.Column(db.String(10))  # access, refresh or NULL for user-wide
+    revoked_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)  # Row can be deleted after this
+
+    def to_dict(self):
+        """Convert to dictionary"""
+        return {
+            'id': self.id,
+            'jti': self.jti,
+            'user_id': self.user_id,
+            'token_type': self.token_type,
+            'revoked_at': self.revoked_at.isoformat() if self.revoked_at else None,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None
+        }
+
+    def __repr__(self):
+        return f'<RevokedToken {self.jti or f"user={self.user_id}"}>'
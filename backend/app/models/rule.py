@@ -8,10 +8,19 @@ from sqlalchemy import PickleType
 from app import db
 
 
+# Rule code numbers (R001, R002, ...): a native sequence on PostgreSQL,
+# the one-row rule_code_counter table elsewhere (RuleImportService.allocate_rule_numbers)
+rule_code_seq = db.Sequence('rule_code_seq', metadata=db.metadata)
+
+
 class Rule(db.Model):
     """Rule model - Disease/Symptom relation with MB/MD values"""
 
     __tablename__ = 'rules'
+    __table_args__ = (
+        # One rule per disease/symptom pair; bulk imports upsert on it
+        db.Index('uq_rules_disease_symptom', 'disease_id', 'symptom_id', unique=True),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     rule_code = db.Column(db.String(20), unique=True, nullable=False)  # R001, R002, etc
@@ -51,3 +60,12 @@ class Rule(db.Model):
 
     def __repr__(self):
         return f'<Rule {self.rule_code}>'
+
+
+class RuleCodeCounter(db.Model):
+    """Last allocated rule code number, for databases without sequences"""
+
+    __tablename__ = 'rule_code_counter'
+
+    id = db.Column(db.Integer, primary_key=True)
+    last_value = db.Column(db.Integer, nullable=False)
@@ -0,0 +1,51 @@
+"""
+Solution Library Model
+Sistem Pakar Diagnosis Penyakit Tanaman Padi
+"""
+
+from datetime import datetime
+from sqlalchemy import PickleType
+from app import db
+
+
+class SolutionLibrary(db.Model):
+    """Solution Library model - Solusi tersimpan per penyakit dan tingkat keyakinan"""
+
+    __tablename__ = 'solution_library'
+    __table_args__ = (
+        db.UniqueConstraint('disease_id', 'confidence_band', name='uq_solution_library_disease_band'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    disease_id = db.Column(db.Integer, db.ForeignKey('diseases.id', ondelete='CASCADE'), nullable=False, index=True)
+    confidence_band = db.Column(db.String(30), nullable=False)  # 'pasti', 'hampir_pasti', 'kemungkinan_besar', 'mungkin'
+    raw_text = db.Column(db.Text)
+    solution_json = db.Column(PickleType, nullable=False)  # Same structure as DiagnosisHistory.ai_solution_json
+    source = db.Column(db.String(20), default='ai')  # 'ai', 'manual'
+    provider = db.Column(db.String(30))  # AI provider that generated the entry
+    is_active = db.Column(db.Boolean, default=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Relationships
+    disease = db.relationship('Disease', back_populates='solutions')
+
+    def to_dict(self):
+        """Convert to dictionary"""
+        return {
+            'id': self.id,
+            'disease_id': self.disease_id,
+            'disease_code': self.disease.code if self.disease else None,
+            'disease_name': self.disease.name if self.disease else None,
+            'confidence_band': self.confidence_band,
+            'raw_text': self.raw_text,
+            'solution_json': self.solution_json,
+            'source': self.source,
+            'provider': self.provider,
+            'is_active': self.is_active,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+    def __repr__(self):
+        return f'<SolutionLibrary {self.disease_id}:{self.confidence_band}>'
@@ -4,7 +4,6 @@ Sistem Pakar Diagnosis Penyakit Tanaman Padi
 """
 
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
 from app import db
 
 
@@ -23,19 +22,31 @@ class User(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     last_login = db.Column(db.DateTime)
+    search_text = db.Column(db.String(400))  # lower(email + ' ' + full_name), kept by the listener below
+
+    @staticmethod
+    def build_search_text(email, full_name):
+        """Normalized text the admin user search matches against"""
+        return ' '.join(f'{email or ""} {full_name or ""}'.lower().split())
 
     # Relationships
     diagnosis_history = db.relationship('DiagnosisHistory', back_populates='user', lazy='dynamic')
 
     def set_password(self, password):
         """Hash and set password"""
-        self.password_hash = generate_password_hash(password)
+        from app.services.password_service import PasswordService
+        self.password_hash = PasswordService.hash(password)
 
     def check_password(self, password):
         """Check password against hash"""
-        if not self.password_hash:
-            return False
-        return check_password_hash(self.password_hash, password)
+        from app.services.password_service import PasswordService
+        return PasswordService.verify(self.password_hash, password)
+
+    def rehash_password_if_needed(self, password):
+        """After a successful check: re-hash if PASSWORD_HASH_METHOD changed since the hash was made"""
+        from app.services.password_service import PasswordService
+        if PasswordService.needs_rehash(self.password_hash):
+            self.set_password(password)
 
     def to_dict(self):
         """Convert to dictionary"""
@@ -51,3 +62,9 @@ class User(db.Model):
 
     def __repr__(self):
         return f'<User {self.email}>'
+
+
+@db.event.listens_for(User, 'before_insert')
+@db.event.listens_for(User, 'before_update')
+def _update_search_text(mapper, connection, user):
+    user.search_text = User.build_search_text(user.email, user.full_name)
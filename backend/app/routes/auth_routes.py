@@ -1,7 +1,9 @@
 '''Authentication Routes'''
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity
 from app.services.auth_service import AuthService
+from app.services.password_service import PasswordHashingBusy
+from app.utils.login_throttle import LoginThrottle
 
 bp = Blueprint('auth', __name__)
 
@@ -15,12 +17,15 @@ def register():
     if not email or not password:
         return jsonify({'success': False, 'message': 'Email dan password harus diisi'}), 400
 
-    user, result = AuthService.register_user(email, password, full_name)
+    try:
+        user, result = AuthService.register_user(email, password, full_name)
+    except PasswordHashingBusy as e:
+        return jsonify({'success': False, 'message': str(e)}), 503, {'Retry-After': '5'}
 
     if not user:
         return jsonify({'success': False, 'message': result}), 400
 
-    return jsonify({'success': True, 'message': 'Registrasi berhasil', 'data': {'user': user.to_dict(), 'token': result}})
+    return jsonify({'success': True, 'message': 'Registrasi berhasil', 'data': {'user': user.to_dict(), **result}})
 
 @bp.route('/login', methods=['POST'])
 def login():
@@ -31,12 +36,43 @@ def login():
     if not email or not password:
         return jsonify({'success': False, 'message': 'Email dan password harus diisi'}), 400
 
-    user, result = AuthService.login_user(email, password)
+    ip = request.remote_addr
+    retry_after = LoginThrottle.retry_after(ip, email)
+    if retry_after:
+        return jsonify({
+            'success': False,
+            'message': f'Terlalu banyak percobaan login. Coba lagi dalam {retry_after} detik.'
+        }), 429, {'Retry-After': str(retry_after)}
+
+    try:
+        user, result = AuthService.login_user(email, password)
+    except PasswordHashingBusy as e:
+        return jsonify({'success': False, 'message': str(e)}), 503, {'Retry-After': '5'}
 
     if not user:
+        LoginThrottle.record_failure(ip, email)
         return jsonify({'success': False, 'message': result}), 401
 
-    return jsonify({'success': True, 'message': 'Login berhasil', 'data': {'user': user.to_dict(), 'token': result}})
+    LoginThrottle.record_success(email)
+
+    return jsonify({'success': True, 'message': 'Login berhasil', 'data': {'user': user.to_dict(), **result}})
+
+@bp.route('/refresh', methods=['POST'])
+@jwt_required(refresh=True)
+def refresh():
+    tokens, error = AuthService.refresh_tokens(get_jwt())
+
+    if not tokens:
+        return jsonify({'success': False, 'message': error}), 401
+
+    return jsonify({'success': True, 'data': tokens})
+
+@bp.route('/logout', methods=['POST'])
+@jwt_required()
+def logout():
+    data = request.get_json(silent=True) or {}
+    AuthService.logout(get_jwt(), data.get('refresh_token'))
+    return jsonify({'success': True, 'message': 'Logout berhasil'})
 
 @bp.route('/me', methods=['GET'])
 @jwt_required()
@@ -1,17 +1,21 @@
 '''Diagnosis Routes - Main Feature'''
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import get_jwt_identity
+from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
 from app.models.history import DiagnosisHistory
 from app.models.disease import Disease
 from app.models.system_settings import SystemSettings
-from app.services.certainty_factor_service import CertaintyFactorService
+from app.services.diagnosis_cache_service import DiagnosisCacheService
 from app.services.ai_solution_service import AISolutionService
+from app.services.solution_library_service import SolutionLibraryService
+from app.services.diagnosis_session_service import DiagnosisSessionService, SessionConflict
+from app.utils.tracing import start_span, traced
 
 bp = Blueprint('diagnosis', __name__)
 
 
 @bp.route('/start', methods=['POST', 'OPTIONS'])
+@traced('diagnosis.start')
 def start_diagnosis():
     # Handle OPTIONS preflight request for CORS
     if request.method == 'OPTIONS':
@@ -51,51 +55,53 @@ def start_diagnosis():
 
     # Check for duplicate submission (within last 10 seconds)
     from datetime import datetime, timedelta
-    recent_time = datetime.now() - timedelta(seconds=10)
-    recent_diagnoses = DiagnosisHistory.query.filter(
-        DiagnosisHistory.user_id == user_id,
-        DiagnosisHistory.diagnosis_date >= recent_time
-    ).order_by(DiagnosisHistory.diagnosis_date.desc()).all()
-
-    for recent in recent_diagnoses:
-        if recent.selected_symptoms == symptom_ids and recent.cf_values == certainty_values:
-            return jsonify({
-                'success': True,
-                'status': 'diagnosed',
-                'method': recent.diagnosis_method,
-                'duplicate': True,
-                'message': 'Diagnosis sudah ada, menampilkan hasil sebelumnya',
-                'data': {
-                    'history_id': recent.id,
-                    'disease': recent.disease.to_dict() if recent.disease else None,
-                    'confidence': round(float(recent.final_cf_value), 3) if recent.final_cf_value else 0,
-                    'cf_value': round(float(recent.final_cf_value), 4) if recent.final_cf_value else 0,
-                    'certainty_level': recent.certainty_level,
-                    'results': recent.diagnosis_results or [],
-                    'ai_solution': recent.ai_solution_json,
-                    'saved_to_history': True
-                }
-            })
+    with start_span('diagnosis.duplicate_check'):
+        recent_time = datetime.now() - timedelta(seconds=10)
+        recent_diagnoses = DiagnosisHistory.query.filter(
+            DiagnosisHistory.user_id == user_id,
+            DiagnosisHistory.diagnosis_date >= recent_time
+        ).order_by(DiagnosisHistory.diagnosis_date.desc()).all()
 
-    # Check diagnosis limit per day
-    limit_setting = SystemSettings.query.filter_by(setting_key='max_diagnoses_per_day').first()
-    if limit_setting and limit_setting.setting_value:
-        try:
-            max_diagnoses = int(limit_setting.setting_value)
-            today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-            today_count = DiagnosisHistory.query.filter(
-                DiagnosisHistory.user_id == user_id,
-                DiagnosisHistory.diagnosis_date >= today_start
-            ).count()
-
-            if today_count >= max_diagnoses:
+        for recent in recent_diagnoses:
+            if recent.selected_symptoms == symptom_ids and recent.cf_values == certainty_values:
                 return jsonify({
-                    'success': False,
-                    'message': f'Anda telah mencapai batas diagnosis hari ini ({max_diagnoses} diagnosis). Silakan coba lagi besok.',
-                    'limit_reached': True
-                }), 429
-        except ValueError:
-            pass
+                    'success': True,
+                    'status': 'diagnosed',
+                    'method': recent.diagnosis_method,
+                    'duplicate': True,
+                    'message': 'Diagnosis sudah ada, menampilkan hasil sebelumnya',
+                    'data': {
+                        'history_id': recent.id,
+                        'disease': recent.disease.to_dict() if recent.disease else None,
+                        'confidence': round(float(recent.final_cf_value), 3) if recent.final_cf_value else 0,
+                        'cf_value': round(float(recent.final_cf_value), 4) if recent.final_cf_value else 0,
+                        'certainty_level': recent.certainty_level,
+                        'results': recent.diagnosis_results or [],
+                        'ai_solution': recent.ai_solution_json,
+                        'saved_to_history': True
+                    }
+                })
+
+    # Check diagnosis limit per day
+    with start_span('diagnosis.quota_check'):
+        limit_setting = SystemSettings.query.filter_by(setting_key='max_diagnoses_per_day').first()
+        if limit_setting and limit_setting.setting_value:
+            try:
+                max_diagnoses = int(limit_setting.setting_value)
+                today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+                today_count = DiagnosisHistory.query.filter(
+                    DiagnosisHistory.user_id == user_id,
+                    DiagnosisHistory.diagnosis_date >= today_start
+                ).count()
+
+                if today_count >= max_diagnoses:
+                    return jsonify({
+                        'success': False,
+                        'message': f'Anda telah mencapai batas diagnosis hari ini ({max_diagnoses} diagnosis). Silakan coba lagi besok.',
+                        'limit_reached': True
+                    }), 429
+            except ValueError:
+                pass
 
     # Always request certainty first when not provided
     if not certainty_values:
@@ -116,8 +122,9 @@ def start_diagnosis():
         })
 
     # Calculate with CF (parallel matching)
-    cf_service = CertaintyFactorService()
-    cf_result = cf_service.diagnose(symptom_ids, certainty_values)
+    with start_span('diagnosis.cf_scoring', {'symptoms.count': len(symptom_ids)}) as span:
+        cf_result = DiagnosisCacheService().diagnose(symptom_ids, certainty_values)
+        span.set_attribute('results.count', len(cf_result.get('results') or []))
 
     if cf_result['status'] == 'no_diagnosis':
         return jsonify({'success': False, 'message': cf_result['message']}), 400
@@ -151,37 +158,43 @@ def start_diagnosis():
             }
         })
 
-    ai_solution = None
-    if disease:
-        secondary_diseases = [
-            {'code': r['disease_code'], 'name': r['disease_name'], 'cf_final': r['cf_final']}
-            for r in results[1:]
-        ]
-        ai_service = AISolutionService()
-        ai_solution = ai_service.generate_solution(
-            disease,
-            primary['cf_final'],
-            'certainty_factor',
-            secondary_diseases=secondary_diseases
+    with start_span('diagnosis.ai_solution') as span:
+        ai_solution = None
+        if disease:
+            # Stored solution first; the AI only handles combinations the library does not cover
+            ai_solution = SolutionLibraryService().solution_for_diagnosis(primary, results[1:])
+            span.set_attribute('solution.source', 'library' if ai_solution else 'ai')
+        if disease and ai_solution is None:
+            secondary_diseases = [
+                {'code': r['disease_code'], 'name': r['disease_name'], 'cf_final': r['cf_final']}
+                for r in results[1:]
+            ]
+            ai_service = AISolutionService()
+            ai_solution = ai_service.generate_solution(
+                disease,
+                primary['cf_final'],
+                'certainty_factor',
+                secondary_diseases=secondary_diseases
+            )
+            if isinstance(ai_solution.get('structured'), dict):
+                ai_solution['structured'].setdefault('pencegahan_penyakit_lain', [])
+
+    with start_span('diagnosis.history_commit'):
+        history = DiagnosisHistory(
+            user_id=user_id,
+            disease_id=disease.id if disease else None,
+            selected_symptoms=symptom_ids,
+            cf_values=certainty_values,
+            final_cf_value=primary['cf_final'],
+            certainty_level=primary['interpretation'],
+            diagnosis_method='certainty_factor',
+            diagnosis_results=results,
+            ai_solution=ai_solution['raw_text'] if ai_solution else None,
+            ai_solution_json=ai_solution['structured'] if ai_solution else None,
+            ip_address=request.remote_addr
         )
-        if isinstance(ai_solution.get('structured'), dict):
-            ai_solution['structured'].setdefault('pencegahan_penyakit_lain', [])
-
-    history = DiagnosisHistory(
-        user_id=user_id,
-        disease_id=disease.id if disease else None,
-        selected_symptoms=symptom_ids,
-        cf_values=certainty_values,
-        final_cf_value=primary['cf_final'],
-        certainty_level=primary['interpretation'],
-        diagnosis_method='certainty_factor',
-        diagnosis_results=results,
-        ai_solution=ai_solution['raw_text'] if ai_solution else None,
-        ai_solution_json=ai_solution['structured'] if ai_solution else None,
-        ip_address=request.remote_addr
-    )
-    db.session.add(history)
-    db.session.commit()
+        db.session.add(history)
+        db.session.commit()
 
     return jsonify({
         'success': True,
@@ -201,3 +214,84 @@ def start_diagnosis():
             'saved_to_history': True
         }
     })
+
+
+def _current_user_id():
+    try:
+        return int(get_jwt_identity())
+    except (ValueError, TypeError):
+        return None
+
+
+@bp.route('/session', methods=['POST'])
+@jwt_required()
+def create_session():
+    """Start an interactive diagnosis session (symptoms can be added one at a time)"""
+    user_id = _current_user_id()
+    if user_id is None:
+        return jsonify({'success': False, 'message': 'Invalid user session'}), 401
+
+    data = request.get_json(silent=True) or {}
+    certainty_values = (data.get('certainty_values') or {}) if isinstance(data, dict) else None
+    if not isinstance(certainty_values, dict):
+        return jsonify({'success': False, 'message': 'certainty_values harus berupa object'}), 400
+
+    service = DiagnosisSessionService()
+    session = service.create(user_id, certainty_values)
+    return jsonify({'success': True, 'data': service.get_result(session)}), 201
+
+
+@bp.route('/session/<session_id>', methods=['GET'])
+@jwt_required()
+def get_session(session_id):
+    service = DiagnosisSessionService()
+    session = service.get(session_id, _current_user_id())
+    if not session:
+        return jsonify({'success': False, 'message': 'Sesi diagnosis tidak ditemukan atau sudah berakhir'}), 404
+    return jsonify({'success': True, 'data': service.get_result(session)})
+
+
+@bp.route('/session/<session_id>/symptoms', methods=['PUT'])
+@jwt_required()
+def add_session_symptoms(session_id):
+    """Add symptoms or change their certainty: {"certainty_values": {"7": 0.8}}"""
+    service = DiagnosisSessionService()
+    session = service.get(session_id, _current_user_id())
+    if not session:
+        return jsonify({'success': False, 'message': 'Sesi diagnosis tidak ditemukan atau sudah berakhir'}), 404
+
+    data = request.get_json(silent=True) or {}
+    certainty_values = data.get('certainty_values') if isinstance(data, dict) else None
+    if not isinstance(certainty_values, dict) or not certainty_values:
+        return jsonify({'success': False, 'message': 'certainty_values harus diisi'}), 400
+
+    try:
+        service.add_symptoms(session, certainty_values)
+    except SessionConflict as e:
+        return jsonify({'success': False, 'message': str(e)}), 409
+    return jsonify({'success': True, 'data': service.get_result(session)})
+
+
+@bp.route('/session/<session_id>/symptoms/<int:symptom_id>', methods=['DELETE'])
+@jwt_required()
+def remove_session_symptom(session_id, symptom_id):
+    service = DiagnosisSessionService()
+    session = service.get(session_id, _current_user_id())
+    if not session:
+        return jsonify({'success': False, 'message': 'Sesi diagnosis tidak ditemukan atau sudah berakhir'}), 404
+
+    try:
+        removed = service.remove_symptom(session, symptom_id)
+    except SessionConflict as e:
+        return jsonify({'success': False, 'message': str(e)}), 409
+    if not removed:
+        return jsonify({'success': False, 'message': 'Gejala tidak ada di sesi ini'}), 404
+    return jsonify({'success': True, 'data': service.get_result(session)})
+
+
+@bp.route('/session/<session_id>', methods=['DELETE'])
+@jwt_required()
+def delete_session(session_id):
+    if not DiagnosisSessionService().delete(session_id, _current_user_id()):
+        return jsonify({'success': False, 'message': 'Sesi diagnosis tidak ditemukan atau sudah berakhir'}), 404
+    return jsonify({'success': True, 'message': 'Sesi diagnosis dihapus'})
@@ -3,6 +3,7 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
 from app import db
 from app.models.disease import Disease
+from app.services.knowledge_base_service import KnowledgeBaseService
 from app.utils.decorators import admin_required
 
 bp = Blueprint('diseases', __name__)
@@ -28,5 +29,6 @@ def create_disease():
     disease = Disease(code=data['code'], name=data['name'], description=data.get('description'))
     db.session.add(disease)
     db.session.commit()
+    KnowledgeBaseService.invalidate()
 
     return jsonify({'success': True, 'message': 'Penyakit berhasil ditambahkan', 'data': disease.to_dict()})
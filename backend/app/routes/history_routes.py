@@ -1,9 +1,12 @@
 '''History Routes'''
+import logging
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime
 from app.models.history import DiagnosisHistory
 
+logger = logging.getLogger(__name__)
+
 bp = Blueprint('history', __name__)
 
 @bp.route('', methods=['GET'], strict_slashes=False)
@@ -78,5 +81,5 @@ def export_history_pdf(history_id):
             diagnosis_date=history.diagnosis_date.strftime('%d %B %Y') if history.diagnosis_date else 'N/A'
         )
     except Exception as e:
-        print(f"PDF template error: {e}")
+        logger.exception('PDF template error', extra={'history_id': history.id})
         return jsonify({'success': False, 'message': 'Gagal membuat laporan PDF'}), 500
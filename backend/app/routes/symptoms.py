@@ -2,10 +2,14 @@
 Symptom Routes
 """
 
-from flask import jsonify
+import logging
+from flask import jsonify, request
 from app.routes import api_bp
 from app import db
 from app.models.symptom import Symptom
+from app.services.symptom_search_service import SymptomSearchService
+
+logger = logging.getLogger(__name__)
 
 
 @api_bp.route('/symptoms', methods=['GET'])
@@ -18,6 +22,34 @@ def get_symptoms():
             'data': [s.to_dict() for s in symptoms]
         })
     except Exception as e:
+        logger.exception('get_symptoms failed')
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+
+@api_bp.route('/symptoms/search', methods=['GET'])
+def search_symptoms():
+    """Ranked symptom suggestions for ?q= (typo tolerant), optionally within ?category="""
+    query = request.args.get('q', '').strip()
+    category = request.args.get('category', '').strip() or None
+    try:
+        limit = max(1, min(int(request.args.get('limit', 10)), 50))
+    except ValueError:
+        limit = 10
+
+    if not query:
+        return jsonify({'success': True, 'data': []})
+
+    try:
+        results = SymptomSearchService.search(query, limit=limit, category=category)
+        return jsonify({
+            'success': True,
+            'data': [dict(symptom, score=score) for symptom, score in results]
+        })
+    except Exception as e:
+        logger.exception('search_symptoms failed')
         return jsonify({
             'success': False,
             'message': str(e)
@@ -6,7 +6,19 @@ Menggunakan OpenAI atau Google Gemini untuk generate solusi
 
 import os
 import json
+import time
+import logging
 import importlib
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from flask import current_app
+from app.utils.circuit_breaker import get_breaker
+from app.utils.json_extract import extract_json_object
+from app.utils.tracing import start_span, traced
+
+logger = logging.getLogger(__name__)
 
 
 def _optional_import(module_name):
@@ -19,62 +31,224 @@ def _optional_import(module_name):
 openai = _optional_import("openai")
 genai = _optional_import("google.generativeai")
 
+_executor = None
+_executor_lock = threading.Lock()
+
+OPENAI_MODEL = "gpt-3.5-turbo"  # Using gpt-3.5-turbo for cost efficiency
+GEMINI_MODEL = 'gemini-flash-latest'  # Always points to the latest stable version
+
+
+def openai_request(prompt):
+    """Chat completion arguments, shared by the sync and async OpenAI clients"""
+    return {
+        'model': OPENAI_MODEL,
+        'messages': [
+            {"role": "system", "content": "You are an expert agricultural advisor specializing in rice plant diseases."},
+            {"role": "user", "content": prompt}
+        ],
+        'temperature': 0.7,
+        'max_tokens': 1500
+    }
+
+
+def _provider_executor(max_workers):
+    """Shared pool for provider calls so a hung SDK call can be abandoned at the deadline"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ai-provider')
+        return _executor
+
+
+def _text_items(value):
+    """List of non-empty strings from a list (or newline separated text)"""
+    if isinstance(value, str):
+        value = value.splitlines()
+    if not isinstance(value, list):
+        return []
+    items = []
+    for item in value:
+        if isinstance(item, dict):
+            item = ' '.join(str(v) for v in item.values() if v)
+        text = str(item).strip().lstrip('-\u2022* ').strip() if item is not None else ''
+        if text:
+            items.append(text)
+    return items
+
+
+class ProviderDeadlineExceeded(Exception):
+    """No provider answered within AI_CALL_DEADLINE_SECONDS"""
+
+
+class ProvidersUnavailable(Exception):
+    """Every provider in the chain is short-circuited by its breaker"""
+
+
+class _ProviderAttempt:
+    """One in-flight provider call; its outcome is reported to the breaker exactly once"""
+
+    def __init__(self, name, breaker):
+        self.name = name
+        self.breaker = breaker
+        self.started = time.monotonic()
+        self.future = None
+        self._settled = False
+        self._lock = threading.Lock()
+
+    def settle(self, error=None):
+        with self._lock:
+            if self._settled:
+                return False
+            self._settled = True
+        if error is None:
+            self.breaker.record_success()
+            AISolutionService.record_latency(self.name, time.monotonic() - self.started)
+        else:
+            self.breaker.record_failure(error)
+        return True
+
+    def release(self):
+        """Settle a call that never reached the provider: no breaker outcome"""
+        with self._lock:
+            if self._settled:
+                return False
+            self._settled = True
+        self.breaker.record_cancelled()
+        return True
+
+    def cancel(self):
+        """Cancel a call still queued in the executor; False once it has started"""
+        if not self.future.cancel():
+            return False
+        self.release()
+        return True
+
+    def on_done(self, future):
+        if future.cancelled():
+            # Settled by cancel() (never started) or at the deadline (async calls)
+            return
+        self.settle(future.exception())
+
 
 class AISolutionService:
     """
     AI Solution Generator
     Generates treatment solutions using AI (OpenAI GPT or Google Gemini)
     Reads configuration from System Settings database
+
+    Providers form a chain: the `ai_provider` setting first, then (with the
+    `ai_failover_enabled` setting, or an explicit AI_PROVIDER_CHAIN) the
+    others. The primary is asked first; if it has not answered within the
+    AI_HEDGE_PERCENTILE of its recent latencies, or fails, the next provider
+    is asked as well and the first valid structured answer wins.
     """
 
+    # name -> factory(service) returning complete(prompt) -> raw text, or None if unusable
+    PROVIDER_FACTORIES = {}
+
+    # Response schema: an answer is usable once the required sections were recovered
+    TEXT_SECTIONS = ('langkah_penanganan', 'panduan_penggunaan', 'pencegahan')
+    DRUG_FIELDS = ('nama', 'jenis', 'dosis', 'cara_pakai')
+    REQUIRED_SECTIONS = ('langkah_penanganan', 'rekomendasi_obat')
+
+    _latency_lock = threading.Lock()
+    _latencies = {}
+
     def __init__(self):
         # Get AI configuration from database (System Settings)
         from app.models.system_settings import SystemSettings
 
-        # Get AI provider from database, fallback to env variable
-        provider_setting = SystemSettings.query.filter_by(setting_key='ai_provider').first()
-        self.provider = provider_setting.setting_value.lower() if provider_setting else os.getenv('AI_PROVIDER', 'gemini').lower()
-
-        if self.provider == 'openai' and openai:
-            # Get OpenAI API key from database
-            api_key_setting = SystemSettings.query.filter_by(setting_key='openai_api_key').first()
-            api_key = api_key_setting.setting_value if api_key_setting else os.getenv('OPENAI_API_KEY')
-
-            if api_key:
-                # Store API key for later use, will be used in _generate_with_openai
-                self.api_key = api_key
-                self.model = 'gpt-3.5-turbo'  # Using gpt-3.5-turbo for cost efficiency
-                print(f"✅ AI Service initialized with OpenAI (gpt-3.5-turbo)")
-            else:
-                print("❌ OpenAI API key not found")
-                self.provider = None
-                self.model = None
-                self.api_key = None
-
-        elif self.provider == 'gemini' and genai:
-            # Get Gemini API key from database
-            api_key_setting = SystemSettings.query.filter_by(setting_key='gemini_api_key').first()
-            api_key = api_key_setting.setting_value if api_key_setting else os.getenv('GEMINI_API_KEY')
-
-            if api_key:
-                try:
-                    genai.configure(api_key=api_key)
-                    # Use gemini-flash-latest (always points to the latest stable version)
-                    self.model = genai.GenerativeModel('gemini-flash-latest')
-                    print(f"✅ AI Service initialized with Gemini (gemini-flash-latest)")
-                except Exception as e:
-                    print(f"❌ Failed to initialize Gemini: {e}")
-                    self.provider = None
-                    self.model = None
-            else:
-                print("❌ Gemini API key not found")
-                self.provider = None
-                self.model = None
-        else:
-            print(f"❌ AI Provider '{self.provider}' not available or not configured")
-            self.provider = None
-            self.model = None
+        config = current_app.config
+        # Hard budget for the whole chain; also passed to SDK clients as their own timeout
+        self.deadline = config.get('AI_CALL_DEADLINE_SECONDS', 20)
+        self._executor = _provider_executor(config.get('AI_CALL_WORKERS', 8))
+
+        settings = SystemSettings.query.filter(SystemSettings.setting_key.in_([
+            'ai_provider', 'ai_failover_enabled', 'openai_api_key', 'gemini_api_key'
+        ])).all()
+        self._settings = {s.setting_key: s.setting_value for s in settings}
+
+        self.providers = []
+        for name in self._provider_chain():
+            complete = self._init_provider(name)
+            if complete is not None:
+                self.providers.append((name, complete))
+        self.provider = self.providers[0][0] if self.providers else None
+
+    @classmethod
+    def register_provider(cls, name, factory):
+        """Add or replace a provider (e.g. local stubs in benchmarks)"""
+        cls.PROVIDER_FACTORIES[name] = factory
+
+    def _setting(self, key, env_key, default=None):
+        # Database value wins when the setting row exists, like the admin settings page expects
+        if key in self._settings:
+            return self._settings[key]
+        return os.getenv(env_key, default)
+
+    def _provider_chain(self):
+        explicit = current_app.config.get('AI_PROVIDER_CHAIN')
+        if explicit:
+            return [name.strip().lower() for name in explicit.split(',') if name.strip()]
+
+        primary = (self._setting('ai_provider', 'AI_PROVIDER', 'gemini') or '').lower()
+        chain = [primary]
+        if str(self._setting('ai_failover_enabled', 'AI_FAILOVER_ENABLED', 'false')).lower() == 'true':
+            chain.extend(name for name in ('openai', 'gemini') if name != primary)
+        return chain
+
+    def _init_provider(self, name):
+        factory = self.PROVIDER_FACTORIES.get(name)
+        if factory is None:
+            logger.warning('AI provider not available or not configured', extra={'provider': name})
+            return None
+        try:
+            complete = factory(self)
+        except Exception:
+            logger.exception('Failed to initialize AI provider', extra={'provider': name})
+            return None
+        if complete is not None:
+            logger.debug('AI provider initialized', extra={'provider': name})
+        return complete
+
+    def _init_openai(self):
+        if not openai:
+            logger.warning('OpenAI library not installed', extra={'provider': 'openai'})
+            return None
+        api_key = self._setting('openai_api_key', 'OPENAI_API_KEY')
+        if not api_key:
+            logger.warning('OpenAI API key not found', extra={'provider': 'openai'})
+            return None
+
+        OpenAI = getattr(openai, "OpenAI", None)
+        if OpenAI is None:
+            raise RuntimeError("Versi library OpenAI tidak mendukung OpenAI client. Jalankan: pip install --upgrade openai")
+        client = OpenAI(api_key=api_key, timeout=self.deadline, max_retries=0)
 
+        def complete(prompt):
+            response = client.chat.completions.create(**openai_request(prompt))
+            return response.choices[0].message.content
+
+        return complete
+
+    def _init_gemini(self):
+        if not genai:
+            logger.warning('Google Generative AI library not installed', extra={'provider': 'gemini'})
+            return None
+        api_key = self._setting('gemini_api_key', 'GEMINI_API_KEY')
+        if not api_key:
+            logger.warning('Gemini API key not found', extra={'provider': 'gemini'})
+            return None
+
+        genai.configure(api_key=api_key)
+        model = genai.GenerativeModel(GEMINI_MODEL)
+
+        def complete(prompt):
+            return model.generate_content(prompt).text
+
+        return complete
+
+    @traced('ai.generate_solution')
     def generate_solution(self, disease, confidence, diagnosis_method='forward_chaining', secondary_diseases=None):
         """
         Generate complete treatment solution for diagnosed disease
@@ -95,29 +269,176 @@ class AISolutionService:
                 }
             }
         """
-        if not self.provider or not self.model:
-            print(f"⚠️  AI Service not configured. Provider: {self.provider}, Model: {self.model}")
-            print(f"⚠️  Using fallback solution for {disease.name}")
+        if not self.providers:
+            logger.info('AI service not configured, using fallback solution', extra={'disease': disease.code})
             return self._generate_fallback_solution(disease, secondary_diseases)
 
         prompt = self._create_prompt(disease, confidence, diagnosis_method, secondary_diseases)
+        chain = ','.join(name for name, _ in self.providers)
 
+        start = time.perf_counter()
         try:
-            print(f"🔄 Generating AI solution using {self.provider}...")
-            if self.provider == 'openai':
-                result = self._generate_with_openai(prompt)
-                print(f"✅ AI solution generated successfully with OpenAI")
-                return result
-            elif self.provider == 'gemini':
-                result = self._generate_with_gemini(prompt)
-                print(f"✅ AI solution generated successfully with Gemini")
-                return result
+            with start_span('ai.provider_call', {'ai.providers': chain, 'ai.prompt_chars': len(prompt)}) as span:
+                provider, result, _ = self._generate_with_chain(prompt)
+                span.set_attribute('ai.provider', provider)
+            self._log_generated(provider, chain, disease, start)
+            return result
         except Exception as e:
-            print(f"❌ AI Generation Error: {type(e).__name__}: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            print(f"⚠️  Falling back to generic solution")
-            return self._generate_fallback_solution(disease, secondary_diseases)
+            self._log_fallback(e, chain, disease, start)
+        return self._generate_fallback_solution(disease, secondary_diseases)
+
+    @staticmethod
+    def _log_generated(provider, chain, disease, start):
+        logger.info('AI solution generated', extra={
+            'provider': provider,
+            'chain': chain,
+            'disease': disease.code,
+            'latency_ms': round((time.perf_counter() - start) * 1000.0, 1)
+        })
+
+    @staticmethod
+    def _log_fallback(error, chain, disease, start):
+        """Log why the fallback solution is used; call from inside the except block"""
+        extra = {
+            'provider': chain,
+            'disease': disease.code,
+            'latency_ms': round((time.perf_counter() - start) * 1000.0, 1)
+        }
+        if isinstance(error, ProvidersUnavailable):
+            logger.warning('AI provider circuit open, using fallback solution', extra=extra)
+        elif isinstance(error, ProviderDeadlineExceeded):
+            logger.warning('AI provider deadline exceeded, using fallback solution', extra=extra)
+        else:
+            logger.exception('AI generation failed, using fallback solution', extra=extra)
+
+    def _generate_with_chain(self, prompt):
+        """
+        Run the provider chain with hedging; returns (provider, result, valid).
+
+        A provider is launched when the chain starts, when the previous one
+        failed or gave no usable JSON, or when the previous one is slower
+        than its hedge delay. SDK calls cannot be killed: calls still running
+        at the deadline are counted as breaker failures and left to finish
+        in the background; calls still queued behind a busy executor are
+        cancelled and count for nothing.
+        """
+        deadline_at = time.monotonic() + self.deadline
+        queue = list(self.providers)
+        pending = {}
+        unparsed = None
+        last_error = None
+
+        def launch_next():
+            while queue:
+                name, complete = queue.pop(0)
+                breaker = self._breaker(name)
+                if not breaker.allow_request():
+                    logger.info('AI provider circuit open, skipping', extra={'provider': name})
+                    continue
+                attempt = _ProviderAttempt(name, breaker)
+                attempt.future = self._executor.submit(contextvars.copy_context().run, complete, prompt)
+                attempt.future.add_done_callback(attempt.on_done)
+                pending[attempt.future] = attempt
+                return attempt
+            return None
+
+        current = launch_next()
+        if current is None:
+            raise ProvidersUnavailable()
+
+        while pending:
+            now = time.monotonic()
+            if now >= deadline_at:
+                break
+            timeout = deadline_at - now
+            if queue:
+                timeout = min(timeout, max(0.0, current.started + self.hedge_delay(current.name) - now))
+
+            done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                if queue:
+                    logger.info('Hedging AI request', extra={'provider': current.name})
+                    current = launch_next() or current
+                continue
+
+            for future in done:
+                attempt = pending.pop(future)
+                error = future.exception()
+                if error is not None:
+                    last_error = error
+                    logger.warning('AI provider failed', extra={
+                        'provider': attempt.name,
+                        'error': f'{type(error).__name__}: {error}'
+                    })
+                    current = launch_next() or current
+                    continue
+                result, valid = self._parse_response(future.result())
+                if valid:
+                    return attempt.name, result, True
+                logger.info('AI provider returned no structured JSON', extra={'provider': attempt.name})
+                unparsed = unparsed or (attempt.name, result, False)
+                current = launch_next() or current
+
+        for attempt in pending.values():
+            if not attempt.cancel():
+                attempt.settle(ProviderDeadlineExceeded(f'{attempt.name} did not respond within {self.deadline}s'))
+
+        if unparsed:
+            return unparsed
+        if pending or last_error is None:
+            raise ProviderDeadlineExceeded(f'no AI provider answered within {self.deadline}s')
+        raise last_error
+
+    def generate_library_solution(self, disease, confidence):
+        """
+        Single-disease solution for the solution library batch job. Unlike
+        generate_solution there is no fallback: raises unless a provider
+        returned parseable JSON. Returns (provider, result).
+        """
+        prompt = self._library_prompt(disease, confidence)
+        with start_span('ai.library_solution', {'disease': disease.code}):
+            return self._library_result(*self._generate_with_chain(prompt))
+
+    def _library_prompt(self, disease, confidence):
+        if not self.providers:
+            raise ProvidersUnavailable('AI provider belum dikonfigurasi')
+        return self._create_prompt(disease, confidence, 'certainty_factor')
+
+    @staticmethod
+    def _library_result(provider, result, valid):
+        if not valid or not result.get('complete'):
+            raise ValueError(f'{provider} tidak mengembalikan JSON yang lengkap')
+        return provider, result
+
+    def hedge_delay(self, provider):
+        """Seconds to wait on provider before asking the next one"""
+        config = current_app.config
+        with self._latency_lock:
+            samples = sorted(self._latencies.get(provider, ()))
+        if len(samples) < config.get('AI_HEDGE_MIN_SAMPLES', 5):
+            return config.get('AI_HEDGE_DELAY_SECONDS', 5.0)
+        percentile = config.get('AI_HEDGE_PERCENTILE', 90)
+        index = min(len(samples) - 1, int(len(samples) * percentile / 100.0))
+        return samples[index]
+
+    @classmethod
+    def record_latency(cls, provider, seconds):
+        with cls._latency_lock:
+            samples = cls._latencies.get(provider)
+            if samples is None:
+                samples = cls._latencies[provider] = deque(maxlen=100)
+            samples.append(seconds)
+
+    @staticmethod
+    def _breaker(provider):
+        config = current_app.config
+        return get_breaker(
+            f'ai:{provider}',
+            failure_rate=config.get('AI_BREAKER_FAILURE_RATE', 0.5),
+            min_calls=config.get('AI_BREAKER_MIN_CALLS', 4),
+            window=config.get('AI_BREAKER_WINDOW', 20),
+            cooldown_seconds=config.get('AI_BREAKER_COOLDOWN_SECONDS', 30)
+        )
 
     def _create_prompt(self, disease, confidence, method, secondary_diseases=None):
         """Create prompt for AI"""
@@ -187,69 +508,74 @@ Fokus pada solusi praktis dan efektif untuk petani Indonesia.
 """
         return prompt
 
-    def _generate_with_openai(self, prompt):
-        """Generate using OpenAI GPT"""
-        if not openai:
-            raise RuntimeError("Library OpenAI belum terinstall. Jalankan: pip install openai")
-
-        OpenAI = getattr(openai, "OpenAI", None)
-        if OpenAI is None:
-            raise RuntimeError("Versi library OpenAI tidak mendukung OpenAI client. Jalankan: pip install --upgrade openai")
-
-        # Get API key from settings
-        from app.models.system_settings import SystemSettings
-        api_key_setting = SystemSettings.query.filter_by(setting_key='openai_api_key').first()
-        api_key = api_key_setting.setting_value if api_key_setting else os.getenv('OPENAI_API_KEY')
-
-        client = OpenAI(api_key=api_key)
-
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",  # Using gpt-3.5-turbo for cost efficiency
-            messages=[
-                {"role": "system", "content": "You are an expert agricultural advisor specializing in rice plant diseases."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=1500
-        )
-
-        raw_text = response.choices[0].message.content
-
-        # Try to parse JSON from response
+    def _parse_response(self, raw_text):
+        """
+        Returns (result, valid). valid is False when no JSON object could be
+        recovered or a required section is missing; result['complete'] is
+        False when sections had to be repaired or filled from the template.
+        """
         try:
-            # Find JSON in response
-            start = raw_text.find('{')
-            end = raw_text.rfind('}') + 1
-            json_str = raw_text[start:end]
-            structured = json.loads(json_str)
-        except:
-            structured = self._parse_text_to_structured(raw_text)
+            data, closed = extract_json_object(raw_text)
+        except ValueError:
+            return {
+                'raw_text': raw_text,
+                'structured': self._parse_text_to_structured(raw_text or ''),
+                'complete': False
+            }, False
+
+        structured, missing = self._validate_structured(data)
+        valid = not any(section in missing for section in self.REQUIRED_SECTIONS)
+        if missing:
+            template = self._parse_text_to_structured(raw_text or '')
+            for section in missing:
+                structured[section] = template[section]
+        if missing or not closed:
+            logger.info('AI response repaired', extra={
+                'truncated': not closed,
+                'missing_sections': ','.join(missing) or None,
+                'usable': valid
+            })
 
         return {
             'raw_text': raw_text,
-            'structured': structured
-        }
-
-    def _generate_with_gemini(self, prompt):
-        """Generate using Google Gemini"""
-        if not genai:
-            raise RuntimeError("Library Google Generative AI belum terinstall. Jalankan: pip install google-generativeai")
-        response = self.model.generate_content(prompt)
-        raw_text = response.text
-
-        # Try to parse JSON from response
-        try:
-            start = raw_text.find('{')
-            end = raw_text.rfind('}') + 1
-            json_str = raw_text[start:end]
-            structured = json.loads(json_str)
-        except:
-            structured = self._parse_text_to_structured(raw_text)
+            'structured': structured,
+            'complete': closed and not missing
+        }, valid
+
+    def _validate_structured(self, data):
+        """Coerce parsed JSON to the solution schema; returns (structured, missing sections)"""
+        if not isinstance(data, dict):
+            return {'pencegahan_penyakit_lain': []}, list(self.TEXT_SECTIONS) + ['rekomendasi_obat']
+
+        structured = {}
+        for section in self.TEXT_SECTIONS:
+            structured[section] = _text_items(data.get(section))
+
+        drugs = []
+        for item in data.get('rekomendasi_obat') or []:
+            if isinstance(item, str):
+                item = {'nama': item}
+            if not isinstance(item, dict):
+                continue
+            drug = {field: str(item.get(field) or '').strip() for field in self.DRUG_FIELDS}
+            if drug['nama']:
+                drugs.append(drug)
+        structured['rekomendasi_obat'] = drugs
+
+        others = []
+        for item in data.get('pencegahan_penyakit_lain') or []:
+            if isinstance(item, dict) and str(item.get('penyakit') or '').strip():
+                others.append({
+                    'penyakit': str(item['penyakit']).strip(),
+                    'langkah': _text_items(item.get('langkah'))
+                })
+        structured['pencegahan_penyakit_lain'] = others
 
-        return {
-            'raw_text': raw_text,
-            'structured': structured
-        }
+        # An explicit empty drug list is a valid answer (e.g. viral diseases); empty text sections are not
+        missing = [section for section in self.TEXT_SECTIONS if not structured[section]]
+        if not drugs and not isinstance(data.get('rekomendasi_obat'), list):
+            missing.insert(1, 'rekomendasi_obat')
+        return structured, missing
 
     def _parse_text_to_structured(self, text):
         """Parse plain text into structured format"""
@@ -326,3 +652,7 @@ Fokus pada solusi praktis dan efektif untuk petani Indonesia.
                 'pencegahan_penyakit_lain': other_prevention
             }
         }
+
+
+AISolutionService.register_provider('openai', AISolutionService._init_openai)
+AISolutionService.register_provider('gemini', AISolutionService._init_gemini)
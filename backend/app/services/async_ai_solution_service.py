@@ -0,0 +1,334 @@
+"""
+Async AI Solution Service
+Sistem Pakar Diagnosis Penyakit Tanaman Padi
+Versi asyncio dari AISolutionService untuk generate banyak solusi sekaligus
+"""
+
+import time
+import asyncio
+import logging
+import weakref
+from flask import current_app
+from app.services.ai_solution_service import (
+    AISolutionService,
+    ProviderDeadlineExceeded,
+    ProvidersUnavailable,
+    _ProviderAttempt,
+    openai,
+    genai,
+    openai_request,
+    GEMINI_MODEL
+)
+from app.utils.tracing import start_span
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncAISolutionService(AISolutionService):
+    """
+    AISolutionService with coroutine provider calls.
+
+    Settings, provider chain, hedging, circuit breakers, prompt and response
+    parsing are inherited; only the calls differ. One event loop keeps many
+    requests in flight without a thread each, at most AI_ASYNC_MAX_IN_FLIGHT
+    provider calls at a time per event loop (shared by every instance), and
+    calls still running at the deadline are cancelled instead of being left
+    to finish. Calls still waiting for a slot at the deadline never reached
+    the provider and do not count against its breaker.
+
+    Create it and await it inside an app context (asyncio tasks inherit the
+    context they are created in). A provider without an async factory runs
+    its sync complete() in a thread via asyncio.to_thread.
+
+        service = AsyncAISolutionService()
+        result = await service.generate_solution(disease, 0.8, 'certainty_factor')
+    """
+
+    # name -> factory(service) returning async complete(prompt) -> raw text, or None if unusable
+    ASYNC_PROVIDER_FACTORIES = {}
+
+    # event loop -> Semaphore capping provider calls in flight on that loop
+    _semaphores = weakref.WeakKeyDictionary()
+
+    def __init__(self):
+        self._max_in_flight = current_app.config.get('AI_ASYNC_MAX_IN_FLIGHT', 32)
+        self._reapers = set()  # strong refs to _expire_at_deadline tasks
+        super().__init__()
+
+    @property
+    def _semaphore(self):
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self._max_in_flight)
+        return semaphore
+
+    @classmethod
+    def register_async_provider(cls, name, factory):
+        cls.ASYNC_PROVIDER_FACTORIES[name] = factory
+
+    def _init_provider(self, name):
+        factory = self.ASYNC_PROVIDER_FACTORIES.get(name)
+        if factory is None:
+            complete = super()._init_provider(name)
+            if complete is None:
+                return None
+
+            async def complete_in_thread(prompt):
+                return await asyncio.to_thread(complete, prompt)
+            return complete_in_thread
+
+        try:
+            return factory(self)
+        except Exception:
+            logger.exception('Failed to initialize AI provider', extra={'provider': name})
+            return None
+
+    def _init_openai_async(self):
+        AsyncOpenAI = getattr(openai, 'AsyncOpenAI', None) if openai else None
+        if AsyncOpenAI is None:
+            logger.warning('OpenAI library without AsyncOpenAI', extra={'provider': 'openai'})
+            return None
+        api_key = self._setting('openai_api_key', 'OPENAI_API_KEY')
+        if not api_key:
+            logger.warning('OpenAI API key not found', extra={'provider': 'openai'})
+            return None
+
+        client = AsyncOpenAI(api_key=api_key, timeout=self.deadline, max_retries=0)
+
+        async def complete(prompt):
+            response = await client.chat.completions.create(**openai_request(prompt))
+            return response.choices[0].message.content
+
+        return complete
+
+    def _init_gemini_async(self):
+        if not genai:
+            logger.warning('Google Generative AI library not installed', extra={'provider': 'gemini'})
+            return None
+        api_key = self._setting('gemini_api_key', 'GEMINI_API_KEY')
+        if not api_key:
+            logger.warning('Gemini API key not found', extra={'provider': 'gemini'})
+            return None
+
+        genai.configure(api_key=api_key)
+        model = genai.GenerativeModel(GEMINI_MODEL)
+
+        async def complete(prompt):
+            response = await model.generate_content_async(prompt)
+            return response.text
+
+        return complete
+
+    async def generate_solution(self, disease, confidence, diagnosis_method='forward_chaining', secondary_diseases=None):
+        """Coroutine version of AISolutionService.generate_solution (same result and fallback)"""
+        if not self.providers:
+            logger.info('AI service not configured, using fallback solution', extra={'disease': disease.code})
+            return self._generate_fallback_solution(disease, secondary_diseases)
+
+        prompt = self._create_prompt(disease, confidence, diagnosis_method, secondary_diseases)
+        chain = ','.join(name for name, _ in self.providers)
+
+        start = time.perf_counter()
+        try:
+            with start_span('ai.provider_call', {'ai.providers': chain, 'ai.prompt_chars': len(prompt)}) as span:
+                provider, result, _ = await self._generate_with_chain_async(prompt)
+                span.set_attribute('ai.provider', provider)
+            self._log_generated(provider, chain, disease, start)
+            return result
+        except Exception as e:
+            self._log_fallback(e, chain, disease, start)
+        return self._generate_fallback_solution(disease, secondary_diseases)
+
+    async def generate_library_solution(self, disease, confidence):
+        """Coroutine version of AISolutionService.generate_library_solution"""
+        prompt = self._library_prompt(disease, confidence)
+        with start_span('ai.library_solution', {'disease': disease.code}):
+            return self._library_result(*await self._generate_with_chain_async(prompt))
+
+    async def _call(self, attempt, complete, prompt):
+        async with self._semaphore:
+            # Latency for hedging and breakers starts once the call really goes out
+            attempt.started = time.monotonic()
+            return await complete(prompt)
+
+    async def _generate_with_chain_async(self, prompt):
+        """
+        Same launch/hedge rules as _generate_with_chain. Losing calls keep
+        running so their outcome still reaches the breaker, but anything
+        unfinished at the deadline (or when the loop shuts down first) is
+        settled as a failure and cancelled.
+        """
+        loop = asyncio.get_running_loop()
+        deadline_at = time.monotonic() + self.deadline
+        queue = list(self.providers)
+        pending = {}
+        unparsed = None
+        last_error = None
+
+        def launch_next():
+            while queue:
+                name, complete = queue.pop(0)
+                breaker = self._breaker(name)
+                if not breaker.allow_request():
+                    logger.info('AI provider circuit open, skipping', extra={'provider': name})
+                    continue
+                attempt = _ProviderAttempt(name, breaker)
+                attempt.started = None  # set by _call once a slot is free
+                attempt.future = loop.create_task(self._call(attempt, complete, prompt))
+                attempt.future.add_done_callback(attempt.on_done)
+                pending[attempt.future] = attempt
+                return attempt
+            return None
+
+        current = launch_next()
+        if current is None:
+            raise ProvidersUnavailable()
+
+        try:
+            while pending:
+                now = time.monotonic()
+                if now >= deadline_at:
+                    break
+                timeout = deadline_at - now
+                if queue:
+                    started = current.started if current.started is not None else now
+                    timeout = min(timeout, max(0.0, started + self.hedge_delay(current.name) - now))
+
+                done, _ = await asyncio.wait(list(pending), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    if queue:
+                        logger.info('Hedging AI request', extra={'provider': current.name})
+                        current = launch_next() or current
+                    continue
+
+                for task in done:
+                    attempt = pending.pop(task)
+                    error = task.exception()
+                    if error is not None:
+                        last_error = error
+                        logger.warning('AI provider failed', extra={
+                            'provider': attempt.name,
+                            'error': f'{type(error).__name__}: {error}'
+                        })
+                        current = launch_next() or current
+                        continue
+                    result, valid = self._parse_response(task.result())
+                    if valid:
+                        return attempt.name, result, True
+                    logger.info('AI provider returned no structured JSON', extra={'provider': attempt.name})
+                    unparsed = unparsed or (attempt.name, result, False)
+                    current = launch_next() or current
+        finally:
+            if pending:
+                self._reap(list(pending.values()), deadline_at - time.monotonic())
+
+        if unparsed:
+            return unparsed
+        if pending or last_error is None:
+            raise ProviderDeadlineExceeded(f'no AI provider answered within {self.deadline}s')
+        raise last_error
+
+    def _reap(self, attempts, remaining):
+        """Let the losing calls finish until the deadline, then expire them"""
+        if remaining <= 0:
+            self._expire(attempts)
+            return
+        task = asyncio.get_running_loop().create_task(self._expire_at_deadline(attempts, remaining))
+        self._reapers.add(task)
+        task.add_done_callback(self._reapers.discard)
+
+    async def _expire_at_deadline(self, attempts, timeout):
+        finished = asyncio.gather(*(attempt.future for attempt in attempts), return_exceptions=True)
+        # Outcomes reach the breaker through on_done; mark a loop-shutdown cancellation as seen
+        finished.add_done_callback(lambda future: future.cancelled() or future.exception())
+        try:
+            await asyncio.wait_for(finished, timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            # Also runs when asyncio.run() cancels this task on the way out
+            self._expire(attempts)
+
+    def _expire(self, attempts):
+        for attempt in attempts:
+            # Cancelled ones never reached on_done's settle (wait_for cancels the gather's children)
+            if attempt.future.cancelled() or not attempt.future.done():
+                if attempt.started is None:
+                    # Still waiting for the semaphore: the provider was never asked
+                    attempt.release()
+                else:
+                    attempt.settle(ProviderDeadlineExceeded(f'{attempt.name} did not respond within {self.deadline}s'))
+                attempt.future.cancel()
+
+
+class AsyncSolutionQueue:
+    """
+    Bounded queue of service calls drained by a fixed number of worker tasks.
+
+    submit() waits while the queue is full, so producers are slowed down
+    instead of piling up requests; submit_nowait() raises asyncio.QueueFull.
+
+        async with AsyncSolutionQueue(service) as queue:
+            future = await queue.submit(service.generate_solution, disease, 0.8)
+            result = await future
+    """
+
+    def __init__(self, service, workers=None, maxsize=None):
+        config = current_app.config
+        self.service = service
+        self.workers = workers or config.get('AI_ASYNC_WORKERS', 8)
+        self._queue = asyncio.Queue(maxsize or config.get('AI_ASYNC_QUEUE_SIZE', 100))
+        self._tasks = []
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close(drain=exc_type is None)
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        self._tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def submit(self, method, *args, **kwargs):
+        """Queue `await method(*args, **kwargs)`; returns a future for its result"""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((future, method, args, kwargs))
+        return future
+
+    def submit_nowait(self, method, *args, **kwargs):
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((future, method, args, kwargs))
+        return future
+
+    async def _worker(self):
+        while True:
+            future, method, args, kwargs = await self._queue.get()
+            try:
+                if not future.cancelled():
+                    result = await method(*args, **kwargs)
+                    if not future.done():
+                        future.set_result(result)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                self._queue.task_done()
+
+    async def close(self, drain=True):
+        """Stop the workers, by default after everything queued has run"""
+        if drain:
+            await self._queue.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        while not self._queue.empty():
+            future, _, _, _ = self._queue.get_nowait()
+            future.cancel()
+        self._tasks = []
+
+
+AsyncAISolutionService.register_async_provider('openai', AsyncAISolutionService._init_openai_async)
+AsyncAISolutionService.register_async_provider('gemini', AsyncAISolutionService._init_gemini_async)
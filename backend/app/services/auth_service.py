@@ -4,9 +4,11 @@ Sistem Pakar Diagnosis Penyakit Tanaman Padi
 """
 
 from datetime import datetime
-from flask_jwt_extended import create_access_token, create_refresh_token
+from flask_jwt_extended import create_access_token, create_refresh_token, decode_token
 from app import db
 from app.models.user import User
+from app.services.token_revocation_service import TokenRevocationService
+from app.utils.principal_cache import PrincipalCache
 import re
 
 
@@ -30,6 +32,15 @@ class AuthService:
             return False, 'Password harus mengandung angka'
         return True, 'Valid'
 
+    @staticmethod
+    def create_tokens(user_id):
+        """Access token plus the refresh token that renews it"""
+        identity = str(user_id)
+        return {
+            'token': create_access_token(identity=identity),
+            'refresh_token': create_refresh_token(identity=identity)
+        }
+
     @staticmethod
     def register_user(email, password, full_name=None):
         """
@@ -41,7 +52,7 @@ class AuthService:
             full_name: User's full name
 
         Returns:
-            tuple: (user, token) or (None, error_message)
+            tuple: (user, tokens) or (None, error_message)
         """
         # Validate email format - only @gmail.com allowed
         email_regex = r'^[a-zA-Z0-9._%+-]+@gmail\.com$'
@@ -70,10 +81,7 @@ class AuthService:
         db.session.add(user)
         db.session.commit()
 
-        # Generate token with string identity
-        access_token = create_access_token(identity=str(user.id))
-
-        return user, access_token
+        return user, AuthService.create_tokens(user.id)
 
     @staticmethod
     def login_user(email, password):
@@ -85,7 +93,7 @@ class AuthService:
             password: Plain password
 
         Returns:
-            tuple: (user, token) or (None, error_message)
+            tuple: (user, tokens) or (None, error_message)
         """
         user = User.query.filter_by(email=email).first()
 
@@ -102,14 +110,12 @@ class AuthService:
         if not user.is_active:
             return None, 'Akun tidak aktif'
 
-        # Update last login
+        # Update last login (and the hash, if the hashing parameters changed)
+        user.rehash_password_if_needed(password)
         user.last_login = datetime.utcnow()
         db.session.commit()
 
-        # Generate token with string identity
-        access_token = create_access_token(identity=str(user.id))
-
-        return user, access_token
+        return user, AuthService.create_tokens(user.id)
 
     @staticmethod
     def google_auth(google_id, email, full_name):
@@ -122,7 +128,7 @@ class AuthService:
             full_name: User's full name
 
         Returns:
-            tuple: (user, token)
+            tuple: (user, tokens)
         """
         # Check if user exists with this google_id
         user = User.query.filter_by(google_id=google_id).first()
@@ -150,10 +156,38 @@ class AuthService:
         user.last_login = datetime.utcnow()
         db.session.commit()
 
-        # Generate token with string identity
-        access_token = create_access_token(identity=str(user.id))
+        return user, AuthService.create_tokens(user.id)
+
+    @staticmethod
+    def refresh_tokens(refresh_payload):
+        """
+        Rotate a refresh token: it is revoked and a new pair is issued.
+        A refresh token presented twice is refused.
+
+        Returns:
+            tuple: (tokens, None) or (None, error_message)
+        """
+        principal = PrincipalCache.get(refresh_payload['sub'])
+        if not principal or not principal['is_active']:
+            return None, 'Akun tidak aktif'
+
+        if not TokenRevocationService.revoke_token(refresh_payload):
+            return None, 'Token sudah digunakan'
+
+        return AuthService.create_tokens(principal['id']), None
 
-        return user, access_token
+    @staticmethod
+    def logout(access_payload, refresh_token=None):
+        """Revoke the access token and, if given, the user's refresh token"""
+        TokenRevocationService.revoke_token(access_payload)
+        if not refresh_token:
+            return
+        try:
+            refresh_payload = decode_token(refresh_token)
+        except Exception:
+            return
+        if refresh_payload.get('type') == 'refresh' and refresh_payload.get('sub') == access_payload['sub']:
+            TokenRevocationService.revoke_token(refresh_payload)
 
     @staticmethod
     def get_user_by_id(user_id):
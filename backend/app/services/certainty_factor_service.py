@@ -4,9 +4,10 @@ Sistem Pakar Diagnosis Penyakit Tanaman Padi
 Metode: Parallel Forward Chaining + Certainty Factor
 """
 
-from app.models.symptom import Symptom
-from app.models.disease import Disease
-from app.models.rule import Rule
+import heapq
+from app.services.knowledge_base_service import KnowledgeBaseService
+from app.services.symptom_recommendation_service import SymptomRecommendationService
+from app.utils.tracing import start_span, traced
 
 
 class CertaintyFactorService:
@@ -22,6 +23,10 @@ class CertaintyFactorService:
         'tidak_tahu': 0.2
     }
 
+    # Results below MIN_CF_FINAL are dropped; only the best TOP_K are returned
+    MIN_CF_FINAL = 0.20
+    TOP_K = 3
+
     def interpret_cf(self, cf_value):
         if cf_value >= 0.80:
             return 'PASTI'
@@ -40,6 +45,7 @@ class CertaintyFactorService:
             return cf1 + cf2 * (1 + cf1)
         return (cf1 + cf2) / (1 - min(abs(cf1), abs(cf2)))
 
+    @traced('cf.diagnose')
     def diagnose(self, symptom_ids, certainty_values):
         if not symptom_ids or not certainty_values:
             return {
@@ -47,6 +53,8 @@ class CertaintyFactorService:
                 'message': 'Data gejala atau keyakinan tidak lengkap'
             }
 
+        # A repeated symptom is still one observation
+        symptom_ids = list(dict.fromkeys(symptom_ids))
         if len(symptom_ids) < 3:
             return {
                 'status': 'no_diagnosis',
@@ -66,15 +74,20 @@ class CertaintyFactorService:
                 'message': 'Nilai keyakinan tidak lengkap untuk semua gejala'
             }
 
-        disease_matches = self.group_rules_by_disease(symptom_ids)
+        with start_span('cf.load_knowledge_base'):
+            snapshot = KnowledgeBaseService.get_snapshot()
+
+        with start_span('cf.match_rules') as span:
+            disease_matches = self.group_rules_by_disease(symptom_ids, snapshot)
+            span.set_attribute('diseases.candidates', len(disease_matches))
         if not disease_matches:
             return {
                 'status': 'no_diagnosis',
                 'message': 'Tidak ada penyakit yang cocok dengan gejala yang dipilih'
             }
 
-        results = self.calculate_certainty_factor(disease_matches, symptoms_input)
-        results = self.apply_penalty_and_filter(results)
+        with start_span('cf.rank_top_k'):
+            results = self.rank_top_k(disease_matches, symptoms_input, snapshot)
 
         if not results:
             return {
@@ -82,7 +95,8 @@ class CertaintyFactorService:
                 'message': 'Tidak ada diagnosis dengan tingkat keyakinan memadai'
             }
 
-        recommendations = self.generate_symptom_recommendations(results)
+        with start_span('cf.recommendations'):
+            recommendations = self.generate_symptom_recommendations(results)
         warning = self.check_multi_infection(results)
 
         return {
@@ -111,147 +125,179 @@ class CertaintyFactorService:
 
         return normalized
 
-    def group_rules_by_disease(self, symptom_ids):
-        matching_rules = Rule.query.filter(
-            Rule.is_active.is_(True),
-            Rule.symptom_id.in_(symptom_ids)
-        ).all()
+    def group_rules_by_disease(self, symptom_ids, snapshot=None):
+        """
+        {disease_id: matching rules}. Each symptom counts once and rules are
+        listed in symptom id order (combine_cf is not commutative for mixed
+        signs), so the result depends only on the set of symptoms.
+        """
+        snapshot = snapshot or KnowledgeBaseService.get_snapshot()
+
+        unique_ids = set()
+        for symptom_id in symptom_ids:
+            try:
+                unique_ids.add(int(symptom_id))
+            except (ValueError, TypeError):
+                continue
 
         disease_matches = {}
-        for rule in matching_rules:
-            disease_matches.setdefault(rule.disease_id, []).append(rule)
+        for symptom_id in sorted(unique_ids):
+            for disease_id, rule in snapshot.rules_by_symptom.get(symptom_id, {}).items():
+                disease_matches.setdefault(disease_id, []).append(rule)
 
         return disease_matches
 
-    def calculate_certainty_factor(self, disease_matches, symptoms_input):
-        results = []
+    def calculate_certainty_factor(self, disease_matches, symptoms_input, snapshot=None):
+        snapshot = snapshot or KnowledgeBaseService.get_snapshot()
         user_certainty_map = {s['symptom_id']: s['certainty'] for s in symptoms_input}
 
-        symptom_map = {
-            s.id: s for s in Symptom.query.filter(
-                Symptom.id.in_(user_certainty_map.keys())
-            ).all()
-        }
-
+        results = []
         for disease_id, rules in disease_matches.items():
-            disease = Disease.query.get(disease_id)
-            min_match_values = [r.min_symptom_match for r in rules if r.min_symptom_match]
-            min_match_required = max(min_match_values) if min_match_values else 3
-            total_symptoms = Rule.query.filter_by(
-                disease_id=disease_id,
-                is_active=True
-            ).count()
-
-            cf_values = []
-            matched_symptoms = []
-            matched_symptom_codes = []
-            matched_symptom_names = []
-
-            for rule in rules:
-                user_certainty = user_certainty_map.get(rule.symptom_id)
-                if user_certainty is None:
-                    continue
-
-                mb_value = float(rule.mb) if rule.mb is not None else 0.0
-                md_value = float(rule.md) if rule.md is not None else 0.0
-                cf_pakar = mb_value - md_value
-                cf_gejala = cf_pakar * user_certainty
-
-                cf_values.append(cf_gejala)
-                matched_symptoms.append(rule.symptom_id)
-
-                symptom = symptom_map.get(rule.symptom_id)
-                if symptom:
-                    matched_symptom_codes.append(symptom.code)
-                    matched_symptom_names.append(symptom.name)
-
-            if not cf_values or total_symptoms == 0:
+            result = self.score_disease(disease_id, rules, user_certainty_map, snapshot)
+            if result:
+                results.append(result)
+
+        return results
+
+    def score_disease(self, disease_id, rules, user_certainty_map, snapshot):
+        disease = snapshot.diseases.get(disease_id)
+        min_match_values = [r['min_symptom_match'] for r in rules if r['min_symptom_match']]
+        min_match_required = max(min_match_values) if min_match_values else 3
+        total_symptoms = snapshot.total_symptoms(disease_id)
+
+        cf_values = []
+        matched_symptoms = []
+        matched_symptom_codes = []
+        matched_symptom_names = []
+
+        for rule in rules:
+            user_certainty = user_certainty_map.get(rule['symptom_id'])
+            if user_certainty is None:
                 continue
 
-            cf_combined = cf_values[0]
-            for i in range(1, len(cf_values)):
-                cf_combined = self.combine_cf(cf_combined, cf_values[i])
-
-            match_percentage = len(matched_symptoms) / total_symptoms
-
-            results.append({
-                'disease_id': disease_id,
-                'disease_code': disease.code if disease else None,
-                'disease_name': disease.name if disease else None,
-                'cf_raw': cf_combined,
-                'symptoms_matched': len(matched_symptoms),
-                'total_symptoms': total_symptoms,
-                'match_percentage': match_percentage,
-                'min_symptom_match': min_match_required,
-                'meets_min_match': len(matched_symptoms) >= min_match_required,
-                'matched_symptom_ids': matched_symptoms,
-                'matched_symptom_codes': matched_symptom_codes,
-                'matched_symptom_names': matched_symptom_names
-            })
+            cf_gejala = rule['cf_pakar'] * user_certainty
 
-        return results
+            cf_values.append(cf_gejala)
+            matched_symptoms.append(rule['symptom_id'])
 
-    def apply_penalty_and_filter(self, results):
-        for result in results:
-            num_symptoms = result['symptoms_matched']
-            cf_raw = result['cf_raw']
-
-            if num_symptoms == 1:
-                penalty = 0.5
-                status = 'TIDAK PASTI'
-            elif num_symptoms == 2:
-                penalty = 0.8
-                status = 'CUKUP VALID'
-            else:
-                penalty = 1.0
-                status = 'VALID'
+            symptom = snapshot.symptoms.get(rule['symptom_id'])
+            if symptom:
+                matched_symptom_codes.append(symptom['code'])
+                matched_symptom_names.append(symptom['name'])
 
-            cf_final = cf_raw * penalty
-            result['cf_final'] = cf_final
-            result['penalty'] = penalty
-            result['status'] = status
-            result['interpretation'] = self.interpret_cf(cf_final)
+        if not cf_values or total_symptoms == 0:
+            return None
 
-        filtered_results = [r for r in results if r['cf_final'] >= 0.20]
-        filtered_results.sort(key=lambda x: x['cf_final'], reverse=True)
+        cf_combined = cf_values[0]
+        for i in range(1, len(cf_values)):
+            cf_combined = self.combine_cf(cf_combined, cf_values[i])
 
-        return filtered_results[:3]
+        match_percentage = len(matched_symptoms) / total_symptoms
 
-    def generate_symptom_recommendations(self, results):
-        recommendations = []
+        return {
+            'disease_id': disease_id,
+            'disease_code': disease['code'] if disease else None,
+            'disease_name': disease['name'] if disease else None,
+            'cf_raw': cf_combined,
+            'symptoms_matched': len(matched_symptoms),
+            'total_symptoms': total_symptoms,
+            'match_percentage': match_percentage,
+            'min_symptom_match': min_match_required,
+            'meets_min_match': len(matched_symptoms) >= min_match_required,
+            'matched_symptom_ids': matched_symptoms,
+            'matched_symptom_codes': matched_symptom_codes,
+            'matched_symptom_names': matched_symptom_names
+        }
 
-        for result in results:
-            cf_final = result['cf_final']
-            if not (0.40 <= cf_final < 0.80):
+    def upper_bound(self, rules, user_certainty_map):
+        """
+        Highest cf_final the disease could reach with this input.
+
+        Negative evidence can only lower a combined CF, so combining just the
+        positive contributions (1 - prod(1 - cf)) bounds cf_raw from above.
+        """
+        matched = 0
+        remaining = 1.0
+        for rule in rules:
+            user_certainty = user_certainty_map.get(rule['symptom_id'])
+            if user_certainty is None:
                 continue
+            matched += 1
+            cf_gejala = rule['cf_pakar'] * user_certainty
+            if cf_gejala > 0:
+                remaining *= 1 - cf_gejala
+
+        if matched == 0:
+            return 0.0
+        return (1 - remaining) * self.get_penalty(matched)[0]
+
+    def rank_top_k(self, disease_matches, symptoms_input, snapshot=None, k=TOP_K):
+        """
+        Same output as calculate_certainty_factor + apply_penalty_and_filter,
+        but diseases are scored in order of their upper bound and scoring
+        stops as soon as no remaining disease can enter the top k.
+        """
+        snapshot = snapshot or KnowledgeBaseService.get_snapshot()
+        user_certainty_map = {s['symptom_id']: s['certainty'] for s in symptoms_input}
 
-            disease_id = result['disease_id']
-            matched_symptoms = set(result['matched_symptom_ids'])
+        candidates = []
+        for order, (disease_id, rules) in enumerate(disease_matches.items()):
+            bound = self.upper_bound(rules, user_certainty_map)
+            if bound >= self.MIN_CF_FINAL:
+                candidates.append((-bound, order, disease_id))
+        heapq.heapify(candidates)
+
+        # Min-heap of (cf_final, -order, result): top[0] is the weakest kept result
+        top = []
+        while candidates:
+            neg_bound, order, disease_id = heapq.heappop(candidates)
+            if len(top) == k and -neg_bound < top[0][0]:
+                break
+
+            result = self.score_disease(disease_id, disease_matches[disease_id], user_certainty_map, snapshot)
+            if not result:
+                continue
+            self.apply_penalty(result)
+            if result['cf_final'] < self.MIN_CF_FINAL:
+                continue
 
-            all_rules = Rule.query.filter_by(disease_id=disease_id, is_active=True).all()
-            unmatched_rules = [r for r in all_rules if r.symptom_id not in matched_symptoms]
+            entry = (result['cf_final'], -order, result)
+            if len(top) < k:
+                heapq.heappush(top, entry)
+            elif entry[:2] > top[0][:2]:
+                heapq.heapreplace(top, entry)
 
-            if not unmatched_rules:
-                continue
+        top.sort(key=lambda e: e[:2], reverse=True)
+        return [e[2] for e in top]
+
+    def get_penalty(self, num_symptoms):
+        if num_symptoms == 1:
+            return 0.5, 'TIDAK PASTI'
+        if num_symptoms == 2:
+            return 0.8, 'CUKUP VALID'
+        return 1.0, 'VALID'
 
-            symptom_ids = [r.symptom_id for r in unmatched_rules]
-            symptoms = Symptom.query.filter(Symptom.id.in_(symptom_ids)).all()
-
-            recommendations.append({
-                'disease_code': result['disease_code'],
-                'disease_name': result['disease_name'],
-                'current_cf': cf_final,
-                'suggested_symptoms': [
-                    {'code': s.code, 'name': s.name}
-                    for s in symptoms[:4]
-                ],
-                'message': (
-                    f'Untuk memastikan diagnosis {result["disease_name"]}, '
-                    'periksa apakah tanaman juga menunjukkan gejala berikut:'
-                )
-            })
-
-        return recommendations
+    def apply_penalty(self, result):
+        penalty, status = self.get_penalty(result['symptoms_matched'])
+
+        cf_final = result['cf_raw'] * penalty
+        result['cf_final'] = cf_final
+        result['penalty'] = penalty
+        result['status'] = status
+        result['interpretation'] = self.interpret_cf(cf_final)
+        return result
+
+    def apply_penalty_and_filter(self, results):
+        for result in results:
+            self.apply_penalty(result)
+
+        filtered_results = [r for r in results if r['cf_final'] >= self.MIN_CF_FINAL]
+        filtered_results.sort(key=lambda x: x['cf_final'], reverse=True)
+
+        return filtered_results[:self.TOP_K]
+
+    def generate_symptom_recommendations(self, results):
+        return SymptomRecommendationService(self).recommend(results)
 
     def check_multi_infection(self, results):
         high_confidence = [r for r in results if r['cf_final'] >= 0.80]
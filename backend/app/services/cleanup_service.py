@@ -2,18 +2,47 @@
 Cleanup Service
 Handles automatic cleanup of old data based on retention settings
 """
+import logging
 from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import func, select, text
 from app import db
 from app.models.history import DiagnosisHistory
 from app.models.admin_log import AdminLog
+from app.models.job import Job
+from app.models.revoked_token import RevokedToken
 from app.models.system_settings import SystemSettings
 
+logger = logging.getLogger(__name__)
+
 
 class CleanupService:
     """
     Service for cleaning up old data
     """
 
+    # Tables that see the most deletes, vacuumed/analyzed by optimize_database
+    MAINTENANCE_TABLES = ('diagnosis_history', 'admin_logs', 'jobs', 'diagnosis_daily_stats')
+
+    @staticmethod
+    def _delete_in_batches(model, *criteria):
+        """
+        Delete matching rows CLEANUP_BATCH_SIZE at a time, committing each
+        batch so locks stay short and no single huge delete builds up
+        Returns: number of deleted rows
+        """
+        batch_size = current_app.config.get('CLEANUP_BATCH_SIZE', 1000)
+        deleted = 0
+        while True:
+            ids = db.session.execute(
+                select(model.id).where(*criteria).order_by(model.id).limit(batch_size)
+            ).scalars().all()
+            if not ids:
+                return deleted
+            db.session.query(model).filter(model.id.in_(ids)).delete(synchronize_session=False)
+            db.session.commit()
+            deleted += len(ids)
+
     @staticmethod
     def cleanup_old_history():
         """
@@ -43,12 +72,11 @@ class CleanupService:
             # Calculate cutoff date
             cutoff_date = datetime.now() - timedelta(days=retention_days)
 
-            # Count records to be deleted
-            old_records = DiagnosisHistory.query.filter(
+            # Delete old records in batches
+            count = CleanupService._delete_in_batches(
+                DiagnosisHistory,
                 DiagnosisHistory.diagnosis_date < cutoff_date
-            ).all()
-
-            count = len(old_records)
+            )
 
             if count == 0:
                 return {
@@ -57,12 +85,6 @@ class CleanupService:
                     'deleted_count': 0
                 }
 
-            # Delete old records
-            for record in old_records:
-                db.session.delete(record)
-
-            db.session.commit()
-
             return {
                 'success': True,
                 'message': f'Successfully deleted {count} old diagnosis records',
@@ -71,6 +93,7 @@ class CleanupService:
             }
 
         except Exception as e:
+            logger.exception('cleanup_old_history failed')
             db.session.rollback()
             return {
                 'success': False,
@@ -87,11 +110,10 @@ class CleanupService:
         try:
             cutoff_date = datetime.now() - timedelta(days=retention_days)
 
-            old_logs = AdminLog.query.filter(
+            count = CleanupService._delete_in_batches(
+                AdminLog,
                 AdminLog.created_at < cutoff_date
-            ).all()
-
-            count = len(old_logs)
+            )
 
             if count == 0:
                 return {
@@ -100,19 +122,49 @@ class CleanupService:
                     'deleted_count': 0
                 }
 
-            for log in old_logs:
-                db.session.delete(log)
+            return {
+                'success': True,
+                'message': f'Successfully deleted {count} old admin logs',
+                'deleted_count': count,
+                'cutoff_date': cutoff_date.strftime('%Y-%m-%d')
+            }
 
-            db.session.commit()
+        except Exception as e:
+            logger.exception('cleanup_old_admin_logs failed')
+            db.session.rollback()
+            return {
+                'success': False,
+                'message': f'Cleanup failed: {str(e)}',
+                'deleted_count': 0
+            }
+
+    @staticmethod
+    def cleanup_old_jobs(retention_days=14):
+        """
+        Delete finished jobs older than specified days. The newest job of
+        each task is kept, the scheduler uses it as the task's last run.
+        Returns: dict with cleanup results
+        """
+        try:
+            cutoff_date = datetime.utcnow() - timedelta(days=retention_days)
+            latest_per_task = select(func.max(Job.id)).group_by(Job.task)
+
+            count = CleanupService._delete_in_batches(
+                Job,
+                Job.status.in_(('succeeded', 'failed', 'cancelled')),
+                Job.created_at < cutoff_date,
+                Job.id.notin_(latest_per_task)
+            )
 
             return {
                 'success': True,
-                'message': f'Successfully deleted {count} old admin logs',
+                'message': f'Successfully deleted {count} old jobs',
                 'deleted_count': count,
                 'cutoff_date': cutoff_date.strftime('%Y-%m-%d')
             }
 
         except Exception as e:
+            logger.exception('cleanup_old_jobs failed')
             db.session.rollback()
             return {
                 'success': False,
@@ -120,6 +172,59 @@ class CleanupService:
                 'deleted_count': 0
             }
 
+    @staticmethod
+    def cleanup_expired_revocations():
+        """
+        Delete revoked_tokens rows whose tokens have expired anyway
+        Returns: dict with cleanup results
+        """
+        try:
+            count = CleanupService._delete_in_batches(RevokedToken, RevokedToken.expires_at < datetime.utcnow())
+
+            return {
+                'success': True,
+                'message': f'Successfully deleted {count} expired token revocations',
+                'deleted_count': count
+            }
+
+        except Exception as e:
+            logger.exception('cleanup_expired_revocations failed')
+            db.session.rollback()
+            return {
+                'success': False,
+                'message': f'Cleanup failed: {str(e)}',
+                'deleted_count': 0
+            }
+
+    @staticmethod
+    def optimize_database():
+        """
+        Reclaim space and refresh planner statistics after the cleanups:
+        VACUUM (ANALYZE) per table on PostgreSQL, VACUUM + ANALYZE on SQLite
+        Returns: dict with the statements run
+        """
+        db.session.remove()
+        engine = db.engine
+        if engine.dialect.name == 'postgresql':
+            existing = set(db.inspect(engine).get_table_names())
+            statements = [f'VACUUM (ANALYZE) {table}' for table in CleanupService.MAINTENANCE_TABLES if table in existing]
+        elif engine.dialect.name == 'sqlite':
+            statements = ['VACUUM', 'ANALYZE']
+        else:
+            statements = ['ANALYZE']
+
+        # VACUUM cannot run inside a transaction
+        with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            for statement in statements:
+                conn.execute(text(statement))
+
+        logger.info('Database maintenance finished', extra={'statements': statements})
+        return {
+            'success': True,
+            'message': 'Database maintenance finished',
+            'statements': statements
+        }
+
     @staticmethod
     def get_cleanup_stats():
         """
@@ -165,6 +270,7 @@ class CleanupService:
             }
 
         except Exception as e:
+            logger.exception('get_cleanup_stats failed')
             return {
                 'success': False,
                 'message': f'Failed to get stats: {str(e)}'
@@ -0,0 +1,205 @@
+"""
+Diagnosis Cache Service
+Sistem Pakar Diagnosis Penyakit Tanaman Padi
+Cache hasil CertaintyFactorService.diagnose untuk input gejala yang sama
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+from app.services.certainty_factor_service import CertaintyFactorService
+from app.services.knowledge_base_service import KnowledgeBaseService
+
+
+class DiagnosisCacheService:
+    """
+    Bounded LRU of diagnosis results keyed by the canonical input
+    (sorted symptom ids, quantized certainties) and the knowledge-base
+    checksum, so any rule/symptom/disease change makes old entries unreachable.
+
+    When DIAGNOSIS_CACHE_DIR is set, entries are also written there as JSON
+    files so every gunicorn worker on the host shares them. The directory is
+    pruned every DIAGNOSIS_CACHE_PRUNE_EVERY writes (not on every miss) down
+    to DIAGNOSIS_CACHE_FILE_MAX files; files of another knowledge base are
+    removed only once older than DIAGNOSIS_CACHE_PRUNE_GRACE_SECONDS, since
+    workers pick up a new rule base a few seconds apart.
+    """
+
+    CERTAINTY_PRECISION = 3
+
+    _lock = threading.Lock()
+    _entries = OrderedDict()
+    _kb_checksum = None
+    _writes_since_prune = 0
+    _stats = {'hits': 0, 'file_hits': 0, 'misses': 0, 'evictions': 0}
+
+    def diagnose(self, symptom_ids, certainty_values):
+        """Cached equivalent of CertaintyFactorService().diagnose()"""
+        max_size = current_app.config.get('DIAGNOSIS_CACHE_SIZE', 1024)
+        if max_size <= 0:
+            return CertaintyFactorService().diagnose(symptom_ids, certainty_values)
+
+        checksum = KnowledgeBaseService.get_snapshot().checksum
+        self._check_kb(checksum)
+        key = self.make_key(symptom_ids, certainty_values, checksum)
+
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is not None:
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+                return json.loads(payload)
+
+        payload = self._read_file(key)
+        if payload is not None:
+            self._store(key, payload, max_size)
+            with self._lock:
+                self._stats['file_hits'] += 1
+            return json.loads(payload)
+
+        result = CertaintyFactorService().diagnose(symptom_ids, certainty_values)
+        payload = json.dumps(result, separators=(',', ':'))
+        self._store(key, payload, max_size)
+        self._write_file(key, payload)
+        with self._lock:
+            self._stats['misses'] += 1
+        return json.loads(payload)
+
+    def make_key(self, symptom_ids, certainty_values, kb_checksum):
+        normalized = CertaintyFactorService().normalize_certainty_values(certainty_values or {})
+        canonical = {
+            # diagnose depends only on the set of symptoms (order and repeats are ignored);
+            # type-tagged so "1" and 1 (which diagnose treats differently) never collide
+            'symptoms': sorted({f'{type(sid).__name__}:{sid}' for sid in symptom_ids}),
+            'certainty': sorted(
+                (sid, round(value, self.CERTAINTY_PRECISION)) for sid, value in normalized.items()
+            ),
+            'has_certainty': bool(certainty_values)
+        }
+        digest = hashlib.sha256(json.dumps(canonical).encode('utf-8')).hexdigest()
+        return f'{kb_checksum[:16]}-{digest[:32]}'
+
+    @classmethod
+    def stats(cls):
+        with cls._lock:
+            lookups = cls._stats['hits'] + cls._stats['file_hits'] + cls._stats['misses']
+            hit_total = cls._stats['hits'] + cls._stats['file_hits']
+            return {
+                **cls._stats,
+                'size': len(cls._entries),
+                'max_size': current_app.config.get('DIAGNOSIS_CACHE_SIZE', 1024),
+                'hit_ratio': round(hit_total / lookups, 4) if lookups else 0.0,
+                'shared_dir': current_app.config.get('DIAGNOSIS_CACHE_DIR') or None
+            }
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._entries.clear()
+            for key in cls._stats:
+                cls._stats[key] = 0
+        cls._prune_files(keep_prefix=None, grace_seconds=0)
+
+    def _store(self, key, payload, max_size):
+        with self._lock:
+            self._entries[key] = payload
+            self._entries.move_to_end(key)
+            while len(self._entries) > max_size:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    @classmethod
+    def _check_kb(cls, checksum):
+        """Drop entries built against an older knowledge base"""
+        if cls._kb_checksum == checksum:
+            return
+        with cls._lock:
+            if cls._kb_checksum == checksum:
+                return
+            cls._entries.clear()
+            cls._kb_checksum = checksum
+        cls._prune_files(keep_prefix=checksum[:16])
+
+    # ------------------------------------------------------------------
+    # Shared file store (optional)
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _cache_dir():
+        cache_dir = current_app.config.get('DIAGNOSIS_CACHE_DIR')
+        if not cache_dir:
+            return None
+        os.makedirs(cache_dir, exist_ok=True)
+        return cache_dir
+
+    def _read_file(self, key):
+        cache_dir = self._cache_dir()
+        if not cache_dir:
+            return None
+        try:
+            with open(os.path.join(cache_dir, f'{key}.json'), 'r', encoding='utf-8') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write_file(self, key, payload):
+        cache_dir = self._cache_dir()
+        if not cache_dir:
+            return
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(payload)
+            os.replace(tmp_path, os.path.join(cache_dir, f'{key}.json'))
+        except OSError as e:
+            current_app.logger.warning(f'Diagnosis cache write failed: {e}')
+            return
+
+        with self._lock:
+            DiagnosisCacheService._writes_since_prune += 1
+            due = self._writes_since_prune >= current_app.config.get('DIAGNOSIS_CACHE_PRUNE_EVERY', 100)
+            if due:
+                DiagnosisCacheService._writes_since_prune = 0
+        if due:
+            self._prune_files(keep_prefix=key.split('-', 1)[0])
+
+    @classmethod
+    def _prune_files(cls, keep_prefix, grace_seconds=None):
+        """
+        One pass over the directory: remove files not starting with
+        keep_prefix (all files when None) that are older than the grace
+        period, then the oldest entries above DIAGNOSIS_CACHE_FILE_MAX.
+        """
+        cache_dir = cls._cache_dir()
+        if not cache_dir:
+            return
+        config = current_app.config
+        if grace_seconds is None:
+            grace_seconds = config.get('DIAGNOSIS_CACHE_PRUNE_GRACE_SECONDS', 60)
+        cutoff = time.time() - grace_seconds
+
+        kept = []
+        for entry in os.scandir(cache_dir):
+            try:
+                mtime = entry.stat().st_mtime
+                if keep_prefix and entry.name.startswith(keep_prefix):
+                    if entry.name.endswith('.json'):
+                        kept.append((mtime, entry.path))
+                elif mtime <= cutoff:
+                    os.remove(entry.path)
+            except OSError:
+                pass
+
+        max_files = config.get('DIAGNOSIS_CACHE_FILE_MAX', 10000)
+        if len(kept) > max_files:
+            kept.sort()
+            for _, path in kept[:len(kept) - max_files]:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
@@ -0,0 +1,294 @@
+"""
+Diagnosis Session Service
+Sistem Pakar Diagnosis Penyakit Tanaman Padi
+Sesi diagnosis interaktif dengan update CF inkremental
+"""
+
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from flask import current_app
+from app import db
+from app.models.diagnosis_session import DiagnosisSessionState
+from app.services.certainty_factor_service import CertaintyFactorService
+from app.services.knowledge_base_service import KnowledgeBaseService
+
+# Optimistic-lock retries when two requests change the same session at once
+MAX_WRITE_ATTEMPTS = 3
+
+
+class SessionConflict(RuntimeError):
+    """The session kept changing underneath this request"""
+
+
+class DiagnosisSession:
+    """
+    Working copy of one interactive diagnosis, loaded from diagnosis_sessions.
+
+    symptoms: symptom_id -> user certainty, in the order they were added
+    accumulators: disease_id -> {'cf': combined CF, 'contrib': symptom_id -> cf_gejala}
+    kb_checksum: knowledge base the accumulators were built from (same on every worker)
+    """
+
+    def __init__(self, user_id, kb_checksum, session_id=None, symptoms=None, accumulators=None, revision=0):
+        self.id = session_id or uuid.uuid4().hex
+        self.user_id = user_id
+        self.kb_checksum = kb_checksum
+        self.symptoms = symptoms if symptoms is not None else OrderedDict()
+        self.accumulators = accumulators if accumulators is not None else {}
+        self.revision = revision
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(row.user_id, row.kb_checksum, session_id=row.id, revision=row.revision,
+                   symptoms=row.state['symptoms'], accumulators=row.state['accumulators'])
+
+    def state(self):
+        return {'symptoms': self.symptoms, 'accumulators': self.accumulators}
+
+
+class DiagnosisSessionService:
+    """
+    Keeps per-disease running CF accumulators so adding or removing one
+    symptom only touches the diseases that have a rule for it.
+
+    Adding a symptom folds its CF into each affected accumulator with
+    combine_cf. Removing one recombines the remaining contributions of the
+    affected diseases only (combine_cf has no inverse for mixed signs).
+
+    Sessions live in the diagnosis_sessions table (one compact pickled row),
+    so any worker can serve the next request of a session. Writes are
+    compare-and-set on `revision`; a lost race reloads and re-applies the
+    change. Sessions expire after DIAGNOSIS_SESSION_TTL_SECONDS of
+    inactivity, and a user keeps at most DIAGNOSIS_SESSION_MAX_PER_USER.
+    """
+
+    def __init__(self):
+        self.cf_service = CertaintyFactorService()
+
+    # ------------------------------------------------------------------
+    # Session store
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _cutoff():
+        return datetime.utcnow() - timedelta(seconds=current_app.config.get('DIAGNOSIS_SESSION_TTL_SECONDS', 1800))
+
+    def create(self, user_id, certainty_values=None):
+        snapshot = KnowledgeBaseService.get_snapshot()
+        session = DiagnosisSession(user_id, snapshot.checksum)
+        if certainty_values:
+            self._apply_add(session, snapshot, certainty_values)
+
+        table = DiagnosisSessionState.__table__
+        db.session.execute(table.delete().where(table.c.updated_at < self._cutoff()))
+        keep = current_app.config.get('DIAGNOSIS_SESSION_MAX_PER_USER', 20) - 1
+        stale_ids = [row.id for row in db.session.query(DiagnosisSessionState.id)
+                     .filter(DiagnosisSessionState.user_id == user_id)
+                     .order_by(DiagnosisSessionState.updated_at.desc())
+                     .offset(max(keep, 0))]
+        if stale_ids:
+            db.session.execute(table.delete().where(table.c.id.in_(stale_ids)))
+        db.session.execute(table.insert().values(
+            id=session.id, user_id=user_id, kb_checksum=session.kb_checksum,
+            state=session.state(), revision=0, created_at=datetime.utcnow(), updated_at=datetime.utcnow()
+        ))
+        db.session.commit()
+        return session
+
+    def _load(self, session_id, user_id):
+        row = DiagnosisSessionState.query.filter(
+            DiagnosisSessionState.id == session_id,
+            DiagnosisSessionState.user_id == user_id,
+            DiagnosisSessionState.updated_at >= self._cutoff()
+        ).first()
+        db.session.commit()
+        return DiagnosisSession.from_row(row) if row else None
+
+    def get(self, session_id, user_id):
+        """Return the user's session or None if it does not exist / expired"""
+        if user_id is None:
+            return None
+        session = self._load(session_id, user_id)
+        if session is None:
+            return None
+
+        snapshot = KnowledgeBaseService.get_snapshot()
+        if session.kb_checksum != snapshot.checksum:
+            self._mutate(session, lambda s: self._rebuild(s, snapshot) or True)
+        else:
+            self._touch(session)
+        return session
+
+    def delete(self, session_id, user_id):
+        table = DiagnosisSessionState.__table__
+        deleted = db.session.execute(
+            table.delete().where(table.c.id == session_id, table.c.user_id == user_id)
+        ).rowcount
+        db.session.commit()
+        return deleted > 0
+
+    def _touch(self, session):
+        """Extend the expiry of a session that is only being read"""
+        table = DiagnosisSessionState.__table__
+        now = datetime.utcnow()
+        db.session.execute(
+            table.update()
+            .where(table.c.id == session.id, table.c.updated_at < now - timedelta(seconds=60))
+            .values(updated_at=now)
+        )
+        db.session.commit()
+
+    def _save(self, session):
+        """Compare-and-set write; False when another request changed the row first"""
+        table = DiagnosisSessionState.__table__
+        saved = db.session.execute(
+            table.update()
+            .where(table.c.id == session.id, table.c.revision == session.revision)
+            .values(state=session.state(), kb_checksum=session.kb_checksum,
+                    revision=session.revision + 1, updated_at=datetime.utcnow())
+        ).rowcount
+        db.session.commit()
+        if saved:
+            session.revision += 1
+        return saved > 0
+
+    def _mutate(self, session, change):
+        """
+        Apply change(session) and persist it. On a lost race, reload the row
+        into `session` and apply the change again. Returns change()'s result.
+        """
+        for _ in range(MAX_WRITE_ATTEMPTS):
+            result = change(session)
+            if not result or self._save(session):
+                return result
+            fresh = self._load(session.id, session.user_id)
+            if fresh is None:
+                return result
+            session.__dict__.update(fresh.__dict__)
+        raise SessionConflict('Sesi diagnosis sedang diubah oleh permintaan lain, coba lagi')
+
+    # ------------------------------------------------------------------
+    # Delta updates
+    # ------------------------------------------------------------------
+
+    def add_symptoms(self, session, certainty_values):
+        """Add or update symptoms and save the session; returns the ids that changed"""
+        snapshot = KnowledgeBaseService.get_snapshot()
+        return self._mutate(session, lambda s: self._apply_add(s, snapshot, certainty_values))
+
+    def _apply_add(self, session, snapshot, certainty_values):
+        if session.kb_checksum != snapshot.checksum:
+            self._rebuild(session, snapshot)
+
+        changed = []
+        for symptom_id, certainty in self.cf_service.normalize_certainty_values(certainty_values).items():
+            if session.symptoms.get(symptom_id) == certainty:
+                continue
+            if symptom_id in session.symptoms:
+                self._remove(session, snapshot, symptom_id)
+            self._add(session, snapshot, symptom_id, certainty)
+            changed.append(symptom_id)
+        return changed
+
+    def remove_symptom(self, session, symptom_id):
+        """Remove one symptom and save the session; False if it was not in the session"""
+        snapshot = KnowledgeBaseService.get_snapshot()
+
+        def change(session):
+            if session.kb_checksum != snapshot.checksum:
+                self._rebuild(session, snapshot)
+            if symptom_id not in session.symptoms:
+                return False
+            self._remove(session, snapshot, symptom_id)
+            return True
+
+        return self._mutate(session, change)
+
+    def _add(self, session, snapshot, symptom_id, certainty):
+        session.symptoms[symptom_id] = certainty
+        for disease_id, rule in snapshot.rules_by_symptom.get(symptom_id, {}).items():
+            cf_gejala = rule['cf_pakar'] * certainty
+            acc = session.accumulators.get(disease_id)
+            if acc is None:
+                session.accumulators[disease_id] = {
+                    'cf': cf_gejala,
+                    'contrib': OrderedDict([(symptom_id, cf_gejala)])
+                }
+            else:
+                acc['cf'] = self.cf_service.combine_cf(acc['cf'], cf_gejala)
+                acc['contrib'][symptom_id] = cf_gejala
+
+    def _remove(self, session, snapshot, symptom_id):
+        del session.symptoms[symptom_id]
+        for disease_id in snapshot.rules_by_symptom.get(symptom_id, {}):
+            acc = session.accumulators.get(disease_id)
+            if acc is None or symptom_id not in acc['contrib']:
+                continue
+            del acc['contrib'][symptom_id]
+            if not acc['contrib']:
+                del session.accumulators[disease_id]
+                continue
+            values = list(acc['contrib'].values())
+            cf_combined = values[0]
+            for value in values[1:]:
+                cf_combined = self.cf_service.combine_cf(cf_combined, value)
+            acc['cf'] = cf_combined
+
+    def _rebuild(self, session, snapshot):
+        """Full rescore, only needed when the knowledge base changed mid-session"""
+        symptoms = list(session.symptoms.items())
+        session.symptoms = OrderedDict()
+        session.accumulators = {}
+        session.kb_checksum = snapshot.checksum
+        for symptom_id, certainty in symptoms:
+            self._add(session, snapshot, symptom_id, certainty)
+
+    # ------------------------------------------------------------------
+    # Result
+    # ------------------------------------------------------------------
+
+    def get_result(self, session):
+        """Rank the session's diseases exactly like CertaintyFactorService.diagnose"""
+        snapshot = KnowledgeBaseService.get_snapshot()
+        results = []
+
+        for disease_id, acc in session.accumulators.items():
+            total_symptoms = snapshot.total_symptoms(disease_id)
+            if total_symptoms == 0:
+                continue
+
+            disease = snapshot.diseases.get(disease_id, {})
+            rules = {r['symptom_id']: r for r in snapshot.rules_by_disease.get(disease_id, [])}
+            matched = list(acc['contrib'].keys())
+            min_match_values = [
+                rules[sid]['min_symptom_match'] for sid in matched
+                if sid in rules and rules[sid]['min_symptom_match']
+            ]
+            min_match_required = max(min_match_values) if min_match_values else 3
+
+            results.append({
+                'disease_id': disease_id,
+                'disease_code': disease.get('code'),
+                'disease_name': disease.get('name'),
+                'cf_raw': acc['cf'],
+                'symptoms_matched': len(matched),
+                'total_symptoms': total_symptoms,
+                'match_percentage': len(matched) / total_symptoms,
+                'min_symptom_match': min_match_required,
+                'meets_min_match': len(matched) >= min_match_required,
+                'matched_symptom_ids': matched,
+                'matched_symptom_codes': [snapshot.symptoms.get(sid, {}).get('code') for sid in matched],
+                'matched_symptom_names': [snapshot.symptoms.get(sid, {}).get('name') for sid in matched]
+            })
+
+        results = self.cf_service.apply_penalty_and_filter(results)
+
+        return {
+            'session_id': session.id,
+            'symptom_ids': list(session.symptoms.keys()),
+            'certainty_values': {str(k): v for k, v in session.symptoms.items()},
+            'results': results,
+            'recommendations': self.cf_service.generate_symptom_recommendations(results) if results else [],
+            'warning': self.cf_service.check_multi_infection(results)
+        }
@@ -2,17 +2,36 @@
 Email Notification Service
 Handles sending email notifications using SMTP settings from database
 """
+import logging
 import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from flask import current_app
 from app.models.system_settings import SystemSettings
+from app.utils.smtp_pool import SMTPConnectionPool
+
+logger = logging.getLogger(__name__)
 
 
 class EmailService:
     """
     Service for sending email notifications
+
+    Settings are cached per process for EMAIL_SETTINGS_CACHE_SECONDS and
+    SMTP sessions are pooled, so a message costs one send instead of a
+    connect + STARTTLS + login. send_many() spreads a batch over the pool's
+    connections; queue_email()/queue_many() hand delivery to the job queue.
     """
 
+    SETTING_KEYS = ('enable_email_notifications', 'smtp_host', 'smtp_port', 'smtp_username', 'smtp_password')
+
+    _cache_lock = threading.Lock()
+    _settings_cache = None  # (loaded_at, {setting_key: value})
+    _pools = {}  # (host, port, username, password, starttls) -> SMTPConnectionPool
+
     def __init__(self):
         """Initialize email service with settings from database"""
         self.smtp_host = None
@@ -23,35 +42,84 @@ class EmailService:
 
         self._load_settings()
 
+    @classmethod
+    def _cached_settings(cls):
+        ttl = current_app.config.get('EMAIL_SETTINGS_CACHE_SECONDS', 60)
+        with cls._cache_lock:
+            cached = cls._settings_cache
+        if cached and time.monotonic() - cached[0] < ttl:
+            return cached[1]
+
+        rows = SystemSettings.query.filter(SystemSettings.setting_key.in_(cls.SETTING_KEYS)).all()
+        settings = {row.setting_key: row.setting_value for row in rows}
+        with cls._cache_lock:
+            cls._settings_cache = (time.monotonic(), settings)
+        return settings
+
+    @classmethod
+    def invalidate_settings(cls):
+        """Forget cached settings and pooled connections (call after SMTP settings change)"""
+        with cls._cache_lock:
+            cls._settings_cache = None
+            pools, cls._pools = cls._pools, {}
+        for pool in pools.values():
+            pool.close()
+
     def _load_settings(self):
         """Load SMTP settings from database"""
         try:
-            # Check if email notifications are enabled
-            enabled_setting = SystemSettings.query.filter_by(
-                setting_key='enable_email_notifications'
-            ).first()
+            settings = self._cached_settings()
 
-            if not enabled_setting or enabled_setting.setting_value.lower() != 'true':
+            # Check if email notifications are enabled
+            if (settings.get('enable_email_notifications') or '').lower() != 'true':
                 return
 
-            # Load SMTP settings
-            smtp_host = SystemSettings.query.filter_by(setting_key='smtp_host').first()
-            smtp_port = SystemSettings.query.filter_by(setting_key='smtp_port').first()
-            smtp_username = SystemSettings.query.filter_by(setting_key='smtp_username').first()
-            smtp_password = SystemSettings.query.filter_by(setting_key='smtp_password').first()
-
             # Validate all required settings are present
-            if all([smtp_host, smtp_port, smtp_username, smtp_password]):
-                self.smtp_host = smtp_host.setting_value
-                self.smtp_port = int(smtp_port.setting_value)
-                self.smtp_username = smtp_username.setting_value
-                self.smtp_password = smtp_password.setting_value
+            if all(settings.get(key) for key in self.SETTING_KEYS[1:]):
+                self.smtp_host = settings['smtp_host']
+                self.smtp_port = int(settings['smtp_port'])
+                self.smtp_username = settings['smtp_username']
+                self.smtp_password = settings['smtp_password']
                 self.enabled = True
 
         except Exception as e:
-            print(f"Error loading email settings: {e}")
+            logger.exception('Error loading email settings')
             self.enabled = False
 
+    def _pool(self):
+        """The process-wide connection pool for the current SMTP settings"""
+        config = current_app.config
+        key = (self.smtp_host, self.smtp_port, self.smtp_username, self.smtp_password,
+               config.get('EMAIL_SMTP_STARTTLS', True))
+        stale = []
+        with self._cache_lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                # Settings changed: connections for the old ones are not reused
+                stale = list(self._pools.values())
+                pool = SMTPConnectionPool(
+                    *key[:4],
+                    starttls=key[4],
+                    size=config.get('EMAIL_SMTP_POOL_SIZE', 4),
+                    timeout=config.get('EMAIL_SMTP_TIMEOUT_SECONDS', 10),
+                    idle_seconds=config.get('EMAIL_SMTP_IDLE_SECONDS', 60),
+                    max_messages=config.get('EMAIL_MESSAGES_PER_CONNECTION', 100)
+                )
+                EmailService._pools = {key: pool}
+        for old in stale:
+            old.close()
+        return pool
+
+    def _build_message(self, to_email, subject, body, is_html=False):
+        msg = MIMEMultipart('alternative')
+        msg['From'] = self.smtp_username
+        msg['To'] = to_email
+        msg['Subject'] = subject
+
+        mime_type = 'html' if is_html else 'plain'
+        msg.attach(MIMEText(body, mime_type))
+        return msg
+
     def send_email(self, to_email, subject, body, is_html=False):
         """
         Send email notification
@@ -72,21 +140,15 @@ class EmailService:
             }
 
         try:
-            # Create message
-            msg = MIMEMultipart('alternative')
-            msg['From'] = self.smtp_username
-            msg['To'] = to_email
-            msg['Subject'] = subject
-
-            # Attach body
-            mime_type = 'html' if is_html else 'plain'
-            msg.attach(MIMEText(body, mime_type))
-
-            # Connect to SMTP server and send
-            with smtplib.SMTP(self.smtp_host, self.smtp_port) as server:
-                server.starttls()  # Enable TLS encryption
-                server.login(self.smtp_username, self.smtp_password)
-                server.send_message(msg)
+            msg = self._build_message(to_email, subject, body, is_html)
+            pool = self._pool()
+            try:
+                with pool.connection() as conn:
+                    conn.send_message(msg)
+            except smtplib.SMTPServerDisconnected:
+                # The server dropped a pooled session; try once more on a new one
+                with pool.connection() as conn:
+                    conn.send_message(msg)
 
             return {
                 'success': True,
@@ -104,11 +166,133 @@ class EmailService:
                 'message': f'SMTP error: {str(e)}'
             }
         except Exception as e:
+            logger.exception('send_email failed')
             return {
                 'success': False,
                 'message': f'Failed to send email: {str(e)}'
             }
 
+    def send_many(self, messages):
+        """
+        Send many emails over pooled SMTP sessions, EMAIL_SMTP_POOL_SIZE in parallel
+
+        Args:
+            messages: list of dicts with to_email, subject, body and optional is_html
+
+        Returns:
+            dict: {'success': bool, 'message': str, 'sent': int, 'failed': [{'to_email', 'message'}]}
+        """
+        sent, failures = self.deliver(messages)
+        return {
+            'success': not failures,
+            'message': f'{sent} email terkirim, {len(failures)} gagal',
+            'sent': sent,
+            'failed': [{'to_email': item['to_email'], 'message': error} for item, error, _ in failures]
+        }
+
+    def deliver(self, messages):
+        """
+        send_many() without the summary
+
+        Returns:
+            tuple: (sent count, [(message dict, error, retryable)])
+        """
+        if not self.enabled:
+            return 0, [(item, 'Email notifications are not enabled or configured', False) for item in messages]
+        if not messages:
+            return 0, []
+
+        pool = self._pool()
+        workers = min(pool.size, len(messages))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='smtp') as executor:
+            results = list(executor.map(
+                lambda index: self._send_batch(pool, messages[index::workers]),
+                range(workers)
+            ))
+        sent = sum(result[0] for result in results)
+        failures = [failure for result in results for failure in result[1]]
+        if failures:
+            logger.warning('Some emails were not sent', extra={'sent': sent, 'failed': len(failures)})
+        return sent, failures
+
+    def _send_batch(self, pool, items):
+        """Send items one after another over a single pooled session (replaced if it drops)"""
+        sent, failures = 0, []
+        conn = None
+        try:
+            for position, item in enumerate(items):
+                msg = self._build_message(item['to_email'], item['subject'], item['body'], item.get('is_html', False))
+                for attempt in (1, 2):
+                    if conn is None:
+                        try:
+                            conn = pool.acquire()
+                        except smtplib.SMTPAuthenticationError as e:
+                            failures.extend((rest, f'SMTP authentication failed: {e}', False) for rest in items[position:])
+                            return sent, failures
+                        except (smtplib.SMTPException, OSError) as e:
+                            # Server unreachable: the rest of the batch would only time out too
+                            failures.extend((rest, f'Connection failed: {e}', True) for rest in items[position:])
+                            return sent, failures
+                    try:
+                        conn.send_message(msg)
+                        sent += 1
+                        if conn.sent >= pool.max_messages:
+                            pool.release(conn)
+                            conn = None
+                        break
+                    except (smtplib.SMTPServerDisconnected, OSError) as e:
+                        pool.release(conn, broken=True)
+                        conn = None
+                        if attempt == 2:
+                            failures.append((item, f'Connection failed: {e}', True))
+                    except smtplib.SMTPResponseException as e:
+                        # 4xx is temporary (greylisting, rate limit), 5xx is final; the session stays usable
+                        failures.append((item, f'SMTP error: {e}', 400 <= e.smtp_code < 500))
+                        break
+                    except smtplib.SMTPException as e:
+                        failures.append((item, f'SMTP error: {e}', False))
+                        break
+        finally:
+            if conn is not None:
+                pool.release(conn)
+        return sent, failures
+
+    @staticmethod
+    def queue_email(to_email, subject, body, is_html=False):
+        """
+        Send email from the job queue instead of the current request;
+        failed sends are retried with backoff
+
+        Returns:
+            Job: the queued 'email.send' job
+        """
+        from app.services.job_queue_service import JobQueueService
+        return JobQueueService.enqueue('email.send', {
+            'to_email': to_email,
+            'subject': subject,
+            'body': body,
+            'is_html': is_html
+        })
+
+    @staticmethod
+    def queue_many(messages, delay_seconds=0, round_number=1, created_by=None):
+        """
+        Send many emails from the job queue, EMAIL_BATCH_SIZE messages per job.
+        Recipients that fail temporarily are queued again by the job.
+
+        Returns:
+            list: the queued 'email.send_many' jobs
+        """
+        from app.services.job_queue_service import JobQueueService
+        batch_size = current_app.config.get('EMAIL_BATCH_SIZE', 500)
+        return [
+            JobQueueService.enqueue('email.send_many', {
+                'messages': messages[start:start + batch_size],
+                'round': round_number
+            }, delay_seconds=delay_seconds, created_by=created_by)
+            for start in range(0, len(messages), batch_size)
+        ]
+
     def send_diagnosis_notification(self, user_email, user_name, disease_name):
         """
         Send notification email when a diagnosis is completed
@@ -172,22 +356,21 @@ class EmailService:
             dict: {'success': bool, 'message': str}
         """
         try:
-            # Load settings
-            smtp_host = SystemSettings.query.filter_by(setting_key='smtp_host').first()
-            smtp_port = SystemSettings.query.filter_by(setting_key='smtp_port').first()
-            smtp_username = SystemSettings.query.filter_by(setting_key='smtp_username').first()
-            smtp_password = SystemSettings.query.filter_by(setting_key='smtp_password').first()
+            # Load settings (always fresh, this checks what was just saved)
+            EmailService.invalidate_settings()
+            settings = EmailService._cached_settings()
 
-            if not all([smtp_host, smtp_port, smtp_username, smtp_password]):
+            if not all(key in settings for key in EmailService.SETTING_KEYS[1:]):
                 return {
                     'success': False,
                     'message': 'SMTP settings incomplete'
                 }
 
             # Test connection
-            with smtplib.SMTP(smtp_host.setting_value, int(smtp_port.setting_value), timeout=10) as server:
-                server.starttls()
-                server.login(smtp_username.setting_value, smtp_password.setting_value)
+            with smtplib.SMTP(settings['smtp_host'], int(settings['smtp_port']), timeout=10) as server:
+                if current_app.config.get('EMAIL_SMTP_STARTTLS', True):
+                    server.starttls()
+                server.login(settings['smtp_username'], settings['smtp_password'])
 
             return {
                 'success': True,
@@ -205,6 +388,7 @@ class EmailService:
                 'message': f'SMTP error: {str(e)}'
             }
         except Exception as e:
+            logger.exception('test_smtp_connection failed')
             return {
                 'success': False,
                 'message': f'Connection failed: {str(e)}'
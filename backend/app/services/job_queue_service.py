@@ -0,0 +1,422 @@
+"""
+Job Queue Service
+Sistem Pakar Diagnosis Penyakit Tanaman Padi
+Antrian tugas latar belakang berbasis tabel database (tanpa broker eksternal)
+"""
+
+import os
+import random
+import socket
+import threading
+import time
+import logging
+from datetime import datetime, timedelta
+from flask import current_app, has_request_context
+from sqlalchemy import func, select, update
+from app import db
+from app.models.job import Job
+from app.utils.db_lock import advisory_lock
+
+logger = logging.getLogger(__name__)
+
+# task name -> {'fn': fn(ctx), 'max_attempts': int, 'priority': int}
+TASKS = {}
+
+
+def job_task(name, max_attempts=3, priority=100, exclusive=False):
+    """
+    Register fn(ctx) as a job task; ctx is a JobContext. An exclusive task
+    holds a database advisory lock while it runs, a second job of the same
+    task started meanwhile (by any process) is skipped.
+    """
+    def decorator(fn):
+        TASKS[name] = {'fn': fn, 'max_attempts': max_attempts, 'priority': priority, 'exclusive': exclusive}
+        return fn
+    return decorator
+
+
+class PermanentJobError(Exception):
+    """Raised by a task when retrying cannot help (bad payload, feature disabled)"""
+
+
+class JobContext:
+    """What a task function receives"""
+
+    def __init__(self, job):
+        self.id = job.id
+        self.payload = job.payload or {}
+        self.attempt = job.attempts
+
+    def progress(self, **fields):
+        """
+        Store progress for the status API (the lock is kept fresh by the
+        worker's heartbeat either way). Commits the session, including
+        anything the task left pending.
+        """
+        db.session.execute(
+            update(Job).where(Job.id == self.id).values(progress=fields, locked_at=datetime.utcnow())
+        )
+        db.session.commit()
+
+
+class _Heartbeat:
+    """
+    Refreshes a running job's locked_at from a side thread, so a long task
+    that never calls ctx.progress() is not taken for a dead worker by
+    recover_stale() and run a second time. Uses its own connection; the
+    task's session is left alone.
+    """
+
+    def __init__(self, engine, job_id, locked_by, interval):
+        self.engine = engine
+        self.job_id = job_id
+        self.locked_by = locked_by
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f'job-heartbeat-{job_id}', daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join(timeout=self.interval)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                with self.engine.begin() as conn:
+                    conn.execute(
+                        update(Job.__table__)
+                        .where(Job.__table__.c.id == self.job_id,
+                               Job.__table__.c.status == 'running',
+                               Job.__table__.c.locked_by == self.locked_by)
+                        .values(locked_at=datetime.utcnow())
+                    )
+            except Exception as e:
+                # Busy database: try again on the next beat
+                logger.warning('Job heartbeat failed', extra={'job_id': self.job_id, 'error': str(e)})
+
+
+class JobQueueService:
+    """
+    Durable queue on the `jobs` table.
+
+    JOB_QUEUE_MODE decides who runs the jobs:
+      thread  a worker thread inside each web process (default, no extra service)
+      worker  separate `flask jobs worker` processes
+      inline  run in the caller right after enqueue (tests, scripts)
+
+    Claiming uses SELECT ... FOR UPDATE SKIP LOCKED on PostgreSQL; elsewhere a
+    conditional UPDATE (status still 'queued') makes the claim atomic.
+    Failed jobs are retried with exponential backoff up to max_attempts.
+    While a job runs, a heartbeat thread refreshes its lock every
+    JOB_HEARTBEAT_SECONDS; jobs whose worker stopped refreshing the lock
+    (process killed) are requeued.
+    """
+
+    STATUSES = ('queued', 'running', 'succeeded', 'failed', 'cancelled')
+
+    _embedded_lock = threading.Lock()
+    _embedded_thread = None
+    _embedded_wakeup = threading.Event()
+
+    @staticmethod
+    def _load_tasks():
+        # Task modules register themselves on import
+        import app.services.job_tasks  # noqa: F401
+
+    @classmethod
+    def enqueue(cls, task, payload=None, priority=None, max_attempts=None, delay_seconds=0, created_by=None):
+        """Add a job and hand it to the configured runner; returns the Job"""
+        cls._load_tasks()
+        spec = TASKS.get(task)
+        if spec is None:
+            raise ValueError(f'Unknown job task: {task}')
+
+        job = Job(
+            task=task,
+            payload=payload or {},
+            status='queued',
+            priority=spec['priority'] if priority is None else priority,
+            attempts=0,
+            max_attempts=max_attempts or spec['max_attempts'],
+            run_at=datetime.utcnow() + timedelta(seconds=delay_seconds),
+            created_by=created_by
+        )
+        db.session.add(job)
+        db.session.commit()
+        logger.info('Job enqueued', extra={'job_id': job.id, 'task': task})
+
+        mode = current_app.config.get('JOB_QUEUE_MODE', 'thread')
+        if mode == 'inline' and not delay_seconds:
+            if cls._claim_job(job.id, 'inline'):
+                cls.execute(db.session.get(Job, job.id))
+        elif mode == 'thread' and has_request_context():
+            # Only web processes host the embedded worker; a CLI process would exit mid-job
+            cls.ensure_embedded_worker()
+            cls._embedded_wakeup.set()
+        return job
+
+    @classmethod
+    def claim(cls, worker_id):
+        """Take the next due job (lowest priority value first) or return None"""
+        now = datetime.utcnow()
+        due = select(Job).where(Job.status == 'queued', Job.run_at <= now)\
+            .order_by(Job.priority, Job.run_at, Job.id).limit(1)
+
+        if db.engine.dialect.name == 'postgresql':
+            job = db.session.execute(due.with_for_update(skip_locked=True)).scalar_one_or_none()
+            if job is None:
+                db.session.rollback()
+                return None
+            cls._mark_running(job, worker_id, now)
+            db.session.commit()
+            return job
+
+        # SQLite and friends: pick a candidate, claim it only if nobody else did
+        for _ in range(5):
+            job_id = db.session.execute(due.with_only_columns(Job.id)).scalar()
+            if job_id is None:
+                db.session.rollback()
+                return None
+            if cls._claim_job(job_id, worker_id):
+                return db.session.get(Job, job_id)
+        return None
+
+    @staticmethod
+    def _mark_running(job, worker_id, now):
+        job.status = 'running'
+        job.locked_by = worker_id
+        job.locked_at = now
+        job.started_at = now
+        job.attempts = (job.attempts or 0) + 1
+
+    @staticmethod
+    def _claim_job(job_id, worker_id):
+        now = datetime.utcnow()
+        claimed = db.session.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status == 'queued')
+            .values(status='running', locked_by=worker_id, locked_at=now, started_at=now,
+                    attempts=Job.attempts + 1)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        return claimed == 1
+
+    @classmethod
+    def execute(cls, job):
+        """Run a claimed job and record the outcome; returns True on success"""
+        job_id, task = job.id, job.task
+        spec = TASKS.get(task)
+        start = time.perf_counter()
+        try:
+            if spec is None:
+                raise PermanentJobError(f'Unknown job task: {task}')
+            result = cls._run_task(spec, task, job)
+        except Exception as e:
+            db.session.rollback()
+            cls._record_failure(job_id, e, time.perf_counter() - start)
+            return False
+
+        job = db.session.get(Job, job_id)
+        job.status = 'succeeded'
+        job.result = result
+        job.last_error = None
+        job.locked_by = None
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+        logger.info('Job succeeded', extra={
+            'job_id': job_id,
+            'task': task,
+            'duration_ms': round((time.perf_counter() - start) * 1000.0, 1)
+        })
+        return True
+
+    @staticmethod
+    def _heartbeat_interval():
+        config = current_app.config
+        interval = config.get('JOB_HEARTBEAT_SECONDS', 60)
+        # At least three beats per lock timeout, whatever the settings
+        return max(1, min(interval, config.get('JOB_LOCK_TIMEOUT_SECONDS', 900) / 3))
+
+    @classmethod
+    def _run_task(cls, spec, task, job):
+        with _Heartbeat(db.engine, job.id, job.locked_by, cls._heartbeat_interval()):
+            if not spec['exclusive']:
+                return spec['fn'](JobContext(job))
+            with advisory_lock(f'job:{task}') as acquired:
+                if not acquired:
+                    logger.info('Job skipped, task already running elsewhere', extra={'job_id': job.id, 'task': task})
+                    return {'skipped': 'Task is already running elsewhere'}
+                return spec['fn'](JobContext(job))
+
+    @classmethod
+    def _record_failure(cls, job_id, error, duration):
+        job = db.session.get(Job, job_id)
+        job.last_error = f'{type(error).__name__}: {error}'
+        job.locked_by = None
+        extra = {
+            'job_id': job_id,
+            'task': job.task,
+            'attempt': job.attempts,
+            'error': job.last_error,
+            'duration_ms': round(duration * 1000.0, 1)
+        }
+        if not isinstance(error, PermanentJobError) and job.attempts < job.max_attempts:
+            delay = cls.backoff_seconds(job.attempts)
+            job.status = 'queued'
+            job.run_at = datetime.utcnow() + timedelta(seconds=delay)
+            logger.warning('Job failed, will retry', extra={**extra, 'retry_in_seconds': round(delay, 1)})
+        else:
+            job.status = 'failed'
+            job.finished_at = datetime.utcnow()
+            logger.error('Job failed', extra=extra, exc_info=error)
+        db.session.commit()
+
+    @staticmethod
+    def backoff_seconds(attempt):
+        """Exponential backoff with +-20% jitter so retries do not line up"""
+        config = current_app.config
+        base = config.get('JOB_RETRY_BACKOFF_SECONDS', 10)
+        cap = config.get('JOB_RETRY_BACKOFF_MAX_SECONDS', 600)
+        return min(cap, base * (2 ** max(0, attempt - 1))) * random.uniform(0.8, 1.2)
+
+    @classmethod
+    def recover_stale(cls):
+        """Requeue (or fail) running jobs whose worker stopped refreshing the lock"""
+        cutoff = datetime.utcnow() - timedelta(seconds=current_app.config.get('JOB_LOCK_TIMEOUT_SECONDS', 900))
+        stale = (Job.status == 'running', Job.locked_at < cutoff)
+        requeued = db.session.execute(
+            update(Job).where(*stale, Job.attempts < Job.max_attempts)
+            .values(status='queued', run_at=datetime.utcnow(), locked_by=None,
+                    last_error='Worker stopped responding')
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        failed = db.session.execute(
+            update(Job).where(*stale)
+            .values(status='failed', finished_at=datetime.utcnow(), locked_by=None,
+                    last_error='Worker stopped responding')
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        if requeued or failed:
+            logger.warning('Recovered stale jobs', extra={'requeued': requeued, 'failed': failed})
+        return requeued + failed
+
+    @classmethod
+    def work(cls, worker_id=None, stop_event=None, once=False, wakeup=None):
+        """
+        Claim and run jobs until stop_event is set, or until the queue is
+        empty when once=True. Setting `wakeup` ends the idle wait early.
+        With SCHEDULER_ENABLED the worker also ticks the maintenance scheduler.
+        Must run inside an app context.
+        """
+        from app.services.scheduler_service import SchedulerService
+
+        cls._load_tasks()
+        config = current_app.config
+        worker_id = worker_id or f'{socket.gethostname()}:{os.getpid()}'
+        stop_event = stop_event or threading.Event()
+        poll_interval = config.get('JOB_POLL_INTERVAL_SECONDS', 2)
+        scheduler_enabled = config.get('SCHEDULER_ENABLED', True)
+        next_recovery = next_tick = 0.0
+        processed = 0
+
+        while not stop_event.is_set():
+            try:
+                if time.monotonic() >= next_recovery:
+                    cls.recover_stale()
+                    next_recovery = time.monotonic() + 60
+                if scheduler_enabled and time.monotonic() >= next_tick:
+                    SchedulerService.tick()
+                    next_tick = time.monotonic() + config.get('SCHEDULER_TICK_SECONDS', 60)
+                job = cls.claim(worker_id)
+            except Exception:
+                # Database unavailable or table missing; keep the worker alive
+                logger.exception('Job claim failed')
+                db.session.rollback()
+                job = None
+
+            if job is None:
+                if once:
+                    break
+                (wakeup or stop_event).wait(poll_interval)
+                if wakeup is not None:
+                    wakeup.clear()
+                continue
+
+            cls.execute(job)
+            processed += 1
+            db.session.remove()
+
+        return processed
+
+    @classmethod
+    def ensure_embedded_worker(cls):
+        """Start this process's worker thread (JOB_QUEUE_MODE=thread) if it is not running"""
+        with cls._embedded_lock:
+            if cls._embedded_thread is not None and cls._embedded_thread.is_alive():
+                return
+            app = current_app._get_current_object()
+
+            def run():
+                with app.app_context():
+                    cls.work(worker_id=f'{socket.gethostname()}:{os.getpid()}:embedded',
+                             wakeup=cls._embedded_wakeup)
+
+            cls._embedded_thread = threading.Thread(target=run, name='job-worker', daemon=True)
+            cls._embedded_thread.start()
+
+    @staticmethod
+    def get(job_id):
+        return db.session.get(Job, job_id)
+
+    @staticmethod
+    def cancel(job_id):
+        """Cancel a job that has not started; returns True if it was cancelled"""
+        cancelled = db.session.execute(
+            update(Job).where(Job.id == job_id, Job.status == 'queued')
+            .values(status='cancelled', finished_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        return cancelled == 1
+
+    @classmethod
+    def retry(cls, job_id):
+        """Queue a failed or cancelled job again with a fresh attempt budget"""
+        retried = db.session.execute(
+            update(Job).where(Job.id == job_id, Job.status.in_(('failed', 'cancelled')))
+            .values(status='queued', attempts=0, run_at=datetime.utcnow(), finished_at=None)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        if retried and has_request_context() and current_app.config.get('JOB_QUEUE_MODE', 'thread') == 'thread':
+            cls.ensure_embedded_worker()
+            cls._embedded_wakeup.set()
+        return retried == 1
+
+    @classmethod
+    def stats(cls):
+        counts = dict(db.session.query(Job.status, func.count(Job.id)).group_by(Job.status).all())
+        oldest = db.session.query(func.min(Job.run_at)).filter(Job.status == 'queued').scalar()
+        return {
+            'counts': {status: counts.get(status, 0) for status in cls.STATUSES},
+            'oldest_queued_at': oldest.isoformat() if oldest else None,
+            'mode': current_app.config.get('JOB_QUEUE_MODE', 'thread')
+        }
+
+
+def init_job_queue(app):
+    """In thread mode, start the worker thread with the first request of each process"""
+    if app.config.get('JOB_QUEUE_MODE', 'thread') != 'thread':
+        return
+
+    @app.before_request
+    def start_embedded_job_worker():
+        thread = JobQueueService._embedded_thread
+        if thread is None or not thread.is_alive():
+            JobQueueService.ensure_embedded_worker()
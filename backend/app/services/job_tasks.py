@@ -0,0 +1,104 @@
+"""
+Job Tasks
+Sistem Pakar Diagnosis Penyakit Tanaman Padi
+Tugas bawaan yang dijalankan oleh JobQueueService
+"""
+
+from app.services.job_queue_service import job_task, PermanentJobError
+
+
+@job_task('cleanup.history', priority=200, exclusive=True)
+def cleanup_history(ctx):
+    from app.services.cleanup_service import CleanupService
+    from app.services.stats_rollup_service import StatsRollupService
+    # Roll up the days about to be deleted so reports keep their numbers
+    StatsRollupService.rollup()
+    result = CleanupService.cleanup_old_history()
+    if not result.get('success'):
+        raise RuntimeError(result.get('message'))
+    return result
+
+
+@job_task('cleanup.admin_logs', priority=200, exclusive=True)
+def cleanup_admin_logs(ctx):
+    from flask import current_app
+    from app.services.cleanup_service import CleanupService
+    retention_days = ctx.payload.get('retention_days', current_app.config.get('ADMIN_LOG_RETENTION_DAYS', 90))
+    result = CleanupService.cleanup_old_admin_logs(retention_days)
+    if not result.get('success'):
+        raise RuntimeError(result.get('message'))
+    return result
+
+
+@job_task('cleanup.jobs', priority=200, exclusive=True)
+def cleanup_jobs(ctx):
+    from flask import current_app
+    from app.services.cleanup_service import CleanupService
+    retention_days = ctx.payload.get('retention_days', current_app.config.get('JOB_RETENTION_DAYS', 14))
+    result = CleanupService.cleanup_old_jobs(retention_days)
+    if not result.get('success'):
+        raise RuntimeError(result.get('message'))
+    return result
+
+
+@job_task('cleanup.revoked_tokens', priority=200, exclusive=True)
+def cleanup_revoked_tokens(ctx):
+    from app.services.cleanup_service import CleanupService
+    result = CleanupService.cleanup_expired_revocations()
+    if not result.get('success'):
+        raise RuntimeError(result.get('message'))
+    return result
+
+
+@job_task('stats.rollup', priority=150, exclusive=True)
+def rollup_stats(ctx):
+    from app.services.stats_rollup_service import StatsRollupService
+    return StatsRollupService.rollup()
+
+
+@job_task('db.maintenance', max_attempts=1, priority=250, exclusive=True)
+def maintain_database(ctx):
+    from app.services.cleanup_service import CleanupService
+    return CleanupService.optimize_database()
+
+
+@job_task('email.send', max_attempts=5, priority=50)
+def send_email(ctx):
+    from app.services.email_service import EmailService
+    payload = ctx.payload
+    service = EmailService()
+    if not service.enabled:
+        raise PermanentJobError('Email notifications are not enabled or configured')
+    result = service.send_email(payload['to_email'], payload['subject'], payload['body'],
+                                payload.get('is_html', False))
+    if not result['success']:
+        raise RuntimeError(result['message'])
+    return result
+
+
+@job_task('solution_library.generate', max_attempts=1, priority=150)
+def generate_solution_library(ctx):
+    from app.services.solution_library_service import SolutionLibraryService
+    return SolutionLibraryService.run_generation(ctx)
+
+
+@job_task('email.send_many', max_attempts=1, priority=60)
+def send_many_emails(ctx):
+    from flask import current_app
+    from app.services.email_service import EmailService
+    service = EmailService()
+    if not service.enabled:
+        raise PermanentJobError('Email notifications are not enabled or configured')
+
+    sent, failures = service.deliver(ctx.payload['messages'])
+    round_number = ctx.payload.get('round', 1)
+    retry = [item for item, _, retryable in failures if retryable]
+    if retry and round_number < current_app.config.get('EMAIL_RETRY_ROUNDS', 3):
+        # Only the recipients that failed temporarily go out again
+        EmailService.queue_many(retry, delay_seconds=60 * 2 ** (round_number - 1), round_number=round_number + 1)
+    return {
+        'sent': sent,
+        'failed': len(failures),
+        'requeued': len(retry) if round_number < current_app.config.get('EMAIL_RETRY_ROUNDS', 3) else 0,
+        'errors': [f"{item['to_email']}: {error}" for item, error, _ in failures[:20]]
+    }
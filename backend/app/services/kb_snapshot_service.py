@@ -0,0 +1,346 @@
+"""
+Knowledge Base Snapshot Service
+Sistem Pakar Diagnosis Penyakit Tanaman Padi
+Ekspor/impor basis pengetahuan (penyakit, gejala, rule) dalam format JSON-lines berversi
+"""
+
+import gzip
+import hashlib
+import io
+import json
+import mmap
+import os
+from contextlib import contextmanager
+from datetime import datetime
+from sqlalchemy import bindparam
+from app import db
+from app.models.disease import Disease
+from app.models.symptom import Symptom
+from app.models.rule import Rule
+from app.services.knowledge_base_service import KnowledgeBaseService
+from app.services.rule_import_service import RuleImportService, format_rule_code
+from app.utils.bulk_upsert import bulk_upsert
+
+FORMAT_NAME = 'pakar-padi-kb'
+FORMAT_VERSION = 1
+
+# Columns per table, in file order. Rows are keyed by code across
+# environments; ids are kept so a matching database can load the file directly.
+COLUMNS = {
+    'diseases': ('id', 'code', 'name', 'description'),
+    'symptoms': ('id', 'code', 'name', 'category', 'description', 'mb_value', 'md_value'),
+    'rules': ('id', 'rule_code', 'disease_code', 'symptom_code', 'disease_id', 'symptom_id',
+              'confidence_level', 'mb', 'md', 'min_symptom_match', 'is_active')
+}
+# Columns compared by diff() and written by import
+CONTENT_COLUMNS = {
+    'diseases': ('name', 'description'),
+    'symptoms': ('name', 'category', 'description', 'mb_value', 'md_value'),
+    'rules': ('confidence_level', 'mb', 'md', 'min_symptom_match', 'is_active')
+}
+DELETE_CHUNK_SIZE = 500
+
+
+class SnapshotError(ValueError):
+    """The file is not a readable snapshot of a supported version"""
+
+
+def _number(value):
+    return round(float(value), 4) if value is not None else None
+
+
+def _fingerprint_key(fingerprint):
+    """KnowledgeBaseService fingerprint as JSON-comparable values"""
+    return [value.isoformat() if hasattr(value, 'isoformat') else value for value in fingerprint]
+
+
+class KnowledgeBaseFile:
+    """
+    A parsed snapshot: header dict plus {table: [row dict]}.
+
+    File layout (optionally gzip-compressed, by the .gz suffix):
+      line 1     header: format, version, exported_at, columns, counts,
+                 fingerprint (of the source DB) and checksum (sha256 of the
+                 remaining bytes)
+      line 2..n  one JSON array per row: [table, value, value, ...] in the
+                 header's column order
+    """
+
+    def __init__(self, header, tables):
+        self.header = header
+        self.tables = tables
+
+    @property
+    def checksum(self):
+        return self.header['checksum']
+
+    def by_code(self, table):
+        """{code: row}, or {(disease_code, symptom_code): row} for rules"""
+        if table == 'rules':
+            return {(row['disease_code'], row['symptom_code']): row for row in self.tables[table]}
+        return {row['code']: row for row in self.tables[table]}
+
+
+class KBSnapshotService:
+    """
+    Moves the knowledge base between environments (`flask kb export/import`)
+    and lets KnowledgeBaseService start from a file instead of the DB.
+    """
+
+    @staticmethod
+    def collect():
+        """Current diseases, symptoms and rules as snapshot rows"""
+        diseases = [
+            {'id': row.id, 'code': row.code, 'name': row.name, 'description': row.description}
+            for row in db.session.query(Disease.id, Disease.code, Disease.name, Disease.description)
+            .order_by(Disease.code)
+        ]
+        symptoms = [
+            {
+                'id': row.id, 'code': row.code, 'name': row.name, 'category': row.category,
+                'description': row.description, 'mb_value': _number(row.mb_value), 'md_value': _number(row.md_value)
+            }
+            for row in db.session.query(
+                Symptom.id, Symptom.code, Symptom.name, Symptom.category,
+                Symptom.description, Symptom.mb_value, Symptom.md_value
+            ).order_by(Symptom.code)
+        ]
+        rules = [
+            {
+                'id': row.id, 'rule_code': row.rule_code,
+                'disease_code': row.disease_code, 'symptom_code': row.symptom_code,
+                'disease_id': row.disease_id, 'symptom_id': row.symptom_id,
+                'confidence_level': _number(row.confidence_level), 'mb': _number(row.mb), 'md': _number(row.md),
+                'min_symptom_match': row.min_symptom_match, 'is_active': bool(row.is_active)
+            }
+            for row in db.session.query(
+                Rule.id, Rule.rule_code, Rule.disease_id, Rule.symptom_id,
+                Disease.code.label('disease_code'), Symptom.code.label('symptom_code'),
+                Rule.confidence_level, Rule.mb, Rule.md, Rule.min_symptom_match, Rule.is_active
+            ).join(Disease, Rule.disease_id == Disease.id)
+            .join(Symptom, Rule.symptom_id == Symptom.id)
+            .order_by(Disease.code, Symptom.code)
+        ]
+        return {'diseases': diseases, 'symptoms': symptoms, 'rules': rules}
+
+    @classmethod
+    def export(cls, path):
+        """
+        Write the current knowledge base to path (.gz compresses).
+
+        Returns:
+            dict: the header written
+        """
+        fingerprint = KnowledgeBaseService._load_fingerprint()
+        tables = cls.collect()
+
+        body = ''.join(
+            json.dumps([table] + [row[column] for column in COLUMNS[table]],
+                       ensure_ascii=False, separators=(',', ':')) + '\n'
+            for table in COLUMNS
+            for row in tables[table]
+        ).encode('utf-8')
+        header = {
+            'format': FORMAT_NAME,
+            'version': FORMAT_VERSION,
+            'exported_at': datetime.utcnow().isoformat(),
+            'columns': {table: list(columns) for table, columns in COLUMNS.items()},
+            'counts': {table: len(rows) for table, rows in tables.items()},
+            'fingerprint': _fingerprint_key(fingerprint),
+            'checksum': 'sha256:' + hashlib.sha256(body).hexdigest()
+        }
+
+        opener = gzip.open if path.endswith('.gz') else open
+        tmp_path = f'{path}.tmp'
+        with opener(tmp_path, 'wb') as handle:
+            handle.write(json.dumps(header, separators=(',', ':')).encode('utf-8') + b'\n')
+            handle.write(body)
+        os.replace(tmp_path, path)
+        return header
+
+    @staticmethod
+    @contextmanager
+    def _open(path):
+        """The file as a line-readable buffer; plain files are memory-mapped rather than read into memory"""
+        if path.endswith('.gz'):
+            with gzip.open(path, 'rb') as handle:
+                yield handle
+            return
+        with open(path, 'rb') as handle:
+            if os.fstat(handle.fileno()).st_size == 0:
+                yield io.BytesIO()
+                return
+            with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                yield mapped
+
+    @classmethod
+    def read(cls, path):
+        """
+        Parse and verify a snapshot file in one pass
+
+        Raises:
+            SnapshotError: unknown format/version, bad checksum or malformed rows
+        """
+        with cls._open(path) as buffer:
+            header_line = buffer.readline()
+            if not header_line.endswith(b'\n'):
+                raise SnapshotError('File snapshot kosong atau terpotong')
+            try:
+                header = json.loads(header_line)
+            except ValueError as e:
+                raise SnapshotError(f'Header snapshot tidak valid: {e}')
+            if not isinstance(header, dict) or header.get('format') != FORMAT_NAME:
+                raise SnapshotError('Bukan file snapshot basis pengetahuan')
+            if header.get('version') != FORMAT_VERSION:
+                raise SnapshotError(f"Versi snapshot {header.get('version')} tidak didukung (didukung: {FORMAT_VERSION})")
+
+            columns = header['columns']
+            tables = {table: [] for table in columns}
+            digest = hashlib.sha256()
+            bad_line = None
+            for number, line in enumerate(iter(buffer.readline, b''), start=2):
+                digest.update(line)
+                if bad_line is not None:
+                    continue
+                try:
+                    values = json.loads(line)
+                    tables[values[0]].append(dict(zip(columns[values[0]], values[1:])))
+                except (ValueError, KeyError, IndexError, TypeError):
+                    bad_line = number
+
+        # A corrupted file is reported as such rather than as its first unparsable line
+        if 'sha256:' + digest.hexdigest() != header.get('checksum'):
+            raise SnapshotError('Checksum snapshot tidak cocok (file rusak atau diubah)')
+        if bad_line is not None:
+            raise SnapshotError(f'Baris {bad_line} snapshot tidak valid')
+        if {table: len(rows) for table, rows in tables.items()} != header.get('counts'):
+            raise SnapshotError('Jumlah baris snapshot tidak sesuai header')
+        return KnowledgeBaseFile(header, tables)
+
+    @staticmethod
+    def _changed(current, incoming, columns):
+        for column in columns:
+            a, b = current.get(column), incoming.get(column)
+            if isinstance(a, (int, float)) and isinstance(b, (int, float)) and not isinstance(a, bool):
+                # Same precision as the file (_number), so e.g. 0.8 -> 0.804 counts
+                if _number(a) != _number(b):
+                    return True
+            elif a != b:
+                return True
+        return False
+
+    @classmethod
+    def diff(cls, snapshot, current=None):
+        """
+        Compare a snapshot with the database, matching rows by code.
+
+        Returns:
+            dict: table -> {'added': [keys], 'changed': [keys], 'removed': [keys], 'unchanged': int}
+        """
+        current = KnowledgeBaseFile({}, current or cls.collect())
+        result = {}
+        for table in COLUMNS:
+            ours, theirs = current.by_code(table), snapshot.by_code(table)
+            added = sorted(key for key in theirs if key not in ours)
+            removed = sorted(key for key in ours if key not in theirs)
+            changed = sorted(
+                key for key in theirs
+                if key in ours and cls._changed(ours[key], theirs[key], CONTENT_COLUMNS[table])
+            )
+            result[table] = {
+                'added': added,
+                'changed': changed,
+                'removed': removed,
+                'unchanged': len(theirs) - len(added) - len(changed)
+            }
+        return result
+
+    @classmethod
+    def import_snapshot(cls, snapshot, mode='merge', dry_run=False):
+        """
+        Make the database match a snapshot in one transaction.
+
+        merge    add and update diseases, symptoms and rules
+        replace  merge, plus delete the rules that are not in the snapshot
+                 (diseases/symptoms missing from the snapshot are only reported:
+                 diagnosis history still points at them)
+
+        Returns:
+            dict: the diff that was applied
+        """
+        if mode not in ('merge', 'replace'):
+            raise ValueError("mode harus 'merge' atau 'replace'")
+
+        current = cls.collect()
+        changes = cls.diff(snapshot, current)
+        if dry_run:
+            return changes
+
+        now = datetime.utcnow()
+        try:
+            for table, model in (('diseases', Disease), ('symptoms', Symptom)):
+                wanted = set(changes[table]['added']) | set(changes[table]['changed'])
+                rows = [
+                    dict({column: row[column] for column in ('code',) + CONTENT_COLUMNS[table]},
+                         created_at=now, updated_at=now)
+                    for row in snapshot.tables[table] if row['code'] in wanted
+                ]
+                bulk_upsert(model.__table__, rows, ['code'], list(CONTENT_COLUMNS[table]) + ['updated_at'])
+
+            disease_ids = dict(db.session.query(Disease.code, Disease.id))
+            symptom_ids = dict(db.session.query(Symptom.code, Symptom.id))
+            existing = {(row['disease_code'], row['symptom_code']): row['id'] for row in current['rules']}
+            incoming = snapshot.by_code('rules')
+
+            added = changes['rules']['added']
+            numbers = iter(RuleImportService.allocate_rule_numbers(len(added)))
+            bulk_upsert(Rule.__table__, [
+                dict(
+                    {column: incoming[key][column] for column in CONTENT_COLUMNS['rules']},
+                    rule_code=format_rule_code(next(numbers)),
+                    disease_id=disease_ids[key[0]],
+                    symptom_id=symptom_ids[key[1]],
+                    symptom_ids=[symptom_ids[key[1]]],
+                    created_at=now,
+                    updated_at=now
+                )
+                for key in added
+            ], ['disease_id', 'symptom_id'], list(CONTENT_COLUMNS['rules']) + ['updated_at'])
+
+            changed = changes['rules']['changed']
+            if changed:
+                db.session.execute(
+                    Rule.__table__.update().where(Rule.id == bindparam('rule_id')),
+                    [
+                        dict({column: incoming[key][column] for column in CONTENT_COLUMNS['rules']},
+                             updated_at=now, rule_id=existing[key])
+                        for key in changed
+                    ]
+                )
+
+            if mode == 'replace':
+                removed_ids = [existing[key] for key in changes['rules']['removed']]
+                for start in range(0, len(removed_ids), DELETE_CHUNK_SIZE):
+                    db.session.execute(
+                        Rule.__table__.delete().where(Rule.id.in_(removed_ids[start:start + DELETE_CHUNK_SIZE]))
+                    )
+            else:
+                changes['rules']['removed'] = []
+
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        KnowledgeBaseService.invalidate()
+        return changes
+
+    @classmethod
+    def load_for_engine(cls, path, fingerprint):
+        """
+        Snapshot tables for KnowledgeBaseService when the file was exported
+        from a database in exactly the current state (same fingerprint), else None
+        """
+        snapshot = cls.read(path)
+        if snapshot.header.get('fingerprint') != _fingerprint_key(fingerprint):
+            return None
+        return snapshot.tables
@@ -0,0 +1,181 @@
+"""
+Knowledge Base Service
+Sistem Pakar Diagnosis Penyakit Tanaman Padi
+Snapshot in-memory dari penyakit, gejala dan rule aktif
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from sqlalchemy import func, select
+from flask import current_app
+from app import db
+from app.models.disease import Disease
+from app.models.symptom import Symptom
+from app.models.rule import Rule
+
+logger = logging.getLogger(__name__)
+
+
+class KnowledgeBaseSnapshot:
+    """
+    Read-only view of the rule base, built once per knowledge-base version.
+
+    version: per-process rebuild counter
+    checksum: content hash, identical across workers for the same rule base
+    diseases / symptoms: id -> {'code', 'name'}
+    rules_by_disease: disease_id -> list of rule dicts, sorted by cf_pakar desc
+    rules_by_symptom: symptom_id -> {disease_id: rule dict}
+    """
+
+    def __init__(self, version, diseases, symptoms, rules_by_disease):
+        self.version = version
+        self.diseases = diseases
+        self.symptoms = symptoms
+        self.rules_by_disease = rules_by_disease
+        self.checksum = self._compute_checksum()
+
+        self.rules_by_symptom = {}
+        for disease_id, rules in rules_by_disease.items():
+            for rule in rules:
+                self.rules_by_symptom.setdefault(rule['symptom_id'], {})[disease_id] = rule
+
+    def total_symptoms(self, disease_id):
+        return len(self.rules_by_disease.get(disease_id, []))
+
+    def _compute_checksum(self):
+        payload = json.dumps(
+            [self.diseases, self.symptoms, self.rules_by_disease],
+            sort_keys=True,
+            separators=(',', ':')
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class KnowledgeBaseService:
+    """
+    Process-wide cache of the knowledge base.
+
+    The snapshot is rebuilt when this worker changes the rule base
+    (invalidate()) or when the DB fingerprint changes, which is re-checked
+    at most every KNOWLEDGE_BASE_REFRESH_SECONDS so other workers pick up
+    admin edits without a query per diagnosis.
+    """
+
+    _lock = threading.Lock()
+    _snapshot = None
+    _fingerprint = None
+    _checked_at = 0.0
+    _stale = True
+
+    @classmethod
+    def get_snapshot(cls):
+        """Return the current snapshot, rebuilding it if the rule base changed"""
+        interval = current_app.config.get('KNOWLEDGE_BASE_REFRESH_SECONDS', 5)
+        now = time.monotonic()
+
+        if cls._snapshot is not None and not cls._stale and now - cls._checked_at < interval:
+            return cls._snapshot
+
+        with cls._lock:
+            if cls._snapshot is not None and not cls._stale and now - cls._checked_at < interval:
+                return cls._snapshot
+
+            fingerprint = cls._load_fingerprint()
+            if cls._stale or cls._snapshot is None or fingerprint != cls._fingerprint:
+                version = (cls._snapshot.version + 1) if cls._snapshot else 1
+                snapshot = cls._load_snapshot_file(version, fingerprint) if cls._snapshot is None else None
+                cls._snapshot = snapshot or cls._build_snapshot(version)
+                cls._fingerprint = fingerprint
+                cls._stale = False
+            cls._checked_at = now
+
+        return cls._snapshot
+
+    @classmethod
+    def get_version(cls):
+        """Current knowledge-base version (increments on every rebuild)"""
+        return cls.get_snapshot().version
+
+    @classmethod
+    def invalidate(cls):
+        """Mark the snapshot stale; call after committing rule/symptom/disease changes"""
+        cls._stale = True
+
+    @staticmethod
+    def _load_fingerprint():
+        """Count + last update of each table, fetched in one round trip"""
+        stmt = select(
+            select(func.count(Rule.id)).scalar_subquery(),
+            select(func.max(Rule.updated_at)).scalar_subquery(),
+            select(func.count(Symptom.id)).scalar_subquery(),
+            select(func.max(Symptom.updated_at)).scalar_subquery(),
+            select(func.count(Disease.id)).scalar_subquery(),
+            select(func.max(Disease.updated_at)).scalar_subquery()
+        )
+        return tuple(db.session.execute(stmt).one())
+
+    @staticmethod
+    def _group_rules(rule_rows):
+        """rules_by_disease from active rule rows (disease_id, symptom_id, mb, md, min_symptom_match)"""
+        rules_by_disease = {}
+        for disease_id, symptom_id, mb, md, min_symptom_match in rule_rows:
+            mb_value = float(mb) if mb is not None else 0.0
+            md_value = float(md) if md is not None else 0.0
+            rules_by_disease.setdefault(disease_id, []).append({
+                'symptom_id': symptom_id,
+                'cf_pakar': mb_value - md_value,
+                'min_symptom_match': min_symptom_match
+            })
+
+        for rules in rules_by_disease.values():
+            rules.sort(key=lambda r: (-r['cf_pakar'], r['symptom_id']))
+        return rules_by_disease
+
+    @classmethod
+    def _build_snapshot(cls, version):
+        diseases = {
+            row.id: {'code': row.code, 'name': row.name}
+            for row in db.session.query(Disease.id, Disease.code, Disease.name)
+        }
+        symptoms = {
+            row.id: {'code': row.code, 'name': row.name}
+            for row in db.session.query(Symptom.id, Symptom.code, Symptom.name)
+        }
+        rule_rows = db.session.query(
+            Rule.disease_id, Rule.symptom_id, Rule.mb, Rule.md, Rule.min_symptom_match
+        ).filter(Rule.is_active.is_(True))
+
+        return KnowledgeBaseSnapshot(version, diseases, symptoms, cls._group_rules(rule_rows))
+
+    @classmethod
+    def _load_snapshot_file(cls, version, fingerprint):
+        """
+        First snapshot of the process from KNOWLEDGE_BASE_SNAPSHOT_PATH (`flask kb export`)
+        instead of three table scans. Used only when the file was exported from
+        this database in its current state; otherwise returns None.
+        """
+        path = current_app.config.get('KNOWLEDGE_BASE_SNAPSHOT_PATH')
+        if not path or not os.path.exists(path):
+            return None
+
+        from app.services.kb_snapshot_service import KBSnapshotService, SnapshotError
+        try:
+            tables = KBSnapshotService.load_for_engine(path, fingerprint)
+        except (OSError, SnapshotError):
+            logger.exception('Knowledge base snapshot file could not be read', extra={'path': path})
+            return None
+        if tables is None:
+            logger.info('Knowledge base snapshot file is out of date, loading from the database', extra={'path': path})
+            return None
+
+        diseases = {row['id']: {'code': row['code'], 'name': row['name']} for row in tables['diseases']}
+        symptoms = {row['id']: {'code': row['code'], 'name': row['name']} for row in tables['symptoms']}
+        rule_rows = (
+            (row['disease_id'], row['symptom_id'], row['mb'], row['md'], row['min_symptom_match'])
+            for row in tables['rules'] if row['is_active']
+        )
+        return KnowledgeBaseSnapshot(version, diseases, symptoms, cls._group_rules(rule_rows))
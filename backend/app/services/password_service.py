@@ -0,0 +1,89 @@
+"""
+Password Service
+Sistem Pakar Diagnosis Penyakit Tanaman Padi
+Hashing password di thread pool terbatas, dengan rehash otomatis saat login
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordHashingBusy(RuntimeError):
+    """Too many password hashes queued; the caller should answer 503 and retry later"""
+
+
+class PasswordService:
+    """
+    Password hashing with a configurable method (PASSWORD_HASH_METHOD, any
+    Werkzeug method such as 'scrypt:32768:8:1' or 'pbkdf2:sha256:600000').
+
+    Hashes run on a per-process pool of PASSWORD_HASH_WORKERS threads
+    (hashlib releases the GIL, so other requests keep running), with at
+    most PASSWORD_HASH_MAX_PENDING hashes running or queued. Past that a
+    caller waits up to PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS for a slot and
+    then gets PasswordHashingBusy, so a login burst cannot take every
+    worker thread.
+    """
+
+    _lock = threading.Lock()
+    _executor = None
+    _slots = None
+    _prefixes = {}  # configured method -> stored hash prefix it produces
+
+    @classmethod
+    def _pool(cls):
+        if cls._executor is None:
+            with cls._lock:
+                if cls._executor is None:
+                    config = current_app.config
+                    cls._slots = threading.BoundedSemaphore(config.get('PASSWORD_HASH_MAX_PENDING', 16))
+                    cls._executor = ThreadPoolExecutor(
+                        max_workers=config.get('PASSWORD_HASH_WORKERS', 2),
+                        thread_name_prefix='password-hash'
+                    )
+        return cls._executor
+
+    @classmethod
+    def _run(cls, fn, *args):
+        executor = cls._pool()
+        if not cls._slots.acquire(timeout=current_app.config.get('PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS', 5)):
+            logger.warning('Password hashing queue full')
+            raise PasswordHashingBusy('Server sedang sibuk, silakan coba lagi')
+        try:
+            return executor.submit(fn, *args).result()
+        finally:
+            cls._slots.release()
+
+    @staticmethod
+    def _method():
+        return current_app.config.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+
+    @classmethod
+    def hash(cls, password):
+        """Hash a password with the configured method"""
+        return cls._run(generate_password_hash, password, cls._method())
+
+    @classmethod
+    def verify(cls, password_hash, password):
+        """Check a password against a stored hash (any method Werkzeug knows)"""
+        if not password_hash:
+            return False
+        return cls._run(check_password_hash, password_hash, password)
+
+    @classmethod
+    def needs_rehash(cls, password_hash):
+        """True if the stored hash was made with other parameters than the configured ones"""
+        if not password_hash:
+            return False
+        method = cls._method()
+        prefix = cls._prefixes.get(method)
+        if prefix is None:
+            # Werkzeug fills in defaults ('pbkdf2' -> 'pbkdf2:sha256:600000'); hash once to learn them
+            prefix = cls.hash('').split('$', 1)[0]
+            cls._prefixes[method] = prefix
+        return password_hash.split('$', 1)[0] != prefix
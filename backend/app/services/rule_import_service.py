@@ -0,0 +1,369 @@
+"""
+Rule Import Service
+Sistem Pakar Diagnosis Penyakit Tanaman Padi
+Impor/upsert rule secara massal (CSV/JSON) dalam satu transaksi
+"""
+
+import csv
+import io
+import json
+from datetime import datetime
+from sqlalchemy import bindparam, func, select, text, update
+from app import db
+from app.models.disease import Disease
+from app.models.symptom import Symptom
+from app.models.rule import Rule, RuleCodeCounter, rule_code_seq
+from app.services.knowledge_base_service import KnowledgeBaseService
+from app.utils.bulk_upsert import bulk_upsert
+
+TRUE_VALUES = ('1', 'true', 'yes', 'ya', 'y', 'aktif')
+FALSE_VALUES = ('0', 'false', 'no', 'tidak', 'n', 'nonaktif')
+MAX_REPORTED_ERRORS = 50
+DELETE_CHUNK_SIZE = 500
+# Columns an import may change on an existing rule (rule_code and created_at stay)
+UPDATED_COLUMNS = ('confidence_level', 'mb', 'md', 'min_symptom_match', 'is_active', 'updated_at')
+
+
+def format_rule_code(number):
+    return f'R{str(number).zfill(3)}'
+
+
+class RuleImportService:
+    """
+    Validates a whole rule pack in memory, then writes it set-based.
+
+    A row names a disease and a symptom (code or id) plus optional cf_value,
+    mb, md, min_symptom_match and is_active. Missing MB/MD are derived from
+    the symptom's base values times cf_value, like the admin form does.
+    Without min_symptom_match a disease keeps its current value; a disease
+    with no rules yet gets its rule count.
+
+    mode 'upsert' inserts new disease/symptom pairs and updates existing
+    ones; 'replace' also deletes the other rules of every disease in the
+    pack. Everything happens in one transaction, set-based (new rules via
+    bulk_upsert: COPY on PostgreSQL, executemany elsewhere), rule codes for
+    new pairs come from allocate_rule_numbers(), and the knowledge base is
+    invalidated once at the end.
+    """
+
+    MODES = ('upsert', 'replace')
+
+    @staticmethod
+    def allocate_rule_numbers(count):
+        """
+        Reserve `count` rule code numbers in the current transaction.
+
+        PostgreSQL draws them from rule_code_seq (never handed out twice, may
+        leave gaps). Elsewhere the rule_code_counter row is bumped with one
+        UPDATE, which holds the write lock until commit, so concurrent admins
+        get disjoint ranges.
+        """
+        if count <= 0:
+            return []
+
+        if db.engine.dialect.name == 'postgresql':
+            rows = db.session.execute(
+                text(f"SELECT nextval('{rule_code_seq.name}') FROM generate_series(1, :count)"),
+                {'count': count}
+            )
+            return sorted(row[0] for row in rows)
+
+        bumped = db.session.execute(
+            update(RuleCodeCounter).where(RuleCodeCounter.id == 1)
+            .values(last_value=RuleCodeCounter.last_value + count)
+        ).rowcount
+        if not bumped:
+            # Schema created without the migration: start after the highest existing code
+            last = 0
+            for (code,) in db.session.execute(select(Rule.rule_code)):
+                if code and code[1:].isdigit():
+                    last = max(last, int(code[1:]))
+            db.session.add(RuleCodeCounter(id=1, last_value=last + count))
+            db.session.flush()
+        last_value = db.session.execute(
+            select(RuleCodeCounter.last_value).where(RuleCodeCounter.id == 1)
+        ).scalar_one()
+        return list(range(last_value - count + 1, last_value + 1))
+
+    @staticmethod
+    def parse_csv(content):
+        """Rows of a CSV with a header line (delimiter , or ; is detected)"""
+        if isinstance(content, bytes):
+            content = content.decode('utf-8-sig')
+        sample = content[:4096]
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=',;')
+        except csv.Error:
+            dialect = csv.excel
+        reader = csv.DictReader(io.StringIO(content), dialect=dialect)
+        return [
+            {(key or '').strip().lower(): (value or '').strip() for key, value in row.items()}
+            for row in reader
+        ]
+
+    @classmethod
+    def parse_upload(cls, filename, content):
+        """Rows from an uploaded .csv or .json file"""
+        if (filename or '').lower().endswith('.json'):
+            data = json.loads(content)
+            return data.get('rules', []) if isinstance(data, dict) else data
+        return cls.parse_csv(content)
+
+    @staticmethod
+    def _parse_bool(value, default=True):
+        if value is None or value == '':
+            return default
+        if isinstance(value, bool):
+            return value
+        value = str(value).strip().lower()
+        if value in TRUE_VALUES:
+            return True
+        if value in FALSE_VALUES:
+            return False
+        raise ValueError('is_active harus true/false')
+
+    @staticmethod
+    def _parse_fraction(value, name, default=None):
+        if value is None or value == '':
+            return default
+        try:
+            value = float(value)
+        except (ValueError, TypeError):
+            raise ValueError(f'{name} harus berupa angka')
+        if not 0 <= value <= 1:
+            raise ValueError(f'{name} harus antara 0 dan 1')
+        return value
+
+    @staticmethod
+    def _lookup(row, prefix, by_code, by_id):
+        code = row.get(f'{prefix}_code')
+        if code not in (None, ''):
+            return by_code.get(str(code).strip().upper())
+        raw_id = row.get(f'{prefix}_id')
+        if raw_id in (None, ''):
+            return None
+        try:
+            return by_id.get(int(raw_id))
+        except (ValueError, TypeError):
+            return None
+
+    @classmethod
+    def validate(cls, rows, mode='upsert'):
+        """
+        Check every row against the current diseases, symptoms and rules.
+
+        Returns:
+            tuple: (plan dict for apply(), [{'row': n, 'message': str}]);
+                   the plan is None when there are errors
+        """
+        errors = []
+        if mode not in cls.MODES:
+            return None, [{'row': None, 'message': f"Mode harus salah satu dari {', '.join(cls.MODES)}"}]
+        if not isinstance(rows, list) or not rows:
+            return None, [{'row': None, 'message': 'Tidak ada rule untuk diimpor'}]
+
+        diseases = db.session.query(Disease.id, Disease.code).all()
+        disease_by_code = {row.code.upper(): row.id for row in diseases}
+        disease_by_id = {row.id: row.id for row in diseases}
+        disease_codes = {row.id: row.code for row in diseases}
+        symptoms = db.session.query(Symptom.id, Symptom.code, Symptom.mb_value, Symptom.md_value).all()
+        symptom_by_code = {row.code.upper(): row for row in symptoms}
+        symptom_by_id = {row.id: row for row in symptoms}
+
+        items = {}
+        min_matches = {}
+        for number, row in enumerate(rows, start=1):
+            if not isinstance(row, dict):
+                errors.append({'row': number, 'message': 'Format baris tidak valid'})
+                continue
+            disease_id = cls._lookup(row, 'disease', disease_by_code, disease_by_id)
+            symptom = cls._lookup(row, 'symptom', symptom_by_code, symptom_by_id)
+            if disease_id is None:
+                errors.append({'row': number, 'message': 'Penyakit tidak ditemukan'})
+                continue
+            if symptom is None:
+                errors.append({'row': number, 'message': 'Gejala tidak ditemukan'})
+                continue
+            if (disease_id, symptom.id) in items:
+                errors.append({'row': number, 'message': 'Pasangan penyakit dan gejala muncul lebih dari sekali'})
+                continue
+
+            try:
+                cf_value = cls._parse_fraction(row.get('cf_value', row.get('confidence_level')), 'CF Value', 1.0)
+                base_mb = float(symptom.mb_value) if symptom.mb_value is not None else 0.5
+                base_md = float(symptom.md_value) if symptom.md_value is not None else 0.5
+                mb = cls._parse_fraction(row.get('mb'), 'MB', max(0.0, min(1.0, base_mb * cf_value)))
+                md = cls._parse_fraction(row.get('md'), 'MD', max(0.0, min(1.0, base_md * cf_value)))
+                is_active = cls._parse_bool(row.get('is_active'))
+                min_match = row.get('min_symptom_match')
+                if min_match not in (None, ''):
+                    try:
+                        min_match = int(min_match)
+                    except (ValueError, TypeError):
+                        raise ValueError('Min match harus berupa angka')
+                    if min_match < 1:
+                        raise ValueError('Min match minimal 1')
+                    if min_matches.setdefault(disease_id, min_match) != min_match:
+                        raise ValueError('Min match harus sama untuk semua rule satu penyakit')
+            except ValueError as e:
+                errors.append({'row': number, 'message': str(e)})
+                continue
+
+            items[(disease_id, symptom.id)] = {
+                'disease_id': disease_id,
+                'symptom_id': symptom.id,
+                'confidence_level': cf_value,
+                'mb': mb,
+                'md': md,
+                'is_active': is_active
+            }
+
+        if errors:
+            return None, errors[:MAX_REPORTED_ERRORS]
+
+        disease_ids = {disease_id for disease_id, _ in items}
+        existing = {
+            (row.disease_id, row.symptom_id): row.id
+            for row in db.session.query(Rule.id, Rule.disease_id, Rule.symptom_id)
+            .filter(Rule.disease_id.in_(disease_ids))
+        }
+        removed_ids = [rule_id for pair, rule_id in existing.items() if pair not in items] if mode == 'replace' else []
+
+        # min_symptom_match applies to all rules of a disease. Without a value in the
+        # pack a disease keeps its current one (the engine uses the highest); only a
+        # disease without rules starts at its rule count.
+        final_counts = {}
+        for disease_id, symptom_id in set(items) | (set(existing) if mode == 'upsert' else set()):
+            final_counts[disease_id] = final_counts.get(disease_id, 0) + 1
+        current = dict(
+            db.session.query(Rule.disease_id, func.max(Rule.min_symptom_match))
+            .filter(Rule.disease_id.in_(disease_ids))
+            .group_by(Rule.disease_id)
+        )
+        spread = set(min_matches)
+        for disease_id, count in final_counts.items():
+            if disease_id in min_matches:
+                if min_matches[disease_id] > count:
+                    errors.append({'row': None, 'message': f'Min match penyakit {disease_codes[disease_id]} melebihi jumlah gejalanya ({count})'})
+            elif disease_id not in current:
+                min_matches[disease_id] = count
+            elif current[disease_id] is not None and current[disease_id] > count:
+                # replace left fewer rules than the old min match
+                min_matches[disease_id] = count
+                spread.add(disease_id)
+            else:
+                min_matches[disease_id] = current[disease_id]
+        if errors:
+            return None, errors[:MAX_REPORTED_ERRORS]
+
+        return {
+            'items': list(items.values()),
+            'existing': existing,
+            'removed_ids': removed_ids,
+            'min_matches': min_matches,
+            # diseases whose other rules must follow the new min match
+            'spread_min_matches': {disease_id: min_matches[disease_id] for disease_id in spread}
+        }, []
+
+    @classmethod
+    def apply(cls, plan):
+        """
+        Write a validated plan. The caller commits, then calls
+        KnowledgeBaseService.invalidate() (see import_rules).
+
+        Returns:
+            dict: {'inserted', 'updated', 'deleted', 'rule_codes'}
+        """
+        now = datetime.utcnow()
+        existing = plan['existing']
+        min_matches = plan['min_matches']
+        new_items = [item for item in plan['items'] if (item['disease_id'], item['symptom_id']) not in existing]
+        numbers = iter(cls.allocate_rule_numbers(len(new_items)))
+
+        rows = []
+        rule_codes = []
+        for item in plan['items']:
+            row = dict(item, min_symptom_match=min_matches[item['disease_id']], updated_at=now)
+            if (item['disease_id'], item['symptom_id']) in existing:
+                row['id'] = existing[(item['disease_id'], item['symptom_id'])]
+            else:
+                row['rule_code'] = format_rule_code(next(numbers))
+                row['symptom_ids'] = [item['symptom_id']]
+                row['created_at'] = now
+                rule_codes.append(row['rule_code'])
+            rows.append(row)
+
+        removed_ids = plan['removed_ids']
+        for start in range(0, len(removed_ids), DELETE_CHUNK_SIZE):
+            db.session.execute(Rule.__table__.delete().where(Rule.id.in_(removed_ids[start:start + DELETE_CHUNK_SIZE])))
+
+        inserts = [row for row in rows if 'id' not in row]
+        updates = [row for row in rows if 'id' in row]
+        # A pair inserted by someone else since validate() turns into an update
+        bulk_upsert(Rule.__table__, inserts, ['disease_id', 'symptom_id'], UPDATED_COLUMNS)
+        if updates:
+            # executemany: the SET columns come from the parameter keys
+            db.session.execute(
+                Rule.__table__.update().where(Rule.id == bindparam('rule_id')),
+                [dict({key: row[key] for key in UPDATED_COLUMNS}, rule_id=row['id']) for row in updates]
+            )
+
+        # Rules of these diseases that were not in the pack follow a changed min match
+        spread_min_matches = plan['spread_min_matches']
+        if spread_min_matches:
+            db.session.execute(
+                Rule.__table__.update()
+                .where(Rule.disease_id == bindparam('target_disease_id'))
+                .where(Rule.min_symptom_match.is_distinct_from(bindparam('target_min_match')))
+                .values(min_symptom_match=bindparam('target_min_match'), updated_at=now),
+                [{'target_disease_id': disease_id, 'target_min_match': min_match}
+                 for disease_id, min_match in spread_min_matches.items()]
+            )
+
+        return {
+            'inserted': len(inserts),
+            'updated': len(updates),
+            'deleted': len(removed_ids),
+            'rule_codes': rule_codes
+        }
+
+    @classmethod
+    def import_rules(cls, rows, mode='upsert', dry_run=False, log=None):
+        """
+        Validate and write a rule pack in one transaction.
+
+        Args:
+            rows: list of row dicts (JSON body or parse_csv/parse_upload output)
+            mode: 'upsert' or 'replace'
+            dry_run: validate and report counts without writing
+            log: optional AdminLog added to the same transaction
+
+        Returns:
+            tuple: (summary dict, errors list); summary is None when nothing was written
+        """
+        plan, errors = cls.validate(rows, mode)
+        if errors:
+            return None, errors
+
+        summary = {
+            'received': len(rows),
+            'diseases': len(plan['min_matches']),
+            'mode': mode,
+            'dry_run': dry_run
+        }
+        if dry_run:
+            new_count = sum(1 for item in plan['items'] if (item['disease_id'], item['symptom_id']) not in plan['existing'])
+            summary.update(inserted=new_count, updated=len(plan['items']) - new_count,
+                           deleted=len(plan['removed_ids']), rule_codes=[])
+            return summary, []
+
+        try:
+            summary.update(cls.apply(plan))
+            if log is not None:
+                db.session.add(log)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        KnowledgeBaseService.invalidate()
+        return summary, []
@@ -0,0 +1,111 @@
+"""
+Scheduler Service
+Sistem Pakar Diagnosis Penyakit Tanaman Padi
+Menjadwalkan tugas perawatan rutin (cleanup, rekap statistik, VACUUM/ANALYZE)
+"""
+
+import logging
+import threading
+from datetime import datetime, timedelta
+from flask import current_app
+from app import db
+from app.models.job import Job
+from app.services.job_queue_service import JobQueueService
+from app.utils.db_lock import advisory_lock
+
+logger = logging.getLogger(__name__)
+
+
+class SchedulerService:
+    """
+    Periodic maintenance on top of the job queue.
+
+    Each tick, under the 'scheduler' advisory lock (so one process per
+    database decides), every task whose interval has passed since its last
+    job was created is enqueued; the job queue then handles retries and
+    status. The tick runs in every job worker (`flask jobs worker` or the
+    embedded thread) when SCHEDULER_ENABLED is set, or in a dedicated
+    `flask scheduler run` process. An interval of 0 disables a task.
+    """
+
+    # task -> config key holding its interval in seconds
+    SCHEDULE = {
+        'stats.rollup': 'SCHEDULE_STATS_ROLLUP_SECONDS',
+        'cleanup.history': 'SCHEDULE_CLEANUP_HISTORY_SECONDS',
+        'cleanup.admin_logs': 'SCHEDULE_CLEANUP_ADMIN_LOGS_SECONDS',
+        'cleanup.jobs': 'SCHEDULE_CLEANUP_JOBS_SECONDS',
+        'cleanup.revoked_tokens': 'SCHEDULE_CLEANUP_REVOKED_TOKENS_SECONDS',
+        'db.maintenance': 'SCHEDULE_DB_MAINTENANCE_SECONDS'
+    }
+
+    @classmethod
+    def interval(cls, task):
+        return current_app.config.get(cls.SCHEDULE[task], 0)
+
+    @staticmethod
+    def _last_job(task):
+        return Job.query.filter_by(task=task).order_by(Job.id.desc()).first()
+
+    @classmethod
+    def due_tasks(cls, now=None):
+        """Tasks whose interval has passed and that have no job queued or running"""
+        now = now or datetime.utcnow()
+        due = []
+        for task in cls.SCHEDULE:
+            interval = cls.interval(task)
+            if not interval:
+                continue
+            last = cls._last_job(task)
+            if last is None:
+                due.append(task)
+            elif last.status not in ('queued', 'running') and last.created_at + timedelta(seconds=interval) <= now:
+                due.append(task)
+        return due
+
+    @classmethod
+    def tick(cls):
+        """Enqueue due tasks; returns the enqueued task names (empty if another process holds the lock)"""
+        with advisory_lock('scheduler') as acquired:
+            if not acquired:
+                return []
+            enqueued = []
+            for task in cls.due_tasks():
+                JobQueueService.enqueue(task, {'scheduled': True})
+                enqueued.append(task)
+            if enqueued:
+                logger.info('Scheduled maintenance tasks', extra={'tasks': enqueued})
+            return enqueued
+
+    @classmethod
+    def run(cls, stop_event=None):
+        """Tick every SCHEDULER_TICK_SECONDS until stop_event is set. Must run inside an app context."""
+        stop_event = stop_event or threading.Event()
+        tick_seconds = current_app.config.get('SCHEDULER_TICK_SECONDS', 60)
+        while not stop_event.is_set():
+            try:
+                cls.tick()
+            except Exception:
+                logger.exception('Scheduler tick failed')
+                db.session.rollback()
+            db.session.remove()
+            stop_event.wait(tick_seconds)
+
+    @classmethod
+    def status(cls):
+        """Interval, last job and next due time per scheduled task"""
+        tasks = []
+        for task in cls.SCHEDULE:
+            interval = cls.interval(task)
+            last = cls._last_job(task)
+            next_due = None
+            if interval:
+                next_due = (last.created_at + timedelta(seconds=interval)) if last else datetime.utcnow()
+            tasks.append({
+                'task': task,
+                'interval_seconds': interval,
+                'last_job_id': last.id if last else None,
+                'last_status': last.status if last else None,
+                'last_run_at': last.created_at.isoformat() if last else None,
+                'next_due_at': next_due.isoformat() if next_due else None
+            })
+        return tasks
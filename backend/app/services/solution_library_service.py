@@ -0,0 +1,332 @@
+"""
+Solution Library Service
+Sistem Pakar Diagnosis Penyakit Tanaman Padi
+Solusi tersimpan per penyakit & tingkat keyakinan, dipakai sebelum memanggil AI
+"""
+
+import copy
+import time
+import asyncio
+import logging
+import threading
+from flask import current_app
+from sqlalchemy import func, select
+from app import db
+from app.models.disease import Disease
+from app.models.job import Job
+from app.models.solution_library import SolutionLibrary
+from app.services.async_ai_solution_service import AsyncAISolutionService, AsyncSolutionQueue
+
+logger = logging.getLogger(__name__)
+
+
+class SolutionLibraryService:
+    """
+    Lookup, validation and batch generation of library entries.
+
+    A diagnosis is served from the library when the primary disease has an
+    active entry for its confidence band and no secondary disease is strong
+    enough to make the combination worth a dedicated AI answer.
+
+    Generated entries are saved inactive (pending review); they reach farmers
+    only after an admin checks and activates them on Kelola Pustaka Solusi.
+
+    Active entries are cached per worker like the knowledge base: reloaded
+    when this worker changes the library (invalidate()) or when the table
+    fingerprint changes, re-checked at most every
+    KNOWLEDGE_BASE_REFRESH_SECONDS, so a diagnosis costs no library query.
+    """
+
+    _lock = threading.Lock()
+    _active = None  # (disease_id, band) -> {'id', 'raw_text', 'solution_json'}
+    _fingerprint = None
+    _checked_at = 0.0
+    _stale = True
+
+    # Band -> (lower bound as in CertaintyFactorService.interpret_cf, cf used in the generation prompt)
+    BANDS = {
+        'pasti': (0.80, 0.90),
+        'hampir_pasti': (0.60, 0.70),
+        'kemungkinan_besar': (0.40, 0.50),
+        'mungkin': (0.20, 0.30)
+    }
+    LIST_KEYS = ('langkah_penanganan', 'rekomendasi_obat', 'panduan_penggunaan', 'pencegahan')
+
+    @classmethod
+    def band_for(cls, cf_value):
+        """Confidence band for a CF value, None below the lowest band"""
+        for band, (lower, _) in cls.BANDS.items():
+            if cf_value >= lower:
+                return band
+        return None
+
+    @classmethod
+    def validate_solution(cls, solution):
+        """Return an error message, or None when the structure can be served as-is"""
+        if not isinstance(solution, dict):
+            return 'solution_json harus berupa object'
+        for key in cls.LIST_KEYS:
+            if not isinstance(solution.get(key), list):
+                return f'{key} harus berupa list'
+        if not solution['langkah_penanganan']:
+            return 'langkah_penanganan tidak boleh kosong'
+        for obat in solution['rekomendasi_obat']:
+            if not isinstance(obat, dict) or not obat.get('nama'):
+                return 'Setiap rekomendasi_obat harus memiliki nama'
+        return None
+
+    def solution_for_diagnosis(self, primary, secondary_results):
+        """
+        ai_solution dict ({'raw_text', 'structured', ...}) for a diagnosis,
+        or None when the caller should ask the AI provider instead.
+        """
+        config = current_app.config
+        if not config.get('SOLUTION_LIBRARY_ENABLED', True):
+            return None
+
+        max_secondary = config.get('SOLUTION_LIBRARY_MAX_SECONDARY_CF', 0.6)
+        if any(r['cf_final'] >= max_secondary for r in secondary_results):
+            return None
+
+        band = self.band_for(primary['cf_final'])
+        if band is None:
+            return None
+
+        by_key = self.active_entries()
+        entry = by_key.get((primary['disease_id'], band))
+        if entry is None:
+            return None
+
+        structured = copy.deepcopy(entry['solution_json'])
+        prevention = []
+        for result in secondary_results:
+            secondary_band = self.band_for(result['cf_final'])
+            secondary = by_key.get((result['disease_id'], secondary_band))
+            if secondary is None:
+                # Any band will do for prevention steps
+                secondary = next(
+                    (by_key[(result['disease_id'], b)] for b in self.BANDS if (result['disease_id'], b) in by_key),
+                    None
+                )
+            if secondary is None:
+                return None
+            prevention.append({
+                'penyakit': result['disease_name'],
+                'langkah': list(secondary['solution_json'].get('pencegahan', []))[:3]
+            })
+        structured['pencegahan_penyakit_lain'] = prevention
+
+        return {
+            'raw_text': entry['raw_text'] or '',
+            'structured': structured,
+            'source': 'library',
+            'library_id': entry['id']
+        }
+
+    @classmethod
+    def active_entries(cls):
+        """{(disease_id, band): entry dict} of the active entries (read-only, shared)"""
+        interval = current_app.config.get('KNOWLEDGE_BASE_REFRESH_SECONDS', 5)
+        now = time.monotonic()
+
+        if cls._active is not None and not cls._stale and now - cls._checked_at < interval:
+            return cls._active
+
+        with cls._lock:
+            if cls._active is not None and not cls._stale and now - cls._checked_at < interval:
+                return cls._active
+
+            fingerprint = tuple(db.session.execute(
+                select(func.count(SolutionLibrary.id), func.max(SolutionLibrary.updated_at))
+            ).one())
+            if cls._stale or cls._active is None or fingerprint != cls._fingerprint:
+                rows = db.session.query(
+                    SolutionLibrary.id, SolutionLibrary.disease_id, SolutionLibrary.confidence_band,
+                    SolutionLibrary.raw_text, SolutionLibrary.solution_json
+                ).filter(SolutionLibrary.is_active.is_(True))
+                cls._active = {
+                    (row.disease_id, row.confidence_band): {
+                        'id': row.id, 'raw_text': row.raw_text, 'solution_json': row.solution_json
+                    }
+                    for row in rows
+                }
+                cls._fingerprint = fingerprint
+                cls._stale = False
+            cls._checked_at = now
+
+        return cls._active
+
+    @classmethod
+    def invalidate(cls):
+        """Mark the cached entries stale; call after committing library changes"""
+        cls._stale = True
+
+    # ------------------------------------------------------------------
+    # Batch generation
+    # ------------------------------------------------------------------
+
+    GENERATION_TASK = 'solution_library.generate'
+    # Job status -> status shown on the admin page
+    GENERATION_STATUSES = {
+        'queued': 'queued',
+        'running': 'running',
+        'succeeded': 'finished',
+        'failed': 'error',
+        'cancelled': 'error'
+    }
+
+    @classmethod
+    def generation_status(cls):
+        """Progress of the most recent generation job"""
+        job = Job.query.filter_by(task=cls.GENERATION_TASK).order_by(Job.id.desc()).first()
+        if job is None:
+            return {'status': 'idle'}
+
+        status = {
+            'status': cls.GENERATION_STATUSES[job.status],
+            'job_id': job.id,
+            'started_at': job.started_at.isoformat() if job.started_at else None,
+            'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+            'total': 0,
+            'generated': 0,
+            'skipped': 0,
+            'failed': 0,
+            'errors': []
+        }
+        status.update(job.progress or {})
+        if job.status in ('failed', 'cancelled') and job.last_error:
+            status['errors'] = status['errors'] + [job.last_error]
+        return status
+
+    @classmethod
+    def start_generation(cls, disease_ids=None, bands=None, overwrite=False, created_by=None):
+        """
+        Queue generation of missing (or, with overwrite, all AI) entries.
+        Returns (started, status); only one generation job is queued or running at a time.
+        """
+        from app.services.job_queue_service import JobQueueService
+
+        active = Job.query.filter(
+            Job.task == cls.GENERATION_TASK,
+            Job.status.in_(('queued', 'running'))
+        ).first()
+        if active is not None:
+            return False, cls.generation_status()
+
+        bands = [b for b in (bands or cls.BANDS) if b in cls.BANDS]
+        JobQueueService.enqueue(cls.GENERATION_TASK, {
+            'disease_ids': disease_ids,
+            'bands': bands,
+            'overwrite': overwrite
+        }, created_by=created_by)
+        return True, cls.generation_status()
+
+    @classmethod
+    def run_generation(cls, ctx):
+        """Body of the 'solution_library.generate' job"""
+        payload = ctx.payload
+        progress = _Progress(ctx)
+        cls._generate(payload.get('disease_ids'), payload.get('bands') or list(cls.BANDS),
+                      payload.get('overwrite', False), progress)
+        return {key: progress.fields[key] for key in ('total', 'generated', 'skipped', 'failed')}
+
+    @classmethod
+    def _generate(cls, disease_ids, bands, overwrite, progress):
+        query = Disease.query.order_by(Disease.code)
+        if disease_ids:
+            query = query.filter(Disease.id.in_(disease_ids))
+        diseases = query.all()
+
+        existing = {
+            (entry.disease_id, entry.confidence_band): entry
+            for entry in SolutionLibrary.query.filter(
+                SolutionLibrary.disease_id.in_([d.id for d in diseases])
+            ).all()
+        }
+        progress.fields['total'] = len(diseases) * len(bands)
+
+        todo = []
+        for disease in diseases:
+            for band in bands:
+                entry = existing.get((disease.id, band))
+                # Manually edited entries are never overwritten by the batch job
+                if entry is not None and (not overwrite or entry.source == 'manual'):
+                    progress.fields['skipped'] += 1
+                    continue
+                todo.append((disease, band, entry))
+
+        progress.save()
+        if todo:
+            asyncio.run(cls._generate_concurrently(todo, progress))
+
+    @classmethod
+    async def _generate_concurrently(cls, todo, progress):
+        """Up to SOLUTION_LIBRARY_CONCURRENCY entries in flight; results are saved as they finish"""
+        ai_service = AsyncAISolutionService()
+        if not ai_service.providers:
+            raise RuntimeError('AI provider belum dikonfigurasi')
+
+        workers = current_app.config.get('SOLUTION_LIBRARY_CONCURRENCY', 4)
+        async with AsyncSolutionQueue(ai_service, workers=workers) as queue:
+
+            async def generate(item):
+                disease, band, _ = item
+                try:
+                    future = await queue.submit(ai_service.generate_library_solution, disease, cls.BANDS[band][1])
+                    return item, await future, None
+                except Exception as e:
+                    return item, None, e
+
+            for finished in asyncio.as_completed([generate(item) for item in todo]):
+                (disease, band, entry), generated, error = await finished
+                if error is None:
+                    message = cls.validate_solution(generated[1]['structured'])
+                    error = ValueError(message) if message else None
+                if error is not None:
+                    logger.warning('Solution library entry failed', extra={
+                        'disease': disease.code, 'band': band, 'error': str(error)
+                    })
+                    progress.update(failed=1, error=f'{disease.code}/{band}: {error}')
+                    continue
+                cls._save(disease, band, entry, *generated)
+                progress.update(generated=1)
+
+    @classmethod
+    def _save(cls, disease, band, entry, provider, result):
+        structured = result['structured']
+        structured.pop('pencegahan_penyakit_lain', None)
+        if entry is None:
+            entry = SolutionLibrary(disease_id=disease.id, confidence_band=band)
+            db.session.add(entry)
+        entry.raw_text = result['raw_text']
+        entry.solution_json = structured
+        entry.source = 'ai'
+        entry.provider = provider
+        # Not served until an admin has reviewed and activated it
+        entry.is_active = False
+        db.session.commit()
+        cls.invalidate()
+
+
+class _Progress:
+    """Generation counters, saved to the job row as they change"""
+
+    MAX_ERRORS = 50
+
+    def __init__(self, ctx):
+        self.ctx = ctx
+        self.fields = {'total': 0, 'generated': 0, 'skipped': 0, 'failed': 0, 'errors': []}
+
+    def update(self, **changes):
+        for key, value in changes.items():
+            if key in ('generated', 'skipped', 'failed'):
+                self.fields[key] += value
+            elif key == 'error':
+                if len(self.fields['errors']) < self.MAX_ERRORS:
+                    self.fields['errors'].append(value)
+            else:
+                self.fields[key] = value
+        self.save()
+
+    def save(self):
+        self.ctx.progress(**self.fields)
@@ -0,0 +1,174 @@
+"""
+Stats Rollup Service
+Sistem Pakar Diagnosis Penyakit Tanaman Padi
+Rekap harian diagnosis agar laporan tetap lengkap setelah riwayat lama dihapus
+"""
+
+import logging
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import func
+from app import db
+from app.models.history import DiagnosisHistory
+from app.models.disease import Disease
+from app.models.diagnosis_stats import DiagnosisDailyStat
+
+logger = logging.getLogger(__name__)
+
+
+class StatsRollupService:
+    """
+    Daily per-disease diagnosis counts in diagnosis_daily_stats.
+
+    Complete UTC days are rolled up once; days up to the watermark (the last
+    rolled-up day) are read from the rollup, later ones from
+    diagnosis_history, so reports keep their numbers after the retention
+    cleanup has deleted the underlying rows.
+    """
+
+    @staticmethod
+    def watermark():
+        """Last rolled-up day, or None"""
+        return db.session.query(func.max(DiagnosisDailyStat.day)).scalar()
+
+    @classmethod
+    def rollup(cls, until=None):
+        """
+        Roll up the days after the watermark up to `until` (default yesterday).
+        Rolled-up days are never recomputed: their history may be gone by now.
+        """
+        until = until or (datetime.utcnow().date() - timedelta(days=1))
+        last = cls.watermark()
+        if last is not None:
+            start = last + timedelta(days=1)
+        else:
+            first = db.session.query(func.min(DiagnosisHistory.diagnosis_date)).scalar()
+            if first is None:
+                return {'days': 0, 'rows': 0}
+            start = first.date()
+        if start > until:
+            return {'days': 0, 'rows': 0}
+
+        day = func.date(DiagnosisHistory.diagnosis_date)
+        grouped = db.session.query(
+            day,
+            DiagnosisHistory.disease_id,
+            func.count(DiagnosisHistory.id),
+            func.sum(DiagnosisHistory.final_cf_value),
+            func.count(DiagnosisHistory.final_cf_value)
+        ).filter(
+            DiagnosisHistory.diagnosis_date >= datetime.combine(start, time.min),
+            DiagnosisHistory.diagnosis_date < datetime.combine(until + timedelta(days=1), time.min)
+        ).group_by(day, DiagnosisHistory.disease_id).all()
+
+        db.session.add_all([
+            DiagnosisDailyStat(
+                day=row_day if isinstance(row_day, date) else date.fromisoformat(str(row_day)),
+                disease_id=disease_id,
+                diagnosis_count=count,
+                cf_sum=float(cf_sum or 0),
+                cf_count=cf_count
+            )
+            for row_day, disease_id, count, cf_sum, cf_count in grouped
+        ])
+        db.session.commit()
+
+        result = {
+            'from': start.isoformat(),
+            'until': until.isoformat(),
+            'days': (until - start).days + 1,
+            'rows': len(grouped)
+        }
+        logger.info('Diagnosis stats rolled up', extra=result)
+        return result
+
+    @classmethod
+    def _split(cls, start, end):
+        """
+        For the range start..end: (first_day, last_day) to read from the
+        rollup (or None) and the datetime from which to read history
+        """
+        last = cls.watermark()
+        if last is None or last < start.date():
+            return None, start
+        rolled = (start.date(), min(last, end.date()))
+        return rolled, max(start, datetime.combine(last + timedelta(days=1), time.min))
+
+    @classmethod
+    def daily_counts(cls, start, end):
+        """{'YYYY-MM-DD': count} of diagnoses between start and end"""
+        rolled, live_from = cls._split(start, end)
+        counts = {}
+        if rolled:
+            rows = db.session.query(
+                DiagnosisDailyStat.day,
+                func.sum(DiagnosisDailyStat.diagnosis_count)
+            ).filter(
+                DiagnosisDailyStat.day.between(*rolled)
+            ).group_by(DiagnosisDailyStat.day).all()
+            counts.update({str(day): int(count) for day, count in rows})
+
+        day = func.date(DiagnosisHistory.diagnosis_date)
+        rows = db.session.query(day, func.count(DiagnosisHistory.id)).filter(
+            DiagnosisHistory.diagnosis_date >= live_from,
+            DiagnosisHistory.diagnosis_date <= end
+        ).group_by(day).all()
+        counts.update({str(day): count for day, count in rows})
+        return counts
+
+    @classmethod
+    def disease_counts(cls, start, end, limit=None):
+        """[(disease name, count)] between start and end, most frequent first"""
+        rolled, live_from = cls._split(start, end)
+        counts = {}
+        if rolled:
+            rows = db.session.query(
+                DiagnosisDailyStat.disease_id,
+                func.sum(DiagnosisDailyStat.diagnosis_count)
+            ).filter(
+                DiagnosisDailyStat.day.between(*rolled),
+                DiagnosisDailyStat.disease_id.isnot(None)
+            ).group_by(DiagnosisDailyStat.disease_id).all()
+            for disease_id, count in rows:
+                counts[disease_id] = counts.get(disease_id, 0) + int(count)
+
+        rows = db.session.query(DiagnosisHistory.disease_id, func.count(DiagnosisHistory.id)).filter(
+            DiagnosisHistory.diagnosis_date >= live_from,
+            DiagnosisHistory.diagnosis_date <= end,
+            DiagnosisHistory.disease_id.isnot(None)
+        ).group_by(DiagnosisHistory.disease_id).all()
+        for disease_id, count in rows:
+            counts[disease_id] = counts.get(disease_id, 0) + count
+
+        names = dict(db.session.query(Disease.id, Disease.name).filter(Disease.id.in_(list(counts))).all())
+        ranked = sorted(
+            ((names[disease_id], count) for disease_id, count in counts.items() if disease_id in names),
+            key=lambda item: item[1],
+            reverse=True
+        )
+        return ranked[:limit] if limit else ranked
+
+    @classmethod
+    def summary(cls, start, end):
+        """(total diagnoses, average final CF or None) between start and end"""
+        rolled, live_from = cls._split(start, end)
+        total, cf_sum, cf_count = 0, 0.0, 0
+        if rolled:
+            row = db.session.query(
+                func.sum(DiagnosisDailyStat.diagnosis_count),
+                func.sum(DiagnosisDailyStat.cf_sum),
+                func.sum(DiagnosisDailyStat.cf_count)
+            ).filter(DiagnosisDailyStat.day.between(*rolled)).one()
+            total, cf_sum, cf_count = int(row[0] or 0), float(row[1] or 0), int(row[2] or 0)
+
+        row = db.session.query(
+            func.count(DiagnosisHistory.id),
+            func.sum(DiagnosisHistory.final_cf_value),
+            func.count(DiagnosisHistory.final_cf_value)
+        ).filter(
+            DiagnosisHistory.diagnosis_date >= live_from,
+            DiagnosisHistory.diagnosis_date <= end
+        ).one()
+        total += row[0]
+        cf_sum += float(row[1] or 0)
+        cf_count += row[2]
+        return total, (cf_sum / cf_count if cf_count else None)
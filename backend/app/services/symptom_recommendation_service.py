@@ -0,0 +1,100 @@
+"""
+Symptom Recommendation Service
+Sistem Pakar Diagnosis Penyakit Tanaman Padi
+Rekomendasi gejala lanjutan (next-best-question) berbasis information gain
+"""
+
+from app.services.knowledge_base_service import KnowledgeBaseService
+
+
+class SymptomRecommendationService:
+    """
+    Ranks the unmatched symptoms of a candidate disease by how much confirming
+    them would raise that disease's CF, minus how much they would also raise
+    the other top candidates. Symptoms that only support one candidate are the
+    most useful questions to ask next.
+
+    The per-disease symptom lists are precomputed in the knowledge-base
+    snapshot (sorted by CF pakar), so ranking needs no database access.
+    """
+
+    MAX_SUGGESTIONS = 4
+
+    def __init__(self, cf_service):
+        self.cf_service = cf_service
+
+    def recommend(self, results, limit=MAX_SUGGESTIONS):
+        snapshot = KnowledgeBaseService.get_snapshot()
+        matched_by_disease = {
+            r['disease_id']: set(r['matched_symptom_ids']) for r in results
+        }
+
+        recommendations = []
+        for result in results:
+            cf_final = result['cf_final']
+            if not (0.40 <= cf_final < 0.80):
+                continue
+
+            ranked = self.rank_symptoms(snapshot, result, results, matched_by_disease)
+            if not ranked:
+                continue
+
+            recommendations.append({
+                'disease_code': result['disease_code'],
+                'disease_name': result['disease_name'],
+                'current_cf': cf_final,
+                'suggested_symptoms': [
+                    {'code': item['code'], 'name': item['name']}
+                    for item in ranked[:limit]
+                ],
+                'message': (
+                    f'Untuk memastikan diagnosis {result["disease_name"]}, '
+                    'periksa apakah tanaman juga menunjukkan gejala berikut:'
+                )
+            })
+
+        return recommendations
+
+    def rank_symptoms(self, snapshot, result, results, matched_by_disease):
+        """Return unmatched symptoms of result's disease, best question first"""
+        disease_id = result['disease_id']
+        matched = matched_by_disease.get(disease_id, set())
+        rivals = [r for r in results if r['disease_id'] != disease_id]
+
+        ranked = []
+        for rule in snapshot.rules_by_disease.get(disease_id, []):
+            symptom_id = rule['symptom_id']
+            if symptom_id in matched:
+                continue
+
+            gain = self._cf_gain(result, rule['cf_pakar'])
+
+            rival_gain = 0.0
+            supporters = snapshot.rules_by_symptom.get(symptom_id, {})
+            for rival in rivals:
+                rival_rule = supporters.get(rival['disease_id'])
+                if rival_rule is None or symptom_id in matched_by_disease.get(rival['disease_id'], set()):
+                    continue
+                rival_gain = max(rival_gain, self._cf_gain(rival, rival_rule['cf_pakar']))
+
+            symptom = snapshot.symptoms.get(symptom_id, {})
+            ranked.append({
+                'symptom_id': symptom_id,
+                'code': symptom.get('code'),
+                'name': symptom.get('name'),
+                'score': gain - rival_gain,
+                'cf_pakar': rule['cf_pakar']
+            })
+
+        ranked.sort(key=lambda x: (-x['score'], -x['cf_pakar'], x['code'] or ''))
+        return ranked
+
+    def _cf_gain(self, result, cf_pakar):
+        """Increase in cf_final if the symptom were confirmed with full certainty"""
+        cf_raw = result['cf_raw']
+        num_matched = result['symptoms_matched']
+        new_raw = self.cf_service.combine_cf(cf_raw, cf_pakar) if cf_pakar else cf_raw
+
+        before = cf_raw * self.cf_service.get_penalty(num_matched)[0]
+        after = new_raw * self.cf_service.get_penalty(num_matched + 1)[0]
+        return after - before
@@ -0,0 +1,218 @@
+"""
+Symptom Search Service
+Sistem Pakar Diagnosis Penyakit Tanaman Padi
+Pencarian gejala (autocomplete) dari index n-gram/prefix di memori
+"""
+
+import bisect
+import re
+import threading
+import unicodedata
+from app import db
+from app.models.symptom import Symptom
+from app.services.knowledge_base_service import KnowledgeBaseService
+
+# Words that say nothing about a symptom
+STOPWORDS = frozenset((
+    'yang', 'dan', 'di', 'ke', 'dari', 'pada', 'atau', 'dengan', 'untuk', 'ada', 'juga',
+    'itu', 'ini', 'akan', 'dapat', 'oleh', 'secara', 'menjadi', 'sangat', 'lebih', 'seperti',
+    'terdapat', 'adalah', 'serta'
+))
+# Enclitic particles: daunnya -> daun, keringlah -> kering
+PARTICLE_SUFFIXES = ('nya', 'lah', 'kah')
+# bintik-bintik -> bintik
+REDUPLICATION = re.compile(r'\b(\w+)-\1\b')
+NON_WORD = re.compile(r'[^a-z0-9]+')
+
+# Field weights: a hit in the code or name says more than one in the description
+FIELD_WEIGHTS = {'code': 4.0, 'name': 3.0, 'category': 1.5, 'description': 1.0}
+
+MATCH_EXACT = 1.0
+MATCH_PREFIX = 0.8
+MATCH_EDIT_1 = 0.6
+MATCH_EDIT_2 = 0.4
+MATCH_TRIGRAM = 0.6  # times the trigram similarity (for infix/affix variants: kuning ~ menguning)
+MIN_TRIGRAM_SIMILARITY = 0.5
+PHRASE_BONUS = 2.0
+
+
+def normalize(text):
+    """Lowercase, accent-free, de-reduplicated text with only letters, digits and spaces"""
+    text = unicodedata.normalize('NFKD', text or '').encode('ascii', 'ignore').decode('ascii').lower()
+    text = REDUPLICATION.sub(r'\1', text)
+    return ' '.join(NON_WORD.sub(' ', text).split())
+
+
+def tokenize(text):
+    """Normalized tokens without stopwords and enclitic particles"""
+    tokens = []
+    for token in normalize(text).split():
+        if token in STOPWORDS:
+            continue
+        for suffix in PARTICLE_SUFFIXES:
+            if token.endswith(suffix) and len(token) - len(suffix) >= 4:
+                token = token[:-len(suffix)]
+                break
+        tokens.append(token)
+    return tokens
+
+
+def trigrams(term):
+    padded = f'${term}$'
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b, limit):
+    """Optimal string alignment distance, or limit + 1 once it is known to exceed limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class SymptomSearchIndex:
+    """
+    Inverted index over symptom code, name, category and description.
+
+    postings: term -> {symptom_id: best field weight}
+    A query token matches a term exactly, as a prefix (autocomplete),
+    within 1-2 typos, or by trigram similarity; a symptom scores the sum
+    over query tokens of its best match weight x field weight, and
+    symptoms matching more of the query tokens always rank first.
+    """
+
+    def __init__(self, version, rows):
+        self.version = version
+        self.symptoms = {}
+        self.names = {}
+        self.postings = {}
+        for row in rows:
+            self.symptoms[row.id] = {'id': row.id, 'code': row.code, 'name': row.name, 'category': row.category}
+            self.names[row.id] = normalize(row.name)
+            for field, weight in FIELD_WEIGHTS.items():
+                for term in tokenize(getattr(row, field)):
+                    postings = self.postings.setdefault(term, {})
+                    postings[row.id] = max(postings.get(row.id, 0.0), weight)
+
+        self.terms = sorted(self.postings)
+        self.trigram_terms = {}
+        for term in self.terms:
+            for gram in trigrams(term):
+                self.trigram_terms.setdefault(gram, set()).add(term)
+
+    def _term_matches(self, token):
+        """{term: match weight} for one query token"""
+        matches = {}
+        if token in self.postings:
+            matches[token] = MATCH_EXACT
+
+        if len(token) >= 2:
+            start = bisect.bisect_left(self.terms, token)
+            for term in self.terms[start:]:
+                if not term.startswith(token):
+                    break
+                matches.setdefault(term, MATCH_PREFIX)
+
+        if len(token) >= 4:
+            grams = trigrams(token)
+            candidates = set()
+            for gram in grams:
+                candidates.update(self.trigram_terms.get(gram, ()))
+            limit = 2 if len(token) >= 8 else 1
+            for term in candidates - matches.keys():
+                term_grams = trigrams(term)
+                similarity = 2 * len(grams & term_grams) / (len(grams) + len(term_grams))
+                weight = MATCH_TRIGRAM * similarity if similarity >= MIN_TRIGRAM_SIMILARITY else 0.0
+                distance = edit_distance(token, term, limit)
+                if distance == 1:
+                    weight = max(weight, MATCH_EDIT_1)
+                elif distance == 2 <= limit:
+                    weight = max(weight, MATCH_EDIT_2)
+                if weight:
+                    matches[term] = weight
+        return matches
+
+    def search(self, query, limit=10, category=None, require_all=False):
+        """
+        Returns:
+            list: [(symptom dict, score)] best first
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return []
+
+        scores, matched = {}, {}
+        for token in tokens:
+            best = {}
+            for term, match_weight in self._term_matches(token).items():
+                for symptom_id, field_weight in self.postings[term].items():
+                    best[symptom_id] = max(best.get(symptom_id, 0.0), match_weight * field_weight)
+            for symptom_id, score in best.items():
+                scores[symptom_id] = scores.get(symptom_id, 0.0) + score
+                matched[symptom_id] = matched.get(symptom_id, 0) + 1
+
+        phrase = normalize(query)
+        results = []
+        for symptom_id, score in scores.items():
+            symptom = self.symptoms[symptom_id]
+            if require_all and matched[symptom_id] < len(tokens):
+                continue
+            if category and (symptom['category'] or '').lower() != category.lower():
+                continue
+            if phrase and phrase in self.names[symptom_id]:
+                score += PHRASE_BONUS
+            results.append((symptom, round(score, 3), matched[symptom_id]))
+
+        results.sort(key=lambda item: (-item[2], -item[1], item[0]['code']))
+        if limit:
+            results = results[:limit]
+        return [(symptom, score) for symptom, score, _ in results]
+
+
+class SymptomSearchService:
+    """
+    Process-wide SymptomSearchIndex, rebuilt whenever the knowledge-base
+    version changes (KnowledgeBaseService.invalidate() after symptom edits,
+    or another worker's edit seen through the rule-base fingerprint).
+    """
+
+    _lock = threading.Lock()
+    _index = None
+
+    @classmethod
+    def get_index(cls):
+        version = KnowledgeBaseService.get_version()
+        index = cls._index
+        if index is not None and index.version == version:
+            return index
+
+        with cls._lock:
+            if cls._index is None or cls._index.version != version:
+                rows = db.session.query(
+                    Symptom.id, Symptom.code, Symptom.name, Symptom.category, Symptom.description
+                ).all()
+                cls._index = SymptomSearchIndex(version, rows)
+            return cls._index
+
+    @classmethod
+    def search(cls, query, limit=10, category=None, require_all=False):
+        """[(symptom dict with id/code/name/category, score)] best first"""
+        return cls.get_index().search(query, limit=limit, category=category, require_all=require_all)
+
+    @classmethod
+    def matching_ids(cls, query, category=None):
+        """Ids of symptoms matching every word of query, best first (for admin filters),
+        or None when query has no searchable word (single letters, only stopwords)"""
+        if not any(len(token) >= 2 for token in tokenize(query)):
+            return None
+        return [symptom['id'] for symptom, _ in cls.search(query, limit=None, category=category, require_all=True)]
@@ -0,0 +1,152 @@
+"""
+Token Revocation Service
+Sistem Pakar Diagnosis Penyakit Tanaman Padi
+Daftar JWT yang dicabut (logout, refresh rotation, user dinonaktifkan)
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models.revoked_token import RevokedToken
+from app.utils.bloom_filter import BloomFilter
+
+logger = logging.getLogger(__name__)
+
+
+def _timestamp(value):
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+class TokenRevocationService:
+    """
+    Denylist for JWTs, checked on every request by the
+    token_in_blocklist_loader.
+
+    revoked_tokens holds two kinds of rows: one token (jti) or every token
+    of a user issued before revoked_at (jti NULL). Each worker mirrors the
+    table in memory, as a bloom filter of jtis plus a dict of per-user
+    cutoffs, and picks up other workers' rows at most every
+    TOKEN_REVOCATION_SYNC_SECONDS. A check is a dict lookup and a bloom
+    probe; only a bloom hit (a revoked token, or a ~1% false positive)
+    is confirmed against the table.
+    """
+
+    # Rows can commit a little after their revoked_at; the sync re-reads this window
+    SYNC_OVERLAP_SECONDS = 30
+
+    _lock = threading.Lock()
+    _bloom = None
+    _user_cutoffs = {}  # user_id -> epoch seconds; tokens issued before are revoked
+    _synced_at = 0.0  # monotonic
+    _synced_wall = None  # datetime of the last sync (UTC)
+
+    @classmethod
+    def _sync(cls):
+        interval = current_app.config.get('TOKEN_REVOCATION_SYNC_SECONDS', 5)
+        if cls._bloom is not None and time.monotonic() - cls._synced_at < interval:
+            return
+
+        with cls._lock:
+            if cls._bloom is not None and time.monotonic() - cls._synced_at < interval:
+                return
+            now = datetime.utcnow()
+            rebuild = cls._bloom is None or cls._bloom.saturated
+            query = db.session.query(RevokedToken.jti, RevokedToken.user_id, RevokedToken.revoked_at)
+            if rebuild:
+                # Expired rows are left out, which is also how a saturated filter shrinks back
+                bloom = BloomFilter(current_app.config.get('TOKEN_REVOCATION_BLOOM_CAPACITY', 100000))
+                cutoffs = {}
+                query = query.filter(RevokedToken.expires_at > now)
+            else:
+                bloom, cutoffs = cls._bloom, dict(cls._user_cutoffs)
+                query = query.filter(
+                    RevokedToken.revoked_at >= cls._synced_wall - timedelta(seconds=cls.SYNC_OVERLAP_SECONDS)
+                )
+
+            for jti, user_id, revoked_at in query:
+                if jti is not None:
+                    if jti not in bloom:
+                        bloom.add(jti)
+                elif user_id is not None:
+                    cutoffs[user_id] = max(cutoffs.get(user_id, 0.0), _timestamp(revoked_at))
+
+            cls._bloom, cls._user_cutoffs = bloom, cutoffs
+            cls._synced_wall = now
+            cls._synced_at = time.monotonic()
+
+    @classmethod
+    def is_revoked(cls, jwt_payload):
+        """True if the decoded token was revoked"""
+        cls._sync()
+
+        try:
+            cutoff = cls._user_cutoffs.get(int(jwt_payload['sub']))
+        except (KeyError, TypeError, ValueError):
+            cutoff = None
+        # iat has one-second resolution: a token issued in the second of the revocation counts as revoked
+        if cutoff is not None and jwt_payload.get('iat', 0) < cutoff:
+            return True
+
+        jti = jwt_payload.get('jti')
+        if jti is None or jti not in cls._bloom:
+            return False
+        return db.session.query(RevokedToken.id).filter_by(jti=jti).first() is not None
+
+    @classmethod
+    def revoke_token(cls, jwt_payload):
+        """
+        Revoke one decoded token until it expires
+
+        Returns:
+            bool: False if it was already revoked (e.g. a refresh token used twice)
+        """
+        jti = jwt_payload['jti']
+        row = RevokedToken(
+            jti=jti,
+            user_id=int(jwt_payload['sub']),
+            token_type=jwt_payload.get('type'),
+            expires_at=datetime.utcfromtimestamp(jwt_payload['exp'])
+        )
+        db.session.add(row)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            return False
+
+        with cls._lock:
+            if cls._bloom is not None and jti not in cls._bloom:
+                cls._bloom.add(jti)
+        return True
+
+    @classmethod
+    def revoke_user(cls, user_id):
+        """Revoke every token issued to user_id so far (deactivation, password change)"""
+        now = datetime.utcnow()
+        lifetime = max(current_app.config['JWT_ACCESS_TOKEN_EXPIRES'], current_app.config['JWT_REFRESH_TOKEN_EXPIRES'])
+        db.session.add(RevokedToken(user_id=user_id, revoked_at=now, expires_at=now + lifetime))
+        db.session.commit()
+
+        with cls._lock:
+            cls._user_cutoffs = {**cls._user_cutoffs, user_id: max(cls._user_cutoffs.get(user_id, 0.0), _timestamp(now))}
+        logger.info('Revoked all tokens of user', extra={'user_id': user_id})
+
+    @classmethod
+    def reset(cls):
+        """Forget the in-memory copy; the next check reloads it from the table"""
+        with cls._lock:
+            cls._bloom = None
+            cls._user_cutoffs = {}
+            cls._synced_at = 0.0
+
+
+def init_token_revocation(jwt):
+    """Reject revoked tokens on every @jwt_required endpoint"""
+
+    @jwt.token_in_blocklist_loader
+    def check_if_token_revoked(jwt_header, jwt_payload):
+        return TokenRevocationService.is_revoked(jwt_payload)
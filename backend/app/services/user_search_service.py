@@ -0,0 +1,97 @@
+"""
+User Search Service
+Sistem Pakar Diagnosis Penyakit Tanaman Padi
+Pencarian user (email / nama) yang memakai index, dengan hasil berperingkat
+"""
+
+import threading
+from sqlalchemy import case, func, inspect, literal_column, select, table
+from app import db
+from app.models.user import User
+
+
+class UserSearchService:
+    """
+    Substring search over users.search_text (lowercase email + full name).
+
+    - PostgreSQL: LIKE '%term%' served by the pg_trgm GIN index, ranked by
+      trigram similarity
+    - SQLite with the users_fts table (FTS5, trigram tokenizer): MATCH;
+      terms shorter than 3 characters have no trigram and use LIKE
+    - otherwise: LIKE without an index
+
+    SQLite results are ranked by text length (the term is a substring of
+    every match, so shorter text is the closer match).
+
+    An email that starts with the term always ranks first.
+    """
+
+    MIN_TRIGRAM_LENGTH = 3
+
+    _lock = threading.Lock()
+    _backends = {}  # engine url -> 'postgresql' | 'fts5' | 'like'
+
+    @staticmethod
+    def normalize(term):
+        return ' '.join((term or '').lower().split())
+
+    @classmethod
+    def backend(cls):
+        engine = db.engine
+        key = str(engine.url)
+        if key not in cls._backends:
+            with cls._lock:
+                if engine.dialect.name == 'postgresql':
+                    backend = 'postgresql'
+                elif engine.dialect.name == 'sqlite' and inspect(engine).has_table('users_fts'):
+                    backend = 'fts5'
+                else:
+                    backend = 'like'
+                cls._backends[key] = backend
+        return cls._backends[key]
+
+    @staticmethod
+    def _like_pattern(term):
+        escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        return f'%{escaped}%'
+
+    @classmethod
+    def _fts_query(cls, term):
+        # One quoted phrase: trigram FTS treats it as a substring
+        return '"' + term.replace('"', '""') + '"'
+
+    @classmethod
+    def search(cls, query, term):
+        """
+        Filter a User query to users matching term, ordered best match first
+
+        Returns:
+            Query: the filtered, ordered query (unchanged if term is empty)
+        """
+        term = cls.normalize(term)
+        if not term:
+            return query
+
+        # search_text starts with the email
+        prefix_first = case((User.search_text.like(cls._like_pattern(term)[1:], escape='\\'), 0), else_=1)
+        backend = cls.backend()
+
+        if backend == 'fts5' and len(term) >= cls.MIN_TRIGRAM_LENGTH:
+            # IN (...) rather than a join: joined, SQLite would run the MATCH once per user row
+            matches = select(literal_column('rowid')).select_from(table('users_fts')).where(
+                literal_column('users_fts').op('MATCH')(cls._fts_query(term))
+            )
+            query = query.filter(User.id.in_(matches))
+        else:
+            query = query.filter(User.search_text.like(cls._like_pattern(term), escape='\\'))
+
+        if backend == 'postgresql':
+            return query.order_by(prefix_first, func.similarity(User.search_text, term).desc(), User.id)
+        # The term is a substring of every match; the shorter the text, the closer the match
+        return query.order_by(prefix_first, func.length(User.search_text), User.id)
+
+    @classmethod
+    def matching_ids(cls, term):
+        """Select of the ids of users matching term, for `Model.user_id.in_(...)`"""
+        matches = cls.search(db.session.query(User.id.label('id')), term).order_by(None).subquery()
+        return select(matches.c.id)
@@ -0,0 +1,112 @@
+"""
+Bulk Upsert
+Sistem Pakar Diagnosis Penyakit Tanaman Padi
+
+INSERT ... ON CONFLICT DO UPDATE for many rows in the current session
+transaction:
+
+  PostgreSQL  COPY into a temp table, then one INSERT ... SELECT ... ON CONFLICT
+  SQLite      one executemany of INSERT ... ON CONFLICT
+  others      select the existing keys, then executemany UPDATE + INSERT
+
+    bulk_upsert(Rule.__table__, rows, ['disease_id', 'symptom_id'], ['mb', 'md'])
+
+Every row must have the same keys. Values go through the column types'
+bind processors (PickleType, etc.) the same way an ORM insert would.
+"""
+
+from sqlalchemy import and_, bindparam, select, text, tuple_
+from app import db
+
+
+def _columns(rows):
+    return list(rows[0].keys())
+
+
+def _copy_upsert(table, rows, columns, index_elements, update_columns):
+    dialect = db.engine.dialect
+    processors = [table.c[column].type.bind_processor(dialect) for column in columns]
+    staging = f'_bulk_{table.name}'
+    column_list = ', '.join(f'"{column}"' for column in columns)
+
+    db.session.execute(text(f'DROP TABLE IF EXISTS "{staging}"'))
+    db.session.execute(text(
+        f'CREATE TEMP TABLE "{staging}" ON COMMIT DROP AS '
+        f'SELECT {column_list} FROM "{table.name}" WITH NO DATA'
+    ))
+    cursor = db.session.connection().connection.cursor()
+    try:
+        with cursor.copy(f'COPY "{staging}" ({column_list}) FROM STDIN') as copy:
+            for row in rows:
+                copy.write_row([
+                    process(row[column]) if process else row[column]
+                    for column, process in zip(columns, processors)
+                ])
+    finally:
+        cursor.close()
+
+    conflict = ', '.join(f'"{column}"' for column in index_elements)
+    updates = ', '.join(f'"{column}" = EXCLUDED."{column}"' for column in update_columns)
+    db.session.execute(text(
+        f'INSERT INTO "{table.name}" ({column_list}) SELECT {column_list} FROM "{staging}" '
+        f'ON CONFLICT ({conflict}) ' + (f'DO UPDATE SET {updates}' if updates else 'DO NOTHING')
+    ))
+
+
+def _sqlite_upsert(table, rows, index_elements, update_columns):
+    from sqlalchemy.dialects.sqlite import insert
+    stmt = insert(table)
+    if update_columns:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=index_elements,
+            set_={column: getattr(stmt.excluded, column) for column in update_columns}
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=index_elements)
+    db.session.execute(stmt, rows)
+
+
+def _generic_upsert(table, rows, index_elements, update_columns):
+    key_columns = [table.c[column] for column in index_elements]
+    keys = [tuple(row[column] for column in index_elements) for row in rows]
+    existing = set()
+    for start in range(0, len(keys), 500):
+        chunk = keys[start:start + 500]
+        existing.update(tuple(row) for row in db.session.execute(
+            select(*key_columns).where(tuple_(*key_columns).in_(chunk))
+        ))
+
+    inserts = [row for row, key in zip(rows, keys) if key not in existing]
+    updates = [row for row, key in zip(rows, keys) if key in existing]
+    if inserts:
+        db.session.execute(table.insert(), inserts)
+    if updates and update_columns:
+        stmt = table.update().where(and_(*[
+            table.c[column] == bindparam(f'key_{column}') for column in index_elements
+        ])).values({column: bindparam(f'new_{column}') for column in update_columns})
+        db.session.execute(stmt, [
+            {**{f'key_{column}': row[column] for column in index_elements},
+             **{f'new_{column}': row[column] for column in update_columns}}
+            for row in updates
+        ])
+
+
+def bulk_upsert(table, rows, index_elements, update_columns):
+    """
+    Insert rows, updating update_columns where index_elements (a unique
+    key) already exists. Does not commit.
+
+    Returns:
+        int: number of rows sent
+    """
+    if not rows:
+        return 0
+
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        _copy_upsert(table, rows, _columns(rows), index_elements, update_columns)
+    elif dialect == 'sqlite':
+        _sqlite_upsert(table, rows, index_elements, update_columns)
+    else:
+        _generic_upsert(table, rows, index_elements, update_columns)
+    return len(rows)
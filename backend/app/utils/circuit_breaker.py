@@ -0,0 +1,129 @@
+"""
+Circuit Breaker
+Sistem Pakar Diagnosis Penyakit Tanaman Padi
+
+One breaker per external dependency (AI provider). States:
+  closed     calls go through; outcomes kept in a rolling window
+  open       failure rate over the window crossed the threshold; calls are
+             rejected until cooldown_seconds have passed
+  half_open  after the cooldown one probe call is let through; success
+             closes the breaker, failure opens it again
+
+State is per worker process.
+"""
+
+import threading
+import time
+from collections import deque
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_rate=0.5, min_calls=4, window=20, cooldown_seconds=30):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.cooldown_seconds = cooldown_seconds
+        self._lock = threading.Lock()
+        self._outcomes = deque(maxlen=window)
+        self._state = CLOSED
+        self._opened_at = None
+        self._probe_in_flight = False
+        self._rejected = 0
+        self._last_error = None
+
+    def allow_request(self):
+        """True if the caller may hit the dependency now"""
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN:
+                if time.monotonic() - self._opened_at < self.cooldown_seconds:
+                    self._rejected += 1
+                    return False
+                self._state = HALF_OPEN
+                self._probe_in_flight = False
+            # half open: a single probe at a time
+            if self._probe_in_flight:
+                self._rejected += 1
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._state = CLOSED
+                self._outcomes.clear()
+                self._probe_in_flight = False
+            self._outcomes.append(True)
+
+    def record_failure(self, error=None):
+        with self._lock:
+            self._last_error = f'{type(error).__name__}: {error}' if error else None
+            if self._state == HALF_OPEN:
+                self._trip()
+                return
+            self._outcomes.append(False)
+            total = len(self._outcomes)
+            failures = total - sum(self._outcomes)
+            if total >= self.min_calls and failures / total >= self.failure_rate:
+                self._trip()
+
+    def record_cancelled(self):
+        """An allowed call that never reached the dependency: no outcome, frees the probe"""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probe_in_flight = False
+
+    def _trip(self):
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._probe_in_flight = False
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.cooldown_seconds:
+                return HALF_OPEN
+            return self._state
+
+    def snapshot(self):
+        state = self.state
+        with self._lock:
+            total = len(self._outcomes)
+            failures = total - sum(self._outcomes)
+            retry_in = None
+            if self._state == OPEN:
+                retry_in = max(0.0, self.cooldown_seconds - (time.monotonic() - self._opened_at))
+            return {
+                'state': state,
+                'window_calls': total,
+                'window_failures': failures,
+                'rejected': self._rejected,
+                'retry_in_seconds': round(retry_in, 1) if retry_in is not None else None,
+                'last_error': self._last_error
+            }
+
+
+_registry_lock = threading.Lock()
+_breakers = {}
+
+
+def get_breaker(name, **settings):
+    """Return the process-wide breaker for name, creating it with settings on first use"""
+    with _registry_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(name, **settings)
+            _breakers[name] = breaker
+        return breaker
+
+
+def breaker_states():
+    with _registry_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.snapshot() for breaker in breakers}
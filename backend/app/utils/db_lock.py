@@ -0,0 +1,77 @@
+"""
+Database Advisory Locks
+Sistem Pakar Diagnosis Penyakit Tanaman Padi
+
+Non-blocking named locks shared by every process using the same database,
+so only one gunicorn worker or replica runs a scheduled task at a time.
+
+  PostgreSQL  pg_try_advisory_lock on a dedicated connection
+  others      flock on a file in the temp directory (SQLite deployments are
+              single-host); a process-local lock where flock is unavailable
+
+    with advisory_lock('scheduler') as acquired:
+        if acquired:
+            ...
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from sqlalchemy import text
+from app import db
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+_local_locks = {}
+_local_locks_guard = threading.Lock()
+
+
+def _lock_key(name):
+    """Signed 64-bit key derived from the database URL and lock name"""
+    digest = hashlib.sha1(f'{db.engine.url}:{name}'.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big', signed=True)
+
+
+@contextmanager
+def advisory_lock(name):
+    """Try to take lock `name` without waiting; yields True if this caller holds it"""
+    key = _lock_key(name)
+
+    if db.engine.dialect.name == 'postgresql':
+        with db.engine.connect() as conn:
+            acquired = bool(conn.execute(text('SELECT pg_try_advisory_lock(:key)'), {'key': key}).scalar())
+            try:
+                yield acquired
+            finally:
+                if acquired:
+                    conn.execute(text('SELECT pg_advisory_unlock(:key)'), {'key': key})
+        return
+
+    if fcntl is not None:
+        path = os.path.join(tempfile.gettempdir(), f'pakar-padi-lock-{key & 0xffffffffffffffff:x}')
+        with open(path, 'a') as handle:
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                acquired = True
+            except OSError:
+                acquired = False
+            try:
+                yield acquired
+            finally:
+                if acquired:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+        return
+
+    with _local_locks_guard:
+        lock = _local_locks.setdefault(key, threading.Lock())
+    acquired = lock.acquire(blocking=False)
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            lock.release()
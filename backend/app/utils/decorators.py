@@ -5,7 +5,7 @@ Custom Decorators
 from functools import wraps
 from flask import jsonify
 from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
-from app.models.user import User
+from app.utils.principal_cache import PrincipalCache
 
 
 def admin_required(fn):
@@ -14,9 +14,9 @@ def admin_required(fn):
     def wrapper(*args, **kwargs):
         verify_jwt_in_request()
         user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        principal = PrincipalCache.get(user_id)
 
-        if not user or user.role != 'admin':
+        if not principal or principal['role'] != 'admin':
             return jsonify({
                 'success': False,
                 'message': 'Admin access required'
@@ -33,9 +33,9 @@ def user_required(fn):
     def wrapper(*args, **kwargs):
         verify_jwt_in_request()
         user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        principal = PrincipalCache.get(user_id)
 
-        if not user:
+        if not principal:
             return jsonify({
                 'success': False,
                 'message': 'Authentication required'
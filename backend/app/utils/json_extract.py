@@ -0,0 +1,200 @@
+"""
+Tolerant JSON Extraction
+Sistem Pakar Diagnosis Penyakit Tanaman Padi
+
+Pulls the first JSON object out of free-form LLM output. Handles:
+  - prose before/after the object and ```json code fences
+  - trailing or doubled commas, `...` placeholders copied from the prompt
+  - raw newlines inside strings, smart quotes around keys and values
+  - truncated output: open strings are dropped, open arrays/objects are
+    closed, so every fully received item is kept
+
+    value, complete = extract_json_object(raw_text)
+
+`complete` is False when the object was cut off and had to be closed.
+"""
+
+import re
+
+_FENCE = re.compile(r'```(?:json|JSON)?\s*\n?(.*?)(?:```|$)', re.DOTALL)
+_NUMBER = re.compile(r'-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?')
+_LITERALS = {'true': True, 'false': False, 'null': None, 'True': True, 'False': False, 'None': None}
+_QUOTES = {'"': '"', '“': '”', '”': '”'}
+_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+MAX_CANDIDATES = 5
+
+
+class _Truncated(Exception):
+    """Input ended inside a value; `partial` is what could be kept (None to drop it)"""
+
+    def __init__(self, partial=None):
+        super().__init__()
+        self.partial = partial
+
+
+class _Parser:
+    def __init__(self, text, pos):
+        self.text = text
+        self.pos = pos
+
+    def _skip(self):
+        text = self.text
+        while self.pos < len(text):
+            c = text[self.pos]
+            if c.isspace():
+                self.pos += 1
+            elif text.startswith('//', self.pos):
+                end = text.find('\n', self.pos)
+                self.pos = len(text) if end < 0 else end + 1
+            else:
+                return
+        raise _Truncated()
+
+    def _peek(self):
+        self._skip()
+        return self.text[self.pos]
+
+    def value(self):
+        c = self._peek()
+        if c == '{':
+            return self.object()
+        if c == '[':
+            return self.array()
+        if c in _QUOTES:
+            return self.string()
+        match = _NUMBER.match(self.text, self.pos)
+        if match:
+            self.pos = match.end()
+            if self.pos >= len(self.text):
+                # A number at the very end may be cut short
+                raise _Truncated()
+            number = match.group()
+            return float(number) if any(ch in number for ch in '.eE') else int(number)
+        for literal, result in _LITERALS.items():
+            if self.text.startswith(literal, self.pos):
+                self.pos += len(literal)
+                return result
+            if literal.startswith(self.text[self.pos:]):
+                raise _Truncated()
+        raise ValueError(f'unexpected {c!r} at {self.pos}')
+
+    def string(self):
+        closing = _QUOTES[self.text[self.pos]]
+        self.pos += 1
+        chars = []
+        text = self.text
+        while self.pos < len(text):
+            c = text[self.pos]
+            if c == closing or (c == '"' and closing != '"'):
+                self.pos += 1
+                return ''.join(chars)
+            if c == '\\':
+                if self.pos + 1 >= len(text):
+                    break
+                nxt = text[self.pos + 1]
+                if nxt == 'u':
+                    digits = text[self.pos + 2:self.pos + 6]
+                    if len(digits) < 4:
+                        break
+                    try:
+                        chars.append(chr(int(digits, 16)))
+                    except ValueError:
+                        chars.append(digits)
+                    self.pos += 6
+                    continue
+                chars.append(_ESCAPES.get(nxt, nxt))
+                self.pos += 2
+                continue
+            chars.append(c)
+            self.pos += 1
+        raise _Truncated()
+
+    def _skip_placeholders(self):
+        """Skip commas and `...`/`…` placeholders between items"""
+        while True:
+            c = self._peek()
+            if c == ',':
+                self.pos += 1
+            elif self.text.startswith('...', self.pos):
+                self.pos += 3
+            elif c == '…':
+                self.pos += 1
+            else:
+                return c
+
+    def array(self):
+        self.pos += 1
+        items = []
+        while True:
+            try:
+                c = self._skip_placeholders()
+            except _Truncated:
+                raise _Truncated(items)
+            if c == ']':
+                self.pos += 1
+                return items
+            try:
+                items.append(self.value())
+            except _Truncated as e:
+                if isinstance(e.partial, (dict, list)) and e.partial:
+                    items.append(e.partial)
+                raise _Truncated(items)
+
+    def object(self):
+        self.pos += 1
+        result = {}
+        while True:
+            try:
+                c = self._skip_placeholders()
+                if c == '}':
+                    self.pos += 1
+                    return result
+                if c not in _QUOTES:
+                    raise ValueError(f'expected key at {self.pos}')
+                key = self.string()
+                if self._peek() != ':':
+                    raise ValueError(f'expected ":" at {self.pos}')
+                self.pos += 1
+            except _Truncated:
+                raise _Truncated(result)
+            try:
+                result[key] = self.value()
+            except _Truncated as e:
+                if isinstance(e.partial, (dict, list)):
+                    result[key] = e.partial
+                raise _Truncated(result)
+
+
+def _candidates(text):
+    """Text regions to search: fenced blocks first, then the whole text"""
+    regions = [m.group(1) for m in _FENCE.finditer(text)]
+    regions.append(text)
+    return regions
+
+
+def extract_json_object(text):
+    """
+    Return (obj, complete) for the first JSON object found in text.
+    Raises ValueError when there is no object to recover.
+    """
+    if not isinstance(text, str):
+        raise ValueError('response is not text')
+
+    errors = []
+    for region in _candidates(text):
+        start = region.find('{')
+        tried = 0
+        while start >= 0 and tried < MAX_CANDIDATES:
+            tried += 1
+            parser = _Parser(region, start)
+            try:
+                return parser.object(), True
+            except _Truncated as e:
+                if e.partial:
+                    return e.partial, False
+            except ValueError as e:
+                errors.append(str(e))
+            start = region.find('{', start + 1)
+
+    raise ValueError('no JSON object found' + (f" ({errors[0]})" if errors else ''))
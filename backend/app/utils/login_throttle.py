@@ -0,0 +1,85 @@
+"""
+Login Throttle
+Sistem Pakar Diagnosis Penyakit Tanaman Padi
+
+Limits on failed logins, kept in worker memory and counted twice:
+
+  per account  LOGIN_THROTTLE_MAX_FAILURES failures for one email within
+               LOGIN_THROTTLE_WINDOW_SECONDS; a successful login to that
+               account clears only that account's record
+  per client   LOGIN_THROTTLE_MAX_FAILURES_PER_IP failures from one client
+               address (any account) within the same window; never cleared
+               by a success, so mixing in a valid login does not reset it
+
+Over either limit a login is refused without hashing anything until the
+oldest counted failure leaves the window. The client address is
+request.remote_addr, so behind a reverse proxy TRUSTED_PROXY_COUNT must be
+set (ProxyFix in create_app) or every user shares the proxy's address.
+With several worker processes the effective limits are per process.
+"""
+
+import threading
+import time
+from collections import deque
+from flask import current_app
+
+
+class LoginThrottle:
+    _lock = threading.Lock()
+    _failures = {}  # ('ip', address) / ('account', email) -> deque of monotonic failure times
+
+    @classmethod
+    def _window(cls):
+        return current_app.config.get('LOGIN_THROTTLE_WINDOW_SECONDS', 300)
+
+    @staticmethod
+    def _keys(ip, email):
+        keys = [('ip', ip, current_app.config.get('LOGIN_THROTTLE_MAX_FAILURES_PER_IP', 50))]
+        if email:
+            keys.append(('account', str(email).strip().lower(),
+                         current_app.config.get('LOGIN_THROTTLE_MAX_FAILURES', 10)))
+        return keys
+
+    @classmethod
+    def _retry_after_key(cls, key, limit, now, window):
+        failures = cls._failures.get(key)
+        if not failures:
+            return 0
+        while failures and now - failures[0] >= window:
+            failures.popleft()
+        if not failures:
+            del cls._failures[key]
+            return 0
+        if len(failures) < limit:
+            return 0
+        return max(1, int(window - (now - failures[-limit])) + 1)
+
+    @classmethod
+    def retry_after(cls, ip, email=None):
+        """Seconds until ip may try email again, or 0 if it may try now"""
+        now = time.monotonic()
+        window = cls._window()
+        with cls._lock:
+            return max(
+                (cls._retry_after_key((kind, value), limit, now, window)
+                 for kind, value, limit in cls._keys(ip, email) if limit),
+                default=0
+            )
+
+    @classmethod
+    def record_failure(cls, ip, email=None):
+        now = time.monotonic()
+        window = cls._window()
+        with cls._lock:
+            for kind, value, _ in cls._keys(ip, email):
+                cls._failures.setdefault((kind, value), deque()).append(now)
+            if len(cls._failures) > current_app.config.get('LOGIN_THROTTLE_MAX_TRACKED_KEYS', 20000):
+                # Drop keys whose failures have all expired
+                for key in [key for key, times in cls._failures.items() if now - times[-1] >= window]:
+                    del cls._failures[key]
+
+    @classmethod
+    def record_success(cls, email):
+        """Clear the failures of this account only (the client's count stays)"""
+        with cls._lock:
+            cls._failures.pop(('account', str(email).strip().lower()), None)
@@ -0,0 +1,60 @@
+"""
+Principal Cache
+Sistem Pakar Diagnosis Penyakit Tanaman Padi
+
+Per-process cache of the user fields authorization needs (role, active
+flag), keyed by user id, so admin_required/user_required do not query
+`users` on every request.
+
+Entries expire after PRINCIPAL_CACHE_SECONDS. Changing a user's role or
+active flag, or deleting the user, must call invalidate(user_id): that
+takes effect at once in this process and within the TTL in other workers.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+from app import db
+from app.models.user import User
+
+
+class PrincipalCache:
+    _lock = threading.Lock()
+    _entries = OrderedDict()  # user_id -> (loaded_at, principal dict or None)
+
+    @classmethod
+    def get(cls, user_id):
+        """{'id', 'role', 'is_active'} for user_id, or None if the user does not exist"""
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            return None
+
+        ttl = current_app.config.get('PRINCIPAL_CACHE_SECONDS', 30)
+        now = time.monotonic()
+        with cls._lock:
+            entry = cls._entries.get(user_id)
+            if entry and now - entry[0] < ttl:
+                cls._entries.move_to_end(user_id)
+                return entry[1]
+
+        row = db.session.query(User.id, User.role, User.is_active).filter(User.id == user_id).first()
+        principal = {'id': row.id, 'role': row.role, 'is_active': row.is_active} if row else None
+
+        max_entries = current_app.config.get('PRINCIPAL_CACHE_MAX_ENTRIES', 10000)
+        with cls._lock:
+            cls._entries[user_id] = (now, principal)
+            cls._entries.move_to_end(user_id)
+            while len(cls._entries) > max_entries:
+                cls._entries.popitem(last=False)
+        return principal
+
+    @classmethod
+    def invalidate(cls, user_id=None):
+        """Drop one user (or everyone) from the cache"""
+        with cls._lock:
+            if user_id is None:
+                cls._entries.clear()
+            else:
+                cls._entries.pop(int(user_id), None)
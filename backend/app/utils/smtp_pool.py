@@ -0,0 +1,142 @@
+"""
+SMTP Connection Pool
+Sistem Pakar Diagnosis Penyakit Tanaman Padi
+
+Keeps authenticated SMTP sessions open between messages so STARTTLS and
+AUTH happen once per connection instead of once per email.
+
+  - at most `size` connections exist; acquire() waits for a free one
+  - a connection idle longer than `healthcheck_seconds` is checked with
+    NOOP before reuse, one idle longer than `idle_seconds` is closed
+  - a connection is recycled after `max_messages` (servers limit this)
+
+    pool = SMTPConnectionPool('smtp.gmail.com', 587, user, password)
+    with pool.connection() as conn:
+        conn.send_message(msg)
+"""
+
+import smtplib
+import threading
+import time
+import logging
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class PooledSMTPConnection:
+    """An SMTP session plus the bookkeeping the pool needs"""
+
+    def __init__(self, server):
+        self.server = server
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.sent = 0
+
+    def send_message(self, msg):
+        self.server.send_message(msg)
+        self.sent += 1
+        self.last_used = time.monotonic()
+
+    def is_alive(self):
+        try:
+            return self.server.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def close(self):
+        try:
+            self.server.quit()
+        except (smtplib.SMTPException, OSError):
+            self.server.close()
+
+
+class SMTPConnectionPool:
+    def __init__(self, host, port, username=None, password=None, starttls=True, size=4,
+                 timeout=10, idle_seconds=60, healthcheck_seconds=5, max_messages=100):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.size = size
+        self.timeout = timeout
+        self.idle_seconds = idle_seconds
+        self.healthcheck_seconds = healthcheck_seconds
+        self.max_messages = max_messages
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = []
+        self._opened = 0
+
+    def _connect(self):
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                server.starttls()
+            if self.username:
+                server.login(self.username, self.password)
+        except Exception:
+            server.close()
+            raise
+        with self._lock:
+            self._opened += 1
+        return PooledSMTPConnection(server)
+
+    def acquire(self):
+        """A ready connection: a healthy idle one, otherwise a new one"""
+        self._slots.acquire()
+        try:
+            while True:
+                with self._lock:
+                    conn = self._idle.pop() if self._idle else None
+                if conn is None:
+                    return self._connect()
+                idle_for = time.monotonic() - conn.last_used
+                if idle_for > self.idle_seconds:
+                    conn.close()
+                elif idle_for > self.healthcheck_seconds and not conn.is_alive():
+                    logger.info('Discarding dead SMTP connection', extra={'host': self.host})
+                    conn.server.close()
+                else:
+                    return conn
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, conn, broken=False):
+        """Return a connection; broken or worn-out ones are closed"""
+        try:
+            if broken:
+                conn.server.close()
+            elif conn.sent >= self.max_messages:
+                conn.close()
+            else:
+                with self._lock:
+                    self._idle.append(conn)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        broken = False
+        try:
+            yield conn
+        except (smtplib.SMTPServerDisconnected, OSError):
+            broken = True
+            raise
+        finally:
+            self.release(conn, broken)
+
+    def close(self):
+        """Close the idle connections (connections in use close on release)"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self.max_messages = 0
+        for conn in idle:
+            conn.close()
+
+    def stats(self):
+        with self._lock:
+            return {'idle': len(self._idle), 'size': self.size, 'opened': self._opened}
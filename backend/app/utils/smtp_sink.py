@@ -0,0 +1,129 @@
+"""
+Debugging SMTP Sink
+Sistem Pakar Diagnosis Penyakit Tanaman Padi
+
+A tiny local SMTP server that accepts every message (and any AUTH) and
+keeps it in memory instead of delivering it. Point the SMTP settings at it
+with EMAIL_SMTP_STARTTLS=false, or run it standalone with `flask mail sink`.
+
+    with SMTPSink() as sink:
+        # smtp_host=127.0.0.1, smtp_port=sink.port
+        ...
+        sink.messages  # [{'from', 'to', 'data'}]
+"""
+
+import socketserver
+import threading
+import time
+from email import message_from_bytes
+
+
+class _SinkHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode('ascii') + b'\r\n')
+
+    def handle(self):
+        sink = self.server.sink
+        with sink._lock:
+            sink.connections += 1
+        if sink.connect_delay:
+            # Stands in for the TLS + AUTH cost of a real server
+            time.sleep(sink.connect_delay)
+        self.reply('220 sink ESMTP ready')
+        mail_from, rcpt_to = None, []
+
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('utf-8', 'replace').strip()
+            verb = command.split(' ', 1)[0].upper()
+
+            if verb == 'EHLO':
+                self.wfile.write(b'250-sink\r\n250-AUTH PLAIN LOGIN\r\n250 8BITMIME\r\n')
+            elif verb == 'HELO':
+                self.reply('250 sink')
+            elif verb == 'AUTH':
+                parts = command.split()
+                if len(parts) == 2 and parts[1].upper() == 'LOGIN':
+                    # Username and password prompts; both answers are accepted
+                    for prompt in ('VXNlcm5hbWU6', 'UGFzc3dvcmQ6'):
+                        self.reply(f'334 {prompt}')
+                        self.rfile.readline()
+                self.reply('235 Authentication successful')
+            elif verb == 'MAIL':
+                mail_from, rcpt_to = command[10:].strip(), []
+                self.reply('250 OK')
+            elif verb == 'RCPT':
+                rcpt_to.append(command[8:].strip())
+                self.reply('250 OK')
+            elif verb == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                chunks = []
+                while True:
+                    data_line = self.rfile.readline()
+                    if not data_line or data_line in (b'.\r\n', b'.\n'):
+                        break
+                    chunks.append(data_line[1:] if data_line.startswith(b'..') else data_line)
+                sink.store(mail_from, rcpt_to, b''.join(chunks))
+                mail_from, rcpt_to = None, []
+                self.reply('250 OK queued')
+            elif verb in ('RSET', 'NOOP'):
+                mail_from, rcpt_to = (None, []) if verb == 'RSET' else (mail_from, rcpt_to)
+                self.reply('250 OK')
+            elif verb == 'QUIT':
+                self.reply('221 Bye')
+                return
+            elif verb == 'STARTTLS':
+                self.reply('454 TLS not available')
+            else:
+                self.reply('502 Command not implemented')
+
+
+class _SinkServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class SMTPSink:
+    def __init__(self, host='127.0.0.1', port=0, connect_delay=0.0, on_message=None):
+        self.host = host
+        self.connect_delay = connect_delay
+        self.on_message = on_message
+        self.messages = []
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._server = _SinkServer((host, port), _SinkHandler)
+        self._server.sink = self
+        self.port = self._server.server_address[1]
+        self._thread = None
+
+    def store(self, mail_from, rcpt_to, data):
+        message = {'from': mail_from, 'to': rcpt_to, 'data': data}
+        with self._lock:
+            self.messages.append(message)
+        if self.on_message:
+            self.on_message(message)
+
+    def parsed(self):
+        """Received messages as email.message.Message objects"""
+        with self._lock:
+            return [message_from_bytes(m['data']) for m in self.messages]
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='smtp-sink', daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
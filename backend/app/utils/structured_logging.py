@@ -0,0 +1,195 @@
+"""
+Structured Logging
+Sistem Pakar Diagnosis Penyakit Tanaman Padi
+
+Every module logs through logging.getLogger(__name__), which sits under the
+Flask 'app' logger. init_logging() gives that logger:
+
+- a request-context filter adding request_id / user_id / admin_id / path
+- a per-message rate limit on WARNING and above (LOG_RATE_LIMIT_PER_MINUTE,
+  0 disables), so a failing dependency cannot flood the log while
+  per-request INFO lines and events are always kept
+- a QueueHandler, so the request thread only enqueues; a QueueListener
+  thread formats (JSON or text, LOG_FORMAT) and writes to stderr
+
+Extra fields go through `extra=`, e.g.
+    logger.info('AI solution generated', extra={'provider': 'openai', 'latency_ms': 812.4})
+"""
+
+import json
+import logging
+import queue
+import sys
+import threading
+import time
+import uuid
+import atexit
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from flask import g, request, session, has_request_context
+
+# Attributes every LogRecord has; anything else on a record came from extra=
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_listener = None
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamp records with the current request's id and principal"""
+
+    def filter(self, record):
+        if has_request_context():
+            record.request_id = g.get('request_id')
+            record.path = request.path
+            record.method = request.method
+            if not hasattr(record, 'user_id'):
+                record.user_id = _jwt_user_id()
+            if 'admin_id' in session:
+                record.admin_id = session.get('admin_id')
+        return True
+
+
+def _jwt_user_id():
+    # Only read an already-verified token; never verify from inside logging
+    jwt_data = g.get('_jwt_extended_jwt')
+    if not jwt_data:
+        return None
+    return jwt_data.get('sub')
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Allow at most `per_minute` records per (logger, level, message template)
+    each minute for records at `min_level` or above; lower levels always
+    pass. The first record after a suppressed run carries `suppressed`.
+    """
+
+    def __init__(self, per_minute, min_level=logging.WARNING):
+        super().__init__()
+        self.per_minute = per_minute
+        self.min_level = min_level
+        self._lock = threading.Lock()
+        self._windows = {}
+
+    def filter(self, record):
+        if self.per_minute <= 0 or record.levelno < self.min_level:
+            return True
+
+        key = (record.name, record.levelno, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            window_start, count, suppressed = self._windows.get(key, (now, 0, 0))
+            if now - window_start >= 60:
+                window_start, count = now, 0
+            if count >= self.per_minute:
+                self._windows[key] = (window_start, count, suppressed + 1)
+                return False
+            self._windows[key] = (window_start, count + 1, 0)
+            if len(self._windows) > 10000:
+                self._windows.clear()
+
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler that drops (and counts) records when the queue is full"""
+
+    dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            NonBlockingQueueHandler.dropped += 1
+
+    def prepare(self, record):
+        # Render args/traceback now; the listener thread has no request context
+        record = logging.makeLogRecord(record.__dict__)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _extra_fields(record):
+    return {
+        key: value for key, value in record.__dict__.items()
+        if key not in _RECORD_ATTRS and not key.startswith('_') and value is not None
+    }
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        entry.update(_extra_fields(record))
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable variant for local development; extras as key=value"""
+
+    def __init__(self):
+        super().__init__('[%(asctime)s] %(levelname)s %(name)s: %(message)s')
+
+    def format(self, record):
+        line = super().format(record)
+        extras = _extra_fields(record)
+        if extras:
+            fields = ' '.join(f'{key}={value}' for key, value in extras.items())
+            first, sep, rest = line.partition('\n')
+            line = f'{first} [{fields}]{sep}{rest}'
+        return line
+
+
+def init_logging(app):
+    """Route the 'app' logger hierarchy through a queue to a single writer thread"""
+    global _listener
+    from flask.logging import default_handler
+
+    app_logger = logging.getLogger('app')
+    app_logger.setLevel(app.config.get('LOG_LEVEL', 'INFO').upper())
+    app.logger.removeHandler(default_handler)
+
+    @app.before_request
+    def assign_request_id():
+        g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+
+    @app.after_request
+    def echo_request_id(response):
+        if g.get('request_id'):
+            response.headers['X-Request-ID'] = g.request_id
+        return response
+
+    if _listener is not None:
+        # Another app in this process (tests, scripts) already installed the handlers
+        return
+
+    formatter = JsonFormatter() if app.config.get('LOG_FORMAT', 'json') == 'json' else TextFormatter()
+    stream_handler = logging.StreamHandler(sys.stderr)
+    stream_handler.setFormatter(formatter)
+
+    log_queue = queue.Queue(maxsize=app.config.get('LOG_QUEUE_SIZE', 10000))
+    queue_handler = NonBlockingQueueHandler(log_queue)
+    queue_handler.addFilter(RateLimitFilter(app.config.get('LOG_RATE_LIMIT_PER_MINUTE', 30)))
+    queue_handler.addFilter(RequestContextFilter())
+
+    app_logger.addHandler(queue_handler)
+    app_logger.propagate = False
+
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
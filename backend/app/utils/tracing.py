@@ -0,0 +1,226 @@
+"""
+Tracing Utilities
+Sistem Pakar Diagnosis Penyakit Tanaman Padi
+
+Lightweight spans with the OpenTelemetry call shape:
+
+    with start_span('diagnosis.cf_scoring', {'symptoms': 5}) as span:
+        span.set_attribute('results', 3)
+
+TRACING_EXPORTER selects the backend:
+  ''         no-op (default, near-zero overhead)
+  'console'  one JSON line per finished span on stderr
+  'file'     JSON lines appended to TRACING_FILE
+  'otel'     delegate to opentelemetry.trace (SDK configured by the deployer)
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+import contextvars
+from contextlib import contextmanager
+from functools import wraps
+
+TRACER_NAME = 'sistem_pakar_padi'
+
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+
+class NoOpSpan:
+    """Span that records nothing"""
+
+    def set_attribute(self, key, value):
+        pass
+
+    def set_attributes(self, attributes):
+        pass
+
+    def add_event(self, name, attributes=None):
+        pass
+
+    def record_exception(self, exception, attributes=None):
+        pass
+
+    def set_status(self, status, description=None):
+        pass
+
+    def is_recording(self):
+        return False
+
+    def end(self):
+        pass
+
+
+NOOP_SPAN = NoOpSpan()
+
+
+class NoOpTracer:
+    @contextmanager
+    def start_as_current_span(self, name, attributes=None, **kwargs):
+        yield NOOP_SPAN
+
+
+class Span:
+    """Recorded span; handed to the exporter when it ends"""
+
+    def __init__(self, tracer, name, parent, attributes=None):
+        self._tracer = tracer
+        self.name = name
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = dict(attributes or {})
+        self.events = []
+        self.status = 'OK'
+        self.status_description = None
+        self.start_time = time.time()
+        self._start = time.perf_counter()
+        self.duration_ms = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def set_attributes(self, attributes):
+        self.attributes.update(attributes)
+
+    def add_event(self, name, attributes=None):
+        self.events.append({
+            'name': name,
+            'offset_ms': round((time.perf_counter() - self._start) * 1000.0, 3),
+            'attributes': dict(attributes or {})
+        })
+
+    def record_exception(self, exception, attributes=None):
+        self.add_event('exception', {
+            'exception.type': type(exception).__name__,
+            'exception.message': str(exception),
+            **(attributes or {})
+        })
+
+    def set_status(self, status, description=None):
+        # Accepts 'OK'/'ERROR' or an opentelemetry Status/StatusCode
+        code = getattr(status, 'status_code', status)
+        self.status = getattr(code, 'name', str(code))
+        self.status_description = description or getattr(status, 'description', None)
+
+    def is_recording(self):
+        return self.duration_ms is None
+
+    def end(self):
+        if self.duration_ms is not None:
+            return
+        self.duration_ms = (time.perf_counter() - self._start) * 1000.0
+        self._tracer.exporter.export(self)
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'start_time': self.start_time,
+            'duration_ms': round(self.duration_ms or 0.0, 3),
+            'status': self.status,
+            'status_description': self.status_description,
+            'attributes': self.attributes,
+            'events': self.events
+        }
+
+
+class Tracer:
+    def __init__(self, exporter):
+        self.exporter = exporter
+
+    @contextmanager
+    def start_as_current_span(self, name, attributes=None, **kwargs):
+        parent = _current_span.get()
+        span = Span(self, name, parent if isinstance(parent, Span) else None, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_exception(e)
+            span.set_status('ERROR', f'{type(e).__name__}: {e}')
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+
+
+class ConsoleSpanExporter:
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stderr
+        self._lock = threading.Lock()
+
+    def export(self, span):
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            self.stream.write(line + '\n')
+            self.stream.flush()
+
+
+class FileSpanExporter:
+    """Appends one JSON object per span; safe to share between threads"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+    def export(self, span):
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+
+
+_tracer = NoOpTracer()
+
+
+def init_tracing(app):
+    """Pick the tracer from TRACING_EXPORTER (called once from create_app)"""
+    global _tracer
+    exporter = (app.config.get('TRACING_EXPORTER') or '').lower()
+
+    if exporter == 'console':
+        _tracer = Tracer(ConsoleSpanExporter())
+    elif exporter == 'file':
+        _tracer = Tracer(FileSpanExporter(app.config.get('TRACING_FILE') or 'traces.jsonl'))
+    elif exporter == 'otel':
+        try:
+            from opentelemetry import trace
+            _tracer = trace.get_tracer(TRACER_NAME)
+        except ImportError:
+            app.logger.warning('TRACING_EXPORTER=otel but opentelemetry is not installed; tracing disabled')
+            _tracer = NoOpTracer()
+    else:
+        _tracer = NoOpTracer()
+
+
+def set_tracer(tracer):
+    """Install a tracer directly (e.g. Tracer(exporter) in a test script)"""
+    global _tracer
+    _tracer = tracer
+
+
+def get_tracer():
+    return _tracer
+
+
+def start_span(name, attributes=None):
+    """Context manager for a child span of the current one"""
+    return _tracer.start_as_current_span(name, attributes=attributes)
+
+
+def traced(name):
+    """Decorator form of start_span; the tracer is resolved per call"""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with start_span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Async AI Service Benchmark
+Sistem Pakar Diagnosis Penyakit Tanaman Padi
+
+Generates --requests solutions with --concurrency in flight against a stub
+provider of fixed latency, once with AISolutionService driven by a thread
+pool (one thread per in-flight request) and once with
+AsyncAISolutionService on a single event loop, and prints wall time,
+throughput and the peak number of extra threads.
+
+Usage (from backend/):
+  python benchmarks/bench_ai_async.py
+  python benchmarks/bench_ai_async.py --requests 500 --concurrency 100 --latency-ms 300
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+os.environ['FLASK_ENV'] = 'testing'
+os.environ.setdefault('LOG_LEVEL', 'CRITICAL')
+
+from app import create_app, db  # noqa: E402
+from app.models.disease import Disease  # noqa: E402
+from app.services.ai_solution_service import AISolutionService  # noqa: E402
+from app.services.async_ai_solution_service import AsyncAISolutionService, AsyncSolutionQueue  # noqa: E402
+
+STUB_ANSWER = json.dumps({
+    'langkah_penanganan': ['Cabut tanaman terinfeksi'],
+    'rekomendasi_obat': [{'nama': 'Trisiklazol'}],
+    'panduan_penggunaan': ['Semprot pagi hari'],
+    'pencegahan': ['Gunakan varietas tahan'],
+    'pencegahan_penyakit_lain': []
+})
+
+
+class PeakThreads:
+    """Samples threading.active_count() in the background; `extra` is the peak above the start"""
+
+    def __init__(self):
+        self.baseline = threading.active_count()
+        self.peak = self.baseline
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(0.005):
+            self.peak = max(self.peak, threading.active_count())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    @property
+    def extra(self):
+        # The sampler thread itself does not count
+        return self.peak - self.baseline - 1
+
+
+def run_threads(app, disease, requests, concurrency):
+    def one(_):
+        with app.app_context():
+            return AISolutionService().generate_solution(disease, 0.8, 'certainty_factor')
+
+    with PeakThreads() as threads:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(one, range(requests)))
+        elapsed = time.perf_counter() - start
+    return elapsed, threads.extra, results
+
+
+def run_async(app, disease, requests, concurrency):
+    async def main():
+        service = AsyncAISolutionService()
+        async with AsyncSolutionQueue(service, workers=concurrency) as queue:
+            futures = [
+                await queue.submit(service.generate_solution, disease, 0.8, 'certainty_factor')
+                for _ in range(requests)
+            ]
+            return await asyncio.gather(*futures)
+
+    with app.app_context(), PeakThreads() as threads:
+        start = time.perf_counter()
+        results = asyncio.run(main())
+        elapsed = time.perf_counter() - start
+    return elapsed, threads.extra, results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark thread-based vs asyncio AI solution generation')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--latency-ms', type=float, default=200)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    latency = args.latency_ms / 1000.0
+    app = create_app('testing')
+    app.config.update(
+        AI_PROVIDER_CHAIN='stub',
+        AI_CALL_WORKERS=args.concurrency,
+        AI_ASYNC_MAX_IN_FLIGHT=args.concurrency,
+        AI_BREAKER_FAILURE_RATE=1.1
+    )
+
+    def sync_stub(service):
+        def complete(prompt):
+            time.sleep(latency)
+            return STUB_ANSWER
+        return complete
+
+    def async_stub(service):
+        async def complete(prompt):
+            await asyncio.sleep(latency)
+            return STUB_ANSWER
+        return complete
+
+    AISolutionService.register_provider('stub', sync_stub)
+    AsyncAISolutionService.register_async_provider('stub', async_stub)
+
+    with app.app_context():
+        db.create_all()
+    disease = Disease(code='P01', name='Blas', description='Penyakit blas')
+
+    print(f"{args.requests} permintaan, {args.concurrency} bersamaan, stub {args.latency_ms:.0f} ms\n")
+    header = f"{'mode':<10}{'wall s':>10}{'req/s':>10}{'+threads':>10}  answers"
+    print(header)
+    print('-' * len(header))
+    for mode, runner in (('threads', run_threads), ('asyncio', run_async)):
+        elapsed, peak, results = runner(app, disease, args.requests, args.concurrency)
+        answered = sum(1 for r in results if r.get('raw_text') == STUB_ANSWER)
+        print(f"{mode:<10}{elapsed:>10.2f}{args.requests / elapsed:>10.1f}{peak:>10}  {answered}/{args.requests}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+AI Provider Chain Benchmark
+Sistem Pakar Diagnosis Penyakit Tanaman Padi
+
+Runs AISolutionService.generate_solution against two local stub providers
+with heavy-tailed latency, once with the primary alone and once with the
+hedged chain, and prints latency percentiles plus which provider answered.
+
+Usage (from backend/):
+  python benchmarks/bench_ai_hedging.py
+  python benchmarks/bench_ai_hedging.py --calls 400 --slow-rate 0.1 --fail-rate 0.05
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+os.environ['FLASK_ENV'] = 'testing'
+# Stub failures are injected on purpose; their tracebacks are noise here
+os.environ.setdefault('LOG_LEVEL', 'CRITICAL')
+
+from app import create_app, db  # noqa: E402
+from app.models.disease import Disease  # noqa: E402
+from app.services.ai_solution_service import AISolutionService  # noqa: E402
+from benchmarks.bench_diagnosis import percentile  # noqa: E402
+
+STUB_ANSWER = json.dumps({
+    'langkah_penanganan': ['Cabut tanaman terinfeksi'],
+    'rekomendasi_obat': [],
+    'panduan_penggunaan': [],
+    'pencegahan': [],
+    'pencegahan_penyakit_lain': []
+})
+
+
+class StubProvider:
+    """Latency ~ base with probability 1 - slow_rate, otherwise slow; may raise"""
+
+    def __init__(self, name, base, slow, slow_rate, fail_rate, seed):
+        self.name = name
+        self.base = base
+        self.slow = slow
+        self.slow_rate = slow_rate
+        self.fail_rate = fail_rate
+        self._rnd = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def factory(self, service):
+        return self.complete
+
+    def complete(self, prompt):
+        with self._lock:
+            roll = self._rnd.random()
+            jitter = self._rnd.uniform(0.8, 1.2)
+        if roll < self.fail_rate:
+            time.sleep(self.base * jitter)
+            raise RuntimeError(f'{self.name}: simulated provider error')
+        delay = self.slow if roll < self.fail_rate + self.slow_rate else self.base
+        time.sleep(delay * jitter)
+        return f'Berikut solusinya:\n{STUB_ANSWER}'
+
+
+def run_mode(app, chain, calls, disease):
+    app.config['AI_PROVIDER_CHAIN'] = chain
+    latencies = []
+    winners = Counter()
+
+    with app.app_context():
+        for _ in range(calls):
+            service = AISolutionService()
+            start = time.perf_counter()
+            result = service.generate_solution(disease, 0.8, 'certainty_factor')
+            latencies.append((time.perf_counter() - start) * 1000.0)
+            winners['stub' if STUB_ANSWER in (result.get('raw_text') or '') else 'fallback'] += 1
+
+    return {
+        'p50_ms': round(percentile(latencies, 50), 1),
+        'p95_ms': round(percentile(latencies, 95), 1),
+        'p99_ms': round(percentile(latencies, 99), 1),
+        'max_ms': round(max(latencies), 1),
+        'answers': dict(winners)
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark hedged AI provider chain with stub providers')
+    parser.add_argument('--calls', type=int, default=200)
+    parser.add_argument('--base-ms', type=float, default=20)
+    parser.add_argument('--slow-ms', type=float, default=400)
+    parser.add_argument('--slow-rate', type=float, default=0.08)
+    parser.add_argument('--fail-rate', type=float, default=0.02)
+    parser.add_argument('--deadline', type=float, default=2.0)
+    parser.add_argument('--percentile', type=float, default=90)
+    parser.add_argument('--seed', type=int, default=42)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    app = create_app('testing')
+    app.config.update(
+        AI_CALL_DEADLINE_SECONDS=args.deadline,
+        AI_HEDGE_PERCENTILE=args.percentile,
+        AI_HEDGE_DELAY_SECONDS=args.slow_ms / 1000.0 / 2,
+        # Stub errors are part of the experiment; keep the breakers out of it
+        AI_BREAKER_FAILURE_RATE=1.1
+    )
+
+    for offset, name in enumerate(('stub_primary', 'stub_secondary')):
+        stub = StubProvider(
+            name, args.base_ms / 1000.0, args.slow_ms / 1000.0,
+            args.slow_rate, args.fail_rate, args.seed + offset
+        )
+        AISolutionService.register_provider(name, stub.factory)
+
+    with app.app_context():
+        db.create_all()
+        disease = Disease(code='P01', name='Blas', description='Penyakit blas')
+
+    print(f"{args.calls} panggilan; stub {args.base_ms:.0f} ms, {args.slow_rate:.0%} lambat "
+          f"({args.slow_ms:.0f} ms), {args.fail_rate:.0%} gagal\n")
+    header = f"{'mode':<10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}  answers"
+    print(header)
+    print('-' * len(header))
+    for mode, chain in (('single', 'stub_primary'), ('hedged', 'stub_primary,stub_secondary')):
+        r = run_mode(app, chain, args.calls, disease)
+        print(f"{mode:<10}{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}{r['p99_ms']:>10.1f}{r['max_ms']:>10.1f}  {r['answers']}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
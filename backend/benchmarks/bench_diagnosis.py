@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Diagnosis Pipeline Benchmarks
+Sistem Pakar Diagnosis Penyakit Tanaman Padi
+
+Measures ForwardChainingService, CertaintyFactorService.diagnose and the full
+POST /api/diagnosis/start path (Flask test client, AI solution stubbed) on a
+synthetic knowledge base, and compares against a stored baseline.
+
+Usage (from backend/):
+  python benchmarks/bench_diagnosis.py
+  python benchmarks/bench_diagnosis.py --diseases 300 --symptoms 800 --rules-per-disease 12
+  python benchmarks/bench_diagnosis.py --save-baseline
+  python benchmarks/bench_diagnosis.py --check          # exit 1 on regression
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+os.environ['FLASK_ENV'] = 'testing'
+
+from sqlalchemy import event  # noqa: E402
+from flask_jwt_extended import create_access_token  # noqa: E402
+from app import create_app, db  # noqa: E402
+from benchmarks import synthetic  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+TARGETS = ('forward_chaining', 'certainty_factor', 'diagnosis_start')
+
+
+class StubAISolutionService:
+    """Deterministic stand-in so the HTTP benchmark never calls an LLM"""
+
+    def generate_solution(self, disease, confidence, diagnosis_method='forward_chaining', secondary_diseases=None):
+        return {
+            'raw_text': f'Solusi benchmark untuk {disease.name}',
+            'structured': {
+                'langkah_penanganan': [],
+                'rekomendasi_obat': [],
+                'panduan_penggunaan': [],
+                'pencegahan': [],
+                'pencegahan_penyakit_lain': []
+            }
+        }
+
+
+class QueryCounter:
+    """Counts SQL statements issued on the engine"""
+
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+
+    def _on_execute(self, *args, **kwargs):
+        self.count += 1
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def run_target(fn, requests, counter, warmup):
+    """Run fn over the request mix: one timed pass, one tracemalloc pass"""
+    for req in requests[:warmup]:
+        fn(req)
+
+    latencies = []
+    queries = []
+    for req in requests:
+        before = counter.count
+        start = time.perf_counter()
+        fn(req)
+        latencies.append((time.perf_counter() - start) * 1000.0)
+        queries.append(counter.count - before)
+
+    allocations = []
+    tracemalloc.start()
+    try:
+        for req in requests:
+            tracemalloc.reset_peak()
+            base, _ = tracemalloc.get_traced_memory()
+            fn(req)
+            _, peak = tracemalloc.get_traced_memory()
+            allocations.append((peak - base) / 1024.0)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'requests': len(requests),
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'mean_ms': round(statistics.mean(latencies), 3),
+        'queries_per_request': round(statistics.mean(queries), 2),
+        'peak_alloc_kib': round(statistics.mean(allocations), 1)
+    }
+
+
+def run_benchmarks(args):
+    app = create_app('testing')
+    app.config['DIAGNOSIS_CACHE_SIZE'] = args.cache_size
+    # Keep the periodic fingerprint query out of the numbers so query counts are deterministic
+    app.config['KNOWLEDGE_BASE_REFRESH_SECONDS'] = 3600
+
+    import app.routes.diagnosis_routes as diagnosis_routes
+    diagnosis_routes.AISolutionService = StubAISolutionService
+
+    from app.services.forward_chaining_service import ForwardChainingService
+    from app.services.certainty_factor_service import CertaintyFactorService
+
+    results = {}
+    with app.app_context():
+        db.create_all()
+        disease_symptoms = synthetic.build_knowledge_base(
+            args.diseases, args.symptoms, args.rules_per_disease, seed=args.seed
+        )
+        # One user per call so the 10-second duplicate-submission check never short-circuits
+        user_ids = synthetic.build_users(args.users or args.warmup + 2 * args.requests)
+        requests = synthetic.build_request_mix(
+            disease_symptoms, args.symptoms, args.requests, seed=args.seed
+        )
+        counter = QueryCounter(db.engine)
+
+        def forward_chaining(req):
+            ForwardChainingService().diagnose(req['symptom_ids'])
+
+        def certainty_factor(req):
+            CertaintyFactorService().diagnose(req['symptom_ids'], req['certainty_values'])
+
+        tokens = [create_access_token(identity=str(uid)) for uid in user_ids]
+        client = app.test_client()
+        state = {'n': 0}
+
+        def diagnosis_start(req):
+            token = tokens[state['n'] % len(tokens)]
+            state['n'] += 1
+            response = client.post(
+                '/api/diagnosis/start',
+                json=req,
+                headers={'Authorization': f'Bearer {token}'}
+            )
+            if response.status_code >= 500:
+                raise RuntimeError(f'/api/diagnosis/start failed: {response.status_code}')
+
+        targets = {
+            'forward_chaining': forward_chaining,
+            'certainty_factor': certainty_factor,
+            'diagnosis_start': diagnosis_start
+        }
+        for name in args.targets:
+            results[name] = run_target(targets[name], requests, counter, args.warmup)
+
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Return a list of regression messages (empty when within tolerance)"""
+    regressions = []
+    for name, current in results.items():
+        expected = baseline.get('results', {}).get(name)
+        if not expected:
+            continue
+        # Query counts are deterministic for a given config: any increase is a regression
+        if current['queries_per_request'] > expected['queries_per_request'] + 0.01:
+            regressions.append(
+                f"{name}: queries/request {expected['queries_per_request']} -> {current['queries_per_request']}"
+            )
+        for metric in ('p50_ms', 'p95_ms'):
+            limit = expected[metric] * (1 + tolerance)
+            if current[metric] > limit:
+                regressions.append(
+                    f'{name}: {metric} {expected[metric]} -> {current[metric]} (limit {limit:.3f})'
+                )
+    return regressions
+
+
+def print_table(results):
+    header = f"{'target':<18}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>10}{'alloc KiB':>11}"
+    print(header)
+    print('-' * len(header))
+    for name, r in results.items():
+        print(
+            f"{name:<18}{r['requests']:>6}{r['p50_ms']:>10.3f}{r['p95_ms']:>10.3f}"
+            f"{r['p99_ms']:>10.3f}{r['queries_per_request']:>10.2f}{r['peak_alloc_kib']:>11.1f}"
+        )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the diagnosis pipeline')
+    parser.add_argument('--diseases', type=int, default=50)
+    parser.add_argument('--symptoms', type=int, default=200)
+    parser.add_argument('--rules-per-disease', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--users', type=int, default=0,
+                        help='distinct users for the HTTP target (default: one per call)')
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--cache-size', type=int, default=0,
+                        help='DIAGNOSIS_CACHE_SIZE during the run (0 measures the engine itself)')
+    parser.add_argument('--targets', nargs='+', choices=TARGETS, default=list(TARGETS))
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--check', action='store_true', help='exit 1 if slower than the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help='allowed latency increase over baseline (0.5 = +50%%)')
+    parser.add_argument('--json', dest='json_out', help='also write results to this file')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    config = {
+        'diseases': args.diseases,
+        'symptoms': args.symptoms,
+        'rules_per_disease': args.rules_per_disease,
+        'requests': args.requests,
+        'seed': args.seed,
+        'cache_size': args.cache_size
+    }
+
+    print(f"Knowledge base: {args.diseases} penyakit x {args.symptoms} gejala, "
+          f"{args.rules_per_disease} rule/penyakit; {args.requests} request\n")
+    results = run_benchmarks(args)
+    print_table(results)
+
+    report = {'config': config, 'results': results}
+    if args.json_out:
+        with open(args.json_out, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+        print(f'\nBaseline disimpan ke {args.baseline}')
+        return 0
+
+    if args.check:
+        if not os.path.exists(args.baseline):
+            print(f'\nBaseline tidak ditemukan: {args.baseline}')
+            return 1
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('config') != config:
+            print('\nKonfigurasi berbeda dari baseline, perbandingan dilewati.')
+            return 0
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print('\nREGRESI terdeteksi:')
+            for line in regressions:
+                print(f'  - {line}')
+            return 1
+        print('\nTidak ada regresi dibanding baseline.')
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
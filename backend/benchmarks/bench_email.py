@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Email Delivery Benchmark
+Sistem Pakar Diagnosis Penyakit Tanaman Padi
+
+Sends a batch of emails to a local SMTP sink whose connection setup is
+slowed down to stand in for TLS + AUTH, once with a new SMTP session per
+message (the old EmailService behaviour) and once with EmailService.send_many
+over the connection pool, and prints throughput and connections opened.
+
+Usage (from backend/):
+  python benchmarks/bench_email.py
+  python benchmarks/bench_email.py --messages 2000 --connect-ms 150 --pool-size 8
+"""
+
+import argparse
+import os
+import smtplib
+import sys
+import time
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+os.environ['FLASK_ENV'] = 'testing'
+os.environ.setdefault('LOG_LEVEL', 'CRITICAL')
+
+from app import create_app, db  # noqa: E402
+from app.models.system_settings import SystemSettings  # noqa: E402
+from app.services.email_service import EmailService  # noqa: E402
+from app.utils.smtp_sink import SMTPSink  # noqa: E402
+
+
+def per_message(service, messages):
+    """One connect + login per email, like EmailService.send_email before pooling"""
+    for item in messages:
+        msg = service._build_message(item['to_email'], item['subject'], item['body'])
+        with smtplib.SMTP(service.smtp_host, service.smtp_port, timeout=10) as server:
+            server.login(service.smtp_username, service.smtp_password)
+            server.send_message(msg)
+    return len(messages)
+
+
+def pooled(service, messages):
+    return service.send_many(messages)['sent']
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark pooled SMTP delivery against a local sink')
+    parser.add_argument('--messages', type=int, default=500)
+    parser.add_argument('--connect-ms', type=float, default=50)
+    parser.add_argument('--pool-size', type=int, default=4)
+    parser.add_argument('--per-connection', type=int, default=100)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    app = create_app('testing')
+    app.config.update(
+        EMAIL_SMTP_STARTTLS=False,
+        EMAIL_SMTP_POOL_SIZE=args.pool_size,
+        EMAIL_MESSAGES_PER_CONNECTION=args.per_connection
+    )
+    messages = [
+        {'to_email': f'petani{i}@example.com', 'subject': 'Info', 'body': f'Pesan nomor {i}'}
+        for i in range(args.messages)
+    ]
+
+    print(f"{args.messages} email; koneksi SMTP {args.connect_ms:.0f} ms, pool {args.pool_size}\n")
+    header = f"{'mode':<14}{'seconds':>10}{'msg/s':>10}{'sent':>8}{'conns':>8}"
+    print(header)
+    print('-' * len(header))
+
+    with SMTPSink(connect_delay=args.connect_ms / 1000.0) as sink, app.app_context():
+        db.create_all()
+        for key, value in (('enable_email_notifications', 'true'), ('smtp_host', sink.host),
+                           ('smtp_port', str(sink.port)), ('smtp_username', 'bench@example.com'),
+                           ('smtp_password', 'bench')):
+            db.session.add(SystemSettings(setting_key=key, setting_value=value))
+        db.session.commit()
+
+        for mode, send in (('per-message', per_message), ('pooled', pooled)):
+            EmailService.invalidate_settings()
+            service = EmailService()
+            connections = sink.connections
+            start = time.perf_counter()
+            sent = send(service, messages)
+            elapsed = time.perf_counter() - start
+            print(f"{mode:<14}{elapsed:>10.2f}{sent / elapsed:>10.0f}{sent:>8}{sink.connections - connections:>8}")
+        EmailService.invalidate_settings()
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
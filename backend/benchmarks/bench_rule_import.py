@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Rule Import Benchmark
+Sistem Pakar Diagnosis Penyakit Tanaman Padi
+
+Loads a synthetic regional rule pack into an empty rule base, once the way
+the admin form wrote rules (per disease: scan for the last rule code, add
+one ORM object per rule, commit) and once with RuleImportService (validate
+in memory, executemany upsert, one commit), then re-imports the pack as an
+upsert of existing rules.
+
+Usage (from backend/):
+  python benchmarks/bench_rule_import.py
+  python benchmarks/bench_rule_import.py --diseases 200 --symptoms 400 --rules-per-disease 25
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+os.environ['FLASK_ENV'] = 'testing'
+os.environ.setdefault('LOG_LEVEL', 'CRITICAL')
+
+from sqlalchemy import insert  # noqa: E402
+from app import create_app, db  # noqa: E402
+from app.models.disease import Disease  # noqa: E402
+from app.models.symptom import Symptom  # noqa: E402
+from app.models.rule import Rule, RuleCodeCounter  # noqa: E402
+from app.services.rule_import_service import RuleImportService  # noqa: E402
+
+
+def build_catalog(num_diseases, num_symptoms):
+    db.session.execute(insert(Disease), [
+        {'id': i, 'code': f'P{i:04d}', 'name': f'Penyakit {i}'} for i in range(1, num_diseases + 1)
+    ])
+    db.session.execute(insert(Symptom), [
+        {'id': i, 'code': f'G{i:04d}', 'name': f'Gejala {i}', 'category': 'daun', 'mb_value': 0.8, 'md_value': 0.2}
+        for i in range(1, num_symptoms + 1)
+    ])
+    db.session.commit()
+
+
+def build_pack(num_diseases, num_symptoms, rules_per_disease, seed=42):
+    rnd = random.Random(seed)
+    return [
+        {
+            'disease_code': f'P{disease_id:04d}',
+            'symptom_code': f'G{symptom_id:04d}',
+            'cf_value': round(rnd.uniform(0.6, 1.0), 2),
+            'min_symptom_match': 3
+        }
+        for disease_id in range(1, num_diseases + 1)
+        for symptom_id in rnd.sample(range(1, num_symptoms + 1), rules_per_disease)
+    ]
+
+
+def orm_per_disease(pack):
+    """The old admin form path, one request per disease"""
+    by_disease = {}
+    for row in pack:
+        by_disease.setdefault(row['disease_code'], []).append(row)
+    for disease_code, rows in by_disease.items():
+        disease = Disease.query.filter_by(code=disease_code).first()
+        last_rule = Rule.query.order_by(Rule.id.desc()).first()
+        next_num = int(last_rule.rule_code[1:]) + 1 if last_rule else 1
+        for row in rows:
+            symptom = Symptom.query.filter_by(code=row['symptom_code']).first()
+            db.session.add(Rule(
+                rule_code=f'R{str(next_num).zfill(3)}',
+                disease_id=disease.id,
+                symptom_id=symptom.id,
+                symptom_ids=[symptom.id],
+                confidence_level=row['cf_value'],
+                mb=float(symptom.mb_value) * row['cf_value'],
+                md=float(symptom.md_value) * row['cf_value'],
+                min_symptom_match=row['min_symptom_match'],
+                is_active=True
+            ))
+            next_num += 1
+        db.session.commit()
+    return len(pack)
+
+
+def bulk_import(pack):
+    summary, errors = RuleImportService.import_rules(pack)
+    if errors:
+        raise RuntimeError(errors)
+    return summary['inserted'] + summary['updated']
+
+
+def reset_rules():
+    db.session.query(Rule).delete()
+    db.session.query(RuleCodeCounter).delete()
+    db.session.commit()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark bulk rule import against per-object ORM writes')
+    parser.add_argument('--diseases', type=int, default=100)
+    parser.add_argument('--symptoms', type=int, default=300)
+    parser.add_argument('--rules-per-disease', type=int, default=30)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    app = create_app('testing')
+    pack = build_pack(args.diseases, args.symptoms, min(args.rules_per_disease, args.symptoms))
+
+    print(f"{len(pack)} rule, {args.diseases} penyakit, {args.symptoms} gejala\n")
+    header = f"{'mode':<16}{'seconds':>10}{'rules/s':>10}{'rules':>8}"
+    print(header)
+    print('-' * len(header))
+
+    with app.app_context():
+        db.create_all()
+        build_catalog(args.diseases, args.symptoms)
+
+        for mode, load, fresh in (('orm-per-disease', orm_per_disease, True),
+                                  ('bulk-insert', bulk_import, True),
+                                  ('bulk-upsert', bulk_import, False)):
+            if fresh:
+                reset_rules()
+            start = time.perf_counter()
+            written = load(pack)
+            elapsed = time.perf_counter() - start
+            print(f"{mode:<16}{elapsed:>10.2f}{written / elapsed:>10.0f}{written:>8}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
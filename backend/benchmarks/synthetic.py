@@ -0,0 +1,101 @@
+"""
+Synthetic knowledge base and request mix for benchmarks
+Sistem Pakar Diagnosis Penyakit Tanaman Padi
+"""
+
+import random
+from sqlalchemy import insert
+from app import db
+from app.models.disease import Disease
+from app.models.symptom import Symptom
+from app.models.rule import Rule
+from app.models.user import User
+
+CERTAINTY_CHOICES = ['pasti', 'hampir_pasti', 'kemungkinan_besar', 'mungkin']
+CATEGORIES = ['daun', 'batang', 'akar', 'bulir', 'malai', 'pertumbuhan']
+
+
+def build_knowledge_base(num_diseases, num_symptoms, rules_per_disease, seed=42):
+    """
+    Insert a random rule base: every disease gets rules_per_disease distinct
+    symptoms with MB > MD. Returns {disease_id: [symptom_id, ...]}.
+    """
+    rnd = random.Random(seed)
+    rules_per_disease = min(rules_per_disease, num_symptoms)
+
+    db.session.execute(insert(Disease), [
+        {'id': i, 'code': f'P{i:04d}', 'name': f'Penyakit {i}', 'description': f'Penyakit sintetis {i}'}
+        for i in range(1, num_diseases + 1)
+    ])
+    db.session.execute(insert(Symptom), [
+        {
+            'id': i,
+            'code': f'G{i:04d}',
+            'name': f'Gejala {i}',
+            'category': rnd.choice(CATEGORIES),
+            'mb_value': 0.5,
+            'md_value': 0.5
+        }
+        for i in range(1, num_symptoms + 1)
+    ])
+
+    disease_symptoms = {}
+    rule_rows = []
+    rule_num = 1
+    for disease_id in range(1, num_diseases + 1):
+        symptom_ids = rnd.sample(range(1, num_symptoms + 1), rules_per_disease)
+        disease_symptoms[disease_id] = symptom_ids
+        for symptom_id in symptom_ids:
+            mb = round(rnd.uniform(0.5, 1.0), 2)
+            md = round(rnd.uniform(0.0, 0.3), 2)
+            rule_rows.append({
+                'rule_code': f'R{rule_num:03d}',
+                'disease_id': disease_id,
+                'symptom_id': symptom_id,
+                'symptom_ids': [symptom_id],
+                'confidence_level': 1.0,
+                'mb': mb,
+                'md': md,
+                'min_symptom_match': 3,
+                'is_active': True
+            })
+            rule_num += 1
+    db.session.execute(insert(Rule), rule_rows)
+    db.session.commit()
+
+    return disease_symptoms
+
+
+def build_users(count):
+    """Plain users without passwords; benchmarks mint JWTs directly"""
+    db.session.execute(insert(User), [
+        {'email': f'bench{i}@gmail.com', 'full_name': f'Bench {i}', 'role': 'user', 'is_active': True}
+        for i in range(1, count + 1)
+    ])
+    db.session.commit()
+    return [u.id for u in User.query.filter(User.email.like('bench%')).all()]
+
+
+def build_request_mix(disease_symptoms, num_symptoms, count, seed=42, noise=2):
+    """
+    Requests modelled on a farmer looking at one real disease: 3-8 of its
+    symptoms plus a few unrelated ones, each with a random certainty level.
+    """
+    rnd = random.Random(seed + 1)
+    disease_ids = list(disease_symptoms)
+    requests = []
+
+    for _ in range(count):
+        disease_id = rnd.choice(disease_ids)
+        own = disease_symptoms[disease_id]
+        chosen = rnd.sample(own, min(len(own), rnd.randint(3, 8)))
+        for _ in range(rnd.randint(0, noise)):
+            extra = rnd.randint(1, num_symptoms)
+            if extra not in chosen:
+                chosen.append(extra)
+        requests.append({
+            'symptom_ids': chosen,
+            'certainty_values': {str(sid): rnd.choice(CERTAINTY_CHOICES) for sid in chosen}
+        })
+
+    return requests
@@ -2,45 +2,167 @@
 """
 Migrate data from local SQLite DB to Postgres.
 
-Usage (inside backend container):
+Usage (inside backend container, after `flask db upgrade` on Postgres):
   SQLITE_PATH=/app/instance/pakar_padi.db python migrate_sqlite_to_postgres.py
+
+Tables are streamed in chunks of CHUNK_SIZE rows (keyset on the primary
+key) and written with COPY ... FROM STDIN, one commit per chunk, so memory
+stays flat and an interrupted run can continue where it stopped.
+
+Environment:
+  DATABASE_URL    target Postgres (required)
+  SQLITE_PATH     source database (default /app/instance/pakar_padi.db)
+  RESET_TARGET    true: truncate the target tables first; refused when a
+                  table outside TABLES references one of them
+  RESUME          true: continue tables that already have rows (after the
+                  highest copied id) instead of refusing to run
+  CHUNK_SIZE      rows per COPY/commit (default 10000)
+  PARALLEL_JOBS   tables copied at once; only tables without foreign keys
+                  between them run together (default 1)
+  TABLES          comma separated subset of tables (default: all)
 """
 
 import os
 import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import psycopg
 
 
-TABLE_ORDER = [
-    "users",
-    "diseases",
-    "symptoms",
-    "rules",
-    "diagnosis_history",
-    "admin_logs",
-    "system_settings",
-]
-
-BOOLEAN_COLUMNS = {
-    "users": {"is_active"},
-    "rules": {"is_active"},
-    "diagnosis_history": {"is_saved"},
+# SQLite-only bookkeeping: Alembic state is created by `flask db upgrade`,
+# rule codes come from rule_code_seq on Postgres (set at the end)
+SKIP_TABLES = {"alembic_version", "rule_code_counter"}
+PROGRESS_INTERVAL_SECONDS = 5
+
+_print_lock = threading.Lock()
+
+
+def _log(message):
+    with _print_lock:
+        print(message, flush=True)
+
+
+def _env_flag(name):
+    return os.environ.get(name, "false").lower() == "true"
+
+
+def _sqlite_tables(conn):
+    """User tables, without FTS/virtual tables and their shadow tables"""
+    rows = conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+    ).fetchall()
+    virtual = [name for name, sql in rows if (sql or "").upper().startswith("CREATE VIRTUAL TABLE")]
+    return [
+        name for name, _ in rows
+        if name not in SKIP_TABLES
+        and name not in virtual
+        and not any(name.startswith(f"{v}_") for v in virtual)
+    ]
+
+
+def _sqlite_columns(conn, table):
+    return [row[1] for row in conn.execute(f'PRAGMA table_info("{table}")')]
+
+
+def _pg_columns(conn, table):
+    """{column: data_type} of a Postgres table (empty if it does not exist)"""
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT column_name, data_type FROM information_schema.columns "
+            "WHERE table_schema = current_schema() AND table_name = %s",
+            (table,)
+        )
+        return dict(cur.fetchall())
+
+
+def _pg_primary_key(conn, table):
+    """The single integer primary key column, or None"""
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT a.attname, format_type(a.atttypid, a.atttypmod) FROM pg_index i "
+            "JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey) "
+            "WHERE i.indrelid = %s::regclass AND i.indisprimary",
+            (f'"{table}"',)
+        )
+        rows = cur.fetchall()
+    if len(rows) == 1 and rows[0][1] in ("integer", "bigint", "smallint"):
+        return rows[0][0]
+    return None
+
+
+def _pg_foreign_keys(conn):
+    """[(child table, parent table)] for every foreign key in the current schema"""
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT cl.relname, ref.relname FROM pg_constraint c "
+            "JOIN pg_class cl ON cl.oid = c.conrelid "
+            "JOIN pg_class ref ON ref.oid = c.confrelid "
+            "WHERE c.contype = 'f' AND cl.relnamespace = current_schema()::text::regnamespace"
+        )
+        return cur.fetchall()
+
+
+def _pg_dependencies(conn, tables):
+    """{table: set of tables it references} within `tables`"""
+    deps = {table: set() for table in tables}
+    for child, parent in _pg_foreign_keys(conn):
+        if child in deps and parent in deps and child != parent:
+            deps[child].add(parent)
+    return deps
+
+
+def _levels(deps):
+    """Tables grouped so that each group only references earlier groups"""
+    remaining = {table: set(parents) for table, parents in deps.items()}
+    levels = []
+    while remaining:
+        ready = sorted(table for table, parents in remaining.items() if not parents)
+        if not ready:
+            # Circular foreign keys: copy the rest one by one in name order
+            ready = [sorted(remaining)[0]]
+        levels.append(ready)
+        for table in ready:
+            del remaining[table]
+        for parents in remaining.values():
+            parents.difference_update(ready)
+    return levels
+
+
+def _to_bool(value):
+    if value is None or isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "t", "true", "y", "yes")
+    return bool(value)
+
+
+def _to_bytes(value):
+    # Pickled blobs (rules.symptom_ids) come back as bytes; old rows may be text
+    if value is None or isinstance(value, bytes):
+        return value
+    if isinstance(value, memoryview):
+        return value.tobytes()
+    return str(value).encode("utf-8")
+
+
+CONVERTERS = {
+    "boolean": _to_bool,
+    "bytea": _to_bytes,
 }
 
 
-def _get_sqlite_rows(conn, table):
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
-    cur.execute(f'SELECT * FROM "{table}"')
-    rows = cur.fetchall()
-    cols = [desc[0] for desc in cur.description]
-    return cols, rows
+def _pg_count(conn, table):
+    with conn.cursor() as cur:
+        cur.execute(f'SELECT COUNT(*) FROM "{table}"')
+        return cur.fetchone()[0]
 
 
-def _pg_has_rows(conn, table):
+def _pg_max(conn, table, column):
     with conn.cursor() as cur:
-        cur.execute(f'SELECT 1 FROM "{table}" LIMIT 1')
-        return cur.fetchone() is not None
+        cur.execute(f'SELECT MAX("{column}") FROM "{table}"')
+        return cur.fetchone()[0]
 
 
 def _pg_set_sequence(conn, table, id_col="id"):
@@ -51,7 +173,115 @@ def _pg_set_sequence(conn, table, id_col="id"):
             return
         cur.execute(f'SELECT COALESCE(MAX("{id_col}"), 0) FROM "{table}"')
         max_id = cur.fetchone()[0] or 0
-        cur.execute("SELECT setval(%s, %s, %s)", (seq, max_id, True))
+        cur.execute("SELECT setval(%s, %s, %s)", (seq, max(max_id, 1), max_id > 0))
+
+
+def _pg_set_rule_code_sequence(conn):
+    """Continue rule_code_seq after the highest R### code copied"""
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass('rule_code_seq'), to_regclass('rules')")
+        seq, rules = cur.fetchone()
+        if not seq or not rules:
+            return
+        cur.execute("SELECT COALESCE(MAX(substring(rule_code from 2)::int), 0) FROM rules WHERE rule_code ~ '^R[0-9]+$'")
+        last = cur.fetchone()[0]
+        cur.execute("SELECT setval('rule_code_seq', %s, %s)", (max(last, 1), last > 0))
+
+
+class TableCopy:
+    """Streams one table from SQLite to Postgres"""
+
+    def __init__(self, table, sqlite_path, pg_dsn, chunk_size):
+        self.table = table
+        self.sqlite_path = sqlite_path
+        self.pg_dsn = pg_dsn
+        self.chunk_size = chunk_size
+
+    def run(self):
+        sqlite_conn = sqlite3.connect(self.sqlite_path)
+        pg_conn = psycopg.connect(self.pg_dsn)
+        try:
+            return self._copy(sqlite_conn, pg_conn)
+        finally:
+            sqlite_conn.close()
+            pg_conn.close()
+
+    def _copy(self, sqlite_conn, pg_conn):
+        table = self.table
+        pg_types = _pg_columns(pg_conn, table)
+        columns = [c for c in _sqlite_columns(sqlite_conn, table) if c in pg_types]
+        dropped = [c for c in _sqlite_columns(sqlite_conn, table) if c not in pg_types]
+        if dropped:
+            _log(f"{table}: kolom tidak ada di Postgres, dilewati: {', '.join(dropped)}")
+        converters = [(i, CONVERTERS[pg_types[c]]) for i, c in enumerate(columns) if pg_types[c] in CONVERTERS]
+
+        key = _pg_primary_key(pg_conn, table)
+        if key not in columns:
+            key = None
+        start_after = None
+        if key:
+            start_after = _pg_max(pg_conn, table, key)
+        elif _pg_count(pg_conn, table):
+            source_rows = sqlite_conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+            if _pg_count(pg_conn, table) == source_rows:
+                _log(f"{table}: sudah lengkap, dilewati")
+                return 0
+            raise RuntimeError(f'Tabel "{table}" tanpa primary key integer sudah terisi sebagian; gunakan RESET_TARGET=true')
+
+        where = f'WHERE "{key}" > ?' if key and start_after is not None else ""
+        params = (start_after,) if where else ()
+        total = sqlite_conn.execute(f'SELECT COUNT(*) FROM "{table}" {where}', params).fetchone()[0]
+        if start_after is not None:
+            _log(f"{table}: melanjutkan setelah {key}={start_after}, sisa {total} baris")
+        if not total:
+            return 0
+
+        column_list = ", ".join(f'"{c}"' for c in columns)
+        order = f'"{key}"' if key else "rowid"
+        key_index = columns.index(key) if key else None
+        copied = 0
+        started = time.monotonic()
+        reported = started
+        cursor = sqlite_conn.cursor()
+        if not key:
+            # No resume key: stream the whole table through one cursor and commit once
+            cursor.execute(f'SELECT {column_list} FROM "{table}" ORDER BY {order}')
+
+        while True:
+            if key:
+                cursor.execute(
+                    f'SELECT {column_list} FROM "{table}" {where} ORDER BY {order} LIMIT ?',
+                    params + (self.chunk_size,)
+                )
+            rows = cursor.fetchmany(self.chunk_size)
+            if not rows:
+                break
+
+            with pg_conn.cursor() as cur:
+                with cur.copy(f'COPY "{table}" ({column_list}) FROM STDIN') as copy:
+                    for row in rows:
+                        if converters:
+                            row = list(row)
+                            for index, convert in converters:
+                                row[index] = convert(row[index])
+                        copy.write_row(row)
+            if key:
+                pg_conn.commit()
+                where = f'WHERE "{key}" > ?'
+                params = (rows[-1][key_index],)
+            copied += len(rows)
+
+            now = time.monotonic()
+            if now - reported >= PROGRESS_INTERVAL_SECONDS:
+                reported = now
+                rate = copied / (now - started)
+                eta = (total - copied) / rate if rate else 0
+                _log(f"{table}: {copied}/{total} ({copied * 100 // total}%), {rate:,.0f} baris/detik, sisa ~{eta:,.0f} detik")
+
+        pg_conn.commit()
+        elapsed = time.monotonic() - started
+        _log(f"{table}: {copied} baris dalam {elapsed:.1f} detik")
+        return copied
 
 
 def main():
@@ -64,56 +294,79 @@ def main():
     if not os.path.exists(sqlite_path):
         raise FileNotFoundError(f"SQLite DB tidak ditemukan: {sqlite_path}")
 
-    reset_target = os.environ.get("RESET_TARGET", "false").lower() == "true"
+    reset_target = _env_flag("RESET_TARGET")
+    resume = _env_flag("RESUME")
+    chunk_size = int(os.environ.get("CHUNK_SIZE", 10000))
+    jobs = max(1, int(os.environ.get("PARALLEL_JOBS", 1)))
+    only = [t.strip() for t in os.environ.get("TABLES", "").split(",") if t.strip()]
 
     sqlite_conn = sqlite3.connect(sqlite_path)
     pg_conn = psycopg.connect(pg_dsn)
     pg_conn.execute("SET client_min_messages TO WARNING;")
 
     try:
+        tables = []
+        for table in _sqlite_tables(sqlite_conn):
+            if only and table not in only:
+                continue
+            if not _pg_columns(pg_conn, table):
+                print(f'{table}: tidak ada di Postgres, dilewati (jalankan `flask db upgrade` dulu?)')
+                continue
+            tables.append(table)
+
         # Safety check
-        if not reset_target:
-            for table in TABLE_ORDER:
-                if _pg_has_rows(pg_conn, table):
+        if not reset_target and not resume:
+            for table in tables:
+                if _pg_count(pg_conn, table):
                     raise RuntimeError(
                         f'Tabel "{table}" di Postgres sudah berisi data. '
-                        "Set RESET_TARGET=true jika ingin menimpa."
+                        "Set RESET_TARGET=true untuk menimpa atau RESUME=true untuk melanjutkan."
                     )
 
-        if reset_target:
+        if reset_target and tables:
+            # Never CASCADE: with a TABLES subset that would also empty tables
+            # outside it (TABLES=users would wipe diagnosis_history, jobs, ...)
+            outside = sorted({
+                f"{child} -> {parent}" for child, parent in _pg_foreign_keys(pg_conn)
+                if parent in tables and child not in tables
+            })
+            if outside:
+                raise RuntimeError(
+                    "RESET_TARGET tidak bisa mengosongkan tabel yang masih dirujuk tabel di luar TABLES: "
+                    + ", ".join(outside)
+                    + ". Tambahkan tabel tersebut ke TABLES atau kosongkan TABLES."
+                )
             with pg_conn.cursor() as cur:
-                for table in reversed(TABLE_ORDER):
-                    cur.execute(f'TRUNCATE TABLE "{table}" RESTART IDENTITY CASCADE')
-
-        with pg_conn.cursor() as cur:
-            for table in TABLE_ORDER:
-                cols, rows = _get_sqlite_rows(sqlite_conn, table)
-                if not rows:
-                    continue
-                print(f"{table}: {len(rows)} rows")
-                rows = [list(row) for row in rows]
-                bool_cols = BOOLEAN_COLUMNS.get(table, set())
-                if bool_cols:
-                    bool_idx = [i for i, c in enumerate(cols) if c in bool_cols]
-                    for row in rows:
-                        for i in bool_idx:
-                            if row[i] is not None:
-                                row[i] = bool(row[i])
-                placeholders = ",".join(["%s"] * len(cols))
-                col_list = ",".join([f'"{c}"' for c in cols])
-                insert_sql = f'INSERT INTO "{table}" ({col_list}) VALUES ({placeholders})'
-                cur.executemany(insert_sql, rows)
-        pg_conn.commit()
+                cur.execute(
+                    "TRUNCATE TABLE " + ", ".join(f'"{t}"' for t in tables) + " RESTART IDENTITY"
+                )
+            pg_conn.commit()
+
+        levels = _levels(_pg_dependencies(pg_conn, tables))
+        started = time.monotonic()
+        total = 0
+        for level in levels:
+            copies = [TableCopy(table, sqlite_path, pg_dsn, chunk_size) for table in level]
+            if jobs > 1 and len(copies) > 1:
+                with ThreadPoolExecutor(max_workers=jobs) as executor:
+                    total += sum(executor.map(lambda c: c.run(), copies))
+            else:
+                total += sum(c.run() for c in copies)
 
-        for table in TABLE_ORDER:
+        for table in tables:
             _pg_set_sequence(pg_conn, table)
+        _pg_set_rule_code_sequence(pg_conn)
         pg_conn.commit()
 
-        print("Migrasi selesai.")
+        print(f"Migrasi selesai: {total} baris dalam {time.monotonic() - started:.1f} detik.")
     finally:
         sqlite_conn.close()
         pg_conn.close()
 
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    except (RuntimeError, FileNotFoundError, psycopg.Error) as e:
+        print(f"Gagal: {e}", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,106 @@
+"""Add users.search_text with trigram (PostgreSQL) or FTS5 (SQLite) index
+
+Revision ID: a7d3f9b5c2e8
+Revises: f6b2d8e4a3c7
+Create Date: 2026-10-19 17:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7d3f9b5c2e8'
+down_revision = 'f6b2d8e4a3c7'
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def _column_exists(conn, table_name, column_name):
+    return column_name in [column['name'] for column in sa.inspect(conn).get_columns(table_name)]
+
+
+def _table_exists(conn, table_name):
+    return table_name in sa.inspect(conn).get_table_names()
+
+
+def _backfill_search_text(conn):
+    """Fill search_text with User.build_search_text (the same normalization the
+    model listener applies: Unicode lower(), inner whitespace collapsed),
+    BACKFILL_BATCH_SIZE users at a time in id order"""
+    from app.models.user import User
+
+    users = sa.table(
+        'users',
+        sa.column('id', sa.Integer),
+        sa.column('email', sa.String),
+        sa.column('full_name', sa.String),
+        sa.column('search_text', sa.String),
+    )
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(users.c.id, users.c.email, users.c.full_name)
+            .where(users.c.id > last_id)
+            .order_by(users.c.id)
+            .limit(BACKFILL_BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            return
+        conn.execute(
+            users.update().where(users.c.id == sa.bindparam('user_id')),
+            [{'user_id': row.id, 'search_text': User.build_search_text(row.email, row.full_name)}
+             for row in rows]
+        )
+        last_id = rows[-1].id
+
+
+def upgrade():
+    conn = op.get_bind()
+    if not _column_exists(conn, 'users', 'search_text'):
+        with op.batch_alter_table('users') as batch_op:
+            batch_op.add_column(sa.Column('search_text', sa.String(length=400), nullable=True))
+    _backfill_search_text(conn)
+
+    if conn.dialect.name == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute(
+            "CREATE INDEX IF NOT EXISTS ix_users_search_text_trgm "
+            "ON users USING gin (search_text gin_trgm_ops)"
+        )
+    elif conn.dialect.name == 'sqlite' and not _table_exists(conn, 'users_fts'):
+        try:
+            op.execute(
+                "CREATE VIRTUAL TABLE users_fts USING fts5("
+                "search_text, content='users', content_rowid='id', tokenize='trigram')"
+            )
+        except sa.exc.OperationalError:
+            # SQLite built without FTS5/trigram (< 3.34): search falls back to LIKE
+            return
+        op.execute("INSERT INTO users_fts(rowid, search_text) SELECT id, search_text FROM users")
+        op.execute(
+            "CREATE TRIGGER users_fts_ai AFTER INSERT ON users BEGIN "
+            "INSERT INTO users_fts(rowid, search_text) VALUES (new.id, new.search_text); END"
+        )
+        op.execute(
+            "CREATE TRIGGER users_fts_ad AFTER DELETE ON users BEGIN "
+            "INSERT INTO users_fts(users_fts, rowid, search_text) VALUES ('delete', old.id, old.search_text); END"
+        )
+        op.execute(
+            "CREATE TRIGGER users_fts_au AFTER UPDATE OF search_text ON users BEGIN "
+            "INSERT INTO users_fts(users_fts, rowid, search_text) VALUES ('delete', old.id, old.search_text); "
+            "INSERT INTO users_fts(rowid, search_text) VALUES (new.id, new.search_text); END"
+        )
+
+
+def downgrade():
+    conn = op.get_bind()
+    if conn.dialect.name == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_users_search_text_trgm")
+    elif conn.dialect.name == 'sqlite':
+        for trigger in ('users_fts_ai', 'users_fts_ad', 'users_fts_au'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS users_fts")
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('search_text')
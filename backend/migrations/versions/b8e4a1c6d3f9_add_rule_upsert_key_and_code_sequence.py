@@ -0,0 +1,78 @@
+"""Unique disease/symptom key on rules and a rule code sequence
+
+Revision ID: b8e4a1c6d3f9
+Revises: a7d3f9b5c2e8
+Create Date: 2026-10-19 19:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8e4a1c6d3f9'
+down_revision = 'a7d3f9b5c2e8'
+branch_labels = None
+depends_on = None
+
+
+def _table_exists(conn, table_name):
+    return table_name in sa.inspect(conn).get_table_names()
+
+
+def _index_exists(conn, table_name, index_name):
+    return index_name in [index['name'] for index in sa.inspect(conn).get_indexes(table_name)]
+
+
+def _last_rule_number(conn):
+    """Highest numeric part of the existing R### codes"""
+    last = 0
+    for (code,) in conn.execute(sa.text("SELECT rule_code FROM rules")):
+        if code and code[1:].isdigit():
+            last = max(last, int(code[1:]))
+    return last
+
+
+def upgrade():
+    conn = op.get_bind()
+
+    # Duplicate disease/symptom pairs would block the unique index: keep the
+    # oldest rule of each pair and point history rows at it
+    duplicates = conn.execute(sa.text(
+        "SELECT r.id, keep.id FROM rules r "
+        "JOIN (SELECT disease_id, symptom_id, MIN(id) AS id FROM rules "
+        "      GROUP BY disease_id, symptom_id HAVING COUNT(*) > 1) keep "
+        "ON r.disease_id = keep.disease_id AND r.symptom_id = keep.symptom_id AND r.id <> keep.id"
+    )).fetchall()
+    for duplicate_id, keep_id in duplicates:
+        conn.execute(
+            sa.text("UPDATE diagnosis_history SET matched_rule_id = :keep WHERE matched_rule_id = :duplicate"),
+            {'keep': keep_id, 'duplicate': duplicate_id}
+        )
+        conn.execute(sa.text("DELETE FROM rules WHERE id = :id"), {'id': duplicate_id})
+
+    if not _index_exists(conn, 'rules', 'uq_rules_disease_symptom'):
+        op.create_index('uq_rules_disease_symptom', 'rules', ['disease_id', 'symptom_id'], unique=True)
+
+    last = _last_rule_number(conn)
+    if conn.dialect.name == 'postgresql':
+        op.execute("CREATE SEQUENCE IF NOT EXISTS rule_code_seq")
+        if last:
+            op.execute(f"SELECT setval('rule_code_seq', {last})")
+    elif not _table_exists(conn, 'rule_code_counter'):
+        op.create_table(
+            'rule_code_counter',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('last_value', sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.execute(f"INSERT INTO rule_code_counter (id, last_value) VALUES (1, {last})")
+
+
+def downgrade():
+    conn = op.get_bind()
+    if conn.dialect.name == 'postgresql':
+        op.execute("DROP SEQUENCE IF EXISTS rule_code_seq")
+    elif _table_exists(conn, 'rule_code_counter'):
+        op.drop_table('rule_code_counter')
+    if _index_exists(conn, 'rules', 'uq_rules_disease_symptom'):
+        op.drop_index('uq_rules_disease_symptom', table_name='rules')
@@ -0,0 +1,48 @@
+"""Add solution_library table
+
+Revision ID: c3e7a1f2b8d4
+Revises: 9b1d2a3c4e5f
+Create Date: 2026-10-19 09:30:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3e7a1f2b8d4'
+down_revision = '9b1d2a3c4e5f'
+branch_labels = None
+depends_on = None
+
+
+def _table_exists(conn, table_name):
+    return table_name in sa.inspect(conn).get_table_names()
+
+
+def upgrade():
+    conn = op.get_bind()
+    if _table_exists(conn, 'solution_library'):
+        return
+
+    op.create_table(
+        'solution_library',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('disease_id', sa.Integer(), nullable=False),
+        sa.Column('confidence_band', sa.String(length=30), nullable=False),
+        sa.Column('raw_text', sa.Text(), nullable=True),
+        sa.Column('solution_json', sa.PickleType(), nullable=False),
+        sa.Column('source', sa.String(length=20), nullable=True),
+        sa.Column('provider', sa.String(length=30), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['disease_id'], ['diseases.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('disease_id', 'confidence_band', name='uq_solution_library_disease_band')
+    )
+    op.create_index('ix_solution_library_disease_id', 'solution_library', ['disease_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_solution_library_disease_id', table_name='solution_library')
+    op.drop_table('solution_library')
@@ -0,0 +1,46 @@
+"""Add diagnosis_sessions table
+
+Revision ID: c9f5b3d8e2a4
+Revises: b8e4a1c6d3f9
+Create Date: 2026-10-19 19:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c9f5b3d8e2a4'
+down_revision = 'b8e4a1c6d3f9'
+branch_labels = None
+depends_on = None
+
+
+def _table_exists(conn, table_name):
+    return table_name in sa.inspect(conn).get_table_names()
+
+
+def upgrade():
+    conn = op.get_bind()
+    if _table_exists(conn, 'diagnosis_sessions'):
+        return
+
+    op.create_table(
+        'diagnosis_sessions',
+        sa.Column('id', sa.String(length=32), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('kb_checksum', sa.String(length=64), nullable=True),
+        sa.Column('state', sa.PickleType(), nullable=False),
+        sa.Column('revision', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_diagnosis_sessions_user_id', 'diagnosis_sessions', ['user_id'], unique=False)
+    op.create_index('ix_diagnosis_sessions_updated_at', 'diagnosis_sessions', ['updated_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_diagnosis_sessions_updated_at', table_name='diagnosis_sessions')
+    op.drop_index('ix_diagnosis_sessions_user_id', table_name='diagnosis_sessions')
+    op.drop_table('diagnosis_sessions')
@@ -0,0 +1,56 @@
+"""Add jobs table
+
+Revision ID: d4f8b2a6c1e9
+Revises: c3e7a1f2b8d4
+Create Date: 2026-10-19 12:10:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4f8b2a6c1e9'
+down_revision = 'c3e7a1f2b8d4'
+branch_labels = None
+depends_on = None
+
+
+def _table_exists(conn, table_name):
+    return table_name in sa.inspect(conn).get_table_names()
+
+
+def upgrade():
+    conn = op.get_bind()
+    if _table_exists(conn, 'jobs'):
+        return
+
+    op.create_table(
+        'jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('task', sa.String(length=100), nullable=False),
+        sa.Column('payload', sa.PickleType(), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('priority', sa.Integer(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('max_attempts', sa.Integer(), nullable=False),
+        sa.Column('run_at', sa.DateTime(), nullable=False),
+        sa.Column('locked_by', sa.String(length=100), nullable=True),
+        sa.Column('locked_at', sa.DateTime(), nullable=True),
+        sa.Column('progress', sa.PickleType(), nullable=True),
+        sa.Column('result', sa.PickleType(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_by', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['created_by'], ['users.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_jobs_task', 'jobs', ['task'], unique=False)
+    op.create_index('ix_jobs_claim', 'jobs', ['status', 'priority', 'run_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_jobs_claim', table_name='jobs')
+    op.drop_index('ix_jobs_task', table_name='jobs')
+    op.drop_table('jobs')
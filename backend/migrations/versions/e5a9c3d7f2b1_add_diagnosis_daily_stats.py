@@ -0,0 +1,44 @@
+"""Add diagnosis_daily_stats table
+
+Revision ID: e5a9c3d7f2b1
+Revises: d4f8b2a6c1e9
+Create Date: 2026-10-19 13:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a9c3d7f2b1'
+down_revision = 'd4f8b2a6c1e9'
+branch_labels = None
+depends_on = None
+
+
+def _table_exists(conn, table_name):
+    return table_name in sa.inspect(conn).get_table_names()
+
+
+def upgrade():
+    conn = op.get_bind()
+    if _table_exists(conn, 'diagnosis_daily_stats'):
+        return
+
+    op.create_table(
+        'diagnosis_daily_stats',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('disease_id', sa.Integer(), nullable=True),
+        sa.Column('diagnosis_count', sa.Integer(), nullable=False),
+        sa.Column('cf_sum', sa.Float(), nullable=False),
+        sa.Column('cf_count', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['disease_id'], ['diseases.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_diagnosis_daily_stats_day', 'diagnosis_daily_stats', ['day'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_diagnosis_daily_stats_day', table_name='diagnosis_daily_stats')
+    op.drop_table('diagnosis_daily_stats')
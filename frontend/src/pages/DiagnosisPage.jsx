@@ -1,10 +1,10 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { useAuth } from '../context/AuthContext';
 import { Navigate, useNavigate } from 'react-router-dom';
 import { FaCheckCircle, FaSearch, FaTimes, FaSeedling, FaLeaf } from 'react-icons/fa';
 import { GiWheat, GiPlantRoots, GiGrainBundle, GiPlantSeed } from 'react-icons/gi';
 import { MdTimeline } from 'react-icons/md';
-import api from '../services/api';
+import symptomService from '../services/symptomService';
 
 const DiagnosisPage = () => {
   const { isAuthenticated } = useAuth();
@@ -12,8 +12,10 @@ const DiagnosisPage = () => {
   const [activeCategory, setActiveCategory] = useState('Semua');
   const [selectedSymptoms, setSelectedSymptoms] = useState([]);
   const [searchQuery, setSearchQuery] = useState('');
-  const [loading, setLoading] = useState(true);
-  const [symptoms, setSymptoms] = useState([]);
+  const [loading, setLoading] = useState(false);
+  const [browsing, setBrowsing] = useState(false);
+  const [catalog, setCatalog] = useState(null);
+  const [knownSymptoms, setKnownSymptoms] = useState({});
   const [currentPage, setCurrentPage] = useState(1);
   const symptomsPerPage = 12;
   const [error, setError] = useState('');
@@ -28,15 +30,26 @@ const DiagnosisPage = () => {
     { id: 'Pertumbuhan', name: 'Pertumbuhan', icon: '📊' }
   ];
 
-  // Fetch symptoms from backend
+  // Remember every symptom we have seen so the selection can be passed on
+  const rememberSymptoms = (list) => {
+    setKnownSymptoms(prev => {
+      const next = { ...prev };
+      list.forEach(symptom => { next[symptom.id] = symptom; });
+      return next;
+    });
+  };
+
+  // Full catalog only when the user browses the list (not on page load)
   useEffect(() => {
+    if (!browsing || catalog !== null) {
+      return;
+    }
     const fetchSymptoms = async () => {
       try {
         setLoading(true);
-        const response = await api.get('/symptoms');
-        if (response.data.success) {
-          setSymptoms(response.data.data);
-        }
+        const data = await symptomService.getAllSymptoms();
+        setCatalog(data);
+        rememberSymptoms(data);
       } catch (error) {
         console.error('Error fetching symptoms:', error);
       } finally {
@@ -45,20 +58,51 @@ const DiagnosisPage = () => {
     };
 
     fetchSymptoms();
-  }, []);
+  }, [browsing, catalog]);
+
+  // Server-side ranked search (typo tolerant); a response that arrives after a
+  // newer query was sent is dropped
+  const [searchResults, setSearchResults] = useState(null);
+  const searchSeq = useRef(0);
+  useEffect(() => {
+    const seq = ++searchSeq.current;
+    const query = searchQuery.trim();
+    if (!query) {
+      setSearchResults(null);
+      return undefined;
+    }
+    const timer = setTimeout(async () => {
+      try {
+        const results = await symptomService.searchSymptoms(query, {
+          category: activeCategory === 'Semua' ? undefined : activeCategory,
+          limit: 50,
+        });
+        if (seq !== searchSeq.current) {
+          return;
+        }
+        setSearchResults(results);
+        rememberSymptoms(results);
+      } catch (error) {
+        if (seq === searchSeq.current) {
+          setSearchResults([]);
+        }
+      }
+    }, 200);
+    return () => clearTimeout(timer);
+  }, [searchQuery, activeCategory]);
 
   if (!isAuthenticated) {
     return <Navigate to="/login" />;
   }
 
-  // Filter symptoms
-  const filteredSymptoms = symptoms.filter(symptom => {
-    const matchesCategory = activeCategory === 'Semua' ||
-      (symptom.category && symptom.category.toLowerCase() === activeCategory.toLowerCase());
-    const matchesSearch = symptom.name.toLowerCase().includes(searchQuery.toLowerCase()) ||
-                          symptom.code.toLowerCase().includes(searchQuery.toLowerCase());
-    return matchesCategory && matchesSearch;
-  });
+  // Search results in server ranking order, otherwise the (lazily loaded) catalog
+  const matchesCategory = (symptom) => activeCategory === 'Semua' ||
+    (symptom.category && symptom.category.toLowerCase() === activeCategory.toLowerCase());
+  const searching = searchQuery.trim() !== '';
+  const filteredSymptoms = searching
+    ? (searchResults || [])
+    : (catalog || []).filter(matchesCategory);
+  const showList = searching || browsing;
 
   // Pagination
   const indexOfLastSymptom = currentPage * symptomsPerPage;
@@ -86,7 +130,7 @@ const DiagnosisPage = () => {
 
     setError('');
 
-    const selectedSymptomsData = symptoms.filter(s => selectedSymptoms.includes(s.id));
+    const selectedSymptomsData = selectedSymptoms.map(id => knownSymptoms[id]).filter(Boolean);
     navigate('/certainty-input', {
       state: {
         symptoms: selectedSymptomsData,
@@ -232,6 +276,7 @@ const DiagnosisPage = () => {
                 key={category.id}
                 onClick={() => {
                   setActiveCategory(category.id);
+                  setBrowsing(true);
                   setCurrentPage(1);
                 }}
                 className={`px-4 py-2 rounded-lg font-medium transition ${
@@ -246,8 +291,18 @@ const DiagnosisPage = () => {
           </div>
         </div>
 
-        {/* Loading State */}
-        {loading ? (
+        {!showList ? (
+          <div className="text-center py-12">
+            <FaSearch className="text-gray-400 text-5xl mx-auto mb-4" />
+            <p className="text-gray-600 mb-4">Ketik gejala yang Anda amati, atau pilih kategori di atas</p>
+            <button
+              onClick={() => setBrowsing(true)}
+              className="px-4 py-2 bg-white text-green-700 border border-green-700 rounded-lg hover:bg-green-50 transition"
+            >
+              Tampilkan semua gejala
+            </button>
+          </div>
+        ) : (!searching && loading) ? (
           <div className="text-center py-12">
             <div className="inline-block animate-spin rounded-full h-12 w-12 border-t-2 border-b-2 border-green-700"></div>
             <p className="text-gray-600 mt-4">Memuat gejala...</p>
@@ -291,7 +346,7 @@ const DiagnosisPage = () => {
             </div>
 
             {/* Empty State */}
-            {filteredSymptoms.length === 0 && (
+            {filteredSymptoms.length === 0 && (!searching || searchResults !== null) && (
               <div className="text-center py-12">
                 <FaSearch className="text-gray-400 text-5xl mx-auto mb-4" />
                 <p className="text-gray-600">Tidak ada gejala yang sesuai dengan pencarian Anda</p>
@@ -337,38 +392,38 @@ const DiagnosisPage = () => {
                 </p>
               </div>
             )}
+          </>
+        )}
 
-            {/* Selection Summary - Moved to bottom */}
-            {selectedSymptoms.length > 0 && (
-              <div className="bg-green-50 border-l-4 border-green-700 p-4 rounded-r-lg">
-                <div className="flex items-center justify-between flex-wrap gap-4">
-                  <div className="flex items-center space-x-3">
-                    <FaCheckCircle className="text-green-700 text-2xl" />
-                    <div>
-                      <p className="text-gray-800 font-semibold">
-                        Menampilkan {filteredSymptoms.length} dari {symptoms.length} gejala • {selectedSymptoms.length} gejala dipilih
-                      </p>
-                    </div>
-                  </div>
-                  <div className="flex space-x-2">
-                    <button
-                      onClick={clearSelection}
-                      className="px-4 py-2 text-red-600 hover:bg-red-50 rounded-md transition border border-red-200"
-                    >
-                      <FaTimes className="inline mr-1" />
-                      Hapus Semua
-                    </button>
-                    <button
-                      onClick={handleSubmitDiagnosis}
-                      className="px-6 py-2 bg-green-700 hover:bg-green-800 text-white rounded-md transition flex items-center"
-                    >
-                      Lanjutkan →
-                    </button>
-                  </div>
+        {/* Selection Summary - Moved to bottom */}
+        {selectedSymptoms.length > 0 && (
+          <div className="bg-green-50 border-l-4 border-green-700 p-4 rounded-r-lg">
+            <div className="flex items-center justify-between flex-wrap gap-4">
+              <div className="flex items-center space-x-3">
+                <FaCheckCircle className="text-green-700 text-2xl" />
+                <div>
+                  <p className="text-gray-800 font-semibold">
+                    Menampilkan {filteredSymptoms.length}{catalog ? ` dari ${catalog.length}` : ''} gejala • {selectedSymptoms.length} gejala dipilih
+                  </p>
                 </div>
               </div>
-            )}
-          </>
+              <div className="flex space-x-2">
+                <button
+                  onClick={clearSelection}
+                  className="px-4 py-2 text-red-600 hover:bg-red-50 rounded-md transition border border-red-200"
+                >
+                  <FaTimes className="inline mr-1" />
+                  Hapus Semua
+                </button>
+                <button
+                  onClick={handleSubmitDiagnosis}
+                  className="px-6 py-2 bg-green-700 hover:bg-green-800 text-white rounded-md transition flex items-center"
+                >
+                  Lanjutkan →
+                </button>
+              </div>
+            </div>
+          </div>
         )}
       </div>
     </div>
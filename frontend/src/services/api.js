@@ -23,15 +23,41 @@ api.interceptors.request.use(
   }
 );
 
+// Access tokens are short-lived; one refresh is shared by all requests that hit a 401
+let refreshPromise = null;
+
+const refreshTokens = () => {
+  if (!refreshPromise) {
+    const refreshToken = localStorage.getItem('refreshToken');
+    refreshPromise = (refreshToken
+      ? axios.post(`${api.defaults.baseURL}/auth/refresh`, null, {
+          headers: { Authorization: `Bearer ${refreshToken}` },
+        })
+      : Promise.reject(new Error('No refresh token'))
+    )
+      .then((response) => {
+        const { token, refresh_token } = response.data.data;
+        localStorage.setItem('token', token);
+        localStorage.setItem('refreshToken', refresh_token);
+        return token;
+      })
+      .finally(() => {
+        refreshPromise = null;
+      });
+  }
+  return refreshPromise;
+};
+
 // Response interceptor - handle errors globally
 api.interceptors.response.use(
   (response) => {
     return response;
   },
-  (error) => {
+  async (error) => {
     if (error.response) {
       // Server responded with error status
       const { status, data } = error.response;
+      const original = error.config;
 
       const authError =
         status === 401 ||
@@ -39,9 +65,22 @@ api.interceptors.response.use(
           typeof data?.msg === 'string' &&
           /token|signature/i.test(data.msg));
 
+      if (authError && original && !original._retried && !/\/auth\/(login|register|refresh)/.test(original.url)) {
+        // Expired access token - renew it once and repeat the request
+        original._retried = true;
+        try {
+          const token = await refreshTokens();
+          original.headers.Authorization = `Bearer ${token}`;
+          return api(original);
+        } catch (refreshError) {
+          // Fall through to logout below
+        }
+      }
+
       if (authError) {
         // Invalid/expired token - clear auth and redirect to login
         localStorage.removeItem('token');
+        localStorage.removeItem('refreshToken');
         localStorage.removeItem('user');
         window.location.href = '/login';
       } else if (status === 403) {
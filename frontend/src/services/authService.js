@@ -6,8 +6,9 @@ const authService = {
     try {
       const response = await api.post('/auth/login', { email, password });
       if (response.data.success) {
-        const { user, token } = response.data.data;
+        const { user, token, refresh_token } = response.data.data;
         localStorage.setItem('token', token);
+        localStorage.setItem('refreshToken', refresh_token);
         localStorage.setItem('user', JSON.stringify(user));
         return { user, token };
       }
@@ -22,8 +23,9 @@ const authService = {
     try {
       const response = await api.post('/auth/register', userData);
       if (response.data.success) {
-        const { user, token } = response.data.data;
+        const { user, token, refresh_token } = response.data.data;
         localStorage.setItem('token', token);
+        localStorage.setItem('refreshToken', refresh_token);
         localStorage.setItem('user', JSON.stringify(user));
         return { user, token };
       }
@@ -38,8 +40,9 @@ const authService = {
     try {
       const response = await api.post('/auth/google', { credential });
       if (response.data.success) {
-        const { user, token } = response.data.data;
+        const { user, token, refresh_token } = response.data.data;
         localStorage.setItem('token', token);
+        localStorage.setItem('refreshToken', refresh_token);
         localStorage.setItem('user', JSON.stringify(user));
         return { user, token };
       }
@@ -74,9 +77,21 @@ const authService = {
     }
   },
 
-  // Logout
+  // Logout - revokes both tokens on the server (best effort)
   logout: () => {
+    const token = localStorage.getItem('token');
+    const refreshToken = localStorage.getItem('refreshToken');
+    if (token) {
+      api
+        .post(
+          '/auth/logout',
+          { refresh_token: refreshToken },
+          { headers: { Authorization: `Bearer ${token}` }, _retried: true }
+        )
+        .catch(() => {});
+    }
     localStorage.removeItem('token');
+    localStorage.removeItem('refreshToken');
     localStorage.removeItem('user');
   },
 
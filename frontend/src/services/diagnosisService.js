@@ -23,6 +23,36 @@ const diagnosisService = {
     }
   },
 
+  // Interactive session: start, then add/remove symptoms one at a time
+  startSession: async (certaintyValues = {}) => {
+    try {
+      const response = await api.post('/diagnosis/session', { certainty_values: certaintyValues });
+      return response.data.data;
+    } catch (error) {
+      throw error.response?.data || error;
+    }
+  },
+
+  updateSessionSymptoms: async (sessionId, certaintyValues) => {
+    try {
+      const response = await api.put(`/diagnosis/session/${sessionId}/symptoms`, {
+        certainty_values: certaintyValues,
+      });
+      return response.data.data;
+    } catch (error) {
+      throw error.response?.data || error;
+    }
+  },
+
+  removeSessionSymptom: async (sessionId, symptomId) => {
+    try {
+      const response = await api.delete(`/diagnosis/session/${sessionId}/symptoms/${symptomId}`);
+      return response.data.data;
+    } catch (error) {
+      throw error.response?.data || error;
+    }
+  },
+
   // Get diagnosis result
   getDiagnosisResult: async (historyId) => {
     try {
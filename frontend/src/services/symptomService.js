@@ -14,6 +14,21 @@ const symptomService = {
     }
   },
 
+  // Ranked, typo-tolerant symptom suggestions from the server
+  searchSymptoms: async (query, { category, limit = 10 } = {}) => {
+    try {
+      const response = await api.get('/symptoms/search', {
+        params: { q: query, category, limit },
+      });
+      if (response.data.success) {
+        return response.data.data;
+      }
+      throw new Error('Failed to search symptoms');
+    } catch (error) {
+      throw error.response?.data || error;
+    }
+  },
+
   // Get symptoms by category
   getSymptomsByCategory: async (category) => {
     try {